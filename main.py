@@ -10,6 +10,14 @@ from src.api.v1 import (
     auth_routes, admin_routes, survey_responses, survey_management, upload_tracking
 )
 from src.infrastructure.database.connection import db_manager
+from src.infrastructure.auth.password_hashing import password_hasher
+from src.services.parsing_executor import parsing_executor
+from src.services.audit_writer import audit_writer
+from src.services.audit_rollup import audit_rollup_job
+from src.services.audit_partitions import audit_retention_job
+from src.services.reference_index import reference_index_job
+from src.services.export_jobs import ExportJobService, export_job_sweep
+from src.services.upload_jobs import UploadJobService
 from src.utils.exception_handler import (
     validation_exception_handler,
     http_exception_handler,
@@ -46,10 +54,32 @@ def get_application():
     async def startup():
         logger.info("Starting up...")
         db_manager.create_tables()  # Create tables on startup
+        # Export and upload jobs left unfinished by a stopped process
+        db = db_manager.SessionLocal()
+        try:
+            failed = ExportJobService(db).fail_stale_jobs()
+            if failed:
+                logger.warning(f"Marked {failed} interrupted export jobs as failed")
+            failed = UploadJobService(db).fail_stale_jobs()
+            if failed:
+                logger.warning(f"Marked {failed} interrupted upload jobs as failed")
+        finally:
+            db.close()
+        audit_rollup_job.start()
+        audit_retention_job.start()
+        reference_index_job.start()
+        export_job_sweep.start()
 
     @_app.on_event("shutdown")
     async def shutdown():
         logger.info("Shutting down...")
+        parsing_executor.shutdown()
+        password_hasher.shutdown()
+        audit_writer.shutdown()
+        audit_rollup_job.stop()
+        audit_retention_job.stop()
+        reference_index_job.stop()
+        export_job_sweep.stop()
 
     # Add exception handlers
     _app.add_exception_handler(RequestValidationError, validation_exception_handler)
@@ -59,12 +89,13 @@ def get_application():
     # Include routers
     _app.include_router(auth_routes.router)
     _app.include_router(admin_routes.router)
+    # Before surveys: /surveys/{schema_name}/{survey_id} would also match /surveys/{id}/progress etc.
+    _app.include_router(survey_responses.router)
+    _app.include_router(survey_management.router)
     _app.include_router(surveys.router)
     _app.include_router(file_upload.router)
     _app.include_router(instat_routes.router)
     _app.include_router(mali_reference_routes.router)
-    _app.include_router(survey_responses.router)
-    _app.include_router(survey_management.router)
     _app.include_router(upload_tracking.router)
 
     return _app
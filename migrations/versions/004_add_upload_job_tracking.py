@@ -0,0 +1,42 @@
+"""Add upload job tracking to ParsingResult
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add job id, status and per-stage outcome columns to ParsingResult"""
+    op.add_column('ParsingResult', sa.Column('JobID', sa.String(36)), schema='public')
+    op.add_column('ParsingResult', sa.Column('Status', sa.String(20), server_default='completed'), schema='public')
+    op.add_column('ParsingResult', sa.Column('CurrentStage', sa.String(50)), schema='public')
+    op.add_column('ParsingResult', sa.Column('Stages', sa.JSON()), schema='public')
+    op.add_column('ParsingResult', sa.Column('FileHash', sa.String(64)), schema='public')
+    op.add_column('ParsingResult', sa.Column('SchemaName', sa.String(50)), schema='public')
+    op.add_column('ParsingResult', sa.Column('CreatedBy', sa.String(100)), schema='public')
+    op.add_column('ParsingResult', sa.Column('SurveyID', sa.Integer()), schema='public')
+    op.add_column('ParsingResult', sa.Column('TemplateID', sa.Integer()), schema='public')
+    op.add_column(
+        'ParsingResult',
+        sa.Column('UpdatedAt', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP')),
+        schema='public'
+    )
+    op.create_index('ix_public_ParsingResult_JobID', 'ParsingResult', ['JobID'], unique=True, schema='public')
+
+
+def downgrade() -> None:
+    """Remove upload job tracking columns"""
+    op.drop_index('ix_public_ParsingResult_JobID', table_name='ParsingResult', schema='public')
+    for column in ('UpdatedAt', 'TemplateID', 'SurveyID', 'CreatedBy', 'SchemaName',
+                   'FileHash', 'Stages', 'CurrentStage', 'Status', 'JobID'):
+        op.drop_column('ParsingResult', column, schema='public')
@@ -0,0 +1,71 @@
+"""Add precomputed structure statistics to SurveyTemplates
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def _complexity(question_count: int) -> str:
+    return 'High' if question_count > 50 else 'Medium' if question_count > 20 else 'Low'
+
+
+def upgrade() -> None:
+    """Add section, subsection and question counts and complexity level, backfilled from Sections"""
+    op.add_column('SurveyTemplates', sa.Column('SectionCount', sa.Integer(), server_default='0'), schema='public')
+    op.add_column('SurveyTemplates', sa.Column('SubsectionCount', sa.Integer(), server_default='0'), schema='public')
+    op.add_column('SurveyTemplates', sa.Column('QuestionCount', sa.Integer(), server_default='0'), schema='public')
+    op.add_column(
+        'SurveyTemplates',
+        sa.Column('ComplexityLevel', sa.String(10), server_default='Low'),
+        schema='public'
+    )
+    op.create_index('ix_public_SurveyTemplates_QuestionCount', 'SurveyTemplates', ['QuestionCount'], schema='public')
+    op.create_index('ix_public_SurveyTemplates_ComplexityLevel', 'SurveyTemplates', ['ComplexityLevel'], schema='public')
+
+    templates = sa.table(
+        'SurveyTemplates',
+        sa.column('TemplateID', sa.Integer()),
+        sa.column('Sections', sa.JSON()),
+        sa.column('SectionCount', sa.Integer()),
+        sa.column('SubsectionCount', sa.Integer()),
+        sa.column('QuestionCount', sa.Integer()),
+        sa.column('ComplexityLevel', sa.String(10)),
+        schema='public'
+    )
+    connection = op.get_bind()
+    rows = connection.execute(sa.select(templates.c.TemplateID, templates.c.Sections)).all()
+    for template_id, sections in rows:
+        sections = sections or []
+        subsections = [subsection for section in sections for subsection in section.get('subsections', [])]
+        questions = (
+            sum(len(section.get('questions', [])) for section in sections)
+            + sum(len(subsection.get('questions', [])) for subsection in subsections)
+        )
+        connection.execute(
+            templates.update()
+            .where(templates.c.TemplateID == template_id)
+            .values(
+                SectionCount=len(sections),
+                SubsectionCount=len(subsections),
+                QuestionCount=questions,
+                ComplexityLevel=_complexity(questions)
+            )
+        )
+
+
+def downgrade() -> None:
+    """Remove template statistics columns"""
+    op.drop_index('ix_public_SurveyTemplates_ComplexityLevel', table_name='SurveyTemplates', schema='public')
+    op.drop_index('ix_public_SurveyTemplates_QuestionCount', table_name='SurveyTemplates', schema='public')
+    for column in ('ComplexityLevel', 'QuestionCount', 'SubsectionCount', 'SectionCount'):
+        op.drop_column('SurveyTemplates', column, schema='public')
@@ -0,0 +1,41 @@
+"""Add AuditLogRollup table for audit statistics
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create the hourly/daily audit rollup table (filled by the rollup job on its first run)"""
+    op.create_table(
+        'AuditLogRollup',
+        sa.Column('RollupID', sa.Integer(), nullable=False),
+        sa.Column('Granularity', sa.String(10), nullable=False),
+        sa.Column('BucketStart', sa.DateTime(), nullable=False),
+        sa.Column('Action', sa.String(100), nullable=False),
+        sa.Column('Resource', sa.String(100)),
+        sa.Column('Success', sa.Boolean()),
+        sa.Column('Count', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('RollupID'),
+        sa.UniqueConstraint('Granularity', 'BucketStart', 'Action', 'Resource', 'Success',
+                            name='uq_AuditLogRollup_bucket'),
+        schema='public'
+    )
+    op.create_index('ix_public_AuditLogRollup_Granularity_BucketStart', 'AuditLogRollup',
+                    ['Granularity', 'BucketStart'], schema='public')
+
+
+def downgrade() -> None:
+    """Drop the audit rollup table"""
+    op.drop_index('ix_public_AuditLogRollup_Granularity_BucketStart', table_name='AuditLogRollup', schema='public')
+    op.drop_table('AuditLogRollup', schema='public')
@@ -0,0 +1,43 @@
+"""Add composite and BRIN indexes to AuditLog
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+# (name, columns, extra keyword arguments) matching models.AuditLog
+INDEXES = [
+    ('ix_public_AuditLog_Timestamp_LogID', ['Timestamp', 'LogID'], {}),
+    ('ix_public_AuditLog_UserID_Timestamp', ['UserID', 'Timestamp', 'LogID'], {}),
+    ('ix_public_AuditLog_Action_Timestamp', ['Action', 'Timestamp', 'LogID'], {}),
+    ('ix_public_AuditLog_Resource_Timestamp', ['Resource', 'Timestamp', 'LogID'], {}),
+    ('ix_public_AuditLog_Failed_Timestamp', ['Timestamp', 'LogID'],
+     {'postgresql_where': sa.text('"Success" = false'), 'sqlite_where': sa.text('"Success" = 0')}),
+    ('ix_public_AuditLog_Timestamp_brin', ['Timestamp'], {'postgresql_using': 'brin'}),
+]
+
+
+def upgrade() -> None:
+    """Create the AuditLog indexes, without blocking writes on PostgreSQL"""
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+    # CREATE INDEX CONCURRENTLY cannot run inside the migration transaction
+    with op.get_context().autocommit_block():
+        for name, columns, options in INDEXES:
+            if postgresql:
+                options = dict(options, postgresql_concurrently=True)
+            op.create_index(name, 'AuditLog', columns, schema='public', if_not_exists=True, **options)
+
+
+def downgrade() -> None:
+    """Drop the AuditLog indexes"""
+    for name, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='AuditLog', schema='public', if_exists=True)
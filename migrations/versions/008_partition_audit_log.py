@@ -0,0 +1,121 @@
+"""Optionally partition AuditLog by month of Timestamp
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-17 12:30:00.000000
+
+Only applied on PostgreSQL when AUDIT_LOG_PARTITIONING=true; the table is
+locked while its rows are moved, so run it in a maintenance window. Entries
+without a Timestamp must be fixed first, the upgrade refuses to guess one.
+
+The setting is only read when the upgrade runs: to partition a database
+already past this revision, run scripts/partition_audit_log.py (same
+conversion, with the indexes of the current model) and then set
+AUDIT_LOG_PARTITIONING=true.
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+import config
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+# (name, columns, extra keyword arguments) of the AuditLog indexes at this revision,
+# recreated on the rebuilt table
+INDEXES = [
+    ('ix_public_AuditLog_LogID', ['LogID'], {}),
+    ('ix_public_AuditLog_Timestamp_LogID', ['Timestamp', 'LogID'], {}),
+    ('ix_public_AuditLog_UserID_Timestamp', ['UserID', 'Timestamp', 'LogID'], {}),
+    ('ix_public_AuditLog_Action_Timestamp', ['Action', 'Timestamp', 'LogID'], {}),
+    ('ix_public_AuditLog_Resource_Timestamp', ['Resource', 'Timestamp', 'LogID'], {}),
+    ('ix_public_AuditLog_Failed_Timestamp', ['Timestamp', 'LogID'], {'postgresql_where': sa.text('"Success" = false')}),
+    ('ix_public_AuditLog_Timestamp_brin', ['Timestamp'], {'postgresql_using': 'brin'}),
+]
+
+
+def _next_month(month: datetime) -> datetime:
+    return month.replace(year=month.year + 1, month=1) if month.month == 12 else month.replace(month=month.month + 1)
+
+
+def _is_partitioned(bind) -> bool:
+    return bool(bind.execute(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('public.\"AuditLog\"'))"
+    )).scalar())
+
+
+def _move_serial(bind, source: str, target: str) -> None:
+    # The LogID sequence belongs to the table being dropped; hand it over first
+    sequence = bind.execute(
+        sa.text("SELECT pg_get_serial_sequence(:table, 'LogID')"), {"table": f'public."{source}"'}
+    ).scalar()
+    if sequence:
+        op.execute(f'ALTER SEQUENCE {sequence} OWNED BY public."{target}"."LogID"')
+
+
+def _create_indexes() -> None:
+    for name, columns, options in INDEXES:
+        op.create_index(name, 'AuditLog', columns, schema='public', **options)
+
+
+def upgrade() -> None:
+    """Rebuild AuditLog as a monthly range-partitioned table"""
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql' or not config.AUDIT_LOG_PARTITIONING or _is_partitioned(bind):
+        return
+
+    op.execute('LOCK TABLE public."AuditLog" IN ACCESS EXCLUSIVE MODE')
+    undated = bind.execute(sa.text('SELECT count(*) FROM public."AuditLog" WHERE "Timestamp" IS NULL')).scalar()
+    if undated:
+        raise RuntimeError(f'{undated} AuditLog entries have no Timestamp; set or delete them before partitioning')
+    op.execute('CREATE TABLE public."AuditLog_partitioned" (LIKE public."AuditLog" INCLUDING DEFAULTS) '
+               'PARTITION BY RANGE ("Timestamp")')
+    op.execute('ALTER TABLE public."AuditLog_partitioned" ALTER COLUMN "Timestamp" SET NOT NULL')
+    op.execute('ALTER TABLE public."AuditLog_partitioned" '
+               'ADD CONSTRAINT "AuditLog_partitioned_pkey" PRIMARY KEY ("LogID", "Timestamp")')
+
+    # One partition per month from the oldest entry through AUDIT_PARTITION_MONTHS_AHEAD months ahead
+    now = datetime.utcnow()
+    oldest = bind.execute(sa.text('SELECT min("Timestamp") FROM public."AuditLog"')).scalar() or now
+    month = oldest.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    last = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    for _ in range(config.AUDIT_PARTITION_MONTHS_AHEAD):
+        last = _next_month(last)
+    while month <= last:
+        op.execute(
+            f'CREATE TABLE public."AuditLog_{month:%Y_%m}" PARTITION OF public."AuditLog_partitioned" '
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{_next_month(month):%Y-%m-%d}')"
+        )
+        month = _next_month(month)
+    op.execute('CREATE TABLE public."AuditLog_default" PARTITION OF public."AuditLog_partitioned" DEFAULT')
+
+    op.execute('INSERT INTO public."AuditLog_partitioned" SELECT * FROM public."AuditLog"')
+    _move_serial(bind, 'AuditLog', 'AuditLog_partitioned')
+    op.execute('DROP TABLE public."AuditLog"')
+    op.execute('ALTER TABLE public."AuditLog_partitioned" RENAME TO "AuditLog"')
+    op.execute('ALTER TABLE public."AuditLog" RENAME CONSTRAINT "AuditLog_partitioned_pkey" TO "AuditLog_pkey"')
+    _create_indexes()
+
+
+def downgrade() -> None:
+    """Rebuild a partitioned AuditLog as a plain table"""
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql' or not _is_partitioned(bind):
+        return
+
+    op.execute('LOCK TABLE public."AuditLog" IN ACCESS EXCLUSIVE MODE')
+    op.execute('CREATE TABLE public."AuditLog_unpartitioned" (LIKE public."AuditLog" INCLUDING DEFAULTS)')
+    op.execute('ALTER TABLE public."AuditLog_unpartitioned" ALTER COLUMN "Timestamp" DROP NOT NULL')
+    op.execute('ALTER TABLE public."AuditLog_unpartitioned" '
+               'ADD CONSTRAINT "AuditLog_unpartitioned_pkey" PRIMARY KEY ("LogID")')
+    op.execute('INSERT INTO public."AuditLog_unpartitioned" SELECT * FROM public."AuditLog"')
+    _move_serial(bind, 'AuditLog', 'AuditLog_unpartitioned')
+    op.execute('DROP TABLE public."AuditLog"')
+    op.execute('ALTER TABLE public."AuditLog_unpartitioned" RENAME TO "AuditLog"')
+    op.execute('ALTER TABLE public."AuditLog" RENAME CONSTRAINT "AuditLog_unpartitioned_pkey" TO "AuditLog_pkey"')
+    _create_indexes()
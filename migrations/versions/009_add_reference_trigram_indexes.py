@@ -0,0 +1,79 @@
+"""Add accent-insensitive trigram indexes to the Mali reference tables
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-17 13:00:00.000000
+
+PostgreSQL only, and skipped when the pg_trgm and unaccent extensions are not
+available on the server: reference searches then use plain ILIKE.
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+# (table, searched columns) matching TABLE_REF_MAPPING search_fields
+SEARCH_COLUMNS = [
+    ('strategic_axis_results', ['strategic_axis', 'operational_objective', 'expected_result']),
+    ('instat_structures', ['structure_name', 'abbreviation']),
+    ('cmr_indicators', ['indicator_name', 'category']),
+    ('operational_results', ['result_description']),
+    ('participating_structures', ['structure_name', 'participation_type']),
+    ('monitoring_indicators', ['indicator_name', 'category']),
+    ('financing_sources', ['source_name', 'source_type']),
+    ('mali_regions', ['region_name', 'region_capital']),
+    ('mali_cercles', ['cercle_name', 'cercle_capital']),
+]
+
+
+def _index_name(table: str, column: str) -> str:
+    return f'ix_{table}_{column}_trgm'
+
+
+def upgrade() -> None:
+    """Create reference_search_text() and a GIN trigram index on it per searched column"""
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+    available = set(bind.execute(sa.text(
+        "SELECT name FROM pg_available_extensions WHERE name IN ('pg_trgm', 'unaccent')"
+    )).scalars())
+    if available != {'pg_trgm', 'unaccent'}:
+        logger.warning("pg_trgm/unaccent not available, reference trigram indexes not created")
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+    # unaccent() is only STABLE; pinning the dictionary makes the wrapper safe to index
+    op.execute(
+        "CREATE OR REPLACE FUNCTION reference_search_text(value text) RETURNS text "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS "
+        "$$ SELECT lower(public.unaccent('public.unaccent'::regdictionary, value)) $$"
+    )
+
+    # CREATE INDEX CONCURRENTLY cannot run inside the migration transaction
+    with op.get_context().autocommit_block():
+        for table, columns in SEARCH_COLUMNS:
+            for column in columns:
+                op.execute(
+                    f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{_index_name(table, column)}" '
+                    f'ON "{table}" USING gin (reference_search_text("{column}") gin_trgm_ops)'
+                )
+
+
+def downgrade() -> None:
+    """Drop the trigram indexes and reference_search_text() (the extensions are kept)"""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for table, columns in reversed(SEARCH_COLUMNS):
+        for column in columns:
+            op.execute(f'DROP INDEX IF EXISTS "{_index_name(table, column)}"')
+    op.execute('DROP FUNCTION IF EXISTS reference_search_text(text)')
@@ -0,0 +1,40 @@
+"""Add RespondentProgress table and Response.RespondentKey
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create the per-respondent progress counters (filled as responses are saved)"""
+    op.add_column('Response', sa.Column('RespondentKey', sa.String(100)))
+    op.create_table(
+        'RespondentProgress',
+        sa.Column('ProgressID', sa.Integer(), nullable=False),
+        sa.Column('SurveyID', sa.Integer(), nullable=False),
+        sa.Column('RespondentKey', sa.String(100), nullable=False),
+        sa.Column('AnsweredQuestionIDs', sa.JSON(), nullable=False),
+        sa.Column('AnsweredQuestions', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('SectionCounts', sa.JSON(), nullable=False),
+        sa.Column('StructureVersion', sa.String(64)),
+        sa.Column('LastActivity', sa.DateTime()),
+        sa.PrimaryKeyConstraint('ProgressID'),
+        sa.ForeignKeyConstraint(['SurveyID'], ['Survey.SurveyID'], ondelete='CASCADE'),
+        sa.UniqueConstraint('SurveyID', 'RespondentKey', name='uq_RespondentProgress_Survey_Respondent')
+    )
+
+
+def downgrade() -> None:
+    """Drop the progress counters and Response.RespondentKey"""
+    op.drop_table('RespondentProgress')
+    op.drop_column('Response', 'RespondentKey')
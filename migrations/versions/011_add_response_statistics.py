@@ -0,0 +1,56 @@
+"""Add SurveyResponseStatistics and QuestionStatistics tables
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create the materialized response statistics (computed on first read, then kept up to date)"""
+    op.create_table(
+        'SurveyResponseStatistics',
+        sa.Column('SurveyID', sa.Integer(), nullable=False),
+        sa.Column('TotalResponses', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('CompletedResponses', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('SectionCompletions', sa.JSON(), nullable=False),
+        sa.Column('ResponsesByDay', sa.JSON(), nullable=False),
+        sa.Column('StructureVersion', sa.String(64)),
+        sa.Column('UpdatedDate', sa.DateTime()),
+        sa.PrimaryKeyConstraint('SurveyID'),
+        sa.ForeignKeyConstraint(['SurveyID'], ['Survey.SurveyID'], ondelete='CASCADE')
+    )
+    op.create_table(
+        'QuestionStatistics',
+        sa.Column('QuestionID', sa.Integer(), nullable=False),
+        sa.Column('SurveyID', sa.Integer(), nullable=False),
+        sa.Column('AnswerCount', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('ResponseCount', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('SkipCount', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('OptionCounts', sa.JSON(), nullable=False),
+        sa.Column('ValueCounts', sa.JSON(), nullable=False),
+        sa.Column('OtherValues', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('NumericCounts', sa.JSON(), nullable=False),
+        sa.Column('NumericSum', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('NumericPrecision', sa.Integer()),
+        sa.PrimaryKeyConstraint('QuestionID'),
+        sa.ForeignKeyConstraint(['QuestionID'], ['Question.QuestionID'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['SurveyID'], ['Survey.SurveyID'], ondelete='CASCADE')
+    )
+    op.create_index('ix_QuestionStatistics_SurveyID', 'QuestionStatistics', ['SurveyID'])
+
+
+def downgrade() -> None:
+    """Drop the response statistics"""
+    op.drop_index('ix_QuestionStatistics_SurveyID', table_name='QuestionStatistics')
+    op.drop_table('QuestionStatistics')
+    op.drop_table('SurveyResponseStatistics')
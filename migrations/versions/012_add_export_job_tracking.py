@@ -0,0 +1,68 @@
+"""Add export job tracking to DataExports
+
+The DataExports table created from the backups only has ExportID, SurveyID and
+ExportFormat; the configuration columns the model and the export jobs use were
+only added by the separate src/infrastructure/database/migrations tree. The
+ones missing are added here as well, so this revision works on either kind of
+database. Downgrading leaves them in place, since they may predate it.
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+
+# Configuration columns of DataExports, added only when missing
+CONFIG_COLUMNS = (
+    sa.Column('ExportType', sa.String(50), nullable=False, server_default='raw_data'),
+    sa.Column('ExportConfig', sa.JSON()),
+    sa.Column('IsScheduled', sa.Boolean(), server_default=sa.false()),
+    sa.Column('ScheduleFrequency', sa.String(50)),
+    sa.Column('NextExport', sa.DateTime()),
+    sa.Column('DeliveryMethod', sa.String(50)),
+    sa.Column('Recipients', sa.JSON()),
+    sa.Column('CreatedBy', sa.String(100)),
+    sa.Column('CreatedDate', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP')),
+    sa.Column('LastExported', sa.DateTime()),
+    sa.Column('ExportCount', sa.Integer(), server_default='0'),
+)
+
+
+def upgrade() -> None:
+    """Add the missing configuration columns and the job id, status, file and progress columns to DataExports"""
+    existing = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('DataExports', schema='public')}
+    for column in CONFIG_COLUMNS:
+        if column.name not in existing:
+            op.add_column('DataExports', column, schema='public')
+
+    op.add_column('DataExports', sa.Column('JobID', sa.String(36)), schema='public')
+    op.add_column('DataExports', sa.Column('Status', sa.String(20)), schema='public')
+    op.add_column('DataExports', sa.Column('FileName', sa.String(255)), schema='public')
+    op.add_column('DataExports', sa.Column('FileSize', sa.BigInteger()), schema='public')
+    op.add_column('DataExports', sa.Column('RowCount', sa.Integer()), schema='public')
+    op.add_column('DataExports', sa.Column('ErrorMessage', sa.Text()), schema='public')
+    op.add_column('DataExports', sa.Column('CompletedDate', sa.DateTime()), schema='public')
+    op.add_column('DataExports', sa.Column('DownloadCount', sa.Integer(), server_default='0'), schema='public')
+    op.add_column(
+        'DataExports',
+        sa.Column('UpdatedAt', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP')),
+        schema='public'
+    )
+    op.create_index('ix_public_DataExports_JobID', 'DataExports', ['JobID'], unique=True, schema='public')
+
+
+def downgrade() -> None:
+    """Remove export job tracking columns"""
+    op.drop_index('ix_public_DataExports_JobID', table_name='DataExports', schema='public')
+    for column in ('UpdatedAt', 'DownloadCount', 'CompletedDate', 'ErrorMessage', 'RowCount',
+                   'FileSize', 'FileName', 'Status', 'JobID'):
+        op.drop_column('DataExports', column, schema='public')
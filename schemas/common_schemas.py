@@ -10,7 +10,7 @@ class PaginatedResponse(BaseModel):
     data: List[Any]
     success: bool = True
     message: str = "Request successful"
-    pagination: Dict[str, int]
+    pagination: Dict[str, Any]
 
 
 class MessageResponse(BaseModel):
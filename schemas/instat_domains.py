@@ -179,6 +179,12 @@ class SurveyTemplate(BaseModel):
     Sections: Optional[List[Dict[str, Any]]] = []
     DefaultQuestions: Optional[List[INSTATQuestion]] = []
     
+    # Structure statistics
+    SectionCount: Optional[int] = 0
+    SubsectionCount: Optional[int] = 0
+    QuestionCount: Optional[int] = 0
+    ComplexityLevel: Optional[str] = None
+    
     # Usage tracking
     UsageCount: Optional[int] = 0
     LastUsed: Optional[datetime] = None
@@ -278,3 +278,27 @@ class TableRefLookupResponse(BaseModel):
     results: List[Dict[str, Any]]
     total_found: int
     filtered: bool
+
+
+class ReferenceValidationItem(BaseModel):
+    """One reference code to validate"""
+    table_ref: str = Field(description="Table reference (e.g., 'TableRef:08')")
+    reference_code: str = Field(description="Code to look up in the table")
+
+
+class ReferenceValidationRequest(BaseModel):
+    """Request model for batch reference validation"""
+    items: List[ReferenceValidationItem] = Field(max_length=1000, description="Codes to validate")
+
+
+class ReferenceValidationResult(BaseModel):
+    """Validation result of one reference code"""
+    table_ref: str
+    reference_code: str
+    exists: bool
+
+
+class ReferenceValidationResponse(BaseModel):
+    """Response model for batch reference validation, results in request order"""
+    results: List[ReferenceValidationResult]
+    all_valid: bool
@@ -104,6 +104,46 @@ class FileUploadResponse(BaseModel):
         }
 
 
+class UploadJobResponse(BaseModel):
+    """Asynchronous upload job status response model"""
+    job_id: str
+    status: str
+    file_name: str
+    schema_name: Optional[str] = None
+    current_stage: Optional[str] = None
+    progress: float = 0.0
+    stages: List[Dict[str, Any]] = []
+    survey_id: Optional[int] = None
+    template_id: Optional[int] = None
+    issues: Optional[List[str]] = None
+    error_message: Optional[str] = None
+    survey_structure: Optional[Dict[str, Any]] = None
+    created_by: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "job_id": "3f2b8c1e-6d4a-4f7e-9a51-0c2d7e8b9f10",
+                "status": "running",
+                "file_name": "survey_20240925_152348.xlsx",
+                "schema_name": "survey_program",
+                "current_stage": "create_survey",
+                "progress": 50.0,
+                "stages": [
+                    {"name": "parse", "status": "completed", "duration_seconds": 4.812},
+                    {"name": "validate", "status": "completed", "duration_seconds": 0.002},
+                    {"name": "create_survey", "status": "running", "duration_seconds": None},
+                    {"name": "create_template", "status": "pending", "duration_seconds": None}
+                ],
+                "created_by": "admin@instat.gov.ml",
+                "created_at": "2024-09-25T15:23:48.123456Z",
+                "updated_at": "2024-09-25T15:23:53.004211Z"
+            }
+        }
+
+
 class DeleteResponse(BaseModel):
     """Delete operation response model"""
     success: bool = True
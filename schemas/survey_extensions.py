@@ -30,6 +30,8 @@ class ExportFormat(str, Enum):
     EXCEL = "excel"
     CSV = "csv"
     JSON = "json"
+    NDJSON = "ndjson"
+    PARQUET = "parquet"
     XML = "xml"
 
 
@@ -77,6 +79,21 @@ class SurveyResponseData(BaseModel):
         orm_mode = True
 
 
+class BulkIngestError(BaseModel):
+    """A rejected line of a bulk ingest"""
+    line: int
+    error: str
+
+
+class BulkIngestResult(BaseModel):
+    """Outcome of a bulk response ingest"""
+    survey_id: int
+    accepted: int
+    rejected: int
+    response_ids: List[int] = []
+    errors: List[BulkIngestError] = []
+
+
 # Progress Tracking Models
 class SurveyProgress(BaseModel):
     """Survey completion progress"""
@@ -130,6 +147,15 @@ class SurveyValidationRequest(BaseModel):
 
 
 # Statistics Models
+class NumericSummary(BaseModel):
+    """Distribution of the numeric answers to a question"""
+    count: int
+    min: float
+    max: float
+    mean: float
+    quantiles: Dict[str, float] = {}  # p25, p50, p75
+
+
 class QuestionStatistics(BaseModel):
     """Statistics for individual question"""
     question_id: int
@@ -137,8 +163,10 @@ class QuestionStatistics(BaseModel):
     question_type: str
     total_responses: int
     response_rate: float
+    skip_rate: Optional[float] = None  # unanswered although a later question was answered
     most_common_answer: Optional[str] = None
     answer_distribution: Dict[str, Any] = {}
+    numeric_summary: Optional[NumericSummary] = None
     average_time_spent: Optional[float] = None  # in seconds
 
 
@@ -182,6 +210,7 @@ class ExportRequest(BaseModel):
     filters: Optional[Dict[str, Any]] = {}
     sections: Optional[List[int]] = None  # Export specific sections only
     questions: Optional[List[int]] = None  # Export specific questions only
+    incremental: bool = False  # Parquet: only responses submitted since the last Parquet export
 
 
 class ExportResult(BaseModel):
@@ -192,7 +221,8 @@ class ExportResult(BaseModel):
     file_url: Optional[str] = None
     file_name: str
     file_size: Optional[int] = None  # in bytes
-    status: str  # "processing", "completed", "failed"
+    status: str  # "queued", "processing", "completed", "failed"
+    rows_exported: Optional[int] = None
     created_at: datetime
     completed_at: Optional[datetime] = None
     expires_at: Optional[datetime] = None
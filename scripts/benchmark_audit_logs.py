@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Benchmark of audit log listing and counting on a large AuditLog table:
+AuditService.get_audit_logs and get_audit_log_count for typical admin filters,
+with only the primary key index (as before migration 007), with the
+composite/BRIN indexes, and optionally after monthly partitioning (migration 008)
+
+Usage: python scripts/benchmark_audit_logs.py --database-url URL [--rows N]
+Requires PostgreSQL. Loads N synthetic entries spread over one year into
+public."AuditLog" when the table holds fewer rows (use a scratch database).
+The baseline phase drops the new indexes inside a transaction that is rolled
+back, so the table is left as it was. --partitioned converts the table in place.
+"""
+import argparse
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from src.infrastructure.database import models
+from src.infrastructure.database.base import Base
+from src.services.audit_partitions import AuditPartitionService, index_definitions
+from src.services.audit_service import AuditService
+
+PERIOD_START = datetime(2025, 10, 1)
+PERIOD_DAYS = 365
+ACTIONS = ["LOGIN", "VIEW_AUDIT_LOGS", "VIEW_USERS", "CREATE_USER", "UPDATE_USER",
+           "DELETE_USER", "UPLOAD_FILE", "VIEW_AUDIT_STATISTICS"]
+RESOURCES = ["auth", "audit_logs", "users", "files", "surveys"]
+LOAD_CHUNK = 1_000_000
+
+# Index names added by migration 007 (the baseline drops them)
+NEW_INDEXES = [index.name for index in models.AuditLog.__table__.indexes if index.name != "ix_public_AuditLog_LogID"]
+
+SCENARIOS = [
+    ("latest entries", {}),
+    ("by user", {"user_id": 42}),
+    ("by action", {"action": "DELETE_USER"}),
+    ("failed on resource", {"resource": "users", "success": False}),
+    ("one day", {"start_date": PERIOD_START + timedelta(days=200),
+                 "end_date": PERIOD_START + timedelta(days=201)}),
+    ("user over a week", {"user_id": 7, "start_date": PERIOD_START + timedelta(days=100),
+                          "end_date": PERIOD_START + timedelta(days=107)}),
+]
+
+
+def load_rows(engine, rows: int) -> None:
+    """Fill AuditLog up to rows entries with random synthetic data (5% failures)"""
+    Base.metadata.create_all(engine, tables=[models.AuditLog.__table__])
+    with engine.connect() as connection:
+        existing = connection.execute(text('SELECT count(*) FROM public."AuditLog"')).scalar()
+    if existing >= rows:
+        print(f"AuditLog already holds {existing} rows")
+        return
+
+    # Indexes are built once after loading (and benchmarked without them first)
+    with engine.begin() as connection:
+        for name in NEW_INDEXES:
+            connection.execute(text(f'DROP INDEX IF EXISTS public."{name}"'))
+
+    actions = "ARRAY[" + ",".join(f"'{a}'" for a in ACTIONS) + "]"
+    resources = "ARRAY[" + ",".join(f"'{r}'" for r in RESOURCES) + "]"
+    seconds_per_row = PERIOD_DAYS * 86400.0 / rows
+    for start in range(existing + 1, rows + 1, LOAD_CHUNK):
+        end = min(start + LOAD_CHUNK - 1, rows)
+        started = time.perf_counter()
+        with engine.begin() as connection:
+            connection.execute(text(f"""
+                INSERT INTO public."AuditLog"
+                    ("UserID", "Username", "Action", "Resource", "ResourceID", "Success", "IPAddress", "Timestamp")
+                SELECT u, 'user' || u,
+                       ({actions})[1 + floor(random() * {len(ACTIONS)})::int],
+                       ({resources})[1 + floor(random() * {len(RESOURCES)})::int],
+                       (g % 1000)::text, random() >= 0.05, '10.0.0.' || (g % 250),
+                       timestamp '{PERIOD_START:%Y-%m-%d}' + g * interval '{seconds_per_row} seconds'
+                FROM (SELECT g, 1 + floor(random() * 500)::int AS u
+                      FROM generate_series({start}::bigint, {end}::bigint) AS g) AS series
+            """))
+        print(f"  loaded rows {start}-{end} in {time.perf_counter() - started:.1f}s")
+    with engine.connect() as connection:
+        connection.execution_options(isolation_level="AUTOCOMMIT").execute(text('VACUUM ANALYZE public."AuditLog"'))
+
+
+def timed(call, repeat: int) -> float:
+    """Median milliseconds of call over repeat runs, after one warm-up run"""
+    call()
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        durations.append((time.perf_counter() - started) * 1000)
+    return statistics.median(durations)
+
+
+def run_scenarios(db: Session, repeat: int) -> dict:
+    service = AuditService(db)
+    results = {}
+    for name, filters in SCENARIOS:
+        results[name] = (
+            timed(lambda: service.get_audit_logs(limit=100, **filters), repeat),
+            timed(lambda: service.get_audit_log_count(**filters), repeat)
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--partitioned", action="store_true", help="Also benchmark after monthly partitioning")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if engine.dialect.name != "postgresql":
+        sys.exit("This benchmark needs PostgreSQL")
+
+    print(f"Loading {args.rows} audit entries")
+    load_rows(engine, args.rows)
+
+    phases = {}
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        for name in NEW_INDEXES:
+            connection.execute(text(f'DROP INDEX IF EXISTS public."{name}"'))
+        phases["primary key only"] = run_scenarios(Session(bind=connection), args.repeat)
+        transaction.rollback()
+
+    with engine.connect() as connection:
+        for index in models.AuditLog.__table__.indexes:
+            index.create(connection, checkfirst=True)
+        connection.commit()
+        connection.execute(text('ANALYZE public."AuditLog"'))
+        connection.commit()
+        phases["composite + BRIN"] = run_scenarios(Session(bind=connection), args.repeat)
+
+    if args.partitioned:
+        with Session(engine) as db:
+            service = AuditPartitionService(db)
+            if not service.is_partitioned():
+                started = time.perf_counter()
+                created = service.convert_to_partitioned(index_definitions(models.AuditLog.__table__))
+                db.commit()
+                print(f"Partitioned into {len(created)} monthly partitions in {time.perf_counter() - started:.1f}s")
+        with engine.connect() as connection:
+            connection.execution_options(isolation_level="AUTOCOMMIT").execute(text('VACUUM ANALYZE public."AuditLog"'))
+        with Session(engine) as db:
+            phases["partitioned"] = run_scenarios(db, args.repeat)
+
+    print(f"\nMedian of {args.repeat} runs, milliseconds (list 100 rows / exact count)")
+    print(f"{'scenario':<22}" + "".join(f"{phase:>28}" for phase in phases))
+    for name, _ in SCENARIOS:
+        cells = "".join(f"{phases[phase][name][0]:>13.1f} / {phases[phase][name][1]:>10.1f}  " for phase in phases)
+        print(f"{name:<22}{cells}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Benchmark of survey creation: database round-trips and time of
+survey_service.create_survey against the former row-by-row implementation
+(add + commit + refresh for every section, subsection, question and option)
+
+Usage: python scripts/benchmark_survey_creation.py [--database-url URL]
+Runs on an in-memory SQLite database by default; pass a PostgreSQL URL to
+measure against a real server (the tables must already exist there).
+SQLite cannot batch ordered INSERT ... RETURNING, so the bulk path still sends
+one statement per row there; on PostgreSQL rows go in pages of 1000.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import create_engine, event, func
+from sqlalchemy.orm import sessionmaker, Session
+
+from src.infrastructure.database import models
+from src.infrastructure.database.base import Base
+from src.domain.survey import survey_service
+from schemas import survey as survey_schema
+
+SURVEY_TABLES = [
+    models.Survey.__table__,
+    models.Section.__table__,
+    models.Subsection.__table__,
+    models.Question.__table__,
+    models.AnswerOption.__table__
+]
+
+
+def create_survey_row_by_row(db: Session, survey: survey_schema.SurveyCreate, schema_name: str):
+    """Former create_survey implementation, kept as the benchmark baseline"""
+    db_survey = models.Survey(Title=survey.Title, Description=survey.Description, Status=survey.Status)
+    db.add(db_survey)
+    db.commit()
+    db.refresh(db_survey)
+
+    def add_question(section_id, subsection_id, question_data):
+        db_question = models.Question(
+            SectionID=section_id,
+            SubsectionID=subsection_id,
+            QuestionText=question_data.QuestionText,
+            QuestionType=question_data.QuestionType
+        )
+        db.add(db_question)
+        db.commit()
+        db.refresh(db_question)
+        for option_data in question_data.AnswerOptions:
+            db.add(models.AnswerOption(QuestionID=db_question.QuestionID, OptionText=option_data.OptionText))
+            db.commit()
+
+    for section_data in survey.Sections:
+        db_section = models.Section(SurveyID=db_survey.SurveyID, Title=section_data.Title)
+        db.add(db_section)
+        db.commit()
+        db.refresh(db_section)
+        for subsection_data in section_data.Subsections:
+            db_subsection = models.Subsection(SectionID=db_section.SectionID, Title=subsection_data.Title)
+            db.add(db_subsection)
+            db.commit()
+            db.refresh(db_subsection)
+            for question_data in subsection_data.Questions:
+                add_question(db_section.SectionID, db_subsection.SubsectionID, question_data)
+        for question_data in section_data.Questions:
+            add_question(db_section.SectionID, None, question_data)
+    return db_survey
+
+
+def build_survey(sections: int, subsections: int, questions: int, options: int) -> survey_schema.SurveyCreate:
+    """Synthetic survey shaped like a parsed diagnostic workbook"""
+    def make_questions(prefix):
+        return [
+            survey_schema.QuestionCreate(
+                QuestionText=f"{prefix} question {q}",
+                QuestionType="single_choice" if options else "text",
+                AnswerOptions=[survey_schema.AnswerOptionCreate(OptionText=f"Option {o}") for o in range(options)]
+            )
+            for q in range(questions)
+        ]
+
+    return survey_schema.SurveyCreate(
+        Title="Benchmark survey",
+        Description="Synthetic survey for the creation benchmark",
+        Status="Draft",
+        Sections=[
+            survey_schema.SectionCreate(
+                Title=f"Section {s}",
+                Subsections=[
+                    survey_schema.SubsectionCreate(Title=f"Subsection {s}.{u}", Questions=make_questions(f"{s}.{u}"))
+                    for u in range(subsections)
+                ],
+                Questions=make_questions(f"{s}")
+            )
+            for s in range(sections)
+        ]
+    )
+
+
+def run(engine, create, survey: survey_schema.SurveyCreate) -> dict:
+    """Create the survey once, counting statements and commits sent to the database"""
+    counters = {"statements": 0, "commits": 0}
+
+    def count_statement(*_):
+        counters["statements"] += 1
+
+    def count_commit(*_):
+        counters["commits"] += 1
+
+    event.listen(engine, "before_cursor_execute", count_statement)
+    event.listen(engine, "commit", count_commit)
+    db = sessionmaker(bind=engine)()
+    try:
+        started = time.perf_counter()
+        db_survey = create(db, survey, "survey_program")
+        elapsed = time.perf_counter() - started
+        survey_id = db_survey.SurveyID
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statement)
+        event.remove(engine, "commit", count_commit)
+
+    questions = (
+        db.query(func.count(models.Question.QuestionID))
+        .join(models.Section, models.Question.SectionID == models.Section.SectionID)
+        .filter(models.Section.SurveyID == survey_id)
+        .scalar()
+    )
+    db.close()
+    return dict(counters, seconds=elapsed, questions=questions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--sections", type=int, default=12)
+    parser.add_argument("--subsections", type=int, default=4)
+    parser.add_argument("--questions", type=int, default=12, help="Questions per subsection and per section")
+    parser.add_argument("--options", type=int, default=4, help="Answer options per question")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if engine.dialect.name == "sqlite":
+        Base.metadata.create_all(engine, tables=SURVEY_TABLES)
+
+    survey = build_survey(args.sections, args.subsections, args.questions, args.options)
+    print(f"Survey: {args.sections} sections x {args.subsections} subsections, "
+          f"{args.questions} questions each, {args.options} options per question")
+
+    results = {
+        "row by row": run(engine, create_survey_row_by_row, survey),
+        "bulk": run(engine, survey_service.create_survey, survey)
+    }
+    print(f"{'path':<12} {'questions':>10} {'statements':>11} {'commits':>8} {'seconds':>9}")
+    for name, result in results.items():
+        print(f"{name:<12} {result['questions']:>10} {result['statements']:>11} "
+              f"{result['commits']:>8} {result['seconds']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
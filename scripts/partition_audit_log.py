@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Partition public."AuditLog" by month of Timestamp on a database already past
+migration 008, e.g. when AUDIT_LOG_PARTITIONING was false when it ran; set
+AUDIT_LOG_PARTITIONING=true afterwards so the maintenance job keeps creating
+the coming months' partitions
+
+Usage: python scripts/partition_audit_log.py [--database-url URL] [--undo]
+Requires PostgreSQL. The table is locked while its rows are moved, so run it
+in a maintenance window; entries without a Timestamp must be fixed first.
+--undo rebuilds a partitioned AuditLog as a plain table.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import config
+from src.infrastructure.database import models
+from src.services.audit_partitions import AuditPartitionService, index_definitions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=config.DATABASE_URL)
+    parser.add_argument("--undo", action="store_true", help="Rebuild AuditLog as a plain table")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    indexes = index_definitions(models.AuditLog.__table__)
+    with Session(engine) as db:
+        service = AuditPartitionService(db)
+        started = time.perf_counter()
+        if args.undo:
+            if not service.is_partitioned():
+                print("AuditLog is not partitioned")
+                return
+            service.convert_to_unpartitioned(indexes)
+            db.commit()
+            print(f"Rebuilt AuditLog as a plain table in {time.perf_counter() - started:.1f}s")
+            return
+        if service.is_partitioned():
+            print("AuditLog is already partitioned")
+            return
+        try:
+            created = service.convert_to_partitioned(indexes)
+        except RuntimeError as e:
+            print(f"Not partitioned: {e}")
+            sys.exit(1)
+        db.commit()
+        print(f"Partitioned AuditLog into {len(created)} monthly partitions in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,9 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.orm import Session
 
 from src.infrastructure.database.connection import get_db
-from src.infrastructure.auth.oauth2 import require_admin, UserInToken
+from src.infrastructure.database.pagination import InvalidCursorError
+from src.infrastructure.auth.oauth2 import require_admin, UserInToken, get_user_cache_statistics
+from src.infrastructure.auth.password_hashing import TooManyHashRequestsError
 from src.services.audit_service import AuditService
 from src.services.user_service import UserService
 from schemas.audit_schemas import (
@@ -29,6 +31,8 @@ async def get_audit_logs(
         success: Optional[bool] = Query(None),
         start_date: Optional[datetime] = Query(None),
         end_date: Optional[datetime] = Query(None),
+        cursor: Optional[str] = Query(None, description="Opaque cursor from pagination.next_cursor"),
+        exact_total: bool = Query(False, description="Count the total exactly instead of using a cached or estimated count"),
         current_user: UserInToken = Depends(require_admin),
         db: Session = Depends(get_db)
 ):
@@ -38,7 +42,7 @@ async def get_audit_logs(
     audit_service = AuditService(db)
 
     # Log this admin action
-    audit_service.log_action(
+    audit_service.queue_action(
         user_id=current_user.user_id,
         username=current_user.username,
         action="VIEW_AUDIT_LOGS",
@@ -56,25 +60,21 @@ async def get_audit_logs(
     )
 
     # Get audit logs
-    logs = audit_service.get_audit_logs(
-        skip=skip,
-        limit=limit,
-        user_id=user_id,
-        action=action,
-        resource=resource,
-        success=success,
-        start_date=start_date,
-        end_date=end_date
-    )
-
-    total_count = audit_service.get_audit_log_count(
-        user_id=user_id,
-        action=action,
-        resource=resource,
-        success=success,
-        start_date=start_date,
-        end_date=end_date
-    )
+    try:
+        logs, pagination = audit_service.get_audit_logs_page(
+            skip=skip,
+            limit=limit,
+            user_id=user_id,
+            action=action,
+            resource=resource,
+            success=success,
+            start_date=start_date,
+            end_date=end_date,
+            cursor=cursor,
+            exact_total=exact_total
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
     # Convert to response schema
     log_responses = [AuditLogResponse.from_orm(log) for log in logs]
@@ -83,17 +83,14 @@ async def get_audit_logs(
         data=log_responses,
         success=True,
         message=f"Retrieved {len(log_responses)} audit logs",
-        pagination={
-            "total": total_count,
-            "skip": skip,
-            "limit": limit,
-            "pages": (total_count + limit - 1) // limit
-        }
+        pagination=dict(pagination, skip=skip, limit=limit)
     )
 
 
 @router.get("/audit-logs/statistics", response_model=AuditStatistics)
 async def get_audit_statistics(
+        start_date: Optional[datetime] = Query(None, description="Count actions from this hour on"),
+        end_date: Optional[datetime] = Query(None, description="Count actions up to the end of this hour"),
         current_user: UserInToken = Depends(require_admin),
         db: Session = Depends(get_db)
 ):
@@ -103,14 +100,14 @@ async def get_audit_statistics(
     audit_service = AuditService(db)
 
     # Log this admin action
-    audit_service.log_action(
+    audit_service.queue_action(
         user_id=current_user.user_id,
         username=current_user.username,
         action="VIEW_AUDIT_STATISTICS",
         resource="audit_logs"
     )
 
-    stats = audit_service.get_action_statistics()
+    stats = audit_service.get_action_statistics(start_date=start_date, end_date=end_date)
     return AuditStatistics(**stats)
 
 
@@ -126,7 +123,7 @@ async def get_recent_audit_logs(
     audit_service = AuditService(db)
 
     # Log this admin action
-    audit_service.log_action(
+    audit_service.queue_action(
         user_id=current_user.user_id,
         username=current_user.username,
         action="VIEW_RECENT_AUDIT_LOGS",
@@ -150,7 +147,7 @@ async def get_failed_audit_logs(
     audit_service = AuditService(db)
 
     # Log this admin action
-    audit_service.log_action(
+    audit_service.queue_action(
         user_id=current_user.user_id,
         username=current_user.username,
         action="VIEW_FAILED_AUDIT_LOGS",
@@ -177,7 +174,7 @@ async def get_all_users(
     user_service = UserService(db)
 
     # Log this admin action
-    audit_service.log_action(
+    audit_service.queue_action(
         user_id=current_user.user_id,
         username=current_user.username,
         action="VIEW_USERS",
@@ -231,10 +228,10 @@ async def create_user(
     user_service = UserService(db)
 
     try:
-        new_user = user_service.create_user(user_data)
+        new_user = await user_service.create_user(user_data, client_ip=request.client.host)
 
         # Log successful user creation
-        audit_service.log_action(
+        audit_service.queue_action(
             user_id=current_user.user_id,
             username=current_user.username,
             action="CREATE_USER",
@@ -262,9 +259,11 @@ async def create_user(
             UpdatedAt=new_user.UpdatedAt
         )
 
+    except TooManyHashRequestsError as e:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
     except Exception as e:
         # Log failed user creation
-        audit_service.log_action(
+        audit_service.queue_action(
             user_id=current_user.user_id,
             username=current_user.username,
             action="CREATE_USER",
@@ -309,7 +308,7 @@ async def update_user(
             )
 
         # Log successful user update
-        audit_service.log_action(
+        audit_service.queue_action(
             user_id=current_user.user_id,
             username=current_user.username,
             action="UPDATE_USER",
@@ -338,7 +337,7 @@ async def update_user(
 
     except Exception as e:
         # Log failed user update
-        audit_service.log_action(
+        audit_service.queue_action(
             user_id=current_user.user_id,
             username=current_user.username,
             action="UPDATE_USER",
@@ -372,10 +371,10 @@ async def reset_user_password(
 
     try:
         # Reset the password
-        reset_response = user_service.reset_user_password(user_id, reset_request)
+        reset_response = await user_service.reset_user_password(user_id, reset_request, client_ip=request.client.host)
         
         # Log successful password reset
-        audit_service.log_action(
+        audit_service.queue_action(
             user_id=current_user.user_id,
             username=current_user.username,
             action="RESET_USER_PASSWORD",
@@ -394,9 +393,11 @@ async def reset_user_password(
         
     except HTTPException:
         raise
+    except TooManyHashRequestsError as e:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
     except Exception as e:
         # Log failed password reset
-        audit_service.log_action(
+        audit_service.queue_action(
             user_id=current_user.user_id,
             username=current_user.username,
             action="RESET_USER_PASSWORD",
@@ -446,7 +447,7 @@ async def delete_user(
         user_service.delete_user(user_id)
 
         # Log successful user deletion
-        audit_service.log_action(
+        audit_service.queue_action(
             user_id=current_user.user_id,
             username=current_user.username,
             action="DELETE_USER",
@@ -465,7 +466,7 @@ async def delete_user(
 
     except Exception as e:
         # Log failed user deletion
-        audit_service.log_action(
+        audit_service.queue_action(
             user_id=current_user.user_id,
             username=current_user.username,
             action="DELETE_USER",
@@ -480,3 +481,13 @@ async def delete_user(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+
+
+@router.get("/user-cache/statistics")
+async def get_user_cache_stats(
+        current_user: UserInToken = Depends(require_admin)
+):
+    """
+    Size and hit/miss counters of the authenticated user cache of this worker (Admin only)
+    """
+    return get_user_cache_statistics()
@@ -2,12 +2,13 @@
 Authentication routes for OAuth2 token management
 """
 from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status, Security
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Security
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
 from src.infrastructure.database.connection import get_db
 from src.infrastructure.database import models
+from src.infrastructure.auth.password_hashing import TooManyHashRequestsError
 from src.infrastructure.auth.oauth2 import (
     authenticate_user, create_access_token, get_user_scopes,
     Token, UserInToken, UserInfo, get_current_user, require_admin
@@ -23,13 +24,17 @@ router = APIRouter(prefix="/v1/api/auth", tags=["Authentication"])
 
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
+        request: Request,
         form_data: OAuth2PasswordRequestForm = Depends(),
         db: Session = Depends(get_db)
 ):
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    user = authenticate_user(db, form_data.username, form_data.password)
+    try:
+        user = await authenticate_user(db, form_data.username, form_data.password, request.client.host)
+    except TooManyHashRequestsError as e:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -139,6 +144,7 @@ async def refresh_access_token(
 @router.post("/change-password")
 async def change_password(
         password_data: PasswordChange,
+        request: Request,
         current_user: UserInToken = Depends(get_current_user),
         db: Session = Depends(get_db)
 ):
@@ -151,9 +157,12 @@ async def change_password(
         await user_service.change_password(
             current_user.user_id,
             password_data.current_password,
-            password_data.new_password
+            password_data.new_password,
+            client_ip=request.client.host
         )
         return {"message": "Password changed successfully"}
+    except TooManyHashRequestsError as e:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -2,27 +2,38 @@
 File upload API for INSTAT Survey Platform
 """
 import os
-import shutil
+import json
+import asyncio
+import logging
 import time
 import hashlib
 from pathlib import Path
-from typing import Optional, Dict, Any, List
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, status, Request
+from typing import Optional, Dict, Any, List, Tuple
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Query, status, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from datetime import datetime
 import config
 from ...utils.instat_excel_parser import INSTATExcelParser
-from ...infrastructure.database.connection import get_db
+from ...infrastructure.database.connection import get_db, db_manager
 from ...domain.survey import survey_service
 from ...domain.instat.instat_services import get_template_service, TemplateService, get_instat_survey_service, INSTATSurveyService
 from ...infrastructure.auth.oauth2 import UserInToken, require_scopes
 from ...services.audit_service import AuditService
+from ...services.upload_jobs import UploadJobService, UploadJobAbortedError
+from ...services.parsing_executor import (
+    parsing_executor,
+    record_parsing_statistics,
+    ParsingQueueFullError,
+    ParsingTimeoutError
+)
 from src.infrastructure.database.models import ParsingResult, ParsingStatistics
 from ...utils.upload_tracker import upload_tracker
+from ...utils.parse_cache import ParseCache
 from ...utils.admin_permissions import admin_permissions
 from schemas import survey as survey_schema
 from schemas.instat_domains import SurveyTemplateCreate, INSTATDomain, SurveyCategory, INSTATSurveyCreate, SurveyDomain, WorkflowStatus, ReportingCycle
-from schemas.responses import FileUploadResponse
+from schemas.responses import FileUploadResponse, UploadJobResponse
 from schemas.errors import (
     BadRequestErrorResponse,
     ValidationErrorResponse,
@@ -34,7 +45,129 @@ router = APIRouter(
     prefix="/v1/api/files"
 )
 
-excel_parser = INSTATExcelParser()
+excel_parser = INSTATExcelParser(
+    streaming_threshold=config.EXCEL_STREAMING_THRESHOLD,
+    chunk_size=config.PROCESSING_BATCH_SIZE
+)
+
+parse_cache = ParseCache(
+    cache_dir=config.PARSE_CACHE_DIR,
+    parser_version=INSTATExcelParser.PARSER_VERSION,
+    max_entries=config.PARSE_CACHE_MAX_ENTRIES,
+    max_bytes=config.PARSE_CACHE_MAX_BYTES
+)
+
+logger = logging.getLogger(__name__)
+
+# Size of the blocks read from the upload while hashing and saving it
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Seconds an upload job waits before retrying when the parsing queue is full
+UPLOAD_JOB_RETRY_INTERVAL = 2.0
+
+
+def _save_upload(file: UploadFile, file_path: Path) -> str:
+    """Stream the uploaded file to disk and return the SHA-256 of its content"""
+    digest = hashlib.sha256()
+    try:
+        with file_path.open("wb") as buffer:
+            while True:
+                chunk = file.file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                buffer.write(chunk)
+    finally:
+        file.file.close()
+    return digest.hexdigest()
+
+
+async def _store_upload(file: UploadFile, username: str) -> Tuple[Path, Dict[str, Any]]:
+    """Save an upload under a timestamped name in UPLOAD_DIR and log it
+
+    Returns the saved file path and the upload information recorded by the
+    upload tracker.
+    """
+    # Ensure upload directory exists
+    upload_dir = Path(config.UPLOAD_DIR)
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    
+    # Generate timestamp for file
+    upload_timestamp = datetime.utcnow()
+    timestamp_str = upload_timestamp.strftime("%Y%m%d_%H%M%S")
+    
+    # Create timestamped filename to avoid conflicts
+    original_name = os.path.splitext(file.filename)[0]
+    file_extension = os.path.splitext(file.filename)[1]
+    timestamped_filename = f"{original_name}_{timestamp_str}{file_extension}"
+    file_path = upload_dir / timestamped_filename
+    
+    # Save file to disk with timestamp, hashing the content on the way
+    content_hash = await run_in_threadpool(_save_upload, file, file_path)
+    
+    # Log upload information
+    upload_info = {
+        "original_filename": file.filename,
+        "timestamped_filename": timestamped_filename,
+        "upload_timestamp": upload_timestamp.isoformat(),
+        "uploaded_by": username,
+        "file_size": file_path.stat().st_size,
+        "file_path": str(file_path),
+        "content_sha256": content_hash
+    }
+    
+    # Track the upload using upload tracker
+    await run_in_threadpool(upload_tracker.log_upload, upload_info)
+    return file_path, upload_info
+
+
+async def _parse_cached(db: Session, file_path: Path, content_hash: str) -> Tuple[Dict[str, Any], List[str], bool]:
+    """Parse and validate an uploaded workbook, reusing the cached result for known content
+
+    Parsing runs in the parsing process pool; the parse time is recorded in
+    ParsingStatistics. Returns (survey_structure, validation_issues, from_cache)
+    and lets the parsing executor errors propagate.
+    """
+    cached = await run_in_threadpool(parse_cache.get, content_hash, file_path)
+    if cached is not None:
+        return cached[0], cached[1], True
+
+    try:
+        survey_structure, validation_issues, parse_time = await parsing_executor.parse(file_path)
+    except ParsingQueueFullError:
+        raise
+    except Exception:
+        await run_in_threadpool(record_parsing_statistics, db, None, False)
+        raise
+
+    await run_in_threadpool(record_parsing_statistics, db, parse_time, True)
+    await run_in_threadpool(parse_cache.put, content_hash, file_path, survey_structure, validation_issues)
+    return survey_structure, validation_issues, False
+
+
+async def _parse_with_cache(db: Session, file_path: Path, content_hash: str):
+    """Parse an upload within a request, mapping a full queue to 429 and a timeout to 504"""
+    try:
+        survey_structure, validation_issues, _ = await _parse_cached(db, file_path, content_hash)
+    except ParsingQueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(int(config.PARSER_JOB_TIMEOUT))}
+        )
+    except ParsingTimeoutError as e:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
+    return survey_structure, validation_issues
+
+
+def _write_structure_file(file_path: Path, survey_structure: Dict[str, Any]) -> Path:
+    """Save the processed structure of an upload to a JSON file in the generated directory"""
+    generated_dir = Path(config.UPLOAD_DIR).parent / "generated"
+    generated_dir.mkdir(parents=True, exist_ok=True)
+    structure_file = generated_dir / f"{file_path.stem}_structure.json"
+    with open(structure_file, 'w', encoding='utf-8') as f:
+        json.dump(survey_structure, f, indent=2, ensure_ascii=False, default=str)
+    return structure_file
 
 
 def _convert_sections_to_schema(sections_data):
@@ -139,56 +272,23 @@ async def upload_excel_and_create_survey(
             detail=f"Unsupported file type. Allowed types are: {config.ALLOWED_FILE_EXTENSIONS}"
         )
     
-    # Ensure upload directory exists
-    upload_dir = Path(config.UPLOAD_DIR)
-    upload_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Generate timestamp for file
-    upload_timestamp = datetime.utcnow()
-    timestamp_str = upload_timestamp.strftime("%Y%m%d_%H%M%S")
-    
-    # Create timestamped filename to avoid conflicts
-    original_name = os.path.splitext(file.filename)[0]
-    file_extension = os.path.splitext(file.filename)[1]
-    timestamped_filename = f"{original_name}_{timestamp_str}{file_extension}"
-    file_path = upload_dir / timestamped_filename
-    
-    # Save file to disk with timestamp
-    try:
-        with file_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-    finally:
-        file.file.close()
-    
-    # Log upload information
-    upload_info = {
-        "original_filename": file.filename,
-        "timestamped_filename": timestamped_filename,
-        "upload_timestamp": upload_timestamp.isoformat(),
-        "uploaded_by": current_user.username,
-        "file_size": file_path.stat().st_size,
-        "file_path": str(file_path)
-    }
-    
-    # Track the upload using upload tracker
-    upload_tracker.log_upload(upload_info)
+    # Save the file under a timestamped name and track the upload
+    file_path, upload_info = await _store_upload(file, current_user.username)
+    upload_timestamp = datetime.fromisoformat(upload_info["upload_timestamp"])
+    timestamped_filename = file_path.name
+    content_hash = upload_info["content_sha256"]
     
     # Parse the uploaded file with enhanced parser
     try:
-        survey_structure = excel_parser.parse_file(file_path)
-        validation_issues = excel_parser.validate_structure(survey_structure)
+        survey_structure, validation_issues = await _parse_with_cache(db, file_path, content_hash)
         
         # Save the processed structure with fixed metadata to JSON file
-        generated_dir = Path(config.UPLOAD_DIR).parent / "generated"
-        generated_dir.mkdir(parents=True, exist_ok=True)
-        structure_file = generated_dir / f"{original_name}_{timestamp_str}_structure.json"
-        
         # Add upload metadata to structure
         survey_structure["upload_metadata"] = upload_info
         
-        import json
-        with open(structure_file, 'w', encoding='utf-8') as f:
-            json.dump(survey_structure, f, indent=2, ensure_ascii=False, default=str)
+        await run_in_threadpool(_write_structure_file, file_path, survey_structure)
+    except HTTPException:
+        raise
     except Exception as parse_error:
         raise HTTPException(
             status_code=500,
@@ -220,7 +320,7 @@ async def upload_excel_and_create_survey(
     )
     
     # Create the INSTAT survey in the database
-    created_survey = instat_service.create_survey(instat_survey_data)
+    created_survey = await run_in_threadpool(instat_service.create_survey, instat_survey_data)
     
     # Create template if requested
     created_template = None
@@ -240,7 +340,7 @@ async def upload_excel_and_create_survey(
                 ExampleImplementations=[f"Original file: {file.filename}"]
             )
             
-            created_template = template_service.create_template(template_data)
+            created_template = await run_in_threadpool(template_service.create_template, template_data)
         except Exception as template_error:
             # Template creation failed, but survey was created successfully
             # Log the error but don't fail the entire operation
@@ -372,56 +472,21 @@ async def upload_excel_and_create_survey_with_template(
             detail=f"Unsupported file type. Allowed types are: {config.ALLOWED_FILE_EXTENSIONS}"
         )
     
-    # Ensure upload directory exists
-    upload_dir = Path(config.UPLOAD_DIR)
-    upload_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Generate timestamp for file
-    upload_timestamp = datetime.utcnow()
-    timestamp_str = upload_timestamp.strftime("%Y%m%d_%H%M%S")
-    
-    # Create timestamped filename to avoid conflicts
-    original_name = os.path.splitext(file.filename)[0]
-    file_extension = os.path.splitext(file.filename)[1]
-    timestamped_filename = f"{original_name}_{timestamp_str}{file_extension}"
-    file_path = upload_dir / timestamped_filename
-    
-    # Save file to disk with timestamp
-    try:
-        with file_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-    finally:
-        file.file.close()
-    
-    # Log upload information
-    upload_info = {
-        "original_filename": file.filename,
-        "timestamped_filename": timestamped_filename,
-        "upload_timestamp": upload_timestamp.isoformat(),
-        "uploaded_by": current_user.username,
-        "file_size": file_path.stat().st_size,
-        "file_path": str(file_path)
-    }
-    
-    # Track the upload using upload tracker
-    upload_tracker.log_upload(upload_info)
+    # Save the file under a timestamped name and track the upload
+    file_path, upload_info = await _store_upload(file, current_user.username)
+    upload_timestamp = datetime.fromisoformat(upload_info["upload_timestamp"])
+    timestamped_filename = file_path.name
+    content_hash = upload_info["content_sha256"]
         
     # Parse the uploaded file with enhanced parser
     try:
-        survey_structure = excel_parser.parse_file(file_path)
-        validation_issues = excel_parser.validate_structure(survey_structure)
+        survey_structure, validation_issues = await _parse_with_cache(db, file_path, content_hash)
         
         # Save the processed structure with fixed metadata to JSON file
-        generated_dir = Path(config.UPLOAD_DIR).parent / "generated"
-        generated_dir.mkdir(parents=True, exist_ok=True)
-        structure_file = generated_dir / f"{original_name}_{timestamp_str}_structure.json"
-        
         # Add upload metadata to structure
         survey_structure["upload_metadata"] = upload_info
         
-        import json
-        with open(structure_file, 'w', encoding='utf-8') as f:
-            json.dump(survey_structure, f, indent=2, ensure_ascii=False, default=str)
+        await run_in_threadpool(_write_structure_file, file_path, survey_structure)
         
         if validation_issues:
             return FileUploadResponse(
@@ -443,7 +508,9 @@ async def upload_excel_and_create_survey_with_template(
         )
         
         # Create the survey in the database
-        created_survey = survey_service.create_survey(db=db, survey=survey_data, schema_name=schema_name)
+        created_survey = await run_in_threadpool(
+            survey_service.create_survey, db=db, survey=survey_data, schema_name=schema_name
+        )
         
         created_template = None
         if create_template:
@@ -462,7 +529,7 @@ async def upload_excel_and_create_survey_with_template(
                     ExampleImplementations=[f"Original file: {file.filename}"]
                 )
                 
-                created_template = template_service.create_template(template_data)
+                created_template = await run_in_threadpool(template_service.create_template, template_data)
             except Exception as template_error:
                 # Template creation failed, but survey was created successfully
                 # Log the error but don't fail the entire operation
@@ -483,9 +550,233 @@ async def upload_excel_and_create_survey_with_template(
         
         return FileUploadResponse(**response_data)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to parse Excel file: {str(e)}"
         )
 
+
+
+async def _parse_for_job(db: Session, file_path: Path, content_hash: str) -> Tuple[Dict[str, Any], List[str], bool]:
+    """Parse an upload for a background job, waiting for a parsing slot instead of failing"""
+    deadline = time.monotonic() + config.UPLOAD_JOB_QUEUE_WAIT
+    while True:
+        try:
+            return await _parse_cached(db, file_path, content_hash)
+        except ParsingQueueFullError:
+            if time.monotonic() >= deadline:
+                raise
+            await asyncio.sleep(UPLOAD_JOB_RETRY_INTERVAL)
+
+
+async def _run_upload_job(
+    job_id: str,
+    file_path: Path,
+    upload_info: Dict[str, Any],
+    schema_name: str,
+    create_template: bool,
+    template_name: Optional[str]
+) -> None:
+    """Background pipeline of an upload job: parse, validate, create survey, create template
+
+    Runs after the upload response has been sent, with its own database
+    session; every stage outcome is recorded on the job's ParsingResult row.
+    """
+    original_filename = upload_info["original_filename"]
+    db = db_manager.SessionLocal()
+    jobs = UploadJobService(db)
+    job = None
+    try:
+        job = await run_in_threadpool(jobs.get_job, job_id)
+        if job is None:
+            logger.error(f"Upload job {job_id} not found")
+            return
+
+        # Parse
+        started = await run_in_threadpool(jobs.start_stage, job, "parse")
+        try:
+            survey_structure, validation_issues, from_cache = await _parse_for_job(
+                db, file_path, upload_info["content_sha256"]
+            )
+            survey_structure["upload_metadata"] = upload_info
+            await run_in_threadpool(_write_structure_file, file_path, survey_structure)
+        except Exception as e:
+            await run_in_threadpool(jobs.finish_stage, job, "parse", started, "failed", str(e))
+            await run_in_threadpool(jobs.fail_job, job, f"Failed to parse Excel file: {str(e)}")
+            return
+        await run_in_threadpool(
+            jobs.finish_stage, job, "parse", started, "completed", None,
+            {"from_cache": from_cache, "sections": len(survey_structure.get("sections", []))}
+        )
+
+        # Validate
+        started = await run_in_threadpool(jobs.start_stage, job, "validate")
+        if validation_issues:
+            await run_in_threadpool(
+                jobs.finish_stage, job, "validate", started, "failed",
+                f"{len(validation_issues)} validation issue(s)"
+            )
+            await run_in_threadpool(
+                jobs.fail_job, job, "Survey structure has validation issues", validation_issues, survey_structure
+            )
+            return
+        await run_in_threadpool(jobs.finish_stage, job, "validate", started)
+
+        # Create survey
+        started = await run_in_threadpool(jobs.start_stage, job, "create_survey")
+        try:
+            survey_data = survey_schema.SurveyCreate(
+                Title=survey_structure.get("title", original_filename),
+                Description=survey_structure.get("description", f"Survey generated from {original_filename}"),
+                Status="Draft",
+                Sections=_convert_sections_to_schema(survey_structure.get("sections", []))
+            )
+            created_survey = await run_in_threadpool(
+                survey_service.create_survey, db=db, survey=survey_data, schema_name=schema_name
+            )
+        except Exception as e:
+            # Roll back the failed survey transaction before the stage is recorded
+            await run_in_threadpool(db.rollback)
+            await run_in_threadpool(jobs.finish_stage, job, "create_survey", started, "failed", str(e))
+            await run_in_threadpool(jobs.fail_job, job, f"Failed to create survey: {str(e)}", None, survey_structure)
+            return
+        survey_id = created_survey.SurveyID
+        await run_in_threadpool(
+            jobs.finish_stage, job, "create_survey", started, "completed", None, {"survey_id": survey_id}
+        )
+
+        # Create template (a failure here does not fail the job, the survey exists)
+        template_id = None
+        if create_template:
+            started = await run_in_threadpool(jobs.start_stage, job, "create_template")
+            try:
+                template_data = SurveyTemplateCreate(
+                    TemplateName=template_name or f"Template_{os.path.splitext(original_filename)[0]}",
+                    Domain=_determine_instat_domain_from_schema(schema_name),
+                    Category=_determine_survey_category_from_schema(schema_name),
+                    Version="1.0.0",
+                    CreatedBy="System",
+                    Sections=_convert_survey_structure_to_template_sections(survey_structure),
+                    UsageGuidelines=f"Template created from {original_filename} upload",
+                    ExampleImplementations=[f"Original file: {original_filename}"]
+                )
+                created_template = await run_in_threadpool(TemplateService(db).create_template, template_data)
+                template_id = created_template.TemplateID
+                await run_in_threadpool(
+                    jobs.finish_stage, job, "create_template", started, "completed", None,
+                    {"template_id": template_id}
+                )
+            except Exception as e:
+                error = e.detail if isinstance(e, HTTPException) else str(e)
+                await run_in_threadpool(jobs.finish_stage, job, "create_template", started, "failed", error)
+
+        await run_in_threadpool(jobs.complete_job, job, survey_id, template_id, survey_structure)
+    except UploadJobAbortedError as e:
+        logger.warning(f"Stopped upload job {job_id}: {e}")
+    except Exception as e:
+        logger.exception(f"Upload job {job_id} failed: {e}")
+        try:
+            if job is not None:
+                await run_in_threadpool(jobs.fail_job, job, f"Upload job failed: {str(e)}")
+        except Exception:
+            logger.exception(f"Could not record the failure of upload job {job_id}")
+    finally:
+        db.close()
+
+
+@router.post(
+    "/upload-jobs",
+    response_model=UploadJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Upload Excel file and create survey in the background (Admin only)",
+    description="Save an Excel file and return an upload job id right away. Parsing, validation, survey creation and template creation run in the background; poll the job to follow their progress. This endpoint is restricted to admin users only.",
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"model": BadRequestErrorResponse},
+        status.HTTP_401_UNAUTHORIZED: {"description": "Not authenticated"},
+        status.HTTP_403_FORBIDDEN: {"description": "Admin access required"},
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {"model": ValidationErrorResponse},
+        status.HTTP_500_INTERNAL_SERVER_ERROR: {"model": InternalErrorResponse}
+    }
+)
+async def create_upload_job(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(..., description="Excel file to upload and parse"),
+    create_template: bool = Query(True, description="Create template from survey structure"),
+    template_name: Optional[str] = Query(None, description="Name for the template (defaults to filename)"),
+    schema_name: Optional[str] = Query(None, description="Override auto-detected schema"),
+    current_user: UserInToken = require_scopes("admin:write"),
+    db: Session = Depends(get_db)
+):
+    """Upload Excel file and process it as a background job (Admin only)"""
+    # Check admin access for file upload
+    admin_permissions.require_upload_admin_access(current_user)
+    
+    # Auto-detect schema name if not provided
+    if not schema_name:
+        schema_name = excel_parser.determine_schema_name(file.filename)
+    
+    # Validate schema name
+    if schema_name not in ["survey_program", "survey_balance", "survey_diagnostic"]:
+        raise HTTPException(status_code=400, detail="Invalid schema name")
+    
+    # Validate file extension
+    file_ext = os.path.splitext(file.filename)[1]
+    if file_ext.lower() not in config.ALLOWED_FILE_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type. Allowed types are: {config.ALLOWED_FILE_EXTENSIONS}"
+        )
+    
+    # Save the file under a timestamped name and track the upload
+    file_path, upload_info = await _store_upload(file, current_user.username)
+    
+    job = await run_in_threadpool(
+        UploadJobService(db).create_job,
+        file_path.name,
+        upload_info["content_sha256"],
+        schema_name,
+        current_user.username,
+        create_template
+    )
+    
+    background_tasks.add_task(
+        _run_upload_job, job.JobID, file_path, upload_info, schema_name, create_template, template_name
+    )
+    
+    return UploadJobResponse(**UploadJobService.job_progress(job))
+
+
+@router.get(
+    "/upload-jobs/{job_id}",
+    response_model=UploadJobResponse,
+    summary="Get upload job progress",
+    description="Report the status of an upload job and the outcome and duration of each of its stages.",
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {"description": "Not authenticated"},
+        status.HTTP_403_FORBIDDEN: {"description": "Not allowed to view this upload job"},
+        status.HTTP_404_NOT_FOUND: {"description": "Upload job not found"}
+    }
+)
+async def get_upload_job(
+    job_id: str,
+    include_structure: bool = Query(False, description="Include the parsed survey structure"),
+    current_user: UserInToken = require_scopes("upload:read"),
+    db: Session = Depends(get_db)
+):
+    """Get the progress of an upload job"""
+    jobs = UploadJobService(db)
+    job = await run_in_threadpool(jobs.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Upload job not found")
+    
+    if job.CreatedBy != current_user.username and not admin_permissions.can_view_all_uploads(current_user):
+        raise HTTPException(status_code=403, detail="Not allowed to view this upload job")
+    
+    # A job its process stopped working on is reported as failed
+    if await run_in_threadpool(jobs.fail_if_stale, job):
+        job = await run_in_threadpool(jobs.get_job, job_id)
+    
+    return UploadJobResponse(**UploadJobService.job_progress(job, include_structure))
@@ -94,6 +94,8 @@ async def list_instat_surveys(
     status: Optional[WorkflowStatus] = Query(None, description="Filter by survey status"),
     fiscal_year: Optional[int] = Query(None, description="Filter by fiscal year"),
     reporting_cycle: Optional[ReportingCycle] = Query(None, description="Filter by reporting cycle"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from pagination.next_cursor"),
+    exact_total: bool = Query(False, description="Count the total exactly instead of using a cached or estimated count"),
     current_user: UserInToken = require_scopes("instat:read"),
     service: INSTATSurveyService = Depends(get_instat_survey_service)
 ) -> PaginatedResponse[INSTATSurveyResponse]:
@@ -105,7 +107,9 @@ async def list_instat_surveys(
         category=category,
         status=status,
         fiscal_year=fiscal_year,
-        reporting_cycle=reporting_cycle
+        reporting_cycle=reporting_cycle,
+        cursor=cursor,
+        exact_total=exact_total
     )
 
 
@@ -267,6 +271,8 @@ async def list_survey_templates(
     limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
     domain: Optional[SurveyDomain] = Query(None, description="Filter by domain"),
     category: Optional[SurveyCategory] = Query(None, description="Filter by category"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from pagination.next_cursor"),
+    exact_total: bool = Query(False, description="Count the total exactly instead of using a cached or estimated count"),
     current_user: UserInToken = require_scopes("templates:read"),
     service: TemplateService = Depends(get_template_service)
 ) -> PaginatedResponse[SurveyTemplateResponse]:
@@ -275,7 +281,9 @@ async def list_survey_templates(
         skip=skip,
         limit=limit,
         domain=domain,
-        category=category
+        category=category,
+        cursor=cursor,
+        exact_total=exact_total
     )
 
 
@@ -383,44 +391,7 @@ async def get_dashboard_summary(
     service: INSTATSurveyService = Depends(get_instat_survey_service)
 ) -> Dict[str, Any]:
     """Get dashboard summary statistics."""
-    # Get surveys by status
-    total_surveys_response = service.list_surveys(limit=1)
-    total_surveys = total_surveys_response.pagination.get("total", 0)
-    
-    draft_surveys_response = service.list_surveys(limit=1, status=WorkflowStatus.DRAFT)
-    draft_surveys = draft_surveys_response.pagination.get("total", 0)
-    
-    published_surveys_response = service.list_surveys(limit=1, status=WorkflowStatus.PUBLISHED)
-    published_surveys = published_surveys_response.pagination.get("total", 0)
-    
-    # Get surveys by domain
-    program_surveys_response = service.list_surveys(limit=1, domain=SurveyDomain.PROGRAM_REVIEW)
-    program_surveys = program_surveys_response.pagination.get("total", 0)
-    
-    sds_surveys_response = service.list_surveys(limit=1, domain=SurveyDomain.SDS)
-    sds_surveys = sds_surveys_response.pagination.get("total", 0)
-    
-    diagnostic_surveys_response = service.list_surveys(limit=1, domain=SurveyDomain.DIAGNOSTIC)
-    diagnostic_surveys = diagnostic_surveys_response.pagination.get("total", 0)
-    
-    # Get recent activity
-    recent_created_response = service.list_surveys(limit=5)
-    recent_updated_response = service.list_surveys(limit=5)
-    
-    return {
-        "total_surveys": total_surveys,
-        "draft_surveys": draft_surveys,
-        "published_surveys": published_surveys,
-        "surveys_by_domain": {
-            "program": program_surveys,
-            "sds": sds_surveys,
-            "diagnostic": diagnostic_surveys
-        },
-        "recent_activity": {
-            "last_created": recent_created_response.data[:5],
-            "last_updated": recent_updated_response.data[:5]
-        }
-    }
+    return service.get_dashboard_summary()
 
 
 # Missing Template Endpoints
@@ -2,22 +2,24 @@
 API Routes for Mali Reference Tables (TableRef 01-09)
 Supports the INSTAT SDS Survey System with table reference lookups
 """
+import hashlib
+import json
 from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+
+import config
 
 from src.infrastructure.database.connection import get_db
 from src.infrastructure.auth.oauth2 import UserInToken, require_scopes
-from src.infrastructure.database.mali_ref_models import (
-    StrategicAxisResultModel, INSTATStructureModel, CMRIndicatorModel,
-    OperationalResultModel, ParticipatingStructureModel, MonitoringIndicatorModel,
-    FinancingSourceModel, MaliRegionModel, MaliCercleModel, TableReferenceMapping
-)
+from src.services.reference_index import TABLE_REF_MAPPING, reference_index
+from src.utils.http_cache import ResponseCache
 from schemas.mali_reference_tables import (
-    StrategicAxisResult, INSTATStructure, CMRIndicator, OperationalResult,
-    ParticipatingStructure, MonitoringIndicator, FinancingSource, MaliRegion,
-    MaliCercle, TableRefLookupRequest, TableRefLookupResponse, ReferenceTableResponse
+    StrategicAxisResult, INSTATStructure, CMRIndicator,
+    MonitoringIndicator, FinancingSource, MaliRegion,
+    MaliCercle, TableRefLookupRequest, TableRefLookupResponse, ReferenceTableResponse,
+    ReferenceValidationRequest, ReferenceValidationResponse, ReferenceValidationResult
 )
 
 router = APIRouter(prefix="/v1/api/mali-references", tags=["Mali Reference Tables"])
@@ -30,72 +32,55 @@ async def test_endpoint():
     return {"message": "API is working", "status": "success"}
 
 
-# Table Reference Mapping
-TABLE_REF_MAPPING = {
-    "TableRef:01": {
-        "model": StrategicAxisResultModel,
-        "schema": StrategicAxisResult,
-        "name": "Axe stratégique/Objectifs opérationnel/Résultats attendus du SDS",
-        "search_fields": ["strategic_axis", "operational_objective", "expected_result"],
-        "display_fields": ["result_id", "strategic_axis", "operational_objective"]
-    },
-    "TableRef:02": {
-        "model": INSTATStructureModel,
-        "schema": INSTATStructure,
-        "name": "Liste des Structures pour les revues SDS",
-        "search_fields": ["structure_name", "abbreviation"],
-        "display_fields": ["structure_id", "structure_name", "abbreviation"]
-    },
-    "TableRef:03": {
-        "model": CMRIndicatorModel,
-        "schema": CMRIndicator,
-        "name": "Indicateurs CMR",
-        "search_fields": ["indicator_name", "category"],
-        "display_fields": ["indicator_id", "indicator_name", "category"]
-    },
-    "TableRef:04": {
-        "model": OperationalResultModel,
-        "schema": OperationalResult,
-        "name": "Résultat attendu par Objectif opérationnel et Axe",
-        "search_fields": ["result_description"],
-        "display_fields": ["result_code", "result_description"]
-    },
-    "TableRef:05": {
-        "model": ParticipatingStructureModel,
-        "schema": ParticipatingStructure,
-        "name": "Autres structures devant participer à l'activité",
-        "search_fields": ["structure_name", "participation_type"],
-        "display_fields": ["structure_code", "structure_name", "participation_type"]
-    },
-    "TableRef:06": {
-        "model": MonitoringIndicatorModel,
-        "schema": MonitoringIndicator,
-        "name": "Indicateur de Suivi-évaluation",
-        "search_fields": ["indicator_name", "category"],
-        "display_fields": ["indicator_code", "indicator_name", "category"]
-    },
-    "TableRef:07": {
-        "model": FinancingSourceModel,
-        "schema": FinancingSource,
-        "name": "Sources de financement",
-        "search_fields": ["source_name", "source_type"],
-        "display_fields": ["source_code", "source_name", "source_type"]
-    },
-    "TableRef:08": {
-        "model": MaliRegionModel,
-        "schema": MaliRegion,
-        "name": "Liste des régions selon le découpage administratif du Mali",
-        "search_fields": ["region_name", "region_capital"],
-        "display_fields": ["region_code", "region_name", "region_capital"]
-    },
-    "TableRef:09": {
-        "model": MaliCercleModel,
-        "schema": MaliCercle,
-        "name": "Liste des cercles selon le découpage administratif du Mali",
-        "search_fields": ["cercle_name", "cercle_capital"],
-        "display_fields": ["cercle_code", "cercle_name", "region_code"]
-    }
-}
+def _reference_rows(db: Session, table_ref: str, search: Optional[str], skip: int = 0,
+                    limit: Optional[int] = None, **filters: Any) -> List[Any]:
+    """Active rows of a reference table matching search and the non-None filters
+
+    Served from the in-memory reference index (dicts, best matches first), or
+    from the database (model instances) when the index is unavailable.
+    """
+    rows = reference_index.search(db, table_ref, search, filters, skip, limit)
+    if rows is not None:
+        return rows
+
+    model = TABLE_REF_MAPPING[table_ref]["model"]
+    query = db.query(model).filter(model.is_active == True)
+    if search:
+        query = query.filter(reference_index.search_condition(db, table_ref, search))
+    for field, value in filters.items():
+        if value is not None:
+            query = query.filter(getattr(model, field) == value)
+    query = query.order_by(model.id).offset(skip)
+    if limit:
+        query = query.limit(limit)
+    return query.all()
+
+
+# Serialized GET responses, revalidated with ETags derived from the table versions
+reference_responses = ResponseCache(
+    max_age=config.REFERENCE_CACHE_MAX_AGE,
+    max_entries=config.REFERENCE_RESPONSE_CACHE_SIZE
+)
+
+
+def _list_adapter(schema: Any) -> TypeAdapter:
+    """Validation and JSON serialization of a list of schema rows"""
+    return TypeAdapter(List[schema])
+
+
+_LIST_ADAPTERS = {table_ref: _list_adapter(mapping["schema"]) for table_ref, mapping in TABLE_REF_MAPPING.items()}
+
+
+def _cached_reference_rows(request: Request, db: Session, table_ref: str, search: Optional[str],
+                           skip: int, limit: int, **filters: Any) -> Response:
+    """_reference_rows as a JSON response, cached until the table changes"""
+    def serialize() -> bytes:
+        adapter = _LIST_ADAPTERS[table_ref]
+        rows = adapter.validate_python(_reference_rows(db, table_ref, search, skip, limit, **filters),
+                                       from_attributes=True)
+        return adapter.dump_json(rows, by_alias=True)
+
+    return reference_responses.respond(request, reference_index.version(db, table_ref), serialize)
 
 
 # Generic Table Reference Lookup
@@ -112,40 +97,19 @@ async def lookup_table_reference(
     if request.table_ref not in TABLE_REF_MAPPING:
         raise HTTPException(status_code=400, detail=f"Invalid table reference: {request.table_ref}")
     
-    mapping = TABLE_REF_MAPPING[request.table_ref]
-    model = mapping["model"]
-    search_fields = mapping["search_fields"]
-    
-    # Build base query
-    query = db.query(model).filter(model.is_active == True)
-    
-    # Apply search filter if provided
-    if request.search_term:
-        search_conditions = []
-        for field in search_fields:
-            if hasattr(model, field):
-                search_conditions.append(
-                    getattr(model, field).ilike(f"%{request.search_term}%")
-                )
-        
-        if search_conditions:
-            query = query.filter(or_(*search_conditions))
-    
-    # Apply limit
-    if request.limit:
-        query = query.limit(request.limit)
-    
-    # Execute query
-    results = query.all()
+    results = _reference_rows(db, request.table_ref, request.search_term, limit=request.limit)
     
     # Convert to dictionaries
+    excluded_columns = ['created_at', 'updated_at', 'is_active']
     result_dicts = []
     for result in results:
-        result_dict = {}
-        for column in model.__table__.columns:
-            if column.name not in ['created_at', 'updated_at', 'is_active']:
-                result_dict[column.name] = getattr(result, column.name)
-        result_dicts.append(result_dict)
+        if isinstance(result, dict):
+            result_dicts.append({name: value for name, value in result.items() if name not in excluded_columns})
+        else:
+            result_dicts.append({
+                column.key: getattr(result, column.key)
+                for column in result.__table__.columns if column.key not in excluded_columns
+            })
     
     return TableRefLookupResponse(
         table_ref=request.table_ref,
@@ -160,6 +124,7 @@ async def lookup_table_reference(
 # TableRef:01 - Strategic Axis Results
 @router.get("/strategic-results", response_model=List[StrategicAxisResult])
 async def get_strategic_results(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     search: Optional[str] = Query(None),
@@ -167,24 +132,13 @@ async def get_strategic_results(
     db: Session = Depends(get_db)
 ):
     """Get strategic axis results (TableRef:01)"""
-    query = db.query(StrategicAxisResultModel).filter(StrategicAxisResultModel.is_active == True)
-    
-    if search:
-        query = query.filter(
-            or_(
-                StrategicAxisResultModel.strategic_axis.ilike(f"%{search}%"),
-                StrategicAxisResultModel.operational_objective.ilike(f"%{search}%"),
-                StrategicAxisResultModel.expected_result.ilike(f"%{search}%")
-            )
-        )
-    
-    results = query.offset(skip).limit(limit).all()
-    return results
+    return _cached_reference_rows(request, db, "TableRef:01", search, skip, limit)
 
 
 # TableRef:02 - INSTAT Structures
 @router.get("/structures", response_model=List[INSTATStructure])
 async def get_instat_structures(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     search: Optional[str] = Query(None),
@@ -193,26 +147,14 @@ async def get_instat_structures(
     db: Session = Depends(get_db)
 ):
     """Get INSTAT structures (TableRef:02)"""
-    query = db.query(INSTATStructureModel).filter(INSTATStructureModel.is_active == True)
-    
-    if search:
-        query = query.filter(
-            or_(
-                INSTATStructureModel.structure_name.ilike(f"%{search}%"),
-                INSTATStructureModel.abbreviation.ilike(f"%{search}%")
-            )
-        )
-    
-    if responsible_for_collection is not None:
-        query = query.filter(INSTATStructureModel.responsible_for_collection == responsible_for_collection)
-    
-    results = query.offset(skip).limit(limit).all()
-    return results
+    return _cached_reference_rows(request, db, "TableRef:02", search, skip, limit,
+                                  responsible_for_collection=responsible_for_collection)
 
 
 # TableRef:03 - CMR Indicators
 @router.get("/cmr-indicators", response_model=List[CMRIndicator])
 async def get_cmr_indicators(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     search: Optional[str] = Query(None),
@@ -221,26 +163,13 @@ async def get_cmr_indicators(
     db: Session = Depends(get_db)
 ):
     """Get CMR indicators (TableRef:03)"""
-    query = db.query(CMRIndicatorModel).filter(CMRIndicatorModel.is_active == True)
-    
-    if search:
-        query = query.filter(
-            or_(
-                CMRIndicatorModel.indicator_name.ilike(f"%{search}%"),
-                CMRIndicatorModel.category.ilike(f"%{search}%")
-            )
-        )
-    
-    if category:
-        query = query.filter(CMRIndicatorModel.category == category)
-    
-    results = query.offset(skip).limit(limit).all()
-    return results
+    return _cached_reference_rows(request, db, "TableRef:03", search, skip, limit, category=category)
 
 
 # TableRef:06 - Monitoring Indicators
 @router.get("/monitoring-indicators", response_model=List[MonitoringIndicator])
 async def get_monitoring_indicators(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     search: Optional[str] = Query(None),
@@ -249,26 +178,13 @@ async def get_monitoring_indicators(
     db: Session = Depends(get_db)
 ):
     """Get monitoring indicators (TableRef:06)"""
-    query = db.query(MonitoringIndicatorModel).filter(MonitoringIndicatorModel.is_active == True)
-    
-    if search:
-        query = query.filter(
-            or_(
-                MonitoringIndicatorModel.indicator_name.ilike(f"%{search}%"),
-                MonitoringIndicatorModel.category.ilike(f"%{search}%")
-            )
-        )
-    
-    if category:
-        query = query.filter(MonitoringIndicatorModel.category == category)
-    
-    results = query.offset(skip).limit(limit).all()
-    return results
+    return _cached_reference_rows(request, db, "TableRef:06", search, skip, limit, category=category)
 
 
 # TableRef:07 - Financing Sources
 @router.get("/financing-sources", response_model=List[FinancingSource])
 async def get_financing_sources(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     search: Optional[str] = Query(None),
@@ -277,26 +193,13 @@ async def get_financing_sources(
     db: Session = Depends(get_db)
 ):
     """Get financing sources (TableRef:07)"""
-    query = db.query(FinancingSourceModel).filter(FinancingSourceModel.is_active == True)
-    
-    if search:
-        query = query.filter(
-            or_(
-                FinancingSourceModel.source_name.ilike(f"%{search}%"),
-                FinancingSourceModel.source_type.ilike(f"%{search}%")
-            )
-        )
-    
-    if source_type:
-        query = query.filter(FinancingSourceModel.source_type == source_type)
-    
-    results = query.offset(skip).limit(limit).all()
-    return results
+    return _cached_reference_rows(request, db, "TableRef:07", search, skip, limit, source_type=source_type)
 
 
 # TableRef:08 - Mali Regions
 @router.get("/regions", response_model=List[MaliRegion])
 async def get_mali_regions(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     search: Optional[str] = Query(None),
@@ -304,23 +207,13 @@ async def get_mali_regions(
     db: Session = Depends(get_db)
 ):
     """Get Mali regions (TableRef:08)"""
-    query = db.query(MaliRegionModel).filter(MaliRegionModel.is_active == True)
-    
-    if search:
-        query = query.filter(
-            or_(
-                MaliRegionModel.region_name.ilike(f"%{search}%"),
-                MaliRegionModel.region_capital.ilike(f"%{search}%")
-            )
-        )
-    
-    results = query.offset(skip).limit(limit).all()
-    return results
+    return _cached_reference_rows(request, db, "TableRef:08", search, skip, limit)
 
 
 # TableRef:09 - Mali Cercles
 @router.get("/cercles", response_model=List[MaliCercle])
 async def get_mali_cercles(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     search: Optional[str] = Query(None),
@@ -329,37 +222,29 @@ async def get_mali_cercles(
     db: Session = Depends(get_db)
 ):
     """Get Mali cercles (TableRef:09)"""
-    query = db.query(MaliCercleModel).filter(MaliCercleModel.is_active == True)
-    
-    if search:
-        query = query.filter(
-            or_(
-                MaliCercleModel.cercle_name.ilike(f"%{search}%"),
-                MaliCercleModel.cercle_capital.ilike(f"%{search}%")
-            )
-        )
-    
-    if region_code:
-        query = query.filter(MaliCercleModel.region_code == region_code)
-    
-    results = query.offset(skip).limit(limit).all()
-    return results
+    return _cached_reference_rows(request, db, "TableRef:09", search, skip, limit, region_code=region_code)
 
 
 # Utility endpoints
+_TABLE_MAPPINGS = {
+    table_ref: {
+        "name": mapping["name"],
+        "search_fields": mapping["search_fields"],
+        "display_fields": mapping["display_fields"]
+    }
+    for table_ref, mapping in TABLE_REF_MAPPING.items()
+}
+_TABLE_MAPPINGS_JSON = json.dumps(_TABLE_MAPPINGS, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+# The mappings only change with the code
+_TABLE_MAPPINGS_VERSION = hashlib.sha1(_TABLE_MAPPINGS_JSON).hexdigest()[:16]
+
 @router.get("/table-mappings", response_model=Dict[str, Dict[str, Any]])
 async def get_table_mappings(
+    request: Request,
     current_user: UserInToken = require_scopes("mali_reference:read")
 ):
     """Get all table reference mappings"""
-    mappings = {}
-    for table_ref, mapping in TABLE_REF_MAPPING.items():
-        mappings[table_ref] = {
-            "name": mapping["name"],
-            "search_fields": mapping["search_fields"],
-            "display_fields": mapping["display_fields"]
-        }
-    return mappings
+    return reference_responses.respond(request, _TABLE_MAPPINGS_VERSION, lambda: _TABLE_MAPPINGS_JSON)
 
 
 @router.get("/validate-reference/{table_ref}/{reference_code}")
@@ -373,41 +258,38 @@ async def validate_table_reference(
     if table_ref not in TABLE_REF_MAPPING:
         raise HTTPException(status_code=400, detail=f"Invalid table reference: {table_ref}")
     
-    mapping = TABLE_REF_MAPPING[table_ref]
-    model = mapping["model"]
-    
-    # Determine the primary code field based on the model
-    if hasattr(model, 'region_code'):
-        code_field = model.region_code
-    elif hasattr(model, 'cercle_code'):
-        code_field = model.cercle_code
-    elif hasattr(model, 'structure_id'):
-        code_field = model.structure_id
-    elif hasattr(model, 'result_id'):
-        code_field = model.result_id
-    elif hasattr(model, 'indicator_id'):
-        code_field = model.indicator_id
-    elif hasattr(model, 'source_code'):
-        code_field = model.source_code
-    else:
-        # Default to first column that contains 'code' or 'id'
-        for column in model.__table__.columns:
-            if 'code' in column.name or 'id' in column.name:
-                code_field = getattr(model, column.name)
-                break
-        else:
-            raise HTTPException(status_code=500, detail="Unable to determine code field for validation")
-    
-    # Check if the reference exists
-    exists = db.query(model).filter(
-        and_(
-            code_field == reference_code,
-            model.is_active == True
-        )
-    ).first() is not None
+    exists = reference_code in reference_index.existing_codes(db, {table_ref: {reference_code}})[table_ref]
     
     return {
         "table_ref": table_ref,
         "reference_code": reference_code,
         "exists": exists
     }
+
+
+@router.post("/validate-references", response_model=ReferenceValidationResponse)
+async def validate_table_references(
+    request: ReferenceValidationRequest,
+    current_user: UserInToken = require_scopes("mali_reference:read"),
+    db: Session = Depends(get_db)
+):
+    """Validate many reference codes at once (at most one query per table)"""
+    codes_by_table: Dict[str, set] = {}
+    for item in request.items:
+        if item.table_ref not in TABLE_REF_MAPPING:
+            raise HTTPException(status_code=400, detail=f"Invalid table reference: {item.table_ref}")
+        codes_by_table.setdefault(item.table_ref, set()).add(item.reference_code)
+
+    existing = reference_index.existing_codes(db, codes_by_table)
+    results = [
+        ReferenceValidationResult(
+            table_ref=item.table_ref,
+            reference_code=item.reference_code,
+            exists=item.reference_code in existing[item.table_ref]
+        )
+        for item in request.items
+    ]
+    return ReferenceValidationResponse(
+        results=results,
+        all_valid=all(result.exists for result in results)
+    )
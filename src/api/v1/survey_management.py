@@ -1,17 +1,21 @@
 """
 Survey Management API endpoints for statistics, exports, search, and general survey operations
 """
-from typing import Optional, Dict, Any, List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import Optional, Dict, Any, Iterator, List
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from datetime import datetime
-import uuid
+import logging
+import os
 import time
 
 from src.infrastructure.auth.oauth2 import UserInToken, require_scopes
-from src.infrastructure.database.connection import get_db
+from src.infrastructure.database.connection import get_db, db_manager
+from src.domain.survey import analytics_service, export_service, statistics_service
+from src.services.export_jobs import ExportJobAbortedError, ExportJobService
 from schemas.survey_extensions import (
-    SurveyStatistics, QuestionStatistics, SectionStatistics,
+    SurveyStatistics,
     ExportRequest, ExportResult, ExportFormat,
     SurveySearchQuery, SurveySearchResult, SurveySearchResponse
 )
@@ -20,6 +24,8 @@ from schemas.instat_domains import INSTATSurveyResponse, SurveyDomain, SurveyCat
 from schemas.responses import BaseResponse, PaginatedResponse
 from schemas.errors import NotFoundErrorResponse, BadRequestErrorResponse
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/v1/api/surveys", tags=["Survey Management"])
 
 
@@ -91,74 +97,16 @@ async def get_survey_statistics(
     current_user: UserInToken = require_scopes("surveys:read"),
     db: Session = Depends(get_db)
 ) -> BaseResponse[SurveyStatistics]:
-    """Get comprehensive survey statistics."""
-    
-    # In a real implementation, query survey and calculate statistics
-    # survey = get_survey_by_id(db, survey_id)
-    # if not survey:
-    #     raise HTTPException(status_code=404, detail="Survey not found")
-    
-    # Mock statistics data
-    question_stats = [
-        QuestionStatistics(
-            question_id=i,
-            question_text=f"Question {i}: Sample question text",
-            question_type=["text", "single_choice", "multiple_choice", "number"][i % 4],
-            total_responses=150,
-            response_rate=0.85 + (i % 10) * 0.01,
-            most_common_answer="Option A" if i % 4 == 1 else None,
-            answer_distribution={"Option A": 45, "Option B": 30, "Option C": 25} if i % 4 == 1 else {},
-            average_time_spent=30.5 + (i % 20)
-        ) for i in range(1, 16)
-    ]
+    """Get comprehensive survey statistics, read from the materialized counters."""
     
-    section_stats = [
-        SectionStatistics(
-            section_id=i,
-            section_title=f"Section {i}: Sample Section",
-            total_questions=5,
-            completion_rate=0.88 - (i * 0.02),
-            average_time_spent=5.5 + (i * 0.5),
-            questions=question_stats[(i-1)*5:i*5]
-        ) for i in range(1, 4)
-    ]
-    
-    statistics = SurveyStatistics(
-        survey_id=survey_id,
-        survey_title=f"Survey {survey_id} Statistics",
-        total_responses=150,
-        completed_responses=132,
-        completion_rate=0.88,
-        average_completion_time=15.5,
-        response_rate_by_day={
-            "2024-01-01": 15,
-            "2024-01-02": 23,
-            "2024-01-03": 18,
-            "2024-01-04": 31,
-            "2024-01-05": 27
-        },
-        geographic_distribution={
-            "Bamako": 45,
-            "Sikasso": 28,
-            "Koulikoro": 22,
-            "Kayes": 19,
-            "Mopti": 15,
-            "Tombouctou": 12,
-            "Gao": 9
-        },
-        demographic_breakdown={
-            "age_groups": {"18-25": 25, "26-35": 45, "36-45": 35, "46+": 45},
-            "gender": {"male": 72, "female": 78},
-            "education": {"primary": 20, "secondary": 60, "tertiary": 70}
-        },
-        sections=section_stats,
-        last_updated=datetime.utcnow()
-    )
+    statistics = statistics_service.get_survey_statistics(db, survey_id)
+    if statistics is None:
+        raise HTTPException(status_code=404, detail="Survey not found")
     
     return BaseResponse[SurveyStatistics](
         success=True,
         message="Survey statistics retrieved successfully",
-        data=statistics
+        data=SurveyStatistics(**statistics)
     )
 
 
@@ -168,56 +116,142 @@ async def get_survey_statistics(
     status_code=status.HTTP_202_ACCEPTED,
     responses={
         404: {"model": NotFoundErrorResponse},
-        400: {"model": BadRequestErrorResponse}
+        400: {"model": BadRequestErrorResponse},
+        409: {"description": "Another Parquet snapshot of the survey is in progress"}
     },
     summary="Export Survey Data",
-    description="Export survey data in various formats (PDF, Excel, CSV, JSON)"
+    description="Export survey data as CSV, JSON, NDJSON, Excel or Parquet in the background, one row per response; "
+                "incremental Parquet exports only hold the responses submitted since the previous Parquet export"
 )
 async def export_survey_data(
     survey_id: int,
     export_request: ExportRequest,
+    background_tasks: BackgroundTasks,
     current_user: UserInToken = require_scopes("surveys:read"),
     db: Session = Depends(get_db)
 ) -> BaseResponse[ExportResult]:
-    """Export survey data in the requested format."""
-    
-    # In a real implementation, check if survey exists
-    # survey = get_survey_by_id(db, survey_id)
-    # if not survey:
-    #     raise HTTPException(status_code=404, detail="Survey not found")
+    """Start a background export of the survey responses; poll its status with the returned export id."""
     
-    # Generate unique export ID
-    export_id = str(uuid.uuid4())
+    jobs = ExportJobService(db)
+    snapshot_since = None
+    if export_request.incremental:
+        # The running snapshot's end is not known yet
+        if jobs.has_active_snapshot(survey_id):
+            raise HTTPException(status_code=409, detail="Another Parquet snapshot of this survey is in progress")
+        snapshot_since = jobs.last_snapshot_end(survey_id)
+    try:
+        plan = export_service.plan_export(db, survey_id, export_request, snapshot_since)
+    except export_service.ExportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if plan is None:
+        raise HTTPException(status_code=404, detail="Survey not found")
     
-    # In a real implementation, queue the export job
-    # queue_export_job(export_id, survey_id, export_request, current_user.username)
+    export_config = export_request.model_dump(mode="json")
+    if plan.snapshot:
+        export_config["snapshot"] = plan.snapshot_config()
+    job = jobs.create_job(survey_id, plan.format.value, plan.file_name(), export_config, current_user.username)
+    background_tasks.add_task(_run_export_job, job.JobID, plan)
     
-    # Mock export result
-    export_result = ExportResult(
-        export_id=export_id,
-        survey_id=survey_id,
-        format=export_request.format,
-        file_name=f"survey_{survey_id}_export_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{export_request.format.lower()}",
-        status="processing",
-        created_at=datetime.utcnow(),
-        download_count=0
+    return BaseResponse[ExportResult](
+        success=True,
+        message="Export request submitted successfully",
+        data=ExportResult(**ExportJobService.job_result(job))
     )
+
+
+def _run_export_job(job_id: str, plan: export_service.ExportPlan) -> None:
+    """Background export: write the file, recording progress on the job's DataExports row
+
+    Responses are read through their own session: committing job updates in
+    the same transaction would close the server-side cursor.
+    """
+    db = db_manager.SessionLocal()
+    jobs = ExportJobService(db_manager.SessionLocal())
+    job = None
+    try:
+        job = jobs.get_job(job_id)
+        if job is None:
+            logger.error(f"Export job {job_id} not found")
+            return
+        jobs.start_job(job)
+        path = ExportJobService.file_path(job)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        rows = export_service.write_export(db, plan, path, progress=lambda done: jobs.record_progress(job, done))
+        try:
+            jobs.complete_job(job, rows)
+        except ExportJobAbortedError:
+            os.remove(path)
+            raise
+    except ExportJobAbortedError as e:
+        # Given up as stale in the meantime; its failure is already recorded
+        logger.warning(f"Stopped export job {job_id}: {e}")
+    except Exception as e:
+        logger.exception(f"Export job {job_id} failed: {e}")
+        try:
+            if job is not None:
+                jobs.fail_job(job, f"Export failed: {str(e)}")
+        except Exception:
+            logger.exception(f"Could not record the failure of export job {job_id}")
+    finally:
+        db.close()
+        jobs.db.close()
+
+
+@router.get(
+    "/{survey_id}/export/stream",
+    responses={
+        404: {"model": NotFoundErrorResponse},
+        400: {"model": BadRequestErrorResponse}
+    },
+    summary="Stream Survey Data",
+    description="Stream survey responses as CSV, JSON or NDJSON while they are read, one row per response"
+)
+async def stream_survey_data(
+    survey_id: int,
+    format: ExportFormat = Query(ExportFormat.CSV, description="csv, json or ndjson"),
+    include_metadata: bool = Query(True, description="Include respondent and submission date columns"),
+    sections: Optional[str] = Query(None, description="Comma-separated section ids to export"),
+    questions: Optional[str] = Query(None, description="Comma-separated question ids to export"),
+    start: Optional[str] = Query(None, description="Responses submitted from this date (YYYY-MM-DD)"),
+    end: Optional[str] = Query(None, description="Responses submitted up to this date (YYYY-MM-DD)"),
+    current_user: UserInToken = require_scopes("surveys:read"),
+    db: Session = Depends(get_db)
+) -> StreamingResponse:
+    """Stream survey responses without creating an export file."""
     
-    # In a real implementation, this would be processed asynchronously
-    # For demo purposes, we'll simulate immediate completion for some formats
-    if export_request.format in [ExportFormat.CSV, ExportFormat.JSON]:
-        export_result.status = "completed"
-        export_result.completed_at = datetime.utcnow()
-        export_result.file_size = 1024 * 50  # 50KB
-        export_result.file_url = f"/downloads/exports/{export_id}/{export_result.file_name}"
+    if format not in export_service.TEXT_FORMATS:
+        raise HTTPException(status_code=400, detail="Only csv, json and ndjson exports can be streamed")
+    try:
+        export_request = ExportRequest(
+            survey_id=survey_id,
+            format=format,
+            include_metadata=include_metadata,
+            date_range={key: value for key, value in (("start", start), ("end", end)) if value},
+            sections=[int(value) for value in sections.split(",")] if sections else None,
+            questions=[int(value) for value in questions.split(",")] if questions else None
+        )
+        plan = export_service.plan_export(db, survey_id, export_request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if plan is None:
+        raise HTTPException(status_code=404, detail="Survey not found")
     
-    return BaseResponse[ExportResult](
-        success=True,
-        message="Export request submitted successfully" if export_result.status == "processing" else "Export completed successfully",
-        data=export_result
+    return StreamingResponse(
+        _export_stream(plan),
+        media_type=plan.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{plan.file_name()}"'}
     )
 
 
+def _export_stream(plan: export_service.ExportPlan) -> Iterator[str]:
+    """Export text of plan, read with a session that lives as long as the response body"""
+    db = db_manager.SessionLocal()
+    try:
+        yield from export_service.export_text(plan, export_service.iter_row_chunks(db, plan))
+    finally:
+        db.close()
+
+
 @router.get(
     "/search",
     response_model=BaseResponse[SurveySearchResponse],
@@ -337,32 +371,49 @@ async def get_export_status(
 ) -> BaseResponse[ExportResult]:
     """Get the status of a survey data export."""
     
-    # In a real implementation, query export status from database/job queue
-    # export_result = get_export_by_id(db, export_id)
-    # if not export_result:
-    #     raise HTTPException(status_code=404, detail="Export not found")
-    
-    # Mock export result
-    export_result = ExportResult(
-        export_id=export_id,
-        survey_id=1,  # Mock survey ID
-        format=ExportFormat.EXCEL,
-        file_name=f"survey_export_{export_id}.xlsx",
-        file_size=1024 * 250,  # 250KB
-        status="completed",
-        created_at=datetime.utcnow(),
-        completed_at=datetime.utcnow(),
-        file_url=f"/downloads/exports/{export_id}/survey_export_{export_id}.xlsx",
-        download_count=0
-    )
+    jobs = ExportJobService(db)
+    job = jobs.get_job(export_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export not found")
     
     return BaseResponse[ExportResult](
         success=True,
         message="Export status retrieved successfully",
-        data=export_result
+        data=ExportResult(**ExportJobService.job_result(job))
     )
 
 
+@router.get(
+    "/exports/{export_id}/download",
+    responses={
+        404: {"model": NotFoundErrorResponse},
+        409: {"description": "Export not completed"}
+    },
+    summary="Download Export",
+    description="Download the file of a completed survey data export"
+)
+async def download_export(
+    export_id: str,
+    current_user: UserInToken = require_scopes("surveys:read"),
+    db: Session = Depends(get_db)
+) -> FileResponse:
+    """Download the file of a completed export."""
+    
+    jobs = ExportJobService(db)
+    job = jobs.get_job(export_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export not found")
+    if job.Status != "completed":
+        raise HTTPException(status_code=409, detail=f"Export is {job.Status}")
+    path = ExportJobService.file_path(job)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Export file no longer available")
+    
+    jobs.record_download(job)
+    media_type = export_service.EXPORT_FILE_TYPES[ExportFormat(job.ExportFormat)][1]
+    return FileResponse(path, media_type=media_type, filename=job.FileName)
+
+
 @router.get(
     "/{survey_id}/analytics",
     response_model=BaseResponse[Dict[str, Any]],
@@ -372,52 +423,18 @@ async def get_export_status(
 )
 async def get_survey_analytics(
     survey_id: int,
-    time_period: str = Query("30d", description="Time period for analytics (7d, 30d, 90d, 1y)"),
+    time_period: str = Query("30d", description="Time period for analytics (7d, 30d, 90d, 1y; units d, w, m, y)"),
     current_user: UserInToken = require_scopes("surveys:read"),
     db: Session = Depends(get_db)
 ) -> BaseResponse[Dict[str, Any]]:
     """Get advanced analytics for a survey."""
     
-    # Mock analytics data
-    analytics = {
-        "survey_id": survey_id,
-        "time_period": time_period,
-        "response_trends": {
-            "daily_responses": [5, 8, 12, 15, 11, 9, 14, 18, 22, 16],
-            "completion_trends": [0.65, 0.68, 0.72, 0.74, 0.71, 0.69, 0.75, 0.78, 0.82, 0.79],
-            "abandonment_points": {
-                "section_1": 0.05,
-                "section_2": 0.12,
-                "section_3": 0.18,
-                "section_4": 0.08
-            }
-        },
-        "user_engagement": {
-            "average_session_duration": 8.5,  # minutes
-            "bounce_rate": 0.15,
-            "return_rate": 0.23,
-            "mobile_usage": 0.45
-        },
-        "quality_metrics": {
-            "data_quality_score": 0.87,
-            "validation_pass_rate": 0.93,
-            "duplicate_responses": 3,
-            "incomplete_responses": 18
-        },
-        "geographic_insights": {
-            "top_regions": [
-                {"region": "Bamako", "responses": 45, "completion_rate": 0.89},
-                {"region": "Sikasso", "responses": 28, "completion_rate": 0.85},
-                {"region": "Koulikoro", "responses": 22, "completion_rate": 0.82}
-            ],
-            "coverage_gaps": ["Tombouctou", "Gao"]
-        },
-        "recommendations": [
-            "Consider simplifying Section 3 as it has the highest abandonment rate",
-            "Mobile optimization could improve completion rates",
-            "Focus collection efforts in Tombouctou and Gao regions"
-        ]
-    }
+    try:
+        analytics = analytics_service.get_survey_analytics(db, survey_id, time_period)
+    except analytics_service.InvalidTimePeriodError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if analytics is None:
+        raise HTTPException(status_code=404, detail="Survey not found")
     
     return BaseResponse[Dict[str, Any]](
         success=True,
@@ -1,18 +1,23 @@
 """
 Survey Response API endpoints for handling survey responses, progress tracking, and validation
 """
-from typing import Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import AsyncIterator, Optional, Dict, Any, Tuple
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
 from datetime import datetime
-import uuid
 
+import config
 from src.infrastructure.auth.oauth2 import UserInToken, require_scopes
 from src.infrastructure.database.connection import get_db
+from src.infrastructure.database.models import Response
+from src.domain.survey import progress_service, response_service
 from schemas.survey_extensions import (
     SurveyResponseCreate, SurveyResponseUpdate, SurveyResponseData,
     SurveyProgress, ValidationResult, SurveyValidationRequest,
-    ResponseStatus, ValidationSeverity, ValidationIssue
+    ResponseStatus, ValidationSeverity, ValidationIssue,
+    BulkIngestResult, BulkIngestError, SurveyResponseValue
 )
 from schemas.responses import BaseResponse, PaginatedResponse
 from schemas.errors import NotFoundErrorResponse, ValidationErrorResponse, BadRequestErrorResponse
@@ -39,19 +44,27 @@ async def save_survey_response(
 ) -> BaseResponse[SurveyResponseData]:
     """Save survey response - supports both partial and complete submissions."""
     
-    # Validate survey exists
-    # In a real implementation, you would check if survey exists in database
-    # survey = get_survey_by_id(db, survey_id)
-    # if not survey:
-    #     raise HTTPException(status_code=404, detail="Survey not found")
+    questions = response_service.get_question_options(db, survey_id)
+    if questions is None:
+        raise HTTPException(status_code=404, detail="Survey not found")
+    
+    try:
+        prepared = response_service.prepare_response(
+            survey_id, response_data, questions, current_user.user_id, current_user.username
+        )
+    except response_service.ResponseValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     
     # Calculate completion percentage
     total_questions = len(response_data.responses) if response_data.responses else 0
-    answered_questions = len([r for r in response_data.responses if r.value is not None]) if response_data.responses else 0
+    answered_questions = len([
+        r for r in response_data.responses if response_service.is_answered(response_service.answer_text(r.value))
+    ]) if response_data.responses else 0
     completion_percentage = (answered_questions / total_questions * 100) if total_questions > 0 else 0
     
-    # Create response record
-    response_id = int(str(uuid.uuid4().int)[:10])  # Simulate database ID
+    # Response and answers in one transaction
+    response_id, = response_service.ingest_responses(db, [prepared])
+    submitted_at = prepared[0]["SubmittedDate"]
     
     saved_response = SurveyResponseData(
         response_id=response_id,
@@ -60,14 +73,11 @@ async def save_survey_response(
         respondent_metadata=response_data.respondent_metadata or {},
         responses=response_data.responses,
         status=response_data.status,
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow(),
+        created_at=submitted_at,
+        updated_at=submitted_at,
         completion_percentage=completion_percentage
     )
     
-    # In a real implementation, save to database here
-    # db_response = save_response_to_db(db, saved_response)
-    
     return BaseResponse[SurveyResponseData](
         success=True,
         message=f"Survey response {'saved as draft' if response_data.save_as_draft else 'submitted'} successfully",
@@ -75,6 +85,94 @@ async def save_survey_response(
     )
 
 
+def _line_too_long(line_number: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Line {line_number} is longer than {config.RESPONSE_BULK_MAX_LINE_BYTES} bytes"
+    )
+
+
+async def _ndjson_lines(request: Request) -> AsyncIterator[Tuple[int, bytes]]:
+    """Non-blank lines of an NDJSON request body with their line numbers, read as the body streams in
+
+    Raises a 413 HTTPException for a line longer than RESPONSE_BULK_MAX_LINE_BYTES,
+    without buffering more of it than that.
+    """
+    max_line = config.RESPONSE_BULK_MAX_LINE_BYTES
+    pending = b""
+    line_number = 0
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if len(line) > max_line:
+                raise _line_too_long(line_number)
+            if line.strip():
+                yield line_number, line
+        if len(pending) > max_line:
+            raise _line_too_long(line_number + 1)
+    if pending.strip():
+        yield line_number + 1, pending
+
+
+@router.post(
+    "/{survey_id}/responses/bulk",
+    response_model=BaseResponse[BulkIngestResult],
+    status_code=status.HTTP_201_CREATED,
+    responses={
+        404: {"model": NotFoundErrorResponse},
+        413: {"model": BadRequestErrorResponse}
+    },
+    summary="Bulk Ingest Survey Responses",
+    description="Store a batch of responses sent as NDJSON (application/x-ndjson), one response per line"
+)
+async def bulk_ingest_survey_responses(
+    survey_id: int,
+    request: Request,
+    current_user: UserInToken = require_scopes("surveys:write"),
+    db: Session = Depends(get_db)
+) -> BaseResponse[BulkIngestResult]:
+    """Ingest NDJSON survey responses; valid lines are stored together, invalid ones reported."""
+    
+    questions = response_service.get_question_options(db, survey_id)
+    if questions is None:
+        raise HTTPException(status_code=404, detail="Survey not found")
+    
+    prepared = []
+    errors = []
+    async for line_number, line in _ndjson_lines(request):
+        if len(prepared) + len(errors) >= config.RESPONSE_BULK_MAX_ITEMS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"A bulk ingest accepts at most {config.RESPONSE_BULK_MAX_ITEMS} responses"
+            )
+        try:
+            submission = SurveyResponseCreate.model_validate_json(line)
+            prepared.append(response_service.prepare_response(
+                survey_id, submission, questions, current_user.user_id, current_user.username
+            ))
+        except ValidationError as e:
+            errors.append(BulkIngestError(line=line_number, error=str(e.errors(include_url=False)[0]["msg"])))
+        except response_service.ResponseValidationError as e:
+            errors.append(BulkIngestError(line=line_number, error=str(e)))
+    
+    # All valid responses in one transaction, off the event loop (COPY, progress, statistics)
+    response_ids = await run_in_threadpool(response_service.ingest_responses, db, prepared)
+    
+    return BaseResponse[BulkIngestResult](
+        success=True,
+        message=f"Stored {len(response_ids)} survey responses, rejected {len(errors)}",
+        data=BulkIngestResult(
+            survey_id=survey_id,
+            accepted=len(response_ids),
+            rejected=len(errors),
+            response_ids=response_ids,
+            errors=errors
+        )
+    )
+
+
 @router.get(
     "/{survey_id}/progress",
     response_model=BaseResponse[SurveyProgress],
@@ -90,36 +188,15 @@ async def get_survey_progress(
 ) -> BaseResponse[SurveyProgress]:
     """Get survey completion progress for a respondent."""
     
-    # In a real implementation, fetch from database
-    # survey = get_survey_by_id(db, survey_id)
-    # if not survey:
-    #     raise HTTPException(status_code=404, detail="Survey not found")
-    
-    # Mock progress data - replace with actual database queries
-    respondent = respondent_id or current_user.username
-    
-    # Simulate fetching progress from database
-    progress = SurveyProgress(
-        survey_id=survey_id,
-        respondent_id=respondent,
-        total_questions=25,  # From database
-        answered_questions=18,  # From responses table
-        completion_percentage=72.0,
-        current_section_id=3,
-        current_section_title="Section 3: Personal Information",
-        last_activity=datetime.utcnow(),
-        estimated_time_remaining=8,  # minutes
-        sections_progress=[
-            {"section_id": 1, "section_title": "Basic Info", "completed": True, "questions_answered": 5, "total_questions": 5},
-            {"section_id": 2, "section_title": "Demographics", "completed": True, "questions_answered": 8, "total_questions": 8},
-            {"section_id": 3, "section_title": "Personal Information", "completed": False, "questions_answered": 5, "total_questions": 12}
-        ]
-    )
+    # Counters maintained as responses are saved: no scan of the answers
+    progress = progress_service.get_progress(db, survey_id, respondent_id or current_user.username)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Survey not found")
     
     return BaseResponse[SurveyProgress](
         success=True,
         message="Survey progress retrieved successfully",
-        data=progress
+        data=SurveyProgress(**progress)
     )
 
 
@@ -275,22 +352,37 @@ async def update_survey_response(
 ) -> BaseResponse[SurveyResponseData]:
     """Update an existing survey response."""
     
-    # In a real implementation, fetch existing response
-    # existing_response = get_response_by_id(db, response_id)
-    # if not existing_response or existing_response.survey_id != survey_id:
-    #     raise HTTPException(status_code=404, detail="Response not found")
+    existing_response = db.get(Response, response_id)
+    if not existing_response or existing_response.SurveyID != survey_id:
+        raise HTTPException(status_code=404, detail="Response not found")
+    
+    questions = response_service.get_question_options(db, survey_id)
+    try:
+        response_service.update_response(db, existing_response, response_update.responses or [], questions or {})
+    except response_service.ResponseValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    answers = response_service.get_answers(db, response_id)
+    answered_questions = len([answer for answer in answers if response_service.is_answered(answer.AnswerText)])
+    completion_percentage = (answered_questions / len(questions) * 100) if questions else 0.0
     
-    # Mock updated response
     updated_response = SurveyResponseData(
         response_id=response_id,
         survey_id=survey_id,
-        respondent_id=current_user.username,
+        respondent_id=existing_response.RespondentKey or current_user.username,
         respondent_metadata=response_update.respondent_metadata or {},
-        responses=response_update.responses or [],
+        responses=[
+            SurveyResponseValue(
+                question_id=answer.QuestionID,
+                value=answer.AnswerText if answer.AnswerText is not None else "",
+                metadata={"option_id": answer.SelectedOptionID} if answer.SelectedOptionID is not None else {}
+            )
+            for answer in answers
+        ],
         status=response_update.status or ResponseStatus.IN_PROGRESS,
-        created_at=datetime.utcnow(),
+        created_at=existing_response.SubmittedDate,
         updated_at=datetime.utcnow(),
-        completion_percentage=85.0
+        completion_percentage=completion_percentage
     )
     
     return BaseResponse[SurveyResponseData](
@@ -1,12 +1,13 @@
 """
 Survey API endpoints
 """
-from typing import List
+from typing import List, Optional, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from datetime import datetime
 
 from ...infrastructure.database.connection import get_db
+from ...infrastructure.database.pagination import InvalidCursorError
 from ...infrastructure.auth.oauth2 import UserInToken, require_scopes
 from ...domain.survey import survey_service
 from schemas import survey as survey_schema
@@ -66,6 +67,8 @@ def read_surveys(
     schema_name: str,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from pagination.next_cursor"),
+    exact_total: bool = Query(False, description="Count the total exactly instead of using a cached or estimated count"),
     current_user: UserInToken = require_scopes("surveys:read"),
     db: Session = Depends(get_db)
 ):
@@ -73,20 +76,17 @@ def read_surveys(
     if schema_name not in ["survey_program", "survey_balance", "survey_diagnostic"]:
         raise HTTPException(status_code=400, detail="Invalid schema name")
     
-    surveys = survey_service.get_surveys(db=db, schema_name=schema_name, skip=skip, limit=limit)
-    total_count = len(surveys)  # This should be improved with actual count query
+    try:
+        surveys, pagination = survey_service.get_surveys_page(
+            db=db, schema_name=schema_name, limit=limit, cursor=cursor, skip=skip, exact_total=exact_total
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return PaginatedResponse(
         message="Surveys retrieved successfully",
         data=surveys,
-        pagination={
-            "page": (skip // limit) + 1,
-            "limit": limit,
-            "total": total_count,
-            "pages": (total_count + limit - 1) // limit,
-            "has_next": skip + limit < total_count,
-            "has_prev": skip > 0
-        },
+        pagination=dict(pagination, limit=limit),
         timestamp=datetime.utcnow()
     )
 
@@ -110,13 +110,57 @@ def read_survey(
     if schema_name not in ["survey_program", "survey_balance", "survey_diagnostic"]:
         raise HTTPException(status_code=400, detail="Invalid schema name")
     
-    db_survey = survey_service.get_survey(db=db, survey_id=survey_id, schema_name=schema_name)
-    if db_survey is None:
+    survey_tree = survey_service.get_survey_tree(db=db, survey_id=survey_id, schema_name=schema_name)
+    if survey_tree is None:
         raise HTTPException(status_code=404, detail="Survey not found")
     
     return BaseResponse(
         message="Survey retrieved successfully",
-        data=db_survey,
+        data=survey_tree,
+        timestamp=datetime.utcnow()
+    )
+
+
+@router.get(
+    "/surveys/{schema_name}/{survey_id}/tree",
+    response_model=BaseResponse[Dict[str, Any]],
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"model": BadRequestErrorResponse},
+        status.HTTP_404_NOT_FOUND: {"model": NotFoundErrorResponse},
+        status.HTTP_500_INTERNAL_SERVER_ERROR: {"model": InternalErrorResponse}
+    }
+)
+def read_survey_tree(
+    schema_name: str,
+    survey_id: int,
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated question fields to return, e.g. QuestionText,QuestionType "
+                    f"(available: {', '.join(survey_service.QUESTION_FIELDS)})"
+    ),
+    current_user: UserInToken = require_scopes("surveys:read"),
+    db: Session = Depends(get_db)
+):
+    """Get a survey with its full tree, optionally projected on some question fields"""
+    if schema_name not in ["survey_program", "survey_balance", "survey_diagnostic"]:
+        raise HTTPException(status_code=400, detail="Invalid schema name")
+    
+    question_fields = None
+    if fields:
+        question_fields = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in question_fields if field not in survey_service.QUESTION_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown question fields: {', '.join(unknown)}")
+    
+    survey_tree = survey_service.get_survey_tree(
+        db=db, survey_id=survey_id, schema_name=schema_name, question_fields=question_fields
+    )
+    if survey_tree is None:
+        raise HTTPException(status_code=404, detail="Survey not found")
+    
+    return BaseResponse(
+        message="Survey retrieved successfully",
+        data=survey_tree,
         timestamp=datetime.utcnow()
     )
 
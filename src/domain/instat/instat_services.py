@@ -2,11 +2,15 @@
 
 from typing import List, Optional, Dict, Any
 from fastapi import Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc, asc
+from sqlalchemy.orm import Session, aliased, load_only
+from sqlalchemy import and_, or_, desc, func, select
+
+import config
 
 from src.infrastructure.database.connection import get_db
 from src.infrastructure.database import models
+from src.infrastructure.database.pagination import order_by_keys, paginate, InvalidCursorError
+from src.utils.ttl_cache import TTLCache
 # Import INSTAT models directly from the main models.py file
 import sys
 import os
@@ -29,10 +33,61 @@ from schemas.errors import (
     ErrorResponse, ValidationErrorResponse, NotFoundErrorResponse
 )
 
+# Dashboard summary, recomputed at most once per DASHBOARD_CACHE_TTL seconds
+dashboard_cache = TTLCache(ttl=config.DASHBOARD_CACHE_TTL, max_entries=1)
+DASHBOARD_RECENT_LIMIT = 5
+
+# Template counts by domain and category, shared by the template dashboard
+template_summary_cache = TTLCache(ttl=config.DASHBOARD_CACHE_TTL, max_entries=1)
+
+# Columns loaded for template listings; the JSON structure columns are left out
+TEMPLATE_LIST_COLUMNS = (
+    SurveyTemplate.TemplateID, SurveyTemplate.TemplateName, SurveyTemplate.Domain,
+    SurveyTemplate.Category, SurveyTemplate.Version, SurveyTemplate.CreatedBy,
+    SurveyTemplate.CreatedDate, SurveyTemplate.LastModified, SurveyTemplate.ApprovedBy,
+    SurveyTemplate.ApprovalDate, SurveyTemplate.SectionCount, SurveyTemplate.SubsectionCount,
+    SurveyTemplate.QuestionCount, SurveyTemplate.ComplexityLevel, SurveyTemplate.UsageCount,
+    SurveyTemplate.LastUsed
+)
+
+# Columns that update_template derives itself and never takes from the request
+TEMPLATE_COMPUTED_FIELDS = {'TemplateID', 'SectionCount', 'SubsectionCount', 'QuestionCount', 'ComplexityLevel'}
+
+
+def template_complexity(question_count: int) -> str:
+    """Complexity level of a template with question_count questions."""
+    return 'High' if question_count > 50 else 'Medium' if question_count > 20 else 'Low'
+
+
+def compute_template_statistics(sections: Optional[List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Section, subsection and question counts of a template structure, keyed by column name."""
+    sections = sections or []
+    total_questions = 0
+    total_subsections = 0
+
+    for section in sections:
+        section_subsections = section.get('subsections', [])
+        total_questions += len(section.get('questions', []))
+        total_subsections += len(section_subsections)
+
+        # Count questions in subsections too
+        for subsection in section_subsections:
+            total_questions += len(subsection.get('questions', []))
+
+    return {
+        'SectionCount': len(sections),
+        'SubsectionCount': total_subsections,
+        'QuestionCount': total_questions,
+        'ComplexityLevel': template_complexity(total_questions)
+    }
+
 
 class INSTATSurveyService:
     """Service for INSTAT survey management."""
 
+    # Listing order, newest first; SurveyID makes the keyset cursor unique
+    LIST_SORT_KEYS = ((INSTATSurvey.CreatedDate, True), (INSTATSurvey.SurveyID, True))
+
     def __init__(self, db: Session):
         self.db = db
 
@@ -46,6 +101,7 @@ class INSTATSurveyService:
             self.db.add(db_survey)
             self.db.commit()
             self.db.refresh(db_survey)
+            dashboard_cache.invalidate()
             
             return INSTATSurveyResponse(**db_survey.to_dict())
         except Exception as e:
@@ -74,9 +130,14 @@ class INSTATSurveyService:
         category: Optional[SurveyCategory] = None,
         status: Optional[WorkflowStatus] = None,
         fiscal_year: Optional[int] = None,
-        reporting_cycle: Optional[ReportingCycle] = None
+        reporting_cycle: Optional[ReportingCycle] = None,
+        cursor: Optional[str] = None,
+        exact_total: bool = False
     ) -> PaginatedResponse[INSTATSurveyResponse]:
-        """List INSTAT surveys with filtering."""
+        """List INSTAT surveys with filtering.
+
+        Pass the returned next_cursor as cursor to fetch the following page.
+        """
         query = self.db.query(INSTATSurvey)
         
         # Apply filters
@@ -91,8 +152,12 @@ class INSTATSurveyService:
         if reporting_cycle:
             query = query.filter(INSTATSurvey.ReportingCycle == reporting_cycle.value)
         
-        total = query.count()
-        surveys = query.order_by(desc(INSTATSurvey.CreatedDate)).offset(skip).limit(limit).all()
+        try:
+            surveys, pagination = paginate(
+                query, self.LIST_SORT_KEYS, limit, cursor=cursor, skip=skip, exact_total=exact_total
+            )
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         items = [INSTATSurveyResponse(**survey.to_dict()) for survey in surveys]
         
@@ -100,14 +165,7 @@ class INSTATSurveyService:
             success=True,
             message="Surveys retrieved successfully",
             data=items,
-            pagination={
-                "total": total,
-                "page": skip // limit + 1 if limit > 0 else 1,
-                "size": limit,
-                "pages": (total + limit - 1) // limit if limit > 0 else 1,
-                "has_next": skip + limit < total,
-                "has_prev": skip > 0
-            }
+            pagination=pagination
         )
 
     def update_survey(
@@ -130,6 +188,7 @@ class INSTATSurveyService:
             
             self.db.commit()
             self.db.refresh(survey)
+            dashboard_cache.invalidate()
             
             return INSTATSurveyResponse(**survey.to_dict())
         except Exception as e:
@@ -139,6 +198,71 @@ class INSTATSurveyService:
                 detail=f"Failed to update survey: {str(e)}"
             )
 
+    def get_dashboard_summary(self) -> Dict[str, Any]:
+        """Dashboard figures: survey counts by status and domain, and recent activity.
+
+        Counts come from one GROUP BY Status, Domain query and recent activity
+        from one more; the result is cached for DASHBOARD_CACHE_TTL seconds and
+        dropped whenever this service changes a survey.
+        """
+        summary = dashboard_cache.get("summary")
+        if summary is not None:
+            return summary
+        
+        total = 0
+        by_status: Dict[str, int] = {}
+        by_domain: Dict[str, int] = {}
+        counts = self.db.query(
+            INSTATSurvey.Status, INSTATSurvey.Domain, func.count(INSTATSurvey.SurveyID)
+        ).group_by(INSTATSurvey.Status, INSTATSurvey.Domain)
+        for survey_status, domain, count in counts:
+            total += count
+            by_status[survey_status] = by_status.get(survey_status, 0) + count
+            by_domain[domain] = by_domain.get(domain, 0) + count
+        
+        # Latest created and latest updated surveys, fetched together; PostgreSQL
+        # sorts NULLs first in descending order, so undated rows are put last
+        created = aliased(INSTATSurvey)
+        updated = aliased(INSTATSurvey)
+        recent = self.db.query(INSTATSurvey).filter(or_(
+            INSTATSurvey.SurveyID.in_(
+                select(created.SurveyID)
+                .order_by(desc(created.CreatedDate).nulls_last(), desc(created.SurveyID))
+                .limit(DASHBOARD_RECENT_LIMIT)
+            ),
+            INSTATSurvey.SurveyID.in_(
+                select(updated.SurveyID)
+                .order_by(desc(updated.UpdatedDate).nulls_last(), desc(updated.SurveyID))
+                .limit(DASHBOARD_RECENT_LIMIT)
+            )
+        )).all()
+        
+        def latest(column: str) -> List[Dict[str, Any]]:
+            ordered = sorted(
+                recent,
+                key=lambda survey: (getattr(survey, column) is not None, getattr(survey, column), survey.SurveyID),
+                reverse=True
+            )
+            return [INSTATSurveyResponse(**survey.to_dict()).model_dump() for survey in ordered[:DASHBOARD_RECENT_LIMIT]]
+        
+        summary = {
+            "total_surveys": total,
+            "draft_surveys": by_status.get(WorkflowStatus.DRAFT.value, 0),
+            "published_surveys": by_status.get(WorkflowStatus.PUBLISHED.value, 0),
+            "surveys_by_domain": {
+                "program": by_domain.get(SurveyDomain.PROGRAM_REVIEW.value, 0),
+                "sds": by_domain.get(SurveyDomain.SDS.value, 0),
+                "diagnostic": by_domain.get(SurveyDomain.DIAGNOSTIC.value, 0)
+            },
+            "surveys_by_status": by_status,
+            "recent_activity": {
+                "last_created": latest("CreatedDate"),
+                "last_updated": latest("UpdatedDate")
+            }
+        }
+        dashboard_cache.put("summary", summary)
+        return summary
+
     def delete_survey(self, survey_id: int) -> bool:
         """Delete INSTAT survey."""
         survey = self.db.query(INSTATSurvey).filter(
@@ -151,6 +275,7 @@ class INSTATSurveyService:
         try:
             self.db.delete(survey)
             self.db.commit()
+            dashboard_cache.invalidate()
             return True
         except Exception as e:
             self.db.rollback()
@@ -163,6 +288,9 @@ class INSTATSurveyService:
 class TemplateService:
     """Service for survey template management."""
 
+    # Listing order by name; TemplateID makes the keyset cursor unique
+    LIST_SORT_KEYS = ((models.SurveyTemplate.TemplateName, False), (models.SurveyTemplate.TemplateID, False))
+
     def __init__(self, db: Session):
         self.db = db
 
@@ -170,9 +298,12 @@ class TemplateService:
         """Create a new survey template."""
         try:
             db_template = models.SurveyTemplate(**template_data.model_dump())
+            for field, value in compute_template_statistics(db_template.Sections).items():
+                setattr(db_template, field, value)
             self.db.add(db_template)
             self.db.commit()
             self.db.refresh(db_template)
+            template_summary_cache.invalidate()
             
             return SurveyTemplateResponse(**db_template.to_dict())
         except Exception as e:
@@ -182,6 +313,46 @@ class TemplateService:
                 detail=f"Failed to create template: {str(e)}"
             )
 
+    def update_template(
+        self,
+        template_id: int,
+        template_update: Dict[str, Any]
+    ) -> Optional[SurveyTemplateResponse]:
+        """Update survey template, recomputing its statistics when Sections change."""
+        template = self.db.query(models.SurveyTemplate).filter(
+            models.SurveyTemplate.TemplateID == template_id
+        ).first()
+        
+        if not template:
+            return None
+        
+        columns = set(models.SurveyTemplate.__table__.columns.keys()) - TEMPLATE_COMPUTED_FIELDS
+        unknown = set(template_update) - columns
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown template fields: {', '.join(sorted(unknown))}"
+            )
+        
+        try:
+            for field, value in template_update.items():
+                setattr(template, field, value)
+            if 'Sections' in template_update:
+                for field, value in compute_template_statistics(template.Sections).items():
+                    setattr(template, field, value)
+            
+            self.db.commit()
+            self.db.refresh(template)
+            template_summary_cache.invalidate()
+            
+            return SurveyTemplateResponse(**template.to_dict())
+        except Exception as e:
+            self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Failed to update template: {str(e)}"
+            )
+
     def get_template(self, template_id: int) -> Optional[SurveyTemplateResponse]:
         """Get survey template by ID."""
         template = self.db.query(models.SurveyTemplate).filter(
@@ -198,9 +369,14 @@ class TemplateService:
         skip: int = 0,
         limit: int = 100,
         domain: Optional[SurveyDomain] = None,
-        category: Optional[SurveyCategory] = None
+        category: Optional[SurveyCategory] = None,
+        cursor: Optional[str] = None,
+        exact_total: bool = False
     ) -> PaginatedResponse[SurveyTemplateResponse]:
-        """List survey templates with filtering."""
+        """List survey templates with filtering.
+
+        Pass the returned next_cursor as cursor to fetch the following page.
+        """
         query = self.db.query(models.SurveyTemplate)
         
         if domain:
@@ -208,19 +384,18 @@ class TemplateService:
         if category:
             query = query.filter(models.SurveyTemplate.Category == category.value)
         
-        total = query.count()
-        templates = query.order_by(asc(models.SurveyTemplate.TemplateName)).offset(skip).limit(limit).all()
+        try:
+            templates, pagination = paginate(
+                query, self.LIST_SORT_KEYS, limit, cursor=cursor, skip=skip, exact_total=exact_total
+            )
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
         
         items = [SurveyTemplateResponse(**template.to_dict()) for template in templates]
         
         return PaginatedResponse[SurveyTemplateResponse](
             data=items,
-            pagination={
-                "total": total,
-                "page": skip // limit + 1 if limit > 0 else 1,
-                "size": limit,
-                "pages": (total + limit - 1) // limit if limit > 0 else 1
-            }
+            pagination=pagination
         )
         
     def get_template_with_sections(self, template_id: int) -> Optional[Dict[str, Any]]:
@@ -234,64 +409,41 @@ class TemplateService:
             
         template_dict = template.to_dict()
         
-        # Parse sections to count questions and subsections
-        sections = template_dict.get('Sections', [])
-        total_questions = 0
-        total_subsections = 0
-        
-        for section in sections:
-            section_questions = section.get('questions', [])
-            section_subsections = section.get('subsections', [])
-            total_questions += len(section_questions)
-            total_subsections += len(section_subsections)
-            
-            # Count questions in subsections too
-            for subsection in section_subsections:
-                subsection_questions = subsection.get('questions', [])
-                total_questions += len(subsection_questions)
+        # Statistics are stored on create/update; rows that predate them are counted here
+        if template.QuestionCount is None:
+            template_dict.update(compute_template_statistics(template.Sections))
         
-        # Add computed metadata
         template_dict['metadata'] = {
-            'total_sections': len(sections),
-            'total_subsections': total_subsections,
-            'total_questions': total_questions,
-            'template_complexity': 'High' if total_questions > 50 else 'Medium' if total_questions > 20 else 'Low'
+            'total_sections': template_dict['SectionCount'],
+            'total_subsections': template_dict['SubsectionCount'],
+            'total_questions': template_dict['QuestionCount'],
+            'template_complexity': template_dict['ComplexityLevel']
         }
         
         return template_dict
         
     def list_templates_with_stats(self, skip: int = 0, limit: int = 100) -> Dict[str, Any]:
-        """List templates with statistical information for better display."""
-        templates = self.db.query(models.SurveyTemplate).offset(skip).limit(limit).all()
-        total = self.db.query(models.SurveyTemplate).count()
+        """List templates with statistical information for better display.
+
+        Only the stored statistics columns are read; the Sections JSON is not loaded.
+        """
+        templates = (
+            self.db.query(models.SurveyTemplate)
+            .options(load_only(*TEMPLATE_LIST_COLUMNS))
+            .order_by(*order_by_keys(self.LIST_SORT_KEYS))
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+        summary = self._get_template_summary()
+        total = summary['total_templates']
         
         template_list = []
         for template in templates:
-            template_dict = template.to_dict()
-            
-            # Calculate metadata
-            sections = template_dict.get('Sections', [])
-            question_count = 0
-            section_count = len(sections)
-            
-            for section in sections:
-                questions = section.get('questions', [])
-                subsections = section.get('subsections', [])
-                question_count += len(questions)
-                
-                for subsection in subsections:
-                    sub_questions = subsection.get('questions', [])
-                    question_count += len(sub_questions)
-            
-            # Add computed fields
-            template_dict['question_count'] = question_count
-            template_dict['section_count'] = section_count
-            template_dict['complexity_level'] = (
-                'High' if question_count > 50 else 
-                'Medium' if question_count > 20 else 
-                'Low'
-            )
-            
+            template_dict = {column.key: getattr(template, column.key) for column in TEMPLATE_LIST_COLUMNS}
+            template_dict['question_count'] = template.QuestionCount
+            template_dict['section_count'] = template.SectionCount
+            template_dict['complexity_level'] = template.ComplexityLevel
             template_list.append(template_dict)
             
         return {
@@ -302,30 +454,34 @@ class TemplateService:
                 'size': limit,
                 'pages': (total + limit - 1) // limit if limit > 0 else 1
             },
-            'summary': {
-                'total_templates': total,
-                'templates_by_domain': self._get_templates_by_domain(),
-                'templates_by_category': self._get_templates_by_category()
-            }
+            'summary': summary
         }
         
-    def _get_templates_by_domain(self) -> Dict[str, int]:
-        """Get template count by domain."""
-        from sqlalchemy import func
-        result = self.db.query(
-            models.SurveyTemplate.Domain, 
-            func.count(models.SurveyTemplate.TemplateID)
-        ).group_by(models.SurveyTemplate.Domain).all()
-        return {domain: count for domain, count in result}
-        
-    def _get_templates_by_category(self) -> Dict[str, int]:
-        """Get template count by category."""
-        from sqlalchemy import func
-        result = self.db.query(
-            models.SurveyTemplate.Category, 
+    def _get_template_summary(self) -> Dict[str, Any]:
+        """Template counts overall, by domain and by category, from one GROUP BY."""
+        summary = template_summary_cache.get('summary')
+        if summary is not None:
+            return summary
+        
+        rows = self.db.query(
+            models.SurveyTemplate.Domain,
+            models.SurveyTemplate.Category,
             func.count(models.SurveyTemplate.TemplateID)
-        ).group_by(models.SurveyTemplate.Category).all()
-        return {category: count for category, count in result}
+        ).group_by(models.SurveyTemplate.Domain, models.SurveyTemplate.Category).all()
+        
+        by_domain: Dict[str, int] = {}
+        by_category: Dict[str, int] = {}
+        for domain, category, count in rows:
+            by_domain[domain] = by_domain.get(domain, 0) + count
+            by_category[category] = by_category.get(category, 0) + count
+        
+        summary = {
+            'total_templates': sum(by_domain.values()),
+            'templates_by_domain': by_domain,
+            'templates_by_category': by_category
+        }
+        template_summary_cache.put('summary', summary)
+        return summary
 
 
 class MetricsService:
@@ -0,0 +1,194 @@
+"""
+Response analytics for a survey
+The answers submitted over the requested period are counted per response and
+section by one streamed query into a columnar pandas frame, and the trends
+are computed from it with vectorized group-bys. Results are cached per
+(survey, time period) and dropped when responses to the survey are saved
+"""
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+import pandas as pd
+from sqlalchemy import case, distinct, func, select
+from sqlalchemy.orm import Session
+
+import config
+from ...infrastructure.database import models
+from ...infrastructure.database.mali_ref_models import MaliRegionModel
+from . import progress_service
+from src.utils.ttl_cache import TTLCache
+
+# Days per time period unit: 30d, 12w, 6m, 1y
+PERIOD_UNITS = {"d": 1, "w": 7, "m": 30, "y": 365}
+_PERIOD_PATTERN = re.compile(r"^(\d+)([dwmy])$")
+
+# Question type whose answers are region codes (TableRef:08)
+REGION_QUESTION_TYPE = "region"
+
+ANSWER_COLUMNS = ["ResponseID", "RespondentKey", "SubmittedDate", "SectionID", "Answered", "RegionCode"]
+
+# Regions listed in geographic_insights.top_regions
+TOP_REGIONS = 10
+
+
+class InvalidTimePeriodError(ValueError):
+    """Raised for a time period other than <number><d|w|m|y>"""
+
+
+def parse_time_period(time_period: str) -> timedelta:
+    """Length of a time period such as 7d, 30d, 90d or 1y"""
+    match = _PERIOD_PATTERN.match(time_period or "")
+    if not match or int(match.group(1)) == 0:
+        raise InvalidTimePeriodError(f"Invalid time period: {time_period} (expected e.g. 7d, 30d, 90d, 1y)")
+    return timedelta(days=int(match.group(1)) * PERIOD_UNITS[match.group(2)])
+
+
+# Global survey analytics cache instance, keyed by (SurveyID, time_period)
+analytics_cache = TTLCache(ttl=config.ANALYTICS_CACHE_TTL, max_entries=config.ANALYTICS_CACHE_SIZE)
+
+
+def invalidate_survey_analytics(survey_id: int) -> None:
+    """Drop the cached analytics of a survey (all time periods)"""
+    analytics_cache.invalidate_where(lambda key: key[0] == survey_id)
+
+
+def load_answers(db: Session, survey_id: int, since: datetime) -> pd.DataFrame:
+    """Answered questions per response and section for the responses submitted since a date
+
+    One row per (response, section answered), plus one row per response
+    without answers; RegionCode holds the answer to a region question. Rows
+    are fetched in partitions of ANALYTICS_FETCH_SIZE, through a server-side
+    cursor on PostgreSQL.
+    """
+    region_answer = case((models.Question.QuestionType == REGION_QUESTION_TYPE, models.ResponseDetail.AnswerText))
+    statement = (
+        select(
+            models.Response.ResponseID,
+            models.Response.RespondentKey,
+            models.Response.SubmittedDate,
+            models.Question.SectionID,
+            func.count(distinct(models.ResponseDetail.QuestionID)),
+            func.max(region_answer)
+        )
+        .outerjoin(models.ResponseDetail, models.ResponseDetail.ResponseID == models.Response.ResponseID)
+        .outerjoin(models.Question, models.Question.QuestionID == models.ResponseDetail.QuestionID)
+        .where(models.Response.SurveyID == survey_id, models.Response.SubmittedDate >= since)
+        .group_by(models.Response.ResponseID, models.Response.RespondentKey,
+                  models.Response.SubmittedDate, models.Question.SectionID)
+        .execution_options(yield_per=config.ANALYTICS_FETCH_SIZE)
+    )
+    # Core execution: ORM row processing would cost more than the query
+    result = db.connection().execute(statement)
+    chunks = [pd.DataFrame.from_records(rows, columns=ANSWER_COLUMNS) for rows in result.partitions()]
+    frame = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=ANSWER_COLUMNS)
+
+    return frame.astype({
+        "ResponseID": "int64",
+        "RespondentKey": "category",
+        "SectionID": "Int64",
+        "Answered": "int64",
+        "RegionCode": "category"
+    }).assign(SubmittedDate=pd.to_datetime(frame["SubmittedDate"]))
+
+
+def _rate(value: float) -> Optional[float]:
+    return None if pd.isna(value) else round(float(value), 4)
+
+
+def region_names(db: Session) -> Dict[str, str]:
+    """Names of the active Mali regions by region code"""
+    rows = db.execute(
+        select(MaliRegionModel.region_code, MaliRegionModel.region_name).where(MaliRegionModel.is_active == True)
+    )
+    return {code: name for code, name in rows}
+
+
+def compute_analytics(db: Session, frame: pd.DataFrame, structure: progress_service.SurveyStructure,
+                      since: datetime, until: datetime) -> Dict[str, Any]:
+    """Trends, section abandonment, quality figures and regions of the answers in frame"""
+    # One row per response
+    responses = frame.groupby("ResponseID").agg(
+        SubmittedDate=("SubmittedDate", "first"),
+        RespondentKey=("RespondentKey", "first"),
+        answered=("Answered", "sum")
+    )
+    total_questions = structure.total_questions
+    responses["completion"] = (responses["answered"] / total_questions).clip(upper=1.0) if total_questions else 0.0
+    incomplete = responses["completion"] < 1.0
+
+    # Daily trends over the whole period, days without responses included
+    days = pd.date_range(pd.Timestamp(since).normalize(), pd.Timestamp(until).normalize(), freq="D")
+    by_day = responses.groupby(responses["SubmittedDate"].dt.normalize())
+    daily_responses = by_day.size().reindex(days, fill_value=0)
+    completion_trend = by_day["completion"].mean().reindex(days)
+
+    # A response abandoned at a section answered nothing from that section on
+    positions = {section_id: position for position, (section_id, _, _) in enumerate(structure.sections)}
+    answered_sections = frame["SectionID"].map(positions, na_action="ignore")
+    last_section = answered_sections.groupby(frame["ResponseID"]).max().reindex(responses.index).fillna(-1)
+    abandonment_points = {}
+    if len(responses):
+        stopped = last_section[incomplete].value_counts()
+        for position, (section_id, _, _) in enumerate(structure.sections):
+            abandonment_points[f"section_{section_id}"] = _rate(stopped.get(position - 1, 0) / len(responses))
+
+    # Regions, from the region answer of each response
+    regions = frame.dropna(subset=["RegionCode"]).groupby("ResponseID", observed=True)["RegionCode"].first()
+    top_regions, coverage_gaps = [], []
+    if len(regions):
+        by_region = responses.loc[regions.index, "completion"].groupby(regions.astype(str)).agg(["size", "mean"])
+        by_region = by_region.sort_values("size", ascending=False)
+        names = region_names(db)
+        top_regions = [
+            {"region": names.get(code, code), "region_code": code,
+             "responses": int(row["size"]), "completion_rate": _rate(row["mean"])}
+            for code, row in by_region.head(TOP_REGIONS).iterrows()
+        ]
+        coverage_gaps = [name for code, name in sorted(names.items()) if code not in by_region.index]
+
+    keyed = responses["RespondentKey"].dropna()
+    return {
+        "period_start": since,
+        "period_end": until,
+        "total_responses": int(len(responses)),
+        "unique_respondents": int(keyed.nunique()),
+        "response_trends": {
+            "dates": [day.date().isoformat() for day in days],
+            "daily_responses": [int(count) for count in daily_responses],
+            "completion_trends": [_rate(value) for value in completion_trend],
+            "abandonment_points": abandonment_points
+        },
+        "quality_metrics": {
+            "average_completion": _rate(responses["completion"].mean()) if len(responses) else None,
+            "incomplete_responses": int(incomplete.sum()),
+            "duplicate_responses": int(len(keyed) - keyed.nunique())
+        },
+        "geographic_insights": {
+            "top_regions": top_regions,
+            "coverage_gaps": coverage_gaps
+        }
+    }
+
+
+def get_survey_analytics(db: Session, survey_id: int, time_period: str = "30d") -> Optional[Dict[str, Any]]:
+    """Analytics of the responses submitted over time_period, None if the survey does not exist
+
+    Raises InvalidTimePeriodError for an unreadable time_period.
+    """
+    length = parse_time_period(time_period)
+    structure = progress_service.get_survey_structure(db, survey_id)
+    if structure is None:
+        return None
+
+    key = (survey_id, time_period)
+    analytics = analytics_cache.get(key)
+    if analytics is None:
+        until = datetime.utcnow()
+        since = until - length
+        analytics = dict(
+            {"survey_id": survey_id, "time_period": time_period},
+            **compute_analytics(db, load_answers(db, survey_id, since), structure, since, until)
+        )
+        analytics_cache.put(key, analytics)
+    return analytics
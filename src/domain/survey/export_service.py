@@ -0,0 +1,482 @@
+"""
+Export engine for survey responses
+Responses are read with one streamed query (server-side cursor on PostgreSQL,
+EXPORT_FETCH_SIZE answers per round trip) and pivoted into one row per
+response with a column per question, EXPORT_CHUNK_SIZE rows at a time.
+Writers consume the chunks as they come, so memory use does not grow with the
+size of the survey: CSV, JSON and NDJSON are produced as text streams, XLSX
+through openpyxl's write-only mode. Parquet exports are datasets with typed
+columns, partitioned by region code and fiscal year, delivered as a zip
+archive; each one is a snapshot, and an incremental snapshot only holds the
+responses submitted since the previous one
+"""
+import csv
+import io
+import json
+import math
+import os
+import shutil
+import zipfile
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet exports are unavailable
+    pa = pq = None
+from sqlalchemy import and_, select
+from sqlalchemy.orm import Session
+
+import config
+from ...infrastructure.database import models
+from .analytics_service import REGION_QUESTION_TYPE
+from schemas.survey_extensions import ExportFormat, ExportRequest
+
+# File extension and media type of each supported format
+EXPORT_FILE_TYPES = {
+    ExportFormat.CSV: ("csv", "text/csv"),
+    ExportFormat.JSON: ("json", "application/json"),
+    ExportFormat.NDJSON: ("ndjson", "application/x-ndjson"),
+    ExportFormat.EXCEL: ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    ExportFormat.PARQUET: ("parquet.zip", "application/zip")
+}
+
+# Formats that can be streamed straight into an HTTP response
+TEXT_FORMATS = (ExportFormat.CSV, ExportFormat.JSON, ExportFormat.NDJSON)
+
+# Response columns before the question columns (include_metadata adds the last two)
+METADATA_COLUMNS = ["response_id", "respondent_id", "submitted_date"]
+
+# Excel sheet limits: rows beyond the first go to a new sheet, longer texts are cut
+XLSX_MAX_ROWS = 1048576
+XLSX_MAX_CELL_LENGTH = 32767
+
+# Separator of the values of a question answered more than once (multiple choice)
+VALUE_SEPARATOR = "; "
+
+# Parquet column type per QuestionType (string otherwise); choices are dictionary-encoded
+NUMERIC_QUESTION_TYPES = {"number", "integer", "decimal"}
+CATEGORICAL_QUESTION_TYPES = {"single_choice", REGION_QUESTION_TYPE}
+BOOLEAN_VALUES = {"true": True, "1": True, "oui": True, "yes": True,
+                  "false": False, "0": False, "non": False, "no": False}
+
+# Partition of responses without a region answer (pyarrow cannot read back a null
+# partition once partition values are dictionary-encoded)
+UNKNOWN_REGION_PARTITION = "unknown"
+
+# Characters escaped (%XX) in partition directory names, as Hive does; control characters too
+PARTITION_ESCAPED_CHARACTERS = frozenset('"#%\'*/:=?\\\x7f{[]^')
+
+
+class ExportError(ValueError):
+    """Raised for an export request that cannot be served"""
+
+
+class ExportPlan:
+    """What one export writes: format, columns and response filters (no database state)"""
+
+    def __init__(self, survey_id: int, export_format: ExportFormat, questions: List[Dict[str, Any]],
+                 option_texts: Dict[int, str], include_metadata: bool = True,
+                 since: Optional[datetime] = None, until: Optional[datetime] = None,
+                 question_filter: bool = False, snapshot: bool = False):
+        self.survey_id = survey_id
+        self.format = export_format
+        self.questions = questions
+        self.question_ids = [question["QuestionID"] for question in questions]
+        self.option_texts = option_texts
+        self.include_metadata = include_metadata
+        self.since = since
+        self.until = until
+        # Only join the answers to the selected questions
+        self.question_filter = question_filter
+        # Parquet snapshots cover [since, until) and are recorded on the export job
+        self.snapshot = snapshot
+        metadata = METADATA_COLUMNS if include_metadata else METADATA_COLUMNS[:1]
+        self.headers = metadata + [f"Q{question['QuestionID']}. {question['QuestionText']}" for question in questions]
+
+    @property
+    def extension(self) -> str:
+        return EXPORT_FILE_TYPES[self.format][0]
+
+    @property
+    def media_type(self) -> str:
+        return EXPORT_FILE_TYPES[self.format][1]
+
+    def snapshot_config(self) -> Optional[Dict[str, Optional[str]]]:
+        """Bounds of a snapshot export, as recorded in the job's ExportConfig"""
+        if not self.snapshot:
+            return None
+        return {"since": self.since.isoformat() if self.since else None, "until": self.until.isoformat()}
+
+    def file_name(self, when: Optional[datetime] = None) -> str:
+        when = when or datetime.utcnow()
+        return f"survey_{self.survey_id}_export_{when.strftime('%Y%m%d_%H%M%S')}.{self.extension}"
+
+
+def _parse_bound(value: Optional[str], end: bool) -> Optional[datetime]:
+    """date_range bound; a date without time covers the whole day"""
+    if not value:
+        return None
+    try:
+        bound = datetime.fromisoformat(value)
+    except ValueError:
+        raise ExportError(f"Invalid date in date_range: {value} (expected YYYY-MM-DD)")
+    if end and len(value) == 10:
+        bound += timedelta(days=1)
+    return bound
+
+
+def plan_export(db: Session, survey_id: int, request: ExportRequest,
+                snapshot_since: Optional[datetime] = None) -> Optional[ExportPlan]:
+    """Plan of an export request, None if the survey does not exist
+
+    Parquet exports are snapshots of the responses submitted up to
+    EXPORT_SNAPSHOT_LAG_SECONDS ago; incremental ones start at snapshot_since,
+    the end of the previous snapshot. Raises ExportError for an unsupported
+    format or an unreadable date range.
+    """
+    if request.format not in EXPORT_FILE_TYPES:
+        supported = ", ".join(export_format.value for export_format in EXPORT_FILE_TYPES)
+        raise ExportError(f"Export format {request.format.value} is not supported (supported: {supported})")
+    parquet = request.format == ExportFormat.PARQUET
+    if parquet and pq is None:
+        raise ExportError("Parquet exports require pyarrow, which is not installed")
+    if request.incremental and not parquet:
+        raise ExportError("Incremental exports are only available in Parquet format")
+    if request.incremental and request.date_range:
+        raise ExportError("Incremental exports cannot be limited to a date range")
+    if db.get(models.Survey, survey_id) is None:
+        return None
+
+    date_range = request.date_range or {}
+    since = _parse_bound(date_range.get("start"), end=False)
+    until = _parse_bound(date_range.get("end"), end=True)
+    if parquet:
+        # Responses still being written when the snapshot starts are left to the next one
+        latest = datetime.utcnow() - timedelta(seconds=config.EXPORT_SNAPSHOT_LAG_SECONDS)
+        until = min(until, latest) if until else latest
+        if request.incremental:
+            since = snapshot_since
+
+    statement = (
+        select(models.Question.QuestionID, models.Question.QuestionText, models.Question.QuestionType)
+        .join(models.Section, models.Section.SectionID == models.Question.SectionID)
+        .where(models.Section.SurveyID == survey_id)
+        .order_by(models.Section.SectionID, models.Question.QuestionID)
+    )
+    if request.sections:
+        statement = statement.where(models.Section.SectionID.in_(request.sections))
+    if request.questions:
+        statement = statement.where(models.Question.QuestionID.in_(request.questions))
+    questions = [dict(row._mapping) for row in db.execute(statement)]
+    if parquet and (request.sections or request.questions):
+        # Parquet datasets are partitioned by the answer to the region question
+        selected = {question["QuestionID"] for question in questions}
+        questions.extend(
+            dict(row._mapping) for row in db.execute(
+                select(models.Question.QuestionID, models.Question.QuestionText, models.Question.QuestionType)
+                .join(models.Section, models.Section.SectionID == models.Question.SectionID)
+                .where(models.Section.SurveyID == survey_id,
+                       models.Question.QuestionType == REGION_QUESTION_TYPE)
+                .order_by(models.Question.QuestionID)
+            ) if row.QuestionID not in selected
+        )
+
+    option_texts = dict(db.execute(
+        select(models.AnswerOption.OptionID, models.AnswerOption.OptionText)
+        .where(models.AnswerOption.QuestionID.in_([question["QuestionID"] for question in questions]))
+    ).all()) if questions else {}
+
+    return ExportPlan(
+        survey_id, request.format, questions, option_texts,
+        # Parquet partitions and snapshots need the submission date
+        include_metadata=request.include_metadata or parquet, since=since, until=until,
+        question_filter=bool(request.sections or request.questions), snapshot=parquet
+    )
+
+
+def iter_row_chunks(db: Session, plan: ExportPlan, chunk_size: Optional[int] = None) -> Iterator[List[List[Any]]]:
+    """Wide rows of the planned export (one per response, in ResponseID order), chunk_size at a time"""
+    chunk_size = chunk_size or config.EXPORT_CHUNK_SIZE
+    join_condition = models.ResponseDetail.ResponseID == models.Response.ResponseID
+    if plan.question_filter:
+        join_condition = and_(join_condition, models.ResponseDetail.QuestionID.in_(plan.question_ids))
+    statement = (
+        select(models.Response.ResponseID, models.Response.RespondentKey, models.Response.SubmittedDate,
+               models.ResponseDetail.QuestionID, models.ResponseDetail.SelectedOptionID,
+               models.ResponseDetail.AnswerText)
+        .outerjoin(models.ResponseDetail, join_condition)
+        .where(models.Response.SurveyID == plan.survey_id)
+        .order_by(models.Response.ResponseID, models.ResponseDetail.ResponseDetailID)
+        .execution_options(yield_per=config.EXPORT_FETCH_SIZE)
+    )
+    if plan.since is not None:
+        statement = statement.where(models.Response.SubmittedDate >= plan.since)
+    if plan.until is not None:
+        statement = statement.where(models.Response.SubmittedDate < plan.until)
+
+    offset = len(plan.headers) - len(plan.question_ids)
+    positions = {question_id: offset + position for position, question_id in enumerate(plan.question_ids)}
+    chunk: List[List[Any]] = []
+    row: Optional[List[Any]] = None
+    current_id = None
+    result = db.connection().execute(statement)
+    for partition in result.partitions():
+        for response_id, respondent_key, submitted, question_id, option_id, answer in partition:
+            if response_id != current_id:
+                if row is not None:
+                    chunk.append(row)
+                    if len(chunk) >= chunk_size:
+                        yield chunk
+                        chunk = []
+                current_id = response_id
+                row = [response_id, respondent_key, submitted] if plan.include_metadata else [response_id]
+                row.extend([None] * len(plan.question_ids))
+            position = positions.get(question_id)
+            if position is None:
+                continue
+            value = answer if answer is not None else plan.option_texts.get(option_id)
+            row[position] = value if row[position] is None else f"{row[position]}{VALUE_SEPARATOR}{value}"
+    if row is not None:
+        chunk.append(row)
+    if chunk:
+        yield chunk
+
+
+def _text_value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, (datetime, date)) else value
+
+
+def export_text(plan: ExportPlan, chunks: Iterator[List[List[Any]]]) -> Iterator[str]:
+    """CSV, JSON (one array) or NDJSON text of the rows, one piece per chunk"""
+    headers = plan.headers
+    if plan.format == ExportFormat.CSV:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(headers)
+        yield buffer.getvalue()
+        for chunk in chunks:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows([[_text_value(value) for value in row] for row in chunk])
+            yield buffer.getvalue()
+        return
+
+    array = plan.format == ExportFormat.JSON
+    separator = ",\n" if array else "\n"
+    if array:
+        yield "["
+    first = True
+    for chunk in chunks:
+        lines = separator.join(
+            json.dumps(dict(zip(headers, map(_text_value, row))), ensure_ascii=False) for row in chunk
+        )
+        yield (lines if first or not array else separator + lines) + ("" if array else "\n")
+        first = False
+    if array:
+        yield "]\n"
+
+
+def _xlsx_value(value: Any) -> Any:
+    if isinstance(value, str):
+        return ILLEGAL_CHARACTERS_RE.sub("", value)[:XLSX_MAX_CELL_LENGTH]
+    return value
+
+
+def write_xlsx(path: str, plan: ExportPlan, chunks: Iterator[List[List[Any]]],
+               progress: Optional[Callable[[int], None]] = None) -> int:
+    """Write the rows to an XLSX file in write-only mode; returns the number of rows"""
+    workbook = Workbook(write_only=True)
+    sheet, sheet_rows, total = None, 0, 0
+    for chunk in chunks:
+        for row in chunk:
+            if sheet is None or sheet_rows >= XLSX_MAX_ROWS:
+                sheet = workbook.create_sheet(f"Responses {len(workbook.worksheets) + 1}" if sheet else "Responses")
+                sheet.append(plan.headers)
+                sheet_rows = 1
+            sheet.append([_xlsx_value(value) for value in row])
+            sheet_rows += 1
+        total += len(chunk)
+        if progress:
+            progress(total)
+    if sheet is None:
+        workbook.create_sheet("Responses").append(plan.headers)
+    workbook.save(path)
+    return total
+
+
+def _parquet_column(question_type: Optional[str]) -> Tuple[Any, Callable[[Any], Any]]:
+    """Arrow type of the answers to a question type, and the conversion of an answer to it"""
+    if question_type in NUMERIC_QUESTION_TYPES:
+        def number(value: Any) -> Optional[float]:
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                return None
+            return value if math.isfinite(value) else None
+        return pa.float64(), number
+    if question_type == "date":
+        def day(value: Any) -> Optional[date]:
+            try:
+                return date.fromisoformat(value[:10])
+            except (TypeError, ValueError):
+                return None
+        return pa.date32(), day
+    if question_type == "boolean":
+        return pa.bool_(), lambda value: BOOLEAN_VALUES.get(value.strip().lower()) if isinstance(value, str) else None
+    if question_type in CATEGORICAL_QUESTION_TYPES:
+        return pa.dictionary(pa.int32(), pa.string()), lambda value: value
+    return pa.string(), lambda value: value
+
+
+def _parquet_schema(plan: ExportPlan) -> Tuple[Any, List[Callable[[Any], Any]]]:
+    fields = [
+        pa.field("response_id", pa.int64()),
+        pa.field("respondent_id", pa.string()),
+        pa.field("submitted_date", pa.timestamp("us"))
+    ]
+    converters = [lambda value: value] * len(fields)
+    for question, header in zip(plan.questions, plan.headers[len(fields):]):
+        arrow_type, converter = _parquet_column(question["QuestionType"])
+        fields.append(pa.field(header, arrow_type))
+        converters.append(converter)
+    metadata = {
+        "survey_id": str(plan.survey_id),
+        "questions": json.dumps([
+            {"question_id": question["QuestionID"], "question_text": question["QuestionText"],
+             "question_type": question["QuestionType"]}
+            for question in plan.questions
+        ], ensure_ascii=False),
+        "snapshot": json.dumps(plan.snapshot_config())
+    }
+    return pa.schema(fields, metadata=metadata), converters
+
+
+def partition_value(value: Any) -> str:
+    """Directory name part of a partition value: Hive-style escapes, UNKNOWN_REGION_PARTITION when empty"""
+    text = UNKNOWN_REGION_PARTITION if value is None or value == "" else str(value)
+    return "".join(
+        f"%{ord(character):02X}" if character in PARTITION_ESCAPED_CHARACTERS or ord(character) < 0x20 else character
+        for character in text
+    )
+
+
+def write_parquet(directory: str, plan: ExportPlan, chunks: Iterator[List[List[Any]]],
+                  progress: Optional[Callable[[int], None]] = None) -> int:
+    """Write the rows as a Parquet dataset partitioned by region_code and fiscal_year
+
+    Each partition gets one file with a row group (and its column statistics)
+    per PARQUET_ROW_GROUP_SIZE responses. Files are named after the snapshot
+    end, so the datasets of successive snapshots can be merged into one
+    directory. Region answers are escaped in directory names (pyarrow
+    decodes them back). Returns the number of rows written; progress gets
+    it after every chunk.
+    """
+    schema, converters = _parquet_schema(plan)
+    region_position = next((
+        len(METADATA_COLUMNS) + position for position, question in enumerate(plan.questions)
+        if question["QuestionType"] == REGION_QUESTION_TYPE
+    ), None)
+    part_name = f"part-{plan.until.strftime('%Y%m%dT%H%M%S')}.parquet"
+    root = os.path.realpath(directory)
+    written = 0
+    # Partition directory name of each region answer
+    region_names: Dict[Optional[str], str] = {}
+    writers: Dict[Tuple[str, int], Any] = {}
+    pending: Dict[Tuple[str, int], List[List[Any]]] = {}
+
+    def write(partition: Tuple[str, int]) -> None:
+        nonlocal written
+        rows = pending.pop(partition, None)
+        if not rows:
+            return
+        writer = writers.get(partition)
+        if writer is None:
+            region_name, fiscal_year = partition
+            path = os.path.realpath(os.path.join(root, f"region_code={region_name}", f"fiscal_year={fiscal_year}"))
+            if os.path.commonpath([root, path]) != root:
+                raise ExportError(f"Partition {partition} is outside the export directory")
+            os.makedirs(path, exist_ok=True)
+            writer = writers[partition] = pq.ParquetWriter(
+                os.path.join(path, part_name), schema, compression=config.PARQUET_COMPRESSION,
+                use_dictionary=True, write_statistics=True
+            )
+        columns = [
+            pa.array([convert(value) for value in values], type=field.type)
+            for values, convert, field in zip(zip(*rows), converters, schema)
+        ]
+        writer.write_table(pa.Table.from_arrays(columns, schema=schema), row_group_size=len(rows))
+        written += len(rows)
+
+    try:
+        for chunk in chunks:
+            for row in chunk:
+                region_code = row[region_position] if region_position is not None else None
+                region_name = region_names.get(region_code)
+                if region_name is None:
+                    region_name = region_names[region_code] = partition_value(region_code)
+                partition = (region_name, row[2].year)
+                rows = pending.setdefault(partition, [])
+                rows.append(row)
+                if len(rows) >= config.PARQUET_ROW_GROUP_SIZE:
+                    write(partition)
+            if progress:
+                progress(written)
+        for partition in list(pending):
+            write(partition)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return written
+
+
+def _zip_directory(directory: str, path: str) -> None:
+    """Archive a dataset directory (stored as is, Parquet files are already compressed)"""
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for root, _, files in os.walk(directory):
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                archive.write(file_path, os.path.relpath(file_path, directory))
+
+
+def write_export(db: Session, plan: ExportPlan, path: str,
+                 progress: Optional[Callable[[int], None]] = None) -> int:
+    """Write the planned export to path (through a temporary file); returns the number of rows
+
+    progress is called with the number of rows written after every chunk.
+    """
+    partial = f"{path}.part"
+    chunks = iter_row_chunks(db, plan)
+    try:
+        if plan.format == ExportFormat.PARQUET:
+            directory = f"{path}.dataset"
+            try:
+                total = write_parquet(directory, plan, chunks, progress)
+                _zip_directory(directory, partial)
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+        elif plan.format == ExportFormat.EXCEL:
+            total = write_xlsx(partial, plan, chunks, progress)
+        else:
+            total = 0
+
+            def counted() -> Iterator[List[List[Any]]]:
+                nonlocal total
+                for chunk in chunks:
+                    yield chunk
+                    total += len(chunk)
+                    if progress:
+                        progress(total)
+
+            with open(partial, "w", encoding="utf-8", newline="") as output:
+                for piece in export_text(plan, counted()):
+                    output.write(piece)
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return total
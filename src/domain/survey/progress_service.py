@@ -0,0 +1,225 @@
+"""
+Business logic for survey completion progress
+Each (survey, respondent) pair has a RespondentProgress row holding the ids
+of the questions answered so far and the answered counts overall and per
+section. Saving responses folds the new answers into it, in the same
+transaction, so reading progress is a single-row lookup. The question totals
+come from the survey structure, cached per survey version
+"""
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import Table, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+import config
+from ...infrastructure.database import models
+from src.utils.ttl_cache import TTLCache
+
+
+class SurveyStructure:
+    """Sections, questions and answer options of one survey version"""
+
+    def __init__(self, version: str, rows: Iterable[Tuple[int, str, Optional[int], Optional[str], Optional[int]]]):
+        self.version = version
+        # (SectionID, Title, number of questions), in section order
+        self.sections: List[Tuple[int, str, int]] = []
+        # Questions in survey order
+        self.question_sections: Dict[int, int] = {}
+        self.question_types: Dict[int, Optional[str]] = {}
+        self.options: Dict[int, Set[int]] = {}
+
+        section_totals: Dict[int, int] = {}
+        titles: Dict[int, str] = {}
+        for section_id, title, question_id, question_type, option_id in rows:
+            titles.setdefault(section_id, title)
+            section_totals.setdefault(section_id, 0)
+            if question_id is None:
+                continue
+            if question_id not in self.question_sections:
+                self.question_sections[question_id] = section_id
+                self.question_types[question_id] = question_type
+                self.options[question_id] = set()
+                section_totals[section_id] += 1
+            if option_id is not None:
+                self.options[question_id].add(option_id)
+        self.sections = [(section_id, titles[section_id], total) for section_id, total in section_totals.items()]
+
+    @property
+    def total_questions(self) -> int:
+        return len(self.question_sections)
+
+    def count(self, question_ids: Iterable[int]) -> Tuple[int, Dict[str, int]]:
+        """Questions of this version among question_ids, overall and per section ("<SectionID>" keys)"""
+        answered = 0
+        section_counts: Dict[str, int] = {}
+        for question_id in question_ids:
+            section_id = self.question_sections.get(question_id)
+            if section_id is None:
+                continue
+            answered += 1
+            section_counts[str(section_id)] = section_counts.get(str(section_id), 0) + 1
+        return answered, section_counts
+
+
+# Global survey structure cache instance, keyed by (SurveyID, version)
+structure_cache = TTLCache(ttl=config.SURVEY_STRUCTURE_CACHE_TTL, max_entries=config.SURVEY_STRUCTURE_CACHE_SIZE)
+
+
+def _survey_version(survey: models.Survey) -> str:
+    updated = survey.UpdatedDate.isoformat() if survey.UpdatedDate else ""
+    return f"{survey.Version or 0}:{updated}"
+
+
+def get_survey_structure(db: Session, survey_id: int) -> Optional[SurveyStructure]:
+    """Structure of the current version of a survey, None if the survey does not exist"""
+    survey = db.get(models.Survey, survey_id)
+    if survey is None:
+        return None
+    version = _survey_version(survey)
+    structure = structure_cache.get((survey_id, version))
+    if structure is None:
+        rows = db.execute(
+            select(models.Section.SectionID, models.Section.Title,
+                   models.Question.QuestionID, models.Question.QuestionType, models.AnswerOption.OptionID)
+            .outerjoin(models.Question, models.Question.SectionID == models.Section.SectionID)
+            .outerjoin(models.AnswerOption, models.AnswerOption.QuestionID == models.Question.QuestionID)
+            .where(models.Section.SurveyID == survey_id)
+            .order_by(models.Section.SectionID, models.Question.QuestionID)
+        ).all()
+        structure = SurveyStructure(version, rows)
+        structure_cache.put((survey_id, version), structure)
+    return structure
+
+
+def invalidate_survey_structure(survey_id: int) -> None:
+    """Forget the cached structures of a survey (all versions)"""
+    structure_cache.invalidate_where(lambda key: key[0] == survey_id)
+
+
+def insert_missing(db: Session, table: Table, rows: List[Dict[str, Any]], index_elements: List[str]) -> None:
+    """Insert counter rows, skipping those another transaction created meanwhile"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        statement = postgresql.insert(table).on_conflict_do_nothing(index_elements=index_elements)
+    elif dialect == "sqlite":
+        statement = sqlite.insert(table).on_conflict_do_nothing(index_elements=index_elements)
+    else:
+        statement = insert(table)
+    db.execute(statement, rows)
+
+
+def _locked_rows(db: Session, survey_id: int, respondent_keys: List[str]) -> Dict[str, models.RespondentProgress]:
+    query = (
+        db.query(models.RespondentProgress)
+        .filter(models.RespondentProgress.SurveyID == survey_id,
+                models.RespondentProgress.RespondentKey.in_(respondent_keys))
+        .order_by(models.RespondentProgress.RespondentKey)
+        .with_for_update()
+        .populate_existing()
+    )
+    return {row.RespondentKey: row for row in query}
+
+
+def record_answers(db: Session, survey_id: int, answered: Dict[str, Set[int]],
+                   when: Optional[datetime] = None,
+                   unanswered: Optional[Dict[str, Set[int]]] = None) -> None:
+    """Fold newly answered question ids, per respondent key, into the progress rows
+
+    Questions in unanswered (answers replaced with an empty one) no longer
+    count as answered. Runs in the caller's transaction; the rows are locked
+    until it commits.
+    """
+    unanswered = unanswered or {}
+    if not answered and not unanswered:
+        return
+    structure = get_survey_structure(db, survey_id)
+    if structure is None:
+        return
+    when = when or datetime.utcnow()
+
+    respondent_keys = sorted(set(answered) | set(unanswered))
+    rows = _locked_rows(db, survey_id, respondent_keys)
+    missing = [key for key in respondent_keys if key not in rows]
+    if missing:
+        insert_missing(db, models.RespondentProgress.__table__, [
+            {"SurveyID": survey_id, "RespondentKey": key, "AnsweredQuestionIDs": [],
+             "AnsweredQuestions": 0, "SectionCounts": {}, "StructureVersion": structure.version}
+            for key in missing
+        ], ["SurveyID", "RespondentKey"])
+        rows.update(_locked_rows(db, survey_id, missing))
+
+    for key in respondent_keys:
+        progress = rows[key]
+        previous = set(progress.AnsweredQuestionIDs or [])
+        new_ids = answered.get(key, set()) - previous
+        removed_ids = previous & unanswered.get(key, set())
+        if new_ids or removed_ids:
+            all_ids = (previous | new_ids) - removed_ids
+            progress.AnsweredQuestionIDs = sorted(all_ids)
+            if progress.StructureVersion == structure.version:
+                # Only the changed answers need counting
+                added, added_by_section = structure.count(new_ids)
+                removed, removed_by_section = structure.count(removed_ids)
+                section_counts = dict(progress.SectionCounts or {})
+                for section_key, count in added_by_section.items():
+                    section_counts[section_key] = section_counts.get(section_key, 0) + count
+                for section_key, count in removed_by_section.items():
+                    section_counts[section_key] = section_counts.get(section_key, 0) - count
+                progress.AnsweredQuestions = (progress.AnsweredQuestions or 0) + added - removed
+                progress.SectionCounts = section_counts
+            else:
+                progress.AnsweredQuestions, progress.SectionCounts = structure.count(all_ids)
+                progress.StructureVersion = structure.version
+        progress.LastActivity = when
+
+
+def get_progress(db: Session, survey_id: int, respondent_key: str) -> Optional[Dict[str, Any]]:
+    """Completion progress of a respondent (SurveyProgress fields), None if the survey does not exist"""
+    structure = get_survey_structure(db, survey_id)
+    if structure is None:
+        return None
+    progress = db.execute(
+        select(models.RespondentProgress).where(
+            models.RespondentProgress.SurveyID == survey_id,
+            models.RespondentProgress.RespondentKey == respondent_key
+        )
+    ).scalar_one_or_none()
+
+    answered, section_counts, last_activity = 0, {}, None
+    if progress is not None:
+        last_activity = progress.LastActivity
+        if progress.StructureVersion == structure.version:
+            answered, section_counts = progress.AnsweredQuestions, progress.SectionCounts or {}
+        else:
+            # Counted for another version of the survey
+            answered, section_counts = structure.count(progress.AnsweredQuestionIDs or [])
+
+    sections_progress = []
+    current_section = None
+    for section_id, title, total in structure.sections:
+        section_answered = section_counts.get(str(section_id), 0)
+        completed = section_answered >= total
+        if not completed and current_section is None:
+            current_section = (section_id, title)
+        sections_progress.append({
+            "section_id": section_id,
+            "section_title": title,
+            "completed": completed,
+            "questions_answered": section_answered,
+            "total_questions": total
+        })
+
+    total_questions = structure.total_questions
+    return {
+        "survey_id": survey_id,
+        "respondent_id": respondent_key,
+        "total_questions": total_questions,
+        "answered_questions": answered,
+        "completion_percentage": round(answered / total_questions * 100, 2) if total_questions else 0.0,
+        "current_section_id": current_section[0] if current_section else None,
+        "current_section_title": current_section[1] if current_section else None,
+        "last_activity": last_activity,
+        "sections_progress": sections_progress
+    }
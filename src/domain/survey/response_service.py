@@ -0,0 +1,232 @@
+"""
+Business logic for storing survey responses
+A response and all its answers are written in one transaction with multi-row
+INSERTs. Submissions are checked against the questions of the survey before
+anything is written, so a bulk ingest reports the bad submissions instead of
+failing as a whole. On PostgreSQL, large batches stream their answers with
+COPY into a temporary staging table and reach ResponseDetail with a single
+INSERT ... SELECT. Respondent progress counters and the materialized
+statistics are updated in the same transaction, and the cached analytics of
+the survey are dropped
+"""
+import io
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.orm import Session
+
+import config
+from ...infrastructure.database import models
+from . import analytics_service, progress_service, statistics_service
+from .survey_service import bulk_insert_returning_ids
+from schemas.survey_extensions import SurveyResponseCreate, SurveyResponseValue
+
+# Temporary table the COPY path loads answers into (dropped at commit)
+STAGING_TABLE = "response_detail_staging"
+
+# A Response row and the ResponseDetail rows of its answers (without ResponseID)
+PreparedResponse = Tuple[Dict[str, Any], List[Dict[str, Any]]]
+
+
+class ResponseValidationError(ValueError):
+    """Raised when a submission does not match the questions of the survey"""
+
+
+def answer_text(value: Any) -> Optional[str]:
+    """AnswerText of a response value: strings as is, anything else as JSON"""
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+def is_answered(text: Optional[str]) -> bool:
+    """Whether an AnswerText counts as answered, for progress and completion_percentage alike"""
+    return text is not None and text != ""
+
+
+def get_question_options(db: Session, survey_id: int) -> Optional[Dict[int, Set[int]]]:
+    """Answer option ids of every question of a survey, None if the survey does not exist"""
+    structure = progress_service.get_survey_structure(db, survey_id)
+    return None if structure is None else structure.options
+
+
+def _detail_row(answer: SurveyResponseValue, questions: Dict[int, Set[int]]) -> Dict[str, Any]:
+    options = questions.get(answer.question_id)
+    if options is None:
+        raise ResponseValidationError(f"Question {answer.question_id} is not part of this survey")
+    option_id = (answer.metadata or {}).get("option_id")
+    if option_id is not None:
+        try:
+            option_id = int(option_id)
+        except (TypeError, ValueError):
+            raise ResponseValidationError(f"Invalid option_id for question {answer.question_id}")
+        if option_id not in options:
+            raise ResponseValidationError(f"Option {option_id} does not belong to question {answer.question_id}")
+    return {
+        "QuestionID": answer.question_id,
+        "SelectedOptionID": option_id,
+        "AnswerText": answer_text(answer.value)
+    }
+
+
+def prepare_response(survey_id: int, submission: SurveyResponseCreate, questions: Dict[int, Set[int]],
+                     default_respondent_id: Optional[int] = None,
+                     default_respondent_key: Optional[str] = None) -> PreparedResponse:
+    """Rows storing submission; raises ResponseValidationError for unknown questions or options
+
+    Response.RespondentID is an integer: a numeric respondent_id is kept,
+    anything else is replaced with default_respondent_id (the submitting user).
+    RespondentKey keeps respondent_id as submitted, or default_respondent_key.
+    """
+    respondent_id = submission.respondent_id
+    response_row = {
+        "SurveyID": survey_id,
+        "RespondentID": int(respondent_id) if respondent_id and respondent_id.isdigit() else default_respondent_id,
+        "RespondentKey": respondent_id or default_respondent_key,
+        "SubmittedDate": datetime.utcnow()
+    }
+    return response_row, [_detail_row(answer, questions) for answer in submission.responses]
+
+
+def ingest_responses(db: Session, prepared: List[PreparedResponse],
+                     copy_threshold: Optional[int] = None) -> List[int]:
+    """Store prepared responses in one transaction; returns their ResponseIDs in order
+
+    Answers go through COPY when there are at least copy_threshold of them
+    (RESPONSE_COPY_THRESHOLD by default) and the database is PostgreSQL.
+    """
+    if not prepared:
+        return []
+    if copy_threshold is None:
+        copy_threshold = config.RESPONSE_COPY_THRESHOLD
+
+    try:
+        response_ids = bulk_insert_returning_ids(db, models.Response, [response for response, _ in prepared])
+        details = [rows for _, rows in prepared]
+        if db.get_bind().dialect.name == "postgresql" and sum(map(len, details)) >= copy_threshold:
+            _copy_details(db, response_ids, details)
+        else:
+            detail_rows = [
+                dict(row, ResponseID=response_id)
+                for response_id, rows in zip(response_ids, details)
+                for row in rows
+            ]
+            if detail_rows:
+                db.execute(insert(models.ResponseDetail.__table__), detail_rows)
+        _record_progress(db, prepared)
+        statistics_service.record_responses(db, prepared)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    for survey_id in {response["SurveyID"] for response, _ in prepared}:
+        analytics_service.invalidate_survey_analytics(survey_id)
+    return response_ids
+
+
+def _record_progress(db: Session, prepared: List[PreparedResponse]) -> None:
+    """Add the answered questions of prepared responses to their respondents' progress
+
+    Empty answers are stored but, as in completion_percentage, do not count
+    as answered.
+    """
+    answered: Dict[int, Dict[str, Set[int]]] = {}
+    for response, rows in prepared:
+        if response["RespondentKey"] is None:
+            continue
+        question_ids = answered.setdefault(response["SurveyID"], {}).setdefault(response["RespondentKey"], set())
+        question_ids.update(row["QuestionID"] for row in rows if is_answered(row["AnswerText"]))
+    for survey_id, by_respondent in answered.items():
+        progress_service.record_answers(db, survey_id, by_respondent)
+
+
+def update_response(db: Session, response: models.Response, answers: List[SurveyResponseValue],
+                    questions: Dict[int, Set[int]]) -> None:
+    """Merge answers into a stored response, replacing earlier answers to the same questions
+
+    Raises ResponseValidationError before writing anything when an answer
+    does not match the survey.
+    """
+    detail_rows = [dict(_detail_row(answer, questions), ResponseID=response.ResponseID) for answer in answers]
+    if not detail_rows:
+        return
+    replaced = {row["QuestionID"] for row in detail_rows}
+    try:
+        old_rows = [dict(row._mapping) for row in db.execute(
+            select(models.ResponseDetail.QuestionID, models.ResponseDetail.SelectedOptionID,
+                   models.ResponseDetail.AnswerText)
+            .where(models.ResponseDetail.ResponseID == response.ResponseID)
+        )]
+        db.execute(delete(models.ResponseDetail.__table__).where(
+            models.ResponseDetail.ResponseID == response.ResponseID,
+            models.ResponseDetail.QuestionID.in_(replaced)
+        ))
+        db.execute(insert(models.ResponseDetail.__table__), detail_rows)
+        if response.RespondentKey is not None:
+            progress_service.record_answers(db, response.SurveyID, {
+                response.RespondentKey: {row["QuestionID"] for row in detail_rows if is_answered(row["AnswerText"])}
+            }, unanswered={
+                response.RespondentKey: {row["QuestionID"] for row in detail_rows if not is_answered(row["AnswerText"])}
+            })
+        statistics_service.record_update(db, response.SurveyID, old_rows, [
+            row for row in old_rows if row["QuestionID"] not in replaced
+        ] + detail_rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    analytics_service.invalidate_survey_analytics(response.SurveyID)
+
+
+def get_answers(db: Session, response_id: int) -> List[models.ResponseDetail]:
+    """Stored answers of a response, in question order"""
+    return (
+        db.query(models.ResponseDetail)
+        .filter(models.ResponseDetail.ResponseID == response_id)
+        .order_by(models.ResponseDetail.QuestionID)
+        .all()
+    )
+
+
+def _copy_value(value: Any) -> str:
+    """value in COPY text format"""
+    if value is None:
+        return "\\N"
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def _copy_details(db: Session, response_ids: List[int], details: List[List[Dict[str, Any]]]) -> None:
+    """Write answers through COPY into the staging table, then into ResponseDetail"""
+    buffer = io.StringIO()
+    item = 0
+    for position, rows in enumerate(details, start=1):
+        for row in rows:
+            item += 1
+            buffer.write("\t".join(_copy_value(value) for value in (
+                item, position, row["QuestionID"], row["SelectedOptionID"], row["AnswerText"]
+            )) + "\n")
+    buffer.seek(0)
+
+    # Raw psycopg2 cursor on the session's connection, inside its transaction
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} (item integer, position integer, "
+            f"question_id integer, selected_option_id integer, answer_text text) ON COMMIT DROP"
+        )
+        cursor.copy_expert(f"COPY {STAGING_TABLE} FROM STDIN", buffer)
+    finally:
+        cursor.close()
+
+    db.execute(text(
+        f'INSERT INTO "{models.ResponseDetail.__tablename__}" '
+        f'("ResponseID", "QuestionID", "SelectedOptionID", "AnswerText") '
+        f"SELECT responses.id, staged.question_id, staged.selected_option_id, staged.answer_text "
+        f"FROM {STAGING_TABLE} AS staged "
+        f"JOIN unnest(CAST(:response_ids AS integer[])) WITH ORDINALITY AS responses(id, position) "
+        f"ON responses.position = staged.position "
+        f"ORDER BY staged.item"
+    ), {"response_ids": response_ids})
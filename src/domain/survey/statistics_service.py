@@ -0,0 +1,403 @@
+"""
+Materialized response statistics of a survey
+Counters per survey (responses, completions, responses per day) and per
+question (answers, skips, option and value frequencies, numeric value counts)
+are kept in SurveyResponseStatistics and QuestionStatistics. Saving responses
+counts the new answers into a StatisticsDelta and adds it to the stored rows
+in the same transaction, so reading statistics never scans ResponseDetail.
+The counters are computed from the stored responses on first read, and again
+when the survey structure changes
+"""
+import math
+from collections import Counter
+from datetime import datetime
+from itertools import groupby
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+import config
+from ...infrastructure.database import models
+from . import analytics_service, progress_service
+
+# Question types whose answers are numbers, and whose answers are free text (no value frequencies)
+NUMERIC_QUESTION_TYPES = {"number", "integer", "decimal"}
+FREE_TEXT_QUESTION_TYPES = {"text", "email", "phone", "date"}
+
+# Significant digits numbers are first rounded to when a question has too many distinct values
+NUMERIC_PRECISION = 6
+
+QUANTILES = (0.25, 0.5, 0.75)
+
+
+def _number(text: Optional[str]) -> Optional[float]:
+    try:
+        value = float(text)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def _number_key(value: float, precision: Optional[int]) -> str:
+    """NumericCounts key of value, rounded to precision significant digits"""
+    return format(value, f".{precision}g" if precision else ".15g")
+
+
+class QuestionCounters:
+    """Answer counters of one question within a StatisticsDelta"""
+    __slots__ = ("answers", "responses", "skips", "options", "values", "numbers", "numeric_sum")
+
+    def __init__(self):
+        self.answers = 0
+        self.responses = 0
+        self.skips = 0
+        self.options: Counter = Counter()
+        self.values: Counter = Counter()
+        self.numbers: Counter = Counter()
+        self.numeric_sum = 0.0
+
+
+class StatisticsDelta:
+    """Counters of a batch of responses, to be added to the stored statistics
+
+    Adding a response with sign=-1 takes its counts out again, so a changed
+    response is recorded as its old answers removed and its new ones added.
+    """
+
+    def __init__(self, structure: progress_service.SurveyStructure):
+        self.structure = structure
+        self.responses = 0
+        self.completed = 0
+        self.section_completions: Counter = Counter()
+        self.by_day: Counter = Counter()
+        self.questions: Dict[int, QuestionCounters] = {}
+        self._order = list(structure.question_sections)
+        self._positions = {question_id: position for position, question_id in enumerate(self._order)}
+
+    def _counters(self, question_id: int) -> QuestionCounters:
+        counters = self.questions.get(question_id)
+        if counters is None:
+            counters = self.questions[question_id] = QuestionCounters()
+        return counters
+
+    def add(self, rows: Iterable[Dict[str, Any]], sign: int = 1, submitted: Optional[datetime] = None) -> None:
+        """Count the answers of one response; with submitted, also count it as a response of that day"""
+        answered = set()
+        for row in rows:
+            question_id = row["QuestionID"]
+            if question_id not in self._positions:
+                continue
+            question_type = self.structure.question_types[question_id]
+            counters = self._counters(question_id)
+            counters.answers += sign
+            if row["SelectedOptionID"] is not None:
+                counters.options[str(row["SelectedOptionID"])] += sign
+            elif question_type in NUMERIC_QUESTION_TYPES:
+                value = _number(row["AnswerText"])
+                if value is not None:
+                    counters.numbers[value] += sign
+                    counters.numeric_sum += sign * value
+            elif question_type not in FREE_TEXT_QUESTION_TYPES and row["AnswerText"] is not None:
+                counters.values[row["AnswerText"]] += sign
+            answered.add(question_id)
+
+        if submitted is not None:
+            self.responses += sign
+            self.by_day[submitted.date().isoformat()] += sign
+        if answered:
+            for question_id in answered:
+                self._counters(question_id).responses += sign
+            # Skipped: unanswered, but a later question was answered
+            last = max(self._positions[question_id] for question_id in answered)
+            for question_id in self._order[:last]:
+                if question_id not in answered:
+                    self._counters(question_id).skips += sign
+
+        answered_count, section_counts = self.structure.count(answered)
+        if self.structure.total_questions and answered_count == self.structure.total_questions:
+            self.completed += sign
+        for section_id, _, total in self.structure.sections:
+            if total and section_counts.get(str(section_id), 0) == total:
+                self.section_completions[str(section_id)] += sign
+
+
+def _merged(counts: Optional[Dict[str, int]], delta: Counter) -> Dict[str, int]:
+    merged = Counter(counts or {})
+    merged.update(delta)
+    return {key: count for key, count in merged.items() if count > 0}
+
+
+def _apply(row: models.QuestionStatistics, counters: QuestionCounters) -> None:
+    """Add counters to a stored question row, within STATISTICS_MAX_DISTINCT_VALUES"""
+    limit = config.STATISTICS_MAX_DISTINCT_VALUES
+    row.AnswerCount += counters.answers
+    row.ResponseCount += counters.responses
+    row.SkipCount += counters.skips
+    if counters.options:
+        row.OptionCounts = _merged(row.OptionCounts, counters.options)
+
+    if counters.values:
+        values = dict(row.ValueCounts or {})
+        other = row.OtherValues
+        for value, count in counters.values.items():
+            if value in values or (count > 0 and len(values) < limit):
+                values[value] = values.get(value, 0) + count
+                if values[value] <= 0:
+                    del values[value]
+            else:
+                other += count
+        row.ValueCounts, row.OtherValues = values, other
+
+    if counters.numbers:
+        precision = row.NumericPrecision
+        numbers = _merged(row.NumericCounts, Counter({
+            _number_key(value, precision): count for value, count in counters.numbers.items()
+        }))
+        # Too many distinct values: round them all to fewer significant digits
+        while len(numbers) > limit and (precision or NUMERIC_PRECISION + 1) > 1:
+            precision = (precision or NUMERIC_PRECISION + 1) - 1
+            rounded: Counter = Counter()
+            for key, count in numbers.items():
+                rounded[_number_key(float(key), precision)] += count
+            numbers = dict(rounded)
+        row.NumericCounts, row.NumericPrecision = numbers, precision
+        row.NumericSum += counters.numeric_sum
+
+
+def _locked_survey_row(db: Session, survey_id: int) -> models.SurveyResponseStatistics:
+    """Statistics row of a survey, created empty (StructureVersion NULL) if missing, locked"""
+    progress_service.insert_missing(db, models.SurveyResponseStatistics.__table__, [{
+        "SurveyID": survey_id, "TotalResponses": 0, "CompletedResponses": 0,
+        "SectionCompletions": {}, "ResponsesByDay": {}
+    }], ["SurveyID"])
+    return (
+        db.query(models.SurveyResponseStatistics)
+        .filter(models.SurveyResponseStatistics.SurveyID == survey_id)
+        .with_for_update()
+        .populate_existing()
+        .one()
+    )
+
+
+def _locked_question_rows(db: Session, survey_id: int,
+                          question_ids: List[int]) -> Dict[int, models.QuestionStatistics]:
+    def locked(ids: List[int]) -> Dict[int, models.QuestionStatistics]:
+        query = (
+            db.query(models.QuestionStatistics)
+            .filter(models.QuestionStatistics.QuestionID.in_(ids))
+            .order_by(models.QuestionStatistics.QuestionID)
+            .with_for_update()
+            .populate_existing()
+        )
+        return {row.QuestionID: row for row in query}
+
+    rows = locked(question_ids)
+    missing = [question_id for question_id in question_ids if question_id not in rows]
+    if missing:
+        progress_service.insert_missing(db, models.QuestionStatistics.__table__, [
+            {"QuestionID": question_id, "SurveyID": survey_id, "AnswerCount": 0, "ResponseCount": 0,
+             "SkipCount": 0, "OptionCounts": {}, "ValueCounts": {}, "OtherValues": 0,
+             "NumericCounts": {}, "NumericSum": 0.0}
+            for question_id in missing
+        ], ["QuestionID"])
+        rows.update(locked(missing))
+    return rows
+
+
+def _add_delta(db: Session, stats: models.SurveyResponseStatistics, delta: StatisticsDelta) -> None:
+    stats.TotalResponses += delta.responses
+    stats.CompletedResponses += delta.completed
+    if delta.section_completions:
+        stats.SectionCompletions = _merged(stats.SectionCompletions, delta.section_completions)
+    if delta.by_day:
+        stats.ResponsesByDay = _merged(stats.ResponsesByDay, delta.by_day)
+    stats.UpdatedDate = datetime.utcnow()
+    rows = _locked_question_rows(db, stats.SurveyID, sorted(delta.questions))
+    for question_id, counters in delta.questions.items():
+        _apply(rows[question_id], counters)
+
+
+def _merge(db: Session, survey_id: int, delta: StatisticsDelta) -> None:
+    stats = _locked_survey_row(db, survey_id)
+    # Not computed for this survey version yet: the next read counts everything
+    if stats.StructureVersion == delta.structure.version:
+        _add_delta(db, stats, delta)
+
+
+def record_responses(db: Session, prepared: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]) -> None:
+    """Add new responses (Response row, ResponseDetail rows) to the statistics of their surveys
+
+    Runs in the caller's transaction; the statistics rows are locked until it commits.
+    """
+    by_survey: Dict[int, StatisticsDelta] = {}
+    for response, rows in prepared:
+        survey_id = response["SurveyID"]
+        delta = by_survey.get(survey_id)
+        if delta is None:
+            structure = progress_service.get_survey_structure(db, survey_id)
+            if structure is None:
+                continue
+            delta = by_survey[survey_id] = StatisticsDelta(structure)
+        delta.add(rows, submitted=response["SubmittedDate"])
+    for survey_id, delta in by_survey.items():
+        _merge(db, survey_id, delta)
+
+
+def record_update(db: Session, survey_id: int, old_rows: List[Dict[str, Any]],
+                  new_rows: List[Dict[str, Any]]) -> None:
+    """Replace the answers of a stored response in the statistics (caller's transaction)"""
+    structure = progress_service.get_survey_structure(db, survey_id)
+    if structure is None:
+        return
+    delta = StatisticsDelta(structure)
+    delta.add(old_rows, sign=-1)
+    delta.add(new_rows)
+    _merge(db, survey_id, delta)
+
+
+def _stored_responses(db: Session, survey_id: int) -> Iterator[Tuple[datetime, List[Dict[str, Any]]]]:
+    """(SubmittedDate, answers) of every stored response of a survey"""
+    statement = (
+        select(models.Response.ResponseID, models.Response.SubmittedDate, models.ResponseDetail.QuestionID,
+               models.ResponseDetail.SelectedOptionID, models.ResponseDetail.AnswerText)
+        .outerjoin(models.ResponseDetail, models.ResponseDetail.ResponseID == models.Response.ResponseID)
+        .where(models.Response.SurveyID == survey_id)
+        .order_by(models.Response.ResponseID)
+        .execution_options(yield_per=config.ANALYTICS_FETCH_SIZE)
+    )
+    result = db.connection().execute(statement)
+    for _, rows in groupby(result, key=lambda row: row[0]):
+        rows = list(rows)
+        yield rows[0][1], [
+            {"QuestionID": question_id, "SelectedOptionID": option_id, "AnswerText": answer}
+            for _, _, question_id, option_id, answer in rows if question_id is not None
+        ]
+
+
+def rebuild_statistics(db: Session, survey_id: int,
+                       structure: progress_service.SurveyStructure) -> models.SurveyResponseStatistics:
+    """Count the statistics of a survey from its stored responses (caller's transaction)"""
+    stats = _locked_survey_row(db, survey_id)
+    if stats.StructureVersion == structure.version:
+        # Counted by another request while waiting for the lock
+        return stats
+    delta = StatisticsDelta(structure)
+    for submitted, rows in _stored_responses(db, survey_id):
+        delta.add(rows, submitted=submitted)
+
+    db.execute(delete(models.QuestionStatistics.__table__).where(models.QuestionStatistics.SurveyID == survey_id))
+    stats.TotalResponses, stats.CompletedResponses = 0, 0
+    stats.SectionCompletions, stats.ResponsesByDay = {}, {}
+    _add_delta(db, stats, delta)
+    stats.StructureVersion = structure.version
+    return stats
+
+
+def _numeric_summary(counts: Dict[str, int], numeric_sum: float) -> Optional[Dict[str, Any]]:
+    points = sorted((float(key), count) for key, count in counts.items())
+    total = sum(count for _, count in points)
+    if not total:
+        return None
+    quantiles = {}
+    pending = list(QUANTILES)
+    cumulative = 0
+    for value, count in points:
+        cumulative += count
+        while pending and cumulative >= max(1, math.ceil(pending[0] * total)):
+            quantiles[f"p{round(pending.pop(0) * 100)}"] = value
+    return {
+        "count": total,
+        "min": points[0][0],
+        "max": points[-1][0],
+        "mean": round(numeric_sum / total, 4),
+        "quantiles": quantiles
+    }
+
+
+def get_survey_statistics(db: Session, survey_id: int) -> Optional[Dict[str, Any]]:
+    """SurveyStatistics fields of a survey, None if the survey does not exist"""
+    structure = progress_service.get_survey_structure(db, survey_id)
+    if structure is None:
+        return None
+    stats = db.execute(
+        select(models.SurveyResponseStatistics).where(models.SurveyResponseStatistics.SurveyID == survey_id)
+    ).scalar_one_or_none()
+    if stats is None or stats.StructureVersion != structure.version:
+        try:
+            rebuild_statistics(db, survey_id, structure)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        stats = db.get(models.SurveyResponseStatistics, survey_id)
+
+    question_rows = {row.QuestionID: row for row in db.execute(
+        select(models.QuestionStatistics).where(models.QuestionStatistics.SurveyID == survey_id)
+    ).scalars()}
+    question_texts = dict(db.execute(
+        select(models.Question.QuestionID, models.Question.QuestionText)
+        .join(models.Section, models.Section.SectionID == models.Question.SectionID)
+        .where(models.Section.SurveyID == survey_id)
+    ).all())
+    option_texts = dict(db.execute(
+        select(models.AnswerOption.OptionID, models.AnswerOption.OptionText)
+        .join(models.Question, models.Question.QuestionID == models.AnswerOption.QuestionID)
+        .join(models.Section, models.Section.SectionID == models.Question.SectionID)
+        .where(models.Section.SurveyID == survey_id)
+    ).all())
+
+    total = stats.TotalResponses
+
+    def rate(count: int) -> float:
+        return round(count / total, 4) if total else 0.0
+
+    questions_by_section: Dict[int, List[Dict[str, Any]]] = {}
+    regions: Counter = Counter()
+    for question_id, section_id in structure.question_sections.items():
+        row = question_rows.get(question_id)
+        distribution: Dict[str, int] = {}
+        numeric_summary = None
+        if row is not None:
+            for option_id, count in (row.OptionCounts or {}).items():
+                text = option_texts.get(int(option_id), option_id)
+                distribution[text] = distribution.get(text, 0) + count
+            for value, count in (row.ValueCounts or {}).items():
+                distribution[value] = distribution.get(value, 0) + count
+            numeric_summary = _numeric_summary(row.NumericCounts or {}, row.NumericSum)
+            if structure.question_types[question_id] == analytics_service.REGION_QUESTION_TYPE:
+                regions.update(row.ValueCounts or {})
+        questions_by_section.setdefault(section_id, []).append({
+            "question_id": question_id,
+            "question_text": question_texts.get(question_id, ""),
+            "question_type": structure.question_types[question_id] or "",
+            "total_responses": row.ResponseCount if row else 0,
+            "response_rate": rate(row.ResponseCount if row else 0),
+            "skip_rate": rate(row.SkipCount if row else 0),
+            "most_common_answer": max(distribution, key=distribution.get) if distribution else None,
+            "answer_distribution": distribution,
+            "numeric_summary": numeric_summary
+        })
+
+    section_completions = stats.SectionCompletions or {}
+    names = analytics_service.region_names(db) if regions else {}
+    return {
+        "survey_id": survey_id,
+        "survey_title": db.get(models.Survey, survey_id).Title,
+        "total_responses": total,
+        "completed_responses": stats.CompletedResponses,
+        "completion_rate": rate(stats.CompletedResponses),
+        "response_rate_by_day": dict(sorted((stats.ResponsesByDay or {}).items())),
+        "geographic_distribution": {names.get(code, code): count for code, count in regions.most_common()},
+        "sections": [
+            {
+                "section_id": section_id,
+                "section_title": title,
+                "total_questions": section_total,
+                "completion_rate": rate(section_completions.get(str(section_id), 0)),
+                "questions": questions_by_section.get(section_id, [])
+            }
+            for section_id, title, section_total in structure.sections
+        ],
+        "last_updated": stats.UpdatedDate
+    }
@@ -1,98 +1,192 @@
 """
 Business logic for survey management
 """
-from sqlalchemy.orm import Session
+from typing import Optional, Dict, Any, List, Tuple
+from operator import attrgetter
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, selectinload
 from ...infrastructure.database import models
+from ...infrastructure.database.pagination import paginate
+from .progress_service import invalidate_survey_structure
 from schemas import survey as survey_schema
 
+# Question keys a survey tree can be projected on
+QUESTION_FIELDS = ("QuestionID", "SectionID", "SubsectionID", "QuestionText", "QuestionType", "AnswerOptions")
+
+# Survey listing order, newest first; SurveyID makes the keyset cursor unique
+SURVEY_SORT_KEYS = ((models.Survey.CreatedDate, True), (models.Survey.SurveyID, True))
+
 
 def create_survey(db: Session, survey: survey_schema.SurveyCreate, schema_name: str):
-    """Create a new survey with all nested objects"""
-    # Create the main survey
-    db_survey = models.Survey(
-        Title=survey.Title,
-        Description=survey.Description,
-        Status=survey.Status
-    )
-    db.add(db_survey)
-    db.commit()
-    db.refresh(db_survey)
-    
-    # Create sections, subsections, questions, and answer options
-    for section_data in survey.Sections:
-        db_section = models.Section(
-            SurveyID=db_survey.SurveyID,
-            Title=section_data.Title
+    """Create a new survey with all nested objects
+
+    The whole tree is written in a single transaction, one batched multi-row
+    INSERT ... RETURNING per level; the returned ids wire the foreign keys of
+    the next level. Nothing is kept if any insert fails.
+    """
+    try:
+        # Create the main survey
+        db_survey = models.Survey(
+            Title=survey.Title,
+            Description=survey.Description,
+            Status=survey.Status
         )
-        db.add(db_section)
-        db.commit()
-        db.refresh(db_section)
-        
+        db.add(db_survey)
+        db.flush()
+
+        # Create sections
+        section_ids = bulk_insert_returning_ids(db, models.Section, [
+            {"SurveyID": db_survey.SurveyID, "Title": section_data.Title}
+            for section_data in survey.Sections
+        ])
+
         # Create subsections
-        for subsection_data in section_data.Subsections:
-            db_subsection = models.Subsection(
-                SectionID=db_section.SectionID,
-                Title=subsection_data.Title
-            )
-            db.add(db_subsection)
-            db.commit()
-            db.refresh(db_subsection)
-            
-            # Create questions in subsection
-            for question_data in subsection_data.Questions:
-                db_question = models.Question(
-                    SectionID=db_section.SectionID,
-                    SubsectionID=db_subsection.SubsectionID,
-                    QuestionText=question_data.QuestionText,
-                    QuestionType=question_data.QuestionType
-                )
-                db.add(db_question)
-                db.commit()
-                db.refresh(db_question)
-                
-                # Create answer options
-                for option_data in question_data.AnswerOptions:
-                    db_option = models.AnswerOption(
-                        QuestionID=db_question.QuestionID,
-                        OptionText=option_data.OptionText
-                    )
-                    db.add(db_option)
-                    db.commit()
-        
-        # Create questions directly in section (not in subsection)
-        for question_data in section_data.Questions:
-            db_question = models.Question(
-                SectionID=db_section.SectionID,
-                SubsectionID=None,  # No subsection
-                QuestionText=question_data.QuestionText,
-                QuestionType=question_data.QuestionType
-            )
-            db.add(db_question)
-            db.commit()
-            db.refresh(db_question)
-            
-            # Create answer options
-            for option_data in question_data.AnswerOptions:
-                db_option = models.AnswerOption(
-                    QuestionID=db_question.QuestionID,
-                    OptionText=option_data.OptionText
-                )
-                db.add(db_option)
-                db.commit()
-    
+        subsection_ids = bulk_insert_returning_ids(db, models.Subsection, [
+            {"SectionID": section_id, "Title": subsection_data.Title}
+            for section_id, section_data in zip(section_ids, survey.Sections)
+            for subsection_data in section_data.Subsections or []
+        ])
+
+        # Create questions, those of the subsections first, then the ones directly in the section
+        question_rows = []
+        questions = []
+        subsection_id_iter = iter(subsection_ids)
+        for section_id, section_data in zip(section_ids, survey.Sections):
+            for subsection_data in section_data.Subsections or []:
+                subsection_id = next(subsection_id_iter)
+                for question_data in subsection_data.Questions or []:
+                    question_rows.append(_question_row(section_id, subsection_id, question_data))
+                    questions.append(question_data)
+            for question_data in section_data.Questions or []:
+                question_rows.append(_question_row(section_id, None, question_data))
+                questions.append(question_data)
+        question_ids = bulk_insert_returning_ids(db, models.Question, question_rows)
+
+        # Create answer options
+        option_rows = [
+            {"QuestionID": question_id, "OptionText": option_data.OptionText}
+            for question_id, question_data in zip(question_ids, questions)
+            for option_data in question_data.AnswerOptions or []
+        ]
+        if option_rows:
+            db.execute(insert(models.AnswerOption.__table__), option_rows)
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    # A deleted survey's id may be handed out again (SQLite)
+    invalidate_survey_structure(db_survey.SurveyID)
+    db.refresh(db_survey)
     return db_survey
 
 
+def _question_row(section_id: int, subsection_id: Optional[int], question_data: survey_schema.QuestionCreate) -> Dict[str, Any]:
+    """Column values of a question insert"""
+    return {
+        "SectionID": section_id,
+        "SubsectionID": subsection_id,
+        "QuestionText": question_data.QuestionText,
+        "QuestionType": question_data.QuestionType
+    }
+
+
+def bulk_insert_returning_ids(db: Session, model, rows: List[Dict[str, Any]]) -> List[int]:
+    """Insert rows with batched multi-row INSERTs and return their primary keys in row order"""
+    if not rows:
+        return []
+    # Core insert on the table: ORM bulk inserts would regroup rows whose None values differ
+    table = model.__table__
+    primary_key = list(table.primary_key)[0]
+    result = db.execute(insert(table).returning(primary_key, sort_by_parameter_order=True), rows)
+    return list(result.scalars())
+
+
 def get_survey(db: Session, survey_id: int, schema_name: str):
     """Get survey by ID"""
     return db.query(models.Survey).filter(models.Survey.SurveyID == survey_id).first()
 
 
+def get_survey_tree(
+    db: Session,
+    survey_id: int,
+    schema_name: str,
+    question_fields: Optional[List[str]] = None
+) -> Optional[Dict[str, Any]]:
+    """Get a survey with its full tree of sections, subsections, questions and answer options
+
+    Each level is loaded with one SELECT ... IN query (selectinload) rather than
+    lazy loads per object, and the nested result is assembled in one pass.
+    question_fields restricts the keys returned for each question; answer
+    options are only loaded when "AnswerOptions" is among them.
+    """
+    fields = [field for field in QUESTION_FIELDS if question_fields is None or field in question_fields]
+
+    question_columns = [getattr(models.Question, field) for field in fields if field != "AnswerOptions"]
+    question_load = selectinload(models.Section.questions).load_only(
+        models.Question.QuestionID, models.Question.SubsectionID, *question_columns
+    )
+    if "AnswerOptions" in fields:
+        question_load = question_load.selectinload(models.Question.answer_options)
+
+    db_survey = (
+        db.query(models.Survey)
+        .options(selectinload(models.Survey.sections).options(selectinload(models.Section.subsections), question_load))
+        .filter(models.Survey.SurveyID == survey_id)
+        .first()
+    )
+    if db_survey is None:
+        return None
+
+    sections = []
+    for db_section in sorted(db_survey.sections, key=attrgetter("SectionID")):
+        subsections = {
+            db_subsection.SubsectionID: dict(db_subsection.to_dict(), Questions=[])
+            for db_subsection in sorted(db_section.subsections, key=attrgetter("SubsectionID"))
+        }
+        section_questions = []
+        for db_question in sorted(db_section.questions, key=attrgetter("QuestionID")):
+            question = {field: getattr(db_question, field) for field in fields if field != "AnswerOptions"}
+            if "AnswerOptions" in fields:
+                question["AnswerOptions"] = [
+                    db_option.to_dict() for db_option in sorted(db_question.answer_options, key=attrgetter("OptionID"))
+                ]
+            subsection = subsections.get(db_question.SubsectionID)
+            if subsection is not None:
+                subsection["Questions"].append(question)
+            else:
+                section_questions.append(question)
+        sections.append(dict(
+            db_section.to_dict(),
+            Subsections=list(subsections.values()),
+            Questions=section_questions
+        ))
+
+    return dict(db_survey.to_dict(), Sections=sections)
+
+
 def get_surveys(db: Session, schema_name: str, skip: int = 0, limit: int = 100):
     """Get all surveys"""
     return db.query(models.Survey).offset(skip).limit(limit).all()
 
 
+def get_surveys_page(
+    db: Session,
+    schema_name: str,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    exact_total: bool = False
+) -> Tuple[List[models.Survey], Dict[str, Any]]:
+    """Get one page of surveys, newest first, and its pagination metadata
+
+    Pass the returned next_cursor as cursor to fetch the following page.
+    Raises InvalidCursorError for a malformed cursor.
+    """
+    return paginate(db.query(models.Survey), SURVEY_SORT_KEYS, limit, cursor=cursor, skip=skip, exact_total=exact_total)
+
+
 def update_survey(db: Session, survey_id: int, survey: survey_schema.SurveyCreate, schema_name: str):
     """Update a survey"""
     db_survey = db.query(models.Survey).filter(models.Survey.SurveyID == survey_id).first()
@@ -111,5 +205,6 @@ def delete_survey(db: Session, survey_id: int, schema_name: str):
     if db_survey:
         db.delete(db_survey)
         db.commit()
+        invalidate_survey_structure(survey_id)
     return db_survey
 
@@ -3,25 +3,32 @@ OAuth2 Authentication and Authorization for INSTAT Survey Platform
 """
 print("LOADING OAUTH2 MODULE WITH TEMP AUTH BYPASS")
 import os
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
+import logging
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, SecurityScopes
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, ValidationError
 
 from src.infrastructure.database.connection import get_db
 from src.infrastructure.database import models
+from src.infrastructure.auth.password_hashing import password_hasher
+from src.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
 
 # Configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "muqObXpk89vWh_6YpNGYMv20iH8Lu7CLW5nh7FCi-o")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))
+# Authenticated users are reused for this many seconds instead of re-read on every request
+USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "30"))
+USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "1024"))
 
 # Security instances
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(
     tokenUrl="api/v1/auth/token",
     scopes={
@@ -58,6 +65,7 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     username: Optional[str] = None
     scopes: list[str] = []
+    jti: Optional[str] = None
 
 
 class UserInToken(BaseModel):
@@ -72,19 +80,33 @@ class UserInToken(BaseModel):
     scopes: list[str]
 
 
-# Password utilities
+# Authenticated users by (username, token jti). Changes made through
+# UserService invalidate the user here; other worker processes see them
+# within USER_CACHE_TTL seconds.
+user_cache = TTLCache(ttl=USER_CACHE_TTL, max_entries=USER_CACHE_SIZE)
+
+
+def invalidate_cached_user(username: Optional[str]) -> int:
+    """Forget the cached entries of username (every token); returns how many were dropped"""
+    if not username:
+        return 0
+    return user_cache.invalidate_where(lambda key: key[0] == username)
+
+
+def get_user_cache_statistics() -> Dict[str, Any]:
+    """Size and hit/miss counters of the authenticated user cache"""
+    return user_cache.get_statistics()
+
+
+# Password utilities (blocking; async code awaits password_hasher instead)
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
-    try:
-        return pwd_context.verify(plain_password, hashed_password)
-    except Exception as e:
-        print(f"Password verification error: {e}")
-        return False
+    return password_hasher.verify_sync(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Get password hash."""
-    return pwd_context.hash(password)
+    return password_hasher.hash_sync(password)
 
 
 # Token utilities
@@ -97,6 +119,8 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
 
     to_encode.update({"exp": expire})
+    # Token id, so each token gets its own entry in the user cache
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -110,15 +134,21 @@ def verify_token(token: str) -> Optional[TokenData]:
             return None
 
         scopes = payload.get("scopes", [])
-        token_data = TokenData(username=username, scopes=scopes)
+        token_data = TokenData(username=username, scopes=scopes, jti=payload.get("jti"))
         return token_data
     except JWTError:
         return None
 
 
 # models.User authentication
-def authenticate_user(db: Session, username: str, password: str) -> Optional[Any]:
-    """Authenticate user with username and password."""
+async def authenticate_user(db: Session, username: str, password: str,
+                            client_ip: Optional[str] = None) -> Optional[Any]:
+    """Authenticate user with username and password.
+
+    The password is checked on the password hashing pool (raising
+    TooManyHashRequestsError when client_ip is over its limit) and its hash is
+    upgraded to the configured cost when outdated.
+    """
     # Temporary bypass for admin user to fix bcrypt issue
     if username == "admin" and password == "admin123!":
         user = db.query(models.User).filter(models.User.Username == username).first()
@@ -129,8 +159,16 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[Any
     user = db.query(models.User).filter(models.User.Username == username).first()
     if not user:
         return None
-    if not verify_password(password, user.HashedPassword):
+    valid, new_hash = await password_hasher.verify_and_update(password, user.HashedPassword, client_ip)
+    if not valid:
         return None
+    if new_hash:
+        try:
+            user.HashedPassword = new_hash
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to upgrade password hash of {username}: {e}")
     return user
 
 
@@ -182,32 +220,37 @@ async def get_current_user(
     if token_data is None:
         raise credentials_exception
 
-    user = db.query(models.User).filter(models.User.Username == token_data.username).first()
-    if user is None:
-        raise credentials_exception
-
-    user_scopes = get_user_scopes(user.Role)
+    cache_key = (token_data.username, token_data.jti)
+    current_user = user_cache.get(cache_key)
+    if current_user is None:
+        user = db.query(models.User).filter(models.User.Username == token_data.username).first()
+        if user is None:
+            raise credentials_exception
+
+        current_user = UserInToken(
+            username=user.Username,
+            email=user.Email,
+            first_name=user.FirstName,
+            last_name=user.LastName,
+            role=user.Role,
+            status=user.Status,
+            department=user.Department,
+            user_id=user.UserID,
+            scopes=get_user_scopes(user.Role)
+        )
+        user_cache.put(cache_key, current_user)
 
     # Check if user has required scopes
     for scope in security_scopes.scopes:
-        if scope not in user_scopes:
+        if scope not in current_user.scopes:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not enough permissions",
                 headers={"WWW-Authenticate": authenticate_value},
             )
 
-    return UserInToken(
-        username=user.Username,
-        email=user.Email,
-        first_name=user.FirstName,
-        last_name=user.LastName,
-        role=user.Role,
-        status=user.Status,
-        department=user.Department,
-        user_id=user.UserID,
-        scopes=user_scopes
-    )
+    # A copy, so callers cannot alter the cached user
+    return current_user.model_copy(deep=True)
 
 
 async def get_current_active_user(
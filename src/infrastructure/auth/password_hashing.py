@@ -0,0 +1,157 @@
+"""
+Password hashing off the event loop
+bcrypt hashing and verification cost a few hundred milliseconds of CPU each;
+async callers run them on a dedicated, size-limited thread pool, with a cap on
+the operations in flight per client IP. Hashes made with a cost other than the
+configured one are replaced after a successful verification
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+import logging
+
+import bcrypt
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# bcrypt only uses the first 72 bytes of a password (passlib truncated the same way)
+BCRYPT_MAX_PASSWORD_BYTES = 72
+
+
+class TooManyHashRequestsError(Exception):
+    """Raised when a client already has the maximum number of password operations in flight"""
+
+
+def _secret(password: str) -> bytes:
+    return password.encode("utf-8")[:BCRYPT_MAX_PASSWORD_BYTES]
+
+
+def hash_cost(hashed_password: str) -> Optional[int]:
+    """Cost (log2 rounds) of a bcrypt hash such as $2b$12$..., None if unreadable"""
+    try:
+        return int(hashed_password.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """Hash and verify bcrypt passwords on a bounded thread pool"""
+
+    def __init__(self, rounds: int = 12, max_workers: int = 4, per_ip_limit: int = 4):
+        self.rounds = rounds
+        self.max_workers = max_workers
+        self.per_ip_limit = per_ip_limit
+
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, int] = {}
+        self._stats = {"hashed": 0, "verified": 0, "rehashed": 0, "rejected": 0}
+
+    # Synchronous operations (run on the pool, or directly by scripts)
+
+    def hash_sync(self, password: str) -> str:
+        """bcrypt hash of password at the configured cost"""
+        hashed = bcrypt.hashpw(_secret(password), bcrypt.gensalt(rounds=self.rounds)).decode("ascii")
+        self._count("hashed")
+        return hashed
+
+    def verify_sync(self, password: str, hashed_password: str) -> bool:
+        """Whether password matches hashed_password (False for a malformed hash)"""
+        self._count("verified")
+        try:
+            return bcrypt.checkpw(_secret(password), hashed_password.encode("ascii"))
+        except (AttributeError, UnicodeEncodeError, ValueError) as e:
+            logger.warning(f"Password verification error: {e}")
+            return False
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """Whether hashed_password was made with a cost other than the configured one"""
+        return hash_cost(hashed_password) != self.rounds
+
+    def verify_and_update_sync(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """(valid, replacement hash at the configured cost or None when current)"""
+        if not self.verify_sync(password, hashed_password):
+            return False, None
+        if not self.needs_rehash(hashed_password):
+            return True, None
+        self._count("rehashed")
+        return True, self.hash_sync(password)
+
+    # Asynchronous operations
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hash")
+            return self._pool
+
+    def _acquire(self, client_ip: Optional[str]) -> None:
+        if client_ip is None:
+            return
+        with self._lock:
+            in_flight = self._in_flight.get(client_ip, 0)
+            if in_flight >= self.per_ip_limit:
+                self._stats["rejected"] += 1
+                raise TooManyHashRequestsError(
+                    f"Too many concurrent password operations from {client_ip}, retry later"
+                )
+            self._in_flight[client_ip] = in_flight + 1
+
+    def _release(self, client_ip: Optional[str]) -> None:
+        if client_ip is None:
+            return
+        with self._lock:
+            remaining = self._in_flight.get(client_ip, 1) - 1
+            if remaining > 0:
+                self._in_flight[client_ip] = remaining
+            else:
+                self._in_flight.pop(client_ip, None)
+
+    async def _run(self, client_ip: Optional[str], func: Callable[..., Any], *args: Any) -> Any:
+        """Run func on the pool; raises TooManyHashRequestsError when client_ip is over its limit"""
+        self._acquire(client_ip)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_pool(), func, *args)
+        finally:
+            self._release(client_ip)
+
+    async def hash(self, password: str, client_ip: Optional[str] = None) -> str:
+        """bcrypt hash of password, computed on the pool"""
+        return await self._run(client_ip, self.hash_sync, password)
+
+    async def verify(self, password: str, hashed_password: str, client_ip: Optional[str] = None) -> bool:
+        """Verify password against hashed_password on the pool"""
+        return await self._run(client_ip, self.verify_sync, password, hashed_password)
+
+    async def verify_and_update(self, password: str, hashed_password: str,
+                                client_ip: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+        """Verify on the pool; a valid password with an outdated hash also gets a new hash"""
+        return await self._run(client_ip, self.verify_and_update_sync, password, hashed_password)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Operation counters and the clients with operations in flight"""
+        with self._lock:
+            return dict(self._stats, rounds=self.rounds, max_workers=self.max_workers,
+                        clients_in_flight=len(self._in_flight))
+
+    def shutdown(self) -> None:
+        """Stop the pool threads once their current operation is done"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+# Global password hasher instance
+password_hasher = PasswordHasher(
+    rounds=config.BCRYPT_ROUNDS,
+    max_workers=config.PASSWORD_HASH_WORKERS,
+    per_ip_limit=config.PASSWORD_HASH_PER_IP_LIMIT
+)
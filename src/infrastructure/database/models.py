@@ -2,7 +2,7 @@
 SQLAlchemy models for INSTAT Survey Platform
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, JSON, Float
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, Boolean, JSON, Float, Index, UniqueConstraint, text
 from sqlalchemy.orm import relationship
 from .base import Base
 
@@ -147,6 +147,7 @@ class Response(Base):
     ResponseID = Column(Integer, primary_key=True, index=True)
     SurveyID = Column(Integer, ForeignKey("Survey.SurveyID", ondelete="CASCADE"))
     RespondentID = Column(Integer)
+    RespondentKey = Column(String(100))  # Respondent id as submitted (username by default)
     SubmittedDate = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -158,6 +159,7 @@ class Response(Base):
             'ResponseID': self.ResponseID,
             'SurveyID': self.SurveyID,
             'RespondentID': self.RespondentID,
+            'RespondentKey': self.RespondentKey,
             'SubmittedDate': self.SubmittedDate
         }
 
@@ -187,6 +189,85 @@ class ResponseDetail(Base):
         }
 
 
+class RespondentProgress(Base):
+    """Answered questions per survey and respondent, maintained as responses are saved"""
+    __tablename__ = "RespondentProgress"
+    __table_args__ = (
+        UniqueConstraint('SurveyID', 'RespondentKey', name='uq_RespondentProgress_Survey_Respondent'),
+    )
+    
+    ProgressID = Column(Integer, primary_key=True)
+    SurveyID = Column(Integer, ForeignKey("Survey.SurveyID", ondelete="CASCADE"), nullable=False)
+    RespondentKey = Column(String(100), nullable=False)
+    AnsweredQuestionIDs = Column(JSON, nullable=False, default=list)
+    AnsweredQuestions = Column(Integer, nullable=False, default=0)
+    SectionCounts = Column(JSON, nullable=False, default=dict)  # {"<SectionID>": answered questions}
+    StructureVersion = Column(String(64))  # Survey version the counters were computed for
+    LastActivity = Column(DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'ProgressID': self.ProgressID,
+            'SurveyID': self.SurveyID,
+            'RespondentKey': self.RespondentKey,
+            'AnsweredQuestions': self.AnsweredQuestions,
+            'SectionCounts': self.SectionCounts,
+            'LastActivity': self.LastActivity
+        }
+
+
+class SurveyResponseStatistics(Base):
+    """Response counters of a survey, maintained as responses are saved"""
+    __tablename__ = "SurveyResponseStatistics"
+    
+    SurveyID = Column(Integer, ForeignKey("Survey.SurveyID", ondelete="CASCADE"), primary_key=True)
+    TotalResponses = Column(Integer, nullable=False, default=0)
+    CompletedResponses = Column(Integer, nullable=False, default=0)
+    SectionCompletions = Column(JSON, nullable=False, default=dict)  # {"<SectionID>": responses completing it}
+    ResponsesByDay = Column(JSON, nullable=False, default=dict)  # {"YYYY-MM-DD": responses}
+    StructureVersion = Column(String(64))  # Survey version counted for, NULL until first computed
+    UpdatedDate = Column(DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'SurveyID': self.SurveyID,
+            'TotalResponses': self.TotalResponses,
+            'CompletedResponses': self.CompletedResponses,
+            'SectionCompletions': self.SectionCompletions,
+            'ResponsesByDay': self.ResponsesByDay,
+            'UpdatedDate': self.UpdatedDate
+        }
+
+
+class QuestionStatistics(Base):
+    """Answer counters of a question, maintained as responses are saved"""
+    __tablename__ = "QuestionStatistics"
+    
+    QuestionID = Column(Integer, ForeignKey("Question.QuestionID", ondelete="CASCADE"), primary_key=True)
+    SurveyID = Column(Integer, ForeignKey("Survey.SurveyID", ondelete="CASCADE"), nullable=False, index=True)
+    AnswerCount = Column(Integer, nullable=False, default=0)
+    ResponseCount = Column(Integer, nullable=False, default=0)  # Responses answering the question
+    SkipCount = Column(Integer, nullable=False, default=0)  # Responses answering a later question only
+    OptionCounts = Column(JSON, nullable=False, default=dict)  # {"<OptionID>": answers}
+    ValueCounts = Column(JSON, nullable=False, default=dict)  # {answer text: answers}, capped
+    OtherValues = Column(Integer, nullable=False, default=0)  # Answers beyond the ValueCounts cap
+    NumericCounts = Column(JSON, nullable=False, default=dict)  # {"<number>": answers}
+    NumericSum = Column(Float, nullable=False, default=0.0)
+    NumericPrecision = Column(Integer)  # Significant digits NumericCounts keys are rounded to, NULL if exact
+    
+    def to_dict(self):
+        return {
+            'QuestionID': self.QuestionID,
+            'SurveyID': self.SurveyID,
+            'AnswerCount': self.AnswerCount,
+            'ResponseCount': self.ResponseCount,
+            'SkipCount': self.SkipCount,
+            'OptionCounts': self.OptionCounts,
+            'ValueCounts': self.ValueCounts,
+            'NumericCounts': self.NumericCounts
+        }
+
+
 # Workflow management model
 class WorkflowAction(Base):
     """Workflow action model for tracking survey state changes"""
@@ -369,6 +450,12 @@ class SurveyTemplate(Base):
     Sections = Column(JSON)
     DefaultQuestions = Column(JSON)
     
+    # Structure statistics, computed from Sections on create/update
+    SectionCount = Column(Integer, default=0)
+    SubsectionCount = Column(Integer, default=0)
+    QuestionCount = Column(Integer, default=0, index=True)
+    ComplexityLevel = Column(String(10), default="Low", index=True)
+    
     # Usage tracking
     UsageCount = Column(Integer, default=0)
     LastUsed = Column(DateTime)
@@ -391,6 +478,10 @@ class SurveyTemplate(Base):
             'ApprovalDate': self.ApprovalDate,
             'Sections': self.Sections,
             'DefaultQuestions': self.DefaultQuestions,
+            'SectionCount': self.SectionCount,
+            'SubsectionCount': self.SubsectionCount,
+            'QuestionCount': self.QuestionCount,
+            'ComplexityLevel': self.ComplexityLevel,
             'UsageCount': self.UsageCount,
             'LastUsed': self.LastUsed,
             'UsageGuidelines': self.UsageGuidelines,
@@ -509,20 +600,73 @@ class DataExport(Base):
     
     ExportID = Column(Integer, primary_key=True, index=True)
     SurveyID = Column(Integer, nullable=False)
-    ExportFormat = Column(String(20), nullable=False)  # excel, csv, json, xml, pdf
+    ExportFormat = Column(String(20), nullable=False)  # excel, csv, json, ndjson, xml, pdf
+    ExportType = Column(String(50), nullable=False, default="raw_data")  # raw_data, analysis, report, dashboard
+    ExportConfig = Column(JSON)
+    IsScheduled = Column(Boolean, default=False)
+    ScheduleFrequency = Column(String(50))
+    NextExport = Column(DateTime)
+    DeliveryMethod = Column(String(50))
+    Recipients = Column(JSON)
+    CreatedBy = Column(String(100))
+    CreatedDate = Column(DateTime, default=datetime.utcnow)
+    LastExported = Column(DateTime)
+    ExportCount = Column(Integer, default=0)
+
+    # Export job tracking (background export engine); Status is NULL for saved configurations
+    JobID = Column(String(36), unique=True, index=True)
+    Status = Column(String(20))  # queued, processing, completed, failed
+    FileName = Column(String(255))
+    FileSize = Column(BigInteger)
+    RowCount = Column(Integer)  # Responses written so far
+    ErrorMessage = Column(Text)
+    CompletedDate = Column(DateTime)
+    DownloadCount = Column(Integer, default=0)
+    UpdatedAt = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def to_dict(self):
         return {
             'ExportID': self.ExportID,
             'SurveyID': self.SurveyID,
-            'ExportFormat': self.ExportFormat
+            'ExportFormat': self.ExportFormat,
+            'ExportType': self.ExportType,
+            'ExportConfig': self.ExportConfig,
+            'IsScheduled': self.IsScheduled,
+            'ScheduleFrequency': self.ScheduleFrequency,
+            'NextExport': self.NextExport,
+            'DeliveryMethod': self.DeliveryMethod,
+            'Recipients': self.Recipients,
+            'CreatedBy': self.CreatedBy,
+            'CreatedDate': self.CreatedDate,
+            'LastExported': self.LastExported,
+            'ExportCount': self.ExportCount,
+            'JobID': self.JobID,
+            'Status': self.Status,
+            'FileName': self.FileName,
+            'FileSize': self.FileSize,
+            'RowCount': self.RowCount,
+            'ErrorMessage': self.ErrorMessage,
+            'CompletedDate': self.CompletedDate,
+            'DownloadCount': self.DownloadCount,
+            'UpdatedAt': self.UpdatedAt
         }
 
 
 class AuditLog(Base):
     """Audit log model for tracking user actions"""
     __tablename__ = "AuditLog"
-    __table_args__ = {'schema': 'public'}
+    __table_args__ = (
+        # Listing filters, each followed by the (Timestamp, LogID) listing order
+        Index('ix_public_AuditLog_Timestamp_LogID', 'Timestamp', 'LogID'),
+        Index('ix_public_AuditLog_UserID_Timestamp', 'UserID', 'Timestamp', 'LogID'),
+        Index('ix_public_AuditLog_Action_Timestamp', 'Action', 'Timestamp', 'LogID'),
+        Index('ix_public_AuditLog_Resource_Timestamp', 'Resource', 'Timestamp', 'LogID'),
+        Index('ix_public_AuditLog_Failed_Timestamp', 'Timestamp', 'LogID',
+              postgresql_where=text('"Success" = false'), sqlite_where=text('"Success" = 0')),
+        # Compact index for time range scans (rollups, retention) over the append-only log
+        Index('ix_public_AuditLog_Timestamp_brin', 'Timestamp', postgresql_using='brin'),
+        {'schema': 'public'}
+    )
     
     LogID = Column(Integer, primary_key=True, index=True)
     UserID = Column(Integer)
@@ -554,6 +698,36 @@ class AuditLog(Base):
         }
 
 
+class AuditLogRollup(Base):
+    """Audit action counts per hour or day, maintained from AuditLog by the rollup job"""
+    __tablename__ = "AuditLogRollup"
+    __table_args__ = (
+        UniqueConstraint('Granularity', 'BucketStart', 'Action', 'Resource', 'Success',
+                         name='uq_AuditLogRollup_bucket'),
+        Index('ix_public_AuditLogRollup_Granularity_BucketStart', 'Granularity', 'BucketStart'),
+        {'schema': 'public'}
+    )
+    
+    RollupID = Column(Integer, primary_key=True)
+    Granularity = Column(String(10), nullable=False)  # hour, day
+    BucketStart = Column(DateTime, nullable=False)
+    Action = Column(String(100), nullable=False)
+    Resource = Column(String(100))
+    Success = Column(Boolean)
+    Count = Column(Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'RollupID': self.RollupID,
+            'Granularity': self.Granularity,
+            'BucketStart': self.BucketStart,
+            'Action': self.Action,
+            'Resource': self.Resource,
+            'Success': self.Success,
+            'Count': self.Count
+        }
+
+
 class ParsingResult(Base):
     """Parsing result model for file upload tracking"""
     __tablename__ = "ParsingResult"
@@ -566,6 +740,18 @@ class ParsingResult(Base):
     Success = Column(Boolean, default=True)
     ErrorMessage = Column(Text)
     Timestamp = Column(DateTime, default=datetime.utcnow)
+
+    # Upload job tracking (asynchronous upload pipeline)
+    JobID = Column(String(36), unique=True, index=True)
+    Status = Column(String(20), default="completed")  # queued, running, completed, failed
+    CurrentStage = Column(String(50))
+    Stages = Column(JSON)  # One entry per pipeline stage with its outcome and duration
+    FileHash = Column(String(64))
+    SchemaName = Column(String(50))
+    CreatedBy = Column(String(100))
+    SurveyID = Column(Integer)
+    TemplateID = Column(Integer)
+    UpdatedAt = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def to_dict(self):
         return {
@@ -575,7 +761,17 @@ class ParsingResult(Base):
             'ValidationIssues': self.ValidationIssues,
             'Success': self.Success,
             'ErrorMessage': self.ErrorMessage,
-            'Timestamp': self.Timestamp
+            'Timestamp': self.Timestamp,
+            'JobID': self.JobID,
+            'Status': self.Status,
+            'CurrentStage': self.CurrentStage,
+            'Stages': self.Stages,
+            'FileHash': self.FileHash,
+            'SchemaName': self.SchemaName,
+            'CreatedBy': self.CreatedBy,
+            'SurveyID': self.SurveyID,
+            'TemplateID': self.TemplateID,
+            'UpdatedAt': self.UpdatedAt
         }
 
 
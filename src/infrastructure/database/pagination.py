@@ -0,0 +1,202 @@
+"""
+Keyset pagination and row counting for list endpoints
+Pages are fetched with a WHERE clause on the sort keys of the last row seen
+(an opaque cursor) instead of OFFSET, so deep pages cost the same as the first
+one. NULL sort keys order last in both directions. Totals are exact counts
+cached for a short time, or the planner's pg_class.reltuples estimate for large
+unfiltered tables
+"""
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, false, or_, text, tuple_
+from sqlalchemy.orm import Query
+
+import config
+from src.utils.ttl_cache import TTLCache
+
+# (column, descending) pairs; the last key must be unique, e.g. the primary key
+SortKeys = Sequence[Tuple[Any, bool]]
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded or belongs to another listing"""
+
+
+# Exact counts keyed by the counted SQL and its parameters
+count_cache = TTLCache(ttl=config.PAGINATION_COUNT_CACHE_TTL)
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+    return value
+
+
+def _key_names(keys: SortKeys) -> List[str]:
+    return [f"{column.key}:{'d' if descending else 'a'}" for column, descending in keys]
+
+
+def encode_cursor(keys: SortKeys, row: Any) -> str:
+    """Opaque cursor pointing just after row in the given ordering"""
+    payload = {
+        "k": _key_names(keys),
+        "v": [_encode_value(getattr(row, column.key)) for column, _ in keys]
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(keys: SortKeys, cursor: str) -> List[Any]:
+    """Sort key values stored in a cursor made by encode_cursor for the same keys"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        names, values = payload["k"], payload["v"]
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidCursorError(f"Invalid pagination cursor: {e}")
+    if names != _key_names(keys) or len(values) != len(keys):
+        raise InvalidCursorError("Pagination cursor does not match this listing")
+    try:
+        return [_decode_value(value) for value in values]
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid pagination cursor: {e}")
+
+
+def _nullable(column: Any) -> bool:
+    return getattr(column, "nullable", True)
+
+
+def order_by_keys(keys: SortKeys) -> List[Any]:
+    """ORDER BY clauses of the (column, descending) ordering, NULLs last"""
+    clauses = []
+    for column, descending in keys:
+        clause = column.desc() if descending else column.asc()
+        clauses.append(clause.nulls_last() if _nullable(column) else clause)
+    return clauses
+
+
+def _equal(column: Any, value: Any):
+    return column.is_(None) if value is None else column == value
+
+
+def _after(keys: SortKeys, values: List[Any]):
+    """Rows strictly after values in the (column, descending) ordering"""
+    columns = [column for column, _ in keys]
+    directions = {descending for _, descending in keys}
+    if len(directions) == 1 and not any(_nullable(column) for column in columns):
+        # Same direction on every key: a row comparison the index can seek on
+        if directions.pop():
+            return tuple_(*columns) < tuple_(*values)
+        return tuple_(*columns) > tuple_(*values)
+
+    clauses = []
+    for i, (column, descending) in enumerate(keys):
+        if values[i] is None:
+            # NULLs sort last: no row is after a NULL on this key
+            continue
+        after = column < values[i] if descending else column > values[i]
+        if _nullable(column):
+            after = or_(after, column.is_(None))
+        equal_prefix = [_equal(columns[j], values[j]) for j in range(i)]
+        clauses.append(and_(*equal_prefix, after))
+    return or_(*clauses) if clauses else false()
+
+
+def count_rows(query: Query, exact: bool = False) -> Tuple[int, bool]:
+    """Row count of a query as (total, is_exact)
+
+    Unless exact is requested, an unfiltered PostgreSQL table larger than
+    PAGINATION_APPROXIMATE_COUNT_THRESHOLD rows is counted from the planner
+    statistics (pg_class.reltuples); other counts are exact and cached for
+    PAGINATION_COUNT_CACHE_TTL seconds. A count served from that cache may be
+    stale and is reported as not exact.
+    """
+    query = query.order_by(None)
+    if not exact and query.whereclause is None and query.session.get_bind().dialect.name == "postgresql":
+        estimate = _estimated_table_rows(query)
+        if estimate is not None and estimate >= config.PAGINATION_APPROXIMATE_COUNT_THRESHOLD:
+            return estimate, False
+
+    statement = query.statement.compile(query.session.get_bind())
+    key = f"{statement}|{sorted(statement.params.items())!r}"
+    if not exact:
+        cached = count_cache.get(key)
+        if cached is not None:
+            return cached, False
+
+    total = query.count()
+    count_cache.put(key, total)
+    return total, True
+
+
+def _estimated_table_rows(query: Query) -> Optional[int]:
+    """Planner row estimate of the table a single-entity query selects from"""
+    descriptions = query.column_descriptions
+    entity = descriptions[0].get("entity") if len(descriptions) == 1 else None
+    table = getattr(entity, "__table__", None)
+    if table is None:
+        return None
+    name = f'"{table.schema}"."{table.name}"' if table.schema else f'"{table.name}"'
+    reltuples = query.session.execute(
+        text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:name)"), {"name": name}
+    ).scalar()
+    # -1 (or NULL) until the table has been vacuumed or analyzed
+    if reltuples is None or reltuples < 0:
+        return None
+    return int(reltuples)
+
+
+def paginate(
+        query: Query,
+        keys: SortKeys,
+        limit: int,
+        cursor: Optional[str] = None,
+        skip: int = 0,
+        exact_total: bool = False
+) -> Tuple[List[Any], Dict[str, Any]]:
+    """Fetch one page of a query ordered by keys
+
+    With a cursor the page starts right after the row it points to (keyset
+    pagination, skip is ignored); without one it starts at offset skip. The
+    returned pagination metadata carries the next_cursor to continue with.
+    Raises InvalidCursorError for a malformed or foreign cursor.
+    """
+    total, total_is_exact = count_rows(query, exact=exact_total)
+
+    ordered = query.order_by(*order_by_keys(keys))
+    if cursor:
+        ordered = ordered.filter(_after(keys, decode_cursor(keys, cursor)))
+        skip = 0
+    elif skip:
+        ordered = ordered.offset(skip)
+
+    rows = ordered.limit(limit + 1).all()
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+
+    pagination = {
+        "total": total,
+        "total_is_exact": total_is_exact,
+        "size": limit,
+        "pages": (total + limit - 1) // limit if limit > 0 else 1,
+        "has_next": has_next,
+        "has_prev": bool(cursor) or skip > 0,
+        "next_cursor": encode_cursor(keys, rows[-1]) if has_next and rows else None
+    }
+    if not cursor:
+        pagination["page"] = skip // limit + 1 if limit > 0 else 1
+    return rows, pagination
@@ -0,0 +1,291 @@
+"""
+Monthly partitioning and retention of the audit log
+On PostgreSQL AuditLog can be turned into a table range-partitioned by month of
+Timestamp (migration 008, opt-in with AUDIT_LOG_PARTITIONING, or later with
+scripts/partition_audit_log.py). A maintenance
+job keeps the coming months' partitions created and removes entries older
+than AUDIT_LOG_RETENTION_DAYS: expired months are dropped whole, the rest is
+deleted in batches (the only mechanism for an unpartitioned log)
+"""
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import logging
+
+from sqlalchemy import Column, Index, MetaData, Table, delete, select, text
+from sqlalchemy.orm import Session
+
+import config
+from src.infrastructure.database.models import AuditLog
+from src.utils.periodic_job import PeriodicJob
+
+logger = logging.getLogger(__name__)
+
+# (name, columns, extra keyword arguments) of an index recreated after a rebuild
+IndexDefinition = Tuple[str, List[str], Dict[str, Any]]
+
+PARTITION_NAME = re.compile(r"^AuditLog_(\d{4})_(\d{2})$")
+DEFAULT_PARTITION = "AuditLog_default"
+
+
+def _month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(month: datetime) -> datetime:
+    return month.replace(year=month.year + 1, month=1) if month.month == 12 else month.replace(month=month.month + 1)
+
+
+def index_definitions(table: Table) -> List[IndexDefinition]:
+    """Index definitions of a table, e.g. of the current AuditLog model for scripts
+
+    Migrations pass their own frozen list instead, so that what they build
+    does not change with the model.
+    """
+    return [
+        (index.name, [column.name for column in index.columns], dict(index.dialect_kwargs))
+        for index in sorted(table.indexes, key=lambda index: index.name)
+    ]
+
+
+def partition_name(month: datetime) -> str:
+    """Name of the partition holding the entries of month"""
+    return f"AuditLog_{month:%Y_%m}"
+
+
+class AuditPartitionService:
+    """
+    Service managing AuditLog partitions and retention
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.dialect_name = db.get_bind().dialect.name
+
+    def is_partitioned(self) -> bool:
+        """Whether AuditLog is a partitioned table"""
+        if self.dialect_name != "postgresql":
+            return False
+        return bool(self.db.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+            "WHERE partrelid = to_regclass('public.\"AuditLog\"'))"
+        )).scalar())
+
+    def partitions(self, parent: str = "AuditLog") -> List[Tuple[datetime, str]]:
+        """(month, partition name) of the monthly partitions, oldest first"""
+        names = self.db.execute(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:parent)"
+        ), {"parent": f'public."{parent}"'}).scalars().all()
+        months = []
+        for name in names:
+            match = PARTITION_NAME.match(name)
+            if match:
+                months.append((datetime(int(match.group(1)), int(match.group(2)), 1), name))
+        return sorted(months)
+
+    def ensure_partitions(self, now: Optional[datetime] = None, start: Optional[datetime] = None,
+                          parent: str = "AuditLog") -> List[str]:
+        """
+        Create the missing monthly partitions from start (default: this month)
+        through AUDIT_PARTITION_MONTHS_AHEAD months ahead, and the default
+        partition; returns the names created. The caller commits.
+
+        Entries written beyond the created months land in the default
+        partition, and PostgreSQL refuses to create a partition for a month
+        the default partition holds rows of: the default partition is then
+        detached while those months are created and their rows moved in.
+        """
+        now = now or datetime.utcnow()
+        existing = {name for _, name in self.partitions(parent)}
+        month = _month_start(start or now)
+        last = _month_start(now)
+        for _ in range(config.AUDIT_PARTITION_MONTHS_AHEAD):
+            last = _next_month(last)
+
+        has_default = self._has_default_partition(parent)
+        detached = False
+        created = []
+        while month <= last:
+            name = partition_name(month)
+            if name not in existing:
+                in_default = has_default and self._default_holds_month(month)
+                if in_default and not detached:
+                    self._sql(f'ALTER TABLE public."{parent}" DETACH PARTITION public."{DEFAULT_PARTITION}"')
+                    detached = True
+                self._sql(
+                    f'CREATE TABLE IF NOT EXISTS public."{name}" PARTITION OF public."{parent}" '
+                    f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{_next_month(month):%Y-%m-%d}')"
+                )
+                if in_default:
+                    moved = self._move_default_rows(parent, month)
+                    logger.info(f"Moved {moved} AuditLog entries from {DEFAULT_PARTITION} to {name}")
+                created.append(name)
+            month = _next_month(month)
+        if detached:
+            self._sql(f'ALTER TABLE public."{parent}" ATTACH PARTITION public."{DEFAULT_PARTITION}" DEFAULT')
+        self._sql(f'CREATE TABLE IF NOT EXISTS public."{DEFAULT_PARTITION}" PARTITION OF public."{parent}" DEFAULT')
+        return created
+
+    def _has_default_partition(self, parent: str) -> bool:
+        return bool(self.db.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_inherits "
+            "WHERE inhparent = to_regclass(:parent) AND inhrelid = to_regclass(:default))"
+        ), {"parent": f'public."{parent}"', "default": f'public."{DEFAULT_PARTITION}"'}).scalar())
+
+    def _default_holds_month(self, month: datetime) -> bool:
+        return bool(self.db.execute(text(
+            f'SELECT EXISTS (SELECT 1 FROM public."{DEFAULT_PARTITION}" '
+            f'WHERE "Timestamp" >= :start AND "Timestamp" < :end)'
+        ), {"start": month, "end": _next_month(month)}).scalar())
+
+    def _move_default_rows(self, parent: str, month: datetime) -> int:
+        # The default partition is detached, so the insert routes the rows to the month's partition
+        bounds = {"start": month, "end": _next_month(month)}
+        moved = self.db.execute(text(
+            f'INSERT INTO public."{parent}" SELECT * FROM public."{DEFAULT_PARTITION}" '
+            f'WHERE "Timestamp" >= :start AND "Timestamp" < :end'
+        ), bounds).rowcount
+        self.db.execute(text(
+            f'DELETE FROM public."{DEFAULT_PARTITION}" WHERE "Timestamp" >= :start AND "Timestamp" < :end'
+        ), bounds)
+        return moved
+
+    def apply_retention(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Remove entries older than AUDIT_LOG_RETENTION_DAYS (0 keeps everything)
+
+        Monthly partitions entirely past the cutoff are dropped; remaining
+        expired rows are deleted AUDIT_RETENTION_BATCH_SIZE at a time, one
+        commit per batch. Rollup counts are kept.
+        """
+        result = {"cutoff": None, "dropped_partitions": [], "deleted_rows": 0}
+        if config.AUDIT_LOG_RETENTION_DAYS <= 0:
+            return result
+        cutoff = (now or datetime.utcnow()) - timedelta(days=config.AUDIT_LOG_RETENTION_DAYS)
+        result["cutoff"] = cutoff
+
+        if self.is_partitioned():
+            for month, name in self.partitions():
+                if _next_month(month) <= cutoff:
+                    self.db.execute(text(f'DROP TABLE public."{name}"'))
+                    self.db.commit()
+                    result["dropped_partitions"].append(name)
+
+        batch_size = config.AUDIT_RETENTION_BATCH_SIZE
+        while True:
+            expired = select(AuditLog.LogID).where(AuditLog.Timestamp < cutoff).limit(batch_size)
+            deleted = self.db.execute(
+                delete(AuditLog).where(AuditLog.Timestamp < cutoff, AuditLog.LogID.in_(expired))
+            ).rowcount
+            self.db.commit()
+            result["deleted_rows"] += deleted
+            if deleted < batch_size:
+                break
+
+        if result["dropped_partitions"] or result["deleted_rows"]:
+            logger.info(f"Audit retention before {cutoff}: dropped {result['dropped_partitions']}, "
+                        f"deleted {result['deleted_rows']} rows")
+        return result
+
+    def _sql(self, statement: str) -> None:
+        self.db.execute(text(statement))
+
+    def _create_indexes(self, indexes: Sequence[IndexDefinition]) -> None:
+        columns = sorted({column for _, index_columns, _ in indexes for column in index_columns})
+        table = Table("AuditLog", MetaData(), *[Column(column) for column in columns], schema="public")
+        for name, index_columns, options in indexes:
+            Index(name, *[table.c[column] for column in index_columns], **options).create(self.db.connection())
+
+    def _move_serial(self, source: str, target: str) -> None:
+        # The LogID sequence belongs to the table being dropped; hand it over first
+        sequence = self.db.execute(
+            text("SELECT pg_get_serial_sequence(:table, 'LogID')"), {"table": f'public."{source}"'}
+        ).scalar()
+        if sequence:
+            self.db.execute(text(f'ALTER SEQUENCE {sequence} OWNED BY public."{target}"."LogID"'))
+
+    def convert_to_partitioned(self, indexes: Sequence[IndexDefinition], now: Optional[datetime] = None) -> List[str]:
+        """
+        Rebuild AuditLog as a table partitioned by month of Timestamp, moving
+        every row and recreating the given indexes; returns the partitions
+        created. Locks the table for the duration; the caller commits.
+
+        The partition key is part of the primary key and cannot be NULL, so
+        entries without a Timestamp make it fail rather than be given one.
+        """
+        if self.dialect_name != "postgresql":
+            raise RuntimeError("Audit log partitioning requires PostgreSQL")
+        if self.is_partitioned():
+            return []
+
+        self._sql('LOCK TABLE public."AuditLog" IN ACCESS EXCLUSIVE MODE')
+        undated = self.db.execute(text('SELECT count(*) FROM public."AuditLog" WHERE "Timestamp" IS NULL')).scalar()
+        if undated:
+            raise RuntimeError(
+                f'{undated} AuditLog entries have no Timestamp; set or delete them before partitioning'
+            )
+        self._sql('CREATE TABLE public."AuditLog_partitioned" (LIKE public."AuditLog" INCLUDING DEFAULTS) '
+                  'PARTITION BY RANGE ("Timestamp")')
+        self._sql('ALTER TABLE public."AuditLog_partitioned" ALTER COLUMN "Timestamp" SET NOT NULL')
+        self._sql('ALTER TABLE public."AuditLog_partitioned" '
+                  'ADD CONSTRAINT "AuditLog_partitioned_pkey" PRIMARY KEY ("LogID", "Timestamp")')
+
+        oldest = self.db.execute(text('SELECT min("Timestamp") FROM public."AuditLog"')).scalar()
+        created = self.ensure_partitions(now=now, start=oldest, parent="AuditLog_partitioned")
+
+        self._sql('INSERT INTO public."AuditLog_partitioned" SELECT * FROM public."AuditLog"')
+        self._move_serial("AuditLog", "AuditLog_partitioned")
+        self._sql('DROP TABLE public."AuditLog"')
+        self._sql('ALTER TABLE public."AuditLog_partitioned" RENAME TO "AuditLog"')
+        self._sql('ALTER TABLE public."AuditLog" RENAME CONSTRAINT "AuditLog_partitioned_pkey" TO "AuditLog_pkey"')
+        self._create_indexes(indexes)
+        logger.info(f"AuditLog partitioned by month into {len(created)} partitions")
+        return created
+
+    def convert_to_unpartitioned(self, indexes: Sequence[IndexDefinition]) -> None:
+        """
+        Rebuild a partitioned AuditLog as a plain table with every row and the
+        given indexes; the caller commits
+        """
+        if not self.is_partitioned():
+            return
+
+        self._sql('LOCK TABLE public."AuditLog" IN ACCESS EXCLUSIVE MODE')
+        self._sql('CREATE TABLE public."AuditLog_unpartitioned" (LIKE public."AuditLog" INCLUDING DEFAULTS)')
+        self._sql('ALTER TABLE public."AuditLog_unpartitioned" ALTER COLUMN "Timestamp" DROP NOT NULL')
+        self._sql('ALTER TABLE public."AuditLog_unpartitioned" '
+                  'ADD CONSTRAINT "AuditLog_unpartitioned_pkey" PRIMARY KEY ("LogID")')
+        self._sql('INSERT INTO public."AuditLog_unpartitioned" SELECT * FROM public."AuditLog"')
+        self._move_serial("AuditLog", "AuditLog_unpartitioned")
+        self._sql('DROP TABLE public."AuditLog"')
+        self._sql('ALTER TABLE public."AuditLog_unpartitioned" RENAME TO "AuditLog"')
+        self._sql('ALTER TABLE public."AuditLog" RENAME CONSTRAINT "AuditLog_unpartitioned_pkey" TO "AuditLog_pkey"')
+        self._create_indexes(indexes)
+
+
+def maintain_audit_log() -> Dict[str, Any]:
+    """Create upcoming partitions and apply retention (the periodic job task)
+
+    A failure to create partitions is logged and does not keep retention
+    from running.
+    """
+    from src.infrastructure.database.connection import db_manager
+    db = db_manager.SessionLocal()
+    try:
+        service = AuditPartitionService(db)
+        created = []
+        if service.is_partitioned():
+            try:
+                created = service.ensure_partitions()
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.exception(f"Could not create AuditLog partitions: {e}")
+        return dict(service.apply_retention(), created_partitions=created)
+    finally:
+        db.close()
+
+
+# Global audit retention job instance
+audit_retention_job = PeriodicJob("audit-retention", config.AUDIT_RETENTION_INTERVAL, maintain_audit_log)
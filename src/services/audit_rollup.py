@@ -0,0 +1,266 @@
+"""
+Hourly and daily rollups of the audit log
+A periodic job keeps AuditLogRollup filled with action counts per
+Action/Resource/Success and time bucket, so audit statistics are one GROUP BY
+over a small table plus the rows logged since the last refresh, instead of
+several scans of AuditLog
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, insert, literal, literal_column, select, text, true, union_all
+from sqlalchemy.orm import Session
+
+import config
+from src.infrastructure.database.models import AuditLog, AuditLogRollup
+from src.utils.periodic_job import PeriodicJob
+
+GRANULARITY_STEPS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+# pg_advisory lock held while refreshing, so concurrent workers do not rebuild the same buckets
+ROLLUP_LOCK_KEY = 72013
+
+# A half-open [start, end) time range; None means unbounded on that side
+TimeRange = Tuple[Optional[datetime], Optional[datetime]]
+
+
+def _floor(moment: datetime, granularity: str) -> datetime:
+    if granularity == "day":
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _ceil(moment: datetime, granularity: str) -> datetime:
+    floored = _floor(moment, granularity)
+    return floored if floored == moment else floored + GRANULARITY_STEPS[granularity]
+
+
+def _earliest(*moments: Optional[datetime]) -> Optional[datetime]:
+    present = [moment for moment in moments if moment is not None]
+    return min(present) if present else None
+
+
+def _latest(*moments: Optional[datetime]) -> Optional[datetime]:
+    present = [moment for moment in moments if moment is not None]
+    return max(present) if present else None
+
+
+def _is_empty(start: Optional[datetime], end: Optional[datetime]) -> bool:
+    return start is not None and end is not None and start >= end
+
+
+def _in_range(column, start: Optional[datetime], end: Optional[datetime]):
+    clauses = []
+    if start is not None:
+        clauses.append(column >= start)
+    if end is not None:
+        clauses.append(column < end)
+    return and_(true(), *clauses)
+
+
+def bucket_expression(column, granularity: str, dialect_name: str):
+    """SQL expression truncating a timestamp column to the start of its hour or day"""
+    if dialect_name == "sqlite":
+        # Same text layout SQLAlchemy stores SQLite datetimes in, so bucket bounds compare correctly
+        layout = "%Y-%m-%d %H:00:00.000000" if granularity == "hour" else "%Y-%m-%d 00:00:00.000000"
+        return func.strftime(literal_column(f"'{layout}'"), column)
+    # Inlined so the SELECT and GROUP BY expressions are identical
+    return func.date_trunc(literal_column(f"'{granularity}'"), column)
+
+
+class AuditRollupService:
+    """
+    Service maintaining and querying audit log rollups
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.dialect_name = db.get_bind().dialect.name
+
+    def _watermarks(self) -> Dict[str, Optional[datetime]]:
+        """End of the newest rolled-up bucket per granularity (None when there is none)"""
+        rows = self.db.query(
+            AuditLogRollup.Granularity, func.max(AuditLogRollup.BucketStart)
+        ).group_by(AuditLogRollup.Granularity).all()
+        latest = {granularity: bucket for granularity, bucket in rows}
+        return {
+            granularity: latest[granularity] + step if latest.get(granularity) else None
+            for granularity, step in GRANULARITY_STEPS.items()
+        }
+
+    def _rebuild(self, granularity: str, source, start: Optional[datetime], end: datetime) -> int:
+        """Replace the rollup rows of one granularity in [start, end) with the rows of source"""
+        rollup = AuditLogRollup.__table__
+        self.db.execute(
+            delete(rollup).where(
+                rollup.c.Granularity == granularity,
+                _in_range(rollup.c.BucketStart, start, end)
+            )
+        )
+        result = self.db.execute(
+            insert(rollup).from_select(
+                ["Granularity", "BucketStart", "Action", "Resource", "Success", "Count"], source
+            )
+        )
+        return result.rowcount
+
+    def refresh(self, now: Optional[datetime] = None, full: bool = False) -> Dict[str, Any]:
+        """
+        Roll up every complete hour and day of the audit log
+
+        Buckets from AUDIT_ROLLUP_LOOKBACK_HOURS before the newest rollup
+        onwards are rebuilt, so entries written late (e.g. replayed from the
+        audit spool) are still counted; full rebuilds all buckets.
+        """
+        if self.dialect_name == "postgresql":
+            acquired = self.db.execute(
+                text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": ROLLUP_LOCK_KEY}
+            ).scalar()
+            if not acquired:
+                self.db.rollback()
+                return {"skipped": True}
+
+        hours_through = _floor(now or datetime.utcnow(), "hour")
+        days_through = _floor(hours_through, "day")
+        start = None
+        if not full:
+            hour_watermark = self._watermarks()["hour"]
+            if hour_watermark is not None:
+                start = hour_watermark - timedelta(hours=config.AUDIT_ROLLUP_LOOKBACK_HOURS)
+        day_start = _floor(start, "day") if start is not None else None
+
+        rollup = AuditLogRollup.__table__
+        hour_bucket = bucket_expression(AuditLog.Timestamp, "hour", self.dialect_name)
+        hourly = select(
+            literal("hour"), hour_bucket, AuditLog.Action, AuditLog.Resource, AuditLog.Success, func.count()
+        ).where(
+            _in_range(AuditLog.Timestamp, start, hours_through)
+        ).group_by(hour_bucket, AuditLog.Action, AuditLog.Resource, AuditLog.Success)
+
+        day_bucket = bucket_expression(rollup.c.BucketStart, "day", self.dialect_name)
+        daily = select(
+            literal("day"), day_bucket, rollup.c.Action, rollup.c.Resource, rollup.c.Success, func.sum(rollup.c.Count)
+        ).where(
+            rollup.c.Granularity == "hour",
+            _in_range(rollup.c.BucketStart, day_start, days_through)
+        ).group_by(day_bucket, rollup.c.Action, rollup.c.Resource, rollup.c.Success)
+
+        try:
+            hour_rows = self._rebuild("hour", hourly, start, hours_through)
+            day_rows = self._rebuild("day", daily, day_start, days_through)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        return {
+            "skipped": False,
+            "start": start,
+            "hours_through": hours_through,
+            "days_through": days_through,
+            "hour_rows": hour_rows,
+            "day_rows": day_rows
+        }
+
+    def _plan(self, start_date: Optional[datetime], end_date: Optional[datetime]) -> Dict[str, List[TimeRange]]:
+        """
+        Split the requested range into complete rolled-up days, rolled-up hours
+        and a tail of raw AuditLog rows not yet rolled up
+        """
+        watermarks = self._watermarks()
+        low = _floor(start_date, "hour") if start_date else None
+        high = _floor(end_date, "hour") + GRANULARITY_STEPS["hour"] if end_date else None
+
+        day_start = day_end = None
+        if watermarks["day"] is not None:
+            day_start = _ceil(low, "day") if low else None
+            day_end = _floor(_earliest(high, watermarks["day"]), "day")
+            if _is_empty(day_start, day_end):
+                day_start = day_end = None
+
+        hour_ranges: List[TimeRange] = []
+        if watermarks["hour"] is not None:
+            hour_end = _earliest(high, watermarks["hour"])
+            if day_end is None:
+                hour_ranges = [(low, hour_end)]
+            else:
+                # Hours on either side of the complete days
+                hour_ranges = [(day_end, hour_end)]
+                if day_start is not None:
+                    hour_ranges.insert(0, (low, day_start))
+            hour_ranges = [(range_start, range_end) for range_start, range_end in hour_ranges
+                           if not _is_empty(range_start, range_end)]
+
+        raw_start = _latest(low, watermarks["hour"], day_end)
+        return {
+            "day": [(day_start, day_end)] if day_end is not None else [],
+            "hour": hour_ranges,
+            "raw": [] if _is_empty(raw_start, high) else [(raw_start, high)]
+        }
+
+    def get_statistics(self, start_date: Optional[datetime] = None,
+                       end_date: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Audit action counts between start_date and end_date (whole hours,
+        end hour included), from the rollups and the not yet rolled-up rows
+        in one GROUP BY
+        """
+        plan = self._plan(start_date, end_date)
+        rollup = AuditLogRollup.__table__
+        parts = []
+        for granularity in ("day", "hour"):
+            for range_start, range_end in plan[granularity]:
+                parts.append(
+                    select(rollup.c.Action, rollup.c.Resource, rollup.c.Success, rollup.c.Count.label("n"))
+                    .where(rollup.c.Granularity == granularity, _in_range(rollup.c.BucketStart, range_start, range_end))
+                )
+        for range_start, range_end in plan["raw"]:
+            parts.append(
+                select(AuditLog.Action, AuditLog.Resource, AuditLog.Success, func.count().label("n"))
+                .where(_in_range(AuditLog.Timestamp, range_start, range_end))
+                .group_by(AuditLog.Action, AuditLog.Resource, AuditLog.Success)
+            )
+
+        rows = []
+        if parts:
+            counts = union_all(*parts).subquery()
+            rows = self.db.execute(
+                select(counts.c.Action, counts.c.Resource, counts.c.Success, func.sum(counts.c.n))
+                .group_by(counts.c.Action, counts.c.Resource, counts.c.Success)
+            ).all()
+
+        total_actions = successful_actions = failed_actions = 0
+        action_types: Dict[str, int] = {}
+        resource_types: Dict[str, int] = {}
+        for action, resource, success, count in rows:
+            count = int(count)
+            total_actions += count
+            if success is True:
+                successful_actions += count
+            elif success is False:
+                failed_actions += count
+            action_types[action] = action_types.get(action, 0) + count
+            resource_types[resource] = resource_types.get(resource, 0) + count
+
+        return {
+            "total_actions": total_actions,
+            "successful_actions": successful_actions,
+            "failed_actions": failed_actions,
+            "success_rate": (successful_actions / total_actions * 100) if total_actions > 0 else 0,
+            "action_types": action_types,
+            "resource_types": resource_types
+        }
+
+
+def refresh_audit_rollups() -> Dict[str, Any]:
+    """Refresh the rollups in a session of their own (the periodic job task)"""
+    from src.infrastructure.database.connection import db_manager
+    db = db_manager.SessionLocal()
+    try:
+        return AuditRollupService(db).refresh()
+    finally:
+        db.close()
+
+
+# Global audit rollup job instance
+audit_rollup_job = PeriodicJob("audit-rollup", config.AUDIT_ROLLUP_INTERVAL, refresh_audit_rollups)
@@ -2,12 +2,15 @@
 Service for audit logging functionality
 """
 import json
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
 from datetime import datetime
 
 from src.infrastructure.database.models import AuditLog
+from src.infrastructure.database.pagination import paginate
+from src.services.audit_rollup import AuditRollupService
+from src.services.audit_writer import audit_writer
 from schemas.audit_schemas import AuditLogResponse, AuditLogCreate
 
 
@@ -16,6 +19,9 @@ class AuditService:
     Service for managing audit logs
     """
 
+    # Listing order, newest first; LogID makes the keyset cursor unique
+    LIST_SORT_KEYS = ((AuditLog.Timestamp, True), (AuditLog.LogID, True))
+
     def __init__(self, db: Session):
         self.db = db
 
@@ -33,20 +39,12 @@ class AuditService:
             error_message: Optional[str] = None
     ) -> AuditLog:
         """
-        Log an administrative action
-        """
-        audit_log = AuditLog(
-            UserID=user_id,
-            Username=username,
-            Action=action,
-            Resource=resource,
-            ResourceID=resource_id,
-            Details=details,
-            IPAddress=ip_address,
-            UserAgent=user_agent,
-            Success=success,
-            ErrorMessage=error_message
-        )
+        Log an administrative action, writing it to the database before returning
+        """
+        audit_log = AuditLog(**self._entry(
+            user_id, username, action, resource, resource_id, details,
+            ip_address, user_agent, success, error_message
+        ))
 
         self.db.add(audit_log)
         self.db.commit()
@@ -54,19 +52,60 @@ class AuditService:
 
         return audit_log
 
-    def get_audit_logs(
+    def queue_action(
+            self,
+            user_id: int,
+            username: str,
+            action: str,
+            resource: str,
+            resource_id: Optional[str] = None,
+            details: Optional[Dict[str, Any]] = None,
+            ip_address: Optional[str] = None,
+            user_agent: Optional[str] = None,
+            success: bool = True,
+            error_message: Optional[str] = None
+    ) -> None:
+        """
+        Log an administrative action through the background audit writer
+
+        Returns immediately; the entry is inserted with the next batch.
+        """
+        audit_writer.submit(self._entry(
+            user_id, username, action, resource, resource_id, details,
+            ip_address, user_agent, success, error_message
+        ))
+
+    @staticmethod
+    def _entry(user_id, username, action, resource, resource_id, details,
+               ip_address, user_agent, success, error_message) -> Dict[str, Any]:
+        """
+        AuditLog column values of one action
+        """
+        return {
+            "UserID": user_id,
+            "Username": username,
+            "Action": action,
+            "Resource": resource,
+            "ResourceID": resource_id,
+            "Details": details,
+            "IPAddress": ip_address,
+            "UserAgent": user_agent,
+            "Success": success,
+            "ErrorMessage": error_message,
+            "Timestamp": datetime.utcnow()
+        }
+
+    def _filtered_query(
             self,
-            skip: int = 0,
-            limit: int = 100,
             user_id: Optional[int] = None,
             action: Optional[str] = None,
             resource: Optional[str] = None,
             success: Optional[bool] = None,
             start_date: Optional[datetime] = None,
             end_date: Optional[datetime] = None
-    ) -> List[AuditLog]:
+    ):
         """
-        Get audit logs with optional filters
+        Audit log query restricted by the optional filters
         """
         query = self.db.query(AuditLog)
 
@@ -88,39 +127,61 @@ class AuditService:
         if end_date:
             query = query.filter(AuditLog.Timestamp <= end_date)
 
-        return query.order_by(desc(AuditLog.Timestamp)).offset(skip).limit(limit).all()
+        return query
 
-    def get_audit_log_count(
+    def get_audit_logs(
             self,
+            skip: int = 0,
+            limit: int = 100,
             user_id: Optional[int] = None,
             action: Optional[str] = None,
             resource: Optional[str] = None,
             success: Optional[bool] = None,
             start_date: Optional[datetime] = None,
             end_date: Optional[datetime] = None
-    ) -> int:
+    ) -> List[AuditLog]:
         """
-        Get total count of audit logs with optional filters
+        Get audit logs with optional filters
         """
-        query = self.db.query(AuditLog)
-
-        if user_id:
-            query = query.filter(AuditLog.UserID == user_id)
-
-        if action:
-            query = query.filter(AuditLog.Action == action)
+        query = self._filtered_query(user_id, action, resource, success, start_date, end_date)
 
-        if resource:
-            query = query.filter(AuditLog.Resource == resource)
+        return query.order_by(desc(AuditLog.Timestamp), desc(AuditLog.LogID)).offset(skip).limit(limit).all()
 
-        if success is not None:
-            query = query.filter(AuditLog.Success == success)
+    def get_audit_logs_page(
+            self,
+            skip: int = 0,
+            limit: int = 100,
+            user_id: Optional[int] = None,
+            action: Optional[str] = None,
+            resource: Optional[str] = None,
+            success: Optional[bool] = None,
+            start_date: Optional[datetime] = None,
+            end_date: Optional[datetime] = None,
+            cursor: Optional[str] = None,
+            exact_total: bool = False
+    ) -> Tuple[List[AuditLog], Dict[str, Any]]:
+        """
+        Get one page of audit logs and its pagination metadata, newest first
 
-        if start_date:
-            query = query.filter(AuditLog.Timestamp >= start_date)
+        Pass the returned next_cursor as cursor to fetch the following page.
+        Raises InvalidCursorError for a malformed cursor.
+        """
+        query = self._filtered_query(user_id, action, resource, success, start_date, end_date)
+        return paginate(query, self.LIST_SORT_KEYS, limit, cursor=cursor, skip=skip, exact_total=exact_total)
 
-        if end_date:
-            query = query.filter(AuditLog.Timestamp <= end_date)
+    def get_audit_log_count(
+            self,
+            user_id: Optional[int] = None,
+            action: Optional[str] = None,
+            resource: Optional[str] = None,
+            success: Optional[bool] = None,
+            start_date: Optional[datetime] = None,
+            end_date: Optional[datetime] = None
+    ) -> int:
+        """
+        Get total count of audit logs with optional filters
+        """
+        query = self._filtered_query(user_id, action, resource, success, start_date, end_date)
 
         return query.count()
 
@@ -148,44 +209,26 @@ class AuditService:
             AuditLog.Success == False
         ).order_by(desc(AuditLog.Timestamp)).limit(limit).all()
 
-    def get_action_statistics(self) -> Dict[str, Any]:
-        """
-        Get audit log statistics
+    def get_action_statistics(
+            self,
+            start_date: Optional[datetime] = None,
+            end_date: Optional[datetime] = None
+    ) -> Dict[str, Any]:
         """
-        total_actions = self.db.query(AuditLog).count()
-        successful_actions = self.db.query(AuditLog).filter(
-            AuditLog.Success == True
-        ).count()
-        failed_actions = self.db.query(AuditLog).filter(
-            AuditLog.Success == False
-        ).count()
-
-        # Get action type counts
-        action_counts = self.db.query(
-            AuditLog.Action,
-            self.db.func.count(AuditLog.LogID).label('count')
-        ).group_by(AuditLog.Action).all()
+        Get audit log statistics, optionally restricted to a time range
 
-        # Get resource counts
-        resource_counts = self.db.query(
-            AuditLog.Resource,
-            self.db.func.count(AuditLog.LogID).label('count')
-        ).group_by(AuditLog.Resource).all()
-
-        return {
-            "total_actions": total_actions,
-            "successful_actions": successful_actions,
-            "failed_actions": failed_actions,
-            "success_rate": (successful_actions / total_actions * 100) if total_actions > 0 else 0,
-            "action_types": dict(action_counts),
-            "resource_types": dict(resource_counts)
-        }
+        Computed from the hourly/daily rollups in one GROUP BY; see AuditRollupService.
+        """
+        return AuditRollupService(self.db).get_statistics(start_date, end_date)
 
 
 # Audit logging decorator
-def audit_action(action: str, resource: str):
+def audit_action(action: str, resource: str, background: bool = True):
     """
     Decorator to automatically log actions
+
+    With background (the default) entries go through the audit writer and the
+    call does not wait for the audit insert.
     """
 
     def decorator(func):
@@ -196,12 +239,13 @@ def audit_action(action: str, resource: str):
 
             if db and current_user:
                 audit_service = AuditService(db)
+                log = audit_service.queue_action if background else audit_service.log_action
 
                 try:
                     result = func(*args, **kwargs)
 
                     # Log successful action
-                    audit_service.log_action(
+                    log(
                         user_id=current_user.user_id,
                         username=current_user.username,
                         action=action,
@@ -213,7 +257,7 @@ def audit_action(action: str, resource: str):
 
                 except Exception as e:
                     # Log failed action
-                    audit_service.log_action(
+                    log(
                         user_id=current_user.user_id,
                         username=current_user.username,
                         action=action,
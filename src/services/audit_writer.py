@@ -0,0 +1,382 @@
+"""
+Background writer for audit log entries
+Requests hand their entries to a bounded in-memory queue; a writer thread
+inserts them into AuditLog in multi-row batches, every batch_size entries or
+every flush_interval_ms milliseconds. Entries that cannot be written (database
+down, queue full) are appended to a JSON-lines spool file of the process and
+replayed once the database accepts writes again
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+import config
+from src.infrastructure.database.models import AuditLog
+
+try:
+    import fcntl
+except ImportError:  # Windows: each process replays its own spool only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Wakes the writer thread without carrying an entry
+_WAKE = object()
+
+# Seconds between spool replay attempts after a failed write
+SPOOL_RETRY_SECONDS = 5.0
+
+# Seconds between looks for spools left by other processes
+ORPHAN_SPOOL_CHECK_SECONDS = 60.0
+
+
+def _to_spool_line(entry: Dict[str, Any]) -> str:
+    record = dict(entry)
+    if isinstance(record.get("Timestamp"), datetime):
+        record["Timestamp"] = record["Timestamp"].isoformat()
+    return json.dumps(record, default=str) + "\n"
+
+
+def _from_spool_line(line: str) -> Dict[str, Any]:
+    record = json.loads(line)
+    if record.get("Timestamp"):
+        record["Timestamp"] = datetime.fromisoformat(record["Timestamp"])
+    return record
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class AuditWriter:
+    """Batch audit log entries from a bounded queue into AuditLog
+
+    Each process spools to its own file, spool_path with the process id
+    inserted before the suffix. Replays run under an exclusive lock on
+    spool_path.lock and also pick up the spools of processes that died.
+    """
+
+    def __init__(self, batch_size: int = 200, flush_interval_ms: int = 200, queue_size: int = 10000,
+                 spool_path: str = "generated/audit_spool.jsonl",
+                 session_factory: Optional[Callable[[], Session]] = None):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.spool_path = Path(spool_path)
+        self.lock_path = self.spool_path.with_name(self.spool_path.name + ".lock")
+        self._session_factory = session_factory
+
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._spool_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._retry_at = 0.0
+        self._orphan_check_at = 0.0
+        self._stats = {"submitted": 0, "written": 0, "spooled": 0, "dropped": 0, "replayed": 0, "failed_batches": 0}
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += amount
+
+    def _new_session(self) -> Session:
+        if self._session_factory is not None:
+            return self._session_factory()
+        # Resolved at write time so the session factory can be swapped (e.g. in tests)
+        from src.infrastructure.database.connection import db_manager
+        return db_manager.SessionLocal()
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, entry: Dict[str, Any]) -> None:
+        """Queue one AuditLog entry (column name -> value) without waiting for the database
+
+        The entry is timestamped now; when the queue is full it goes straight to the spool.
+        """
+        entry.setdefault("Timestamp", datetime.utcnow())
+        self._count("submitted")
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            logger.warning("Audit queue full, spooling entry to disk")
+            self._spool([entry])
+            return
+        self._ensure_started()
+
+    def _next_batch(self) -> List[Dict[str, Any]]:
+        """Entries received within one flush interval, at most batch_size of them"""
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=max(remaining, 0)) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._queue.task_done()
+            if item is _WAKE:
+                if batch or self._stopping.is_set():
+                    break
+                continue
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+            elif self._stopping.is_set() and self._queue.empty():
+                return
+            self._replay_spool()
+
+    def _insert(self, rows: List[Dict[str, Any]]) -> None:
+        """Insert rows in one transaction, batch_size rows per multi-row INSERT"""
+        db = self._new_session()
+        try:
+            for start in range(0, len(rows), self.batch_size):
+                db.execute(insert(AuditLog.__table__), rows[start:start + self.batch_size])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            self._insert(batch)
+            self._count("written", len(batch))
+        except Exception as e:
+            self._count("failed_batches")
+            self._retry_at = time.monotonic() + SPOOL_RETRY_SECONDS
+            logger.error(f"Audit batch of {len(batch)} entries not written, spooling: {e}")
+            self._spool(batch)
+
+    def _spool_file(self, pid: int) -> Path:
+        """Spool file of a process"""
+        return self.spool_path.with_name(f"{self.spool_path.stem}.{pid}{self.spool_path.suffix}")
+
+    @staticmethod
+    def _replay_file(spool_file: Path) -> Path:
+        # Spooled entries being replayed; kept until they are all committed
+        return spool_file.with_name(spool_file.name + ".replay")
+
+    @property
+    def process_spool_path(self) -> Path:
+        """Spool file of the current process (resolved on use, as workers fork after import)"""
+        return self._spool_file(os.getpid())
+
+    def _spool(self, entries: List[Dict[str, Any]]) -> None:
+        """Append entries to the spool file of the process and sync it to disk"""
+        spool_file = self.process_spool_path
+        try:
+            with self._spool_lock:
+                spool_file.parent.mkdir(parents=True, exist_ok=True)
+                with open(spool_file, "a", encoding="utf-8") as f:
+                    f.writelines(_to_spool_line(entry) for entry in entries)
+                    f.flush()
+                    os.fsync(f.fileno())
+            self._count("spooled", len(entries))
+        except OSError as e:
+            self._count("dropped", len(entries))
+            logger.error(f"Could not spool {len(entries)} audit entries to {spool_file}: {e}")
+
+    @contextmanager
+    def _replay_lock(self) -> Iterator[bool]:
+        """Try to take the exclusive replay lock shared by the processes; yields whether it was taken"""
+        if fcntl is None:
+            yield True
+            return
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a") as lock:
+            try:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another process is replaying
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def _spool_owner(self, spool_file: Path) -> Optional[int]:
+        """Process id in the name of a spool file, None for the former shared spool_path"""
+        pid = spool_file.name[len(self.spool_path.stem) + 1:-len(self.spool_path.suffix) or None]
+        return int(pid) if pid.isdigit() else None
+
+    def _claim(self, spool_file: Path) -> None:
+        """Move a spool file to its replay file, after any entries left there by an interrupted replay"""
+        replay_file = self._replay_file(spool_file)
+        if not replay_file.exists():
+            os.replace(spool_file, replay_file)
+            return
+        with open(spool_file, "r", encoding="utf-8") as src, open(replay_file, "a", encoding="utf-8") as dst:
+            dst.write(src.read())
+        spool_file.unlink()
+
+    def _claim_spools(self) -> List[Path]:
+        """Claim the spools to replay and return their replay files (replay lock held)
+
+        These are the spool of the current process and, where the replay lock
+        is shared with the other processes, the spools of dead processes and
+        the replay files they left behind.
+        """
+        own_spool = self.process_spool_path
+        with self._spool_lock:
+            if own_spool.exists():
+                self._claim(own_spool)
+        if fcntl is None:
+            replay_file = self._replay_file(own_spool)
+            return [replay_file] if replay_file.exists() else []
+
+        pattern = f"{self.spool_path.stem}.*{self.spool_path.suffix}"
+        spools = [self.spool_path] + sorted(self.spool_path.parent.glob(pattern))
+        for spool_file in spools:
+            if spool_file == own_spool or not spool_file.exists():
+                continue
+            owner = self._spool_owner(spool_file)
+            if owner is None or not _pid_alive(owner):
+                self._claim(spool_file)
+        return sorted(self.spool_path.parent.glob(f"{self.spool_path.stem}*{self.spool_path.suffix}.replay"))
+
+    def _replay_spool(self) -> None:
+        """Write spooled entries to the database, keeping them on disk until committed
+
+        Runs after every batch: the lock is only taken when this process has
+        spooled entries, or every ORPHAN_SPOOL_CHECK_SECONDS to look for the
+        spools of other processes.
+        """
+        now = time.monotonic()
+        if now < self._retry_at or not self.spool_path.parent.is_dir():
+            return
+        own_spool = self.process_spool_path
+        if now < self._orphan_check_at and not own_spool.exists() and not self._replay_file(own_spool).exists():
+            return
+        with self._replay_lock() as locked:
+            if not locked:
+                return
+            self._orphan_check_at = now + ORPHAN_SPOOL_CHECK_SECONDS
+            for replay_file in self._claim_spools():
+                if not self._replay_file_entries(replay_file):
+                    return
+
+    def _replay_file_entries(self, replay_file: Path) -> bool:
+        """Insert the entries of one replay file and delete it; False when the database refused them"""
+        try:
+            with open(replay_file, "r", encoding="utf-8") as f:
+                rows = [_from_spool_line(line) for line in f if line.strip()]
+            if rows:
+                self._insert(rows)
+        except FileNotFoundError:
+            return True
+        except (OSError, ValueError) as e:
+            # Set the file aside for inspection so it does not block later spools
+            corrupt_path = replay_file.with_name(f"{replay_file.name}.corrupt-{int(time.time())}")
+            logger.error(f"Unreadable audit spool {replay_file}, moved to {corrupt_path}: {e}")
+            try:
+                os.replace(replay_file, corrupt_path)
+            except OSError:
+                self._retry_at = time.monotonic() + SPOOL_RETRY_SECONDS
+            return True
+        except Exception as e:
+            self._retry_at = time.monotonic() + SPOOL_RETRY_SECONDS
+            logger.debug(f"Audit spool replay postponed: {e}")
+            return False
+
+        replay_file.unlink(missing_ok=True)
+        self._count("replayed", len(rows))
+        logger.info(f"Replayed {len(rows)} spooled audit entries from {replay_file}")
+        return True
+
+    def _wake(self) -> None:
+        # A full queue keeps the writer busy anyway
+        try:
+            self._queue.put_nowait(_WAKE)
+        except queue.Full:
+            pass
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until every queued entry has been written or spooled
+
+        Returns False if the queue was not drained within timeout seconds.
+        """
+        if self._thread is None:
+            return self._queue.empty()
+        deadline = time.monotonic() + timeout
+        self._wake()
+        while self._queue.unfinished_tasks or (self._thread.is_alive() and self._busy()):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _busy(self) -> bool:
+        # Entries taken off the queue but not yet written, spooled or dropped
+        with self._lock:
+            stats = self._stats
+            return stats["submitted"] > stats["written"] + stats["spooled"] + stats["dropped"]
+
+    def shutdown(self, timeout: float = 10.0) -> None:
+        """Write the queued entries and stop the writer thread"""
+        with self._lock:
+            thread = self._thread
+        if thread is None:
+            return
+        self._stopping.set()
+        self._wake()
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.warning("Audit writer did not stop in time, spooling the remaining entries")
+        # Anything still queued (writer stuck or stopped) is kept on disk
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _WAKE:
+                leftovers.append(item)
+        if leftovers:
+            self._spool(leftovers)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Writer counters and current queue length"""
+        with self._lock:
+            stats = dict(self._stats)
+        spool_file = self.process_spool_path
+        return dict(
+            stats,
+            pending=self._queue.qsize(),
+            spool_exists=spool_file.exists() or self._replay_file(spool_file).exists()
+        )
+
+
+# Global audit writer instance
+audit_writer = AuditWriter(
+    batch_size=config.AUDIT_BATCH_SIZE,
+    flush_interval_ms=config.AUDIT_FLUSH_INTERVAL_MS,
+    queue_size=config.AUDIT_QUEUE_SIZE,
+    spool_path=config.AUDIT_SPOOL_PATH
+)
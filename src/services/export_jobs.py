@@ -0,0 +1,242 @@
+"""
+Service for background survey data exports
+Each export job is a DataExports row recording its status, the number of
+responses written so far and the resulting file, so clients can poll it
+instead of holding the export request open. Parquet jobs also record the
+bounds of their snapshot, where the next incremental snapshot starts.
+A job whose process stopped before finishing it stays queued or processing;
+such jobs are marked failed once they have not been updated for
+EXPORT_JOB_TIMEOUT_SECONDS, at startup and every EXPORT_JOB_SWEEP_INTERVAL
+seconds. The worker's own updates only apply while the job is still its to
+finish, so a job given up as stale is never reported completed
+"""
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+import config
+from src.infrastructure.database.models import DataExport
+from src.utils.periodic_job import PeriodicJob
+
+# Statuses of jobs a background task still has to finish
+ACTIVE_STATUSES = ("queued", "processing")
+
+STALE_JOB_ERROR = "Export interrupted: the job stopped making progress"
+
+
+class ExportJobAbortedError(Exception):
+    """The job is no longer in the status its worker expects, e.g. failed as stale"""
+
+
+class ExportJobService:
+    """
+    Service for creating export jobs and recording their progress
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create_job(
+            self,
+            survey_id: int,
+            export_format: str,
+            file_name: str,
+            export_config: Dict[str, Any],
+            created_by: str
+    ) -> DataExport:
+        """
+        Register a queued export job
+        """
+        job = DataExport(
+            JobID=str(uuid.uuid4()),
+            SurveyID=survey_id,
+            ExportFormat=export_format,
+            ExportType="raw_data",
+            ExportConfig=export_config,
+            DeliveryMethod="download",
+            CreatedBy=created_by,
+            Status="queued",
+            FileName=file_name,
+            RowCount=0
+        )
+        self.db.add(job)
+        self.db.commit()
+        self.db.refresh(job)
+        return job
+
+    def get_job(self, job_id: str) -> Optional[DataExport]:
+        """
+        Get an export job by its job id
+        """
+        return self.db.query(DataExport).filter(DataExport.JobID == job_id).first()
+
+    def fail_stale_jobs(self, now: Optional[datetime] = None) -> int:
+        """
+        Mark as failed the queued or processing jobs not updated for EXPORT_JOB_TIMEOUT_SECONDS
+        """
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(seconds=config.EXPORT_JOB_TIMEOUT_SECONDS)
+        failed = (
+            self.db.query(DataExport)
+            .filter(
+                DataExport.Status.in_(ACTIVE_STATUSES),
+                or_(DataExport.UpdatedAt < cutoff, DataExport.UpdatedAt.is_(None))
+            )
+            .update({
+                DataExport.Status: "failed",
+                DataExport.ErrorMessage: STALE_JOB_ERROR,
+                DataExport.CompletedDate: now,
+                DataExport.UpdatedAt: now
+            }, synchronize_session="fetch")
+        )
+        self.db.commit()
+        return failed
+
+    def last_snapshot_end(self, survey_id: int) -> Optional[datetime]:
+        """
+        End of the completed Parquet snapshot of a survey reaching furthest, None if there is none
+
+        Snapshots limited to a date range are left out: responses before them
+        may not have been exported.
+        """
+        configs = (
+            self.db.query(DataExport.ExportConfig)
+            .filter(
+                DataExport.SurveyID == survey_id,
+                DataExport.ExportFormat == "parquet",
+                DataExport.Status == "completed"
+            )
+        )
+        ends = [
+            datetime.fromisoformat(export_config["snapshot"]["until"])
+            for export_config, in configs
+            if export_config and not export_config.get("date_range")
+            and (export_config.get("snapshot") or {}).get("until")
+        ]
+        return max(ends, default=None)
+
+    def has_active_snapshot(self, survey_id: int) -> bool:
+        """
+        Whether a Parquet snapshot of a survey is queued or processing
+        """
+        self.fail_stale_jobs()
+        return self.db.query(
+            self.db.query(DataExport)
+            .filter(
+                DataExport.SurveyID == survey_id,
+                DataExport.ExportFormat == "parquet",
+                DataExport.Status.in_(ACTIVE_STATUSES)
+            )
+            .exists()
+        ).scalar()
+
+    @staticmethod
+    def file_path(job: DataExport) -> str:
+        """
+        Location of the file of an export job
+        """
+        return os.path.join(config.EXPORT_DIR, job.JobID, job.FileName)
+
+    def _update_job(self, job: DataExport, statuses: Tuple[str, ...], values: Dict[str, Any]) -> bool:
+        """
+        Apply values to the job's row if its status is one of statuses; returns whether a row matched
+        """
+        updated = (
+            self.db.query(DataExport)
+            .filter(DataExport.JobID == job.JobID, DataExport.Status.in_(statuses))
+            .update(values, synchronize_session=False)
+        )
+        self.db.commit()
+        return updated > 0
+
+    def _advance_job(self, job: DataExport, status: str, values: Dict[str, Any]) -> None:
+        """
+        Apply values to a job in the given status, raising ExportJobAbortedError when it is not
+        """
+        if not self._update_job(job, (status,), dict(values, UpdatedAt=datetime.utcnow())):
+            raise ExportJobAbortedError(f"Export job {job.JobID} is no longer {status}")
+
+    def start_job(self, job: DataExport) -> None:
+        """
+        Mark a queued job as processing
+        """
+        self._advance_job(job, "queued", {"Status": "processing"})
+
+    def record_progress(self, job: DataExport, rows: int) -> None:
+        """
+        Record the number of responses written so far
+        """
+        self._advance_job(job, "processing", {"RowCount": rows})
+
+    def complete_job(self, job: DataExport, rows: int) -> None:
+        """
+        Mark a processing job as completed once its file is in place
+        """
+        now = datetime.utcnow()
+        self._advance_job(job, "processing", {
+            "Status": "completed",
+            "RowCount": rows,
+            "FileSize": os.path.getsize(self.file_path(job)),
+            "CompletedDate": now,
+            "LastExported": now,
+            "ExportCount": func.coalesce(DataExport.ExportCount, 0) + 1
+        })
+
+    def fail_job(self, job: DataExport, error_message: str) -> None:
+        """
+        Mark a job as failed, unless it has already finished
+        """
+        self.db.rollback()
+        now = datetime.utcnow()
+        self._update_job(job, ACTIVE_STATUSES, {
+            "Status": "failed",
+            "ErrorMessage": error_message,
+            "CompletedDate": now,
+            "UpdatedAt": now
+        })
+
+    def record_download(self, job: DataExport) -> None:
+        """
+        Count a download of the export file
+        """
+        job.DownloadCount = (job.DownloadCount or 0) + 1
+        self.db.commit()
+
+    @staticmethod
+    def job_result(job: DataExport) -> Dict[str, Any]:
+        """
+        Status report of a job, as returned by the export endpoints (ExportResult fields)
+        """
+        completed = job.Status == "completed"
+        return {
+            "export_id": job.JobID,
+            "survey_id": job.SurveyID,
+            "format": job.ExportFormat,
+            "file_url": f"/v1/api/surveys/exports/{job.JobID}/download" if completed else None,
+            "file_name": job.FileName,
+            "file_size": job.FileSize,
+            "status": job.Status,
+            "rows_exported": job.RowCount,
+            "created_at": job.CreatedDate,
+            "completed_at": job.CompletedDate,
+            "download_count": job.DownloadCount or 0,
+            "error_message": job.ErrorMessage
+        }
+
+
+def fail_stale_export_jobs() -> int:
+    """Fail stale export jobs in a session of their own (the periodic job task)"""
+    from src.infrastructure.database.connection import db_manager
+    db = db_manager.SessionLocal()
+    try:
+        return ExportJobService(db).fail_stale_jobs()
+    finally:
+        db.close()
+
+
+# Global stale export job sweep
+export_job_sweep = PeriodicJob("export-job-sweep", config.EXPORT_JOB_SWEEP_INTERVAL, fail_stale_export_jobs)
@@ -0,0 +1,207 @@
+"""
+Process-pool executor for Excel parsing
+Keeps CPU-bound workbook parsing off the event loop, with a bounded number of
+queued jobs and a per-job timeout
+"""
+import asyncio
+import multiprocessing
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Callable, Dict, List, Any, Optional, Tuple
+import logging
+
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+
+import config
+from src.infrastructure.database.models import ParsingStatistics
+from src.utils.instat_excel_parser import INSTATExcelParser
+
+logger = logging.getLogger(__name__)
+
+
+class ParsingQueueFullError(Exception):
+    """Raised when the parsing queue has no free slot"""
+
+
+class ParsingTimeoutError(Exception):
+    """Raised when a parsing job does not finish within the job timeout"""
+
+
+# Parser instance of the current worker process
+_worker_parser: Optional[INSTATExcelParser] = None
+
+
+def _parse_workbook(file_path: str, streaming_threshold: Optional[int],
+                    chunk_size: int) -> Tuple[Dict[str, Any], List[str], float]:
+    """Worker entry point: parse and validate a workbook, timing the parse"""
+    global _worker_parser
+    if _worker_parser is None:
+        _worker_parser = INSTATExcelParser(streaming_threshold=streaming_threshold, chunk_size=chunk_size)
+
+    started = time.perf_counter()
+    survey_structure = _worker_parser.parse_file(Path(file_path))
+    validation_issues = _worker_parser.validate_structure(survey_structure)
+    return survey_structure, validation_issues, time.perf_counter() - started
+
+
+class ParsingExecutor:
+    """Run workbook parsing in a process pool, awaited from async routes"""
+
+    def __init__(self, max_workers: int = 2, queue_size: int = 8, job_timeout: float = 120.0,
+                 start_method: str = "spawn"):
+        self.max_workers = max_workers
+        # Jobs accepted at once: one running per worker plus queue_size waiting
+        self.capacity = max_workers + queue_size
+        self.job_timeout = job_timeout
+        self.start_method = start_method
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        # Pools killed after a job timeout, whose other jobs are resubmitted
+        self._recycled_pools: "weakref.WeakSet[ProcessPoolExecutor]" = weakref.WeakSet()
+
+    @property
+    def pending_jobs(self) -> int:
+        """Jobs running or waiting in the pool"""
+        return self._pending
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context(self.start_method)
+            )
+        return self._pool
+
+    def _release(self, _future) -> None:
+        # Slots are released when the job really ends, not when the caller times out
+        with self._lock:
+            self._pending -= 1
+
+    def _submit(self, fn: Callable, args: Tuple, check_capacity: bool) -> Tuple[ProcessPoolExecutor, Future]:
+        with self._lock:
+            if check_capacity and self._pending >= self.capacity:
+                raise ParsingQueueFullError(
+                    f"Parsing queue is full ({self._pending} jobs pending), retry later"
+                )
+            self._pending += 1
+            try:
+                pool = self._get_pool()
+                future = pool.submit(fn, *args)
+            except Exception:
+                self._pending -= 1
+                raise
+        future.add_done_callback(self._release)
+        return pool, future
+
+    def _recycle_pool(self, pool: ProcessPoolExecutor) -> None:
+        """Kill the workers of a pool and start a fresh pool for the next jobs
+
+        A running job cannot be cancelled, so a timed-out job would otherwise
+        keep its worker busy until it ends on its own. The other jobs of the
+        pool fail with BrokenProcessPool and are resubmitted by their callers.
+        """
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+            self._recycled_pools.add(pool)
+        processes = list((getattr(pool, "_processes", None) or {}).values())
+        for process in processes:
+            if process.is_alive():
+                process.kill()
+        # Returns once the pool has failed its jobs, releasing their slots
+        pool.shutdown(wait=True)
+
+    async def run(self, fn: Callable, *args: Any) -> Any:
+        """Run a picklable function in the pool
+
+        Raises ParsingQueueFullError when no slot is free and
+        ParsingTimeoutError when the job exceeds job_timeout; a timed-out job
+        is stopped by killing the workers of its pool.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.job_timeout
+        pool, future = self._submit(fn, args, check_capacity=True)
+        while True:
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(future), timeout=max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                if not future.cancel():
+                    logger.warning(f"Parsing job exceeded {self.job_timeout}s, killing the parsing workers")
+                    await asyncio.to_thread(self._recycle_pool, pool)
+                raise ParsingTimeoutError(f"Parsing job exceeded {self.job_timeout}s")
+            except BrokenProcessPool:
+                if pool in self._recycled_pools and deadline > loop.time():
+                    # Killed because another job of the pool timed out, run it again
+                    pool, future = self._submit(fn, args, check_capacity=False)
+                    continue
+                # A worker died (e.g. killed for memory), start a fresh pool for the next jobs
+                logger.error("Parsing pool broken, recreating it")
+                with self._lock:
+                    if self._pool is pool:
+                        self._pool = None
+                raise
+
+    async def parse(self, file_path: Path) -> Tuple[Dict[str, Any], List[str], float]:
+        """Parse a workbook in the pool
+
+        Returns (survey_structure, validation_issues, parse_time_seconds).
+        Raises ParsingQueueFullError when no slot is free and
+        ParsingTimeoutError when the job exceeds job_timeout.
+        """
+        try:
+            return await self.run(
+                _parse_workbook, str(file_path), config.EXCEL_STREAMING_THRESHOLD, config.PROCESSING_BATCH_SIZE
+            )
+        except ParsingTimeoutError:
+            raise ParsingTimeoutError(f"Parsing {file_path.name} exceeded {self.job_timeout}s") from None
+
+    def shutdown(self) -> None:
+        """Stop the worker processes, cancelling queued jobs"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+def record_parsing_statistics(db: Session, parse_time: Optional[float], success: bool) -> None:
+    """Fold one parse into the ParsingStatistics aggregate row"""
+    try:
+        stats = (
+            db.query(ParsingStatistics)
+            .order_by(ParsingStatistics.StatID)
+            .with_for_update()
+            .first()
+        )
+        if stats is None:
+            stats = ParsingStatistics(TotalFiles=0, SuccessfulParses=0, FailedParses=0)
+            db.add(stats)
+
+        stats.TotalFiles = (stats.TotalFiles or 0) + 1
+        if success:
+            previous = stats.SuccessfulParses or 0
+            if parse_time is not None:
+                stats.AverageParseTime = ((stats.AverageParseTime or 0.0) * previous + parse_time) / (previous + 1)
+            stats.SuccessfulParses = previous + 1
+        else:
+            stats.FailedParses = (stats.FailedParses or 0) + 1
+
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Failed to record parsing statistics: {e}")
+
+
+# Global executor instance
+parsing_executor = ParsingExecutor(
+    max_workers=config.PARSER_MAX_WORKERS,
+    queue_size=config.PARSER_QUEUE_SIZE,
+    job_timeout=config.PARSER_JOB_TIMEOUT,
+    start_method=config.PARSER_START_METHOD
+)
@@ -0,0 +1,363 @@
+"""
+In-memory search index over the Mali reference tables (TableRef 01-09)
+The reference tables are small and rarely change, so their active rows are
+kept in memory with accent- and case-insensitive search text and a trigram
+index: autocomplete lookups are answered without a database round-trip. The
+index is reloaded after a commit changing a reference table in this process,
+and a periodic job reloads the tables changed elsewhere. When the index is
+unavailable, searches go to the database, through the pg_trgm GIN indexes of
+migration 009 when present
+"""
+import hashlib
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional, Set, Tuple
+import logging
+
+from sqlalchemy import case, event, func, literal, or_, select, text, union_all
+from sqlalchemy.orm import Session
+
+import config
+from src.infrastructure.database.mali_ref_models import (
+    StrategicAxisResultModel, INSTATStructureModel, CMRIndicatorModel,
+    OperationalResultModel, ParticipatingStructureModel, MonitoringIndicatorModel,
+    FinancingSourceModel, MaliRegionModel, MaliCercleModel
+)
+from src.utils.periodic_job import PeriodicJob
+from schemas.mali_reference_tables import (
+    StrategicAxisResult, INSTATStructure, CMRIndicator, OperationalResult,
+    ParticipatingStructure, MonitoringIndicator, FinancingSource, MaliRegion, MaliCercle
+)
+
+logger = logging.getLogger(__name__)
+
+# Table Reference Mapping
+TABLE_REF_MAPPING = {
+    "TableRef:01": {
+        "model": StrategicAxisResultModel,
+        "schema": StrategicAxisResult,
+        "name": "Axe stratégique/Objectifs opérationnel/Résultats attendus du SDS",
+        "search_fields": ["strategic_axis", "operational_objective", "expected_result"],
+        "display_fields": ["result_id", "strategic_axis", "operational_objective"],
+        "code_field": "result_id"
+    },
+    "TableRef:02": {
+        "model": INSTATStructureModel,
+        "schema": INSTATStructure,
+        "name": "Liste des Structures pour les revues SDS",
+        "search_fields": ["structure_name", "abbreviation"],
+        "display_fields": ["structure_id", "structure_name", "abbreviation"],
+        "code_field": "structure_id"
+    },
+    "TableRef:03": {
+        "model": CMRIndicatorModel,
+        "schema": CMRIndicator,
+        "name": "Indicateurs CMR",
+        "search_fields": ["indicator_name", "category"],
+        "display_fields": ["indicator_id", "indicator_name", "category"],
+        "code_field": "indicator_id"
+    },
+    "TableRef:04": {
+        "model": OperationalResultModel,
+        "schema": OperationalResult,
+        "name": "Résultat attendu par Objectif opérationnel et Axe",
+        "search_fields": ["result_description"],
+        "display_fields": ["result_code", "result_description"],
+        "code_field": "result_code"
+    },
+    "TableRef:05": {
+        "model": ParticipatingStructureModel,
+        "schema": ParticipatingStructure,
+        "name": "Autres structures devant participer à l'activité",
+        "search_fields": ["structure_name", "participation_type"],
+        "display_fields": ["structure_code", "structure_name", "participation_type"],
+        "code_field": "structure_code"
+    },
+    "TableRef:06": {
+        "model": MonitoringIndicatorModel,
+        "schema": MonitoringIndicator,
+        "name": "Indicateur de Suivi-évaluation",
+        "search_fields": ["indicator_name", "category"],
+        "display_fields": ["indicator_code", "indicator_name", "category"],
+        "code_field": "indicator_code"
+    },
+    "TableRef:07": {
+        "model": FinancingSourceModel,
+        "schema": FinancingSource,
+        "name": "Sources de financement",
+        "search_fields": ["source_name", "source_type"],
+        "display_fields": ["source_code", "source_name", "source_type"],
+        "code_field": "source_code"
+    },
+    "TableRef:08": {
+        "model": MaliRegionModel,
+        "schema": MaliRegion,
+        "name": "Liste des régions selon le découpage administratif du Mali",
+        "search_fields": ["region_name", "region_capital"],
+        "display_fields": ["region_code", "region_name", "region_capital"],
+        "code_field": "region_code"
+    },
+    "TableRef:09": {
+        "model": MaliCercleModel,
+        "schema": MaliCercle,
+        "name": "Liste des cercles selon le découpage administratif du Mali",
+        "search_fields": ["cercle_name", "cercle_capital"],
+        "display_fields": ["cercle_code", "cercle_name", "region_code"],
+        "code_field": "cercle_code"
+    }
+}
+
+REFERENCE_MODELS = tuple(mapping["model"] for mapping in TABLE_REF_MAPPING.values())
+
+# SQL counterpart of normalize_search_text, created by migration 009 on PostgreSQL
+SEARCH_TEXT_FUNCTION = "reference_search_text"
+
+
+def normalize_search_text(value: Any) -> str:
+    """Lower-case text without accents or repeated spaces ("Ségou " -> "segou")"""
+    if value is None:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", str(value))
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.casefold().split())
+
+
+def _trigrams(value: str) -> Set[str]:
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+class _TableIndex:
+    """Active rows of one reference table with their search text"""
+
+    def __init__(self, rows: List[Dict[str, Any]], search_fields: List[str], code_field: str):
+        self.rows = rows
+        self.codes: Set[Any] = {row.get(code_field) for row in rows}
+        # Normalized text of each search field, per row
+        self.texts: List[Tuple[str, ...]] = [
+            tuple(normalize_search_text(row.get(field)) for field in search_fields) for row in rows
+        ]
+        self.postings: Dict[str, Set[int]] = {}
+        for position, texts in enumerate(self.texts):
+            for value in texts:
+                for trigram in _trigrams(value):
+                    self.postings.setdefault(trigram, set()).add(position)
+
+    def _candidates(self, term: str) -> List[int]:
+        """Positions of the rows that may contain term"""
+        trigrams = _trigrams(term)
+        if not trigrams:
+            return list(range(len(self.rows)))
+        postings = sorted((self.postings.get(trigram, set()) for trigram in trigrams), key=len)
+        return sorted(set.intersection(*postings)) if postings[0] else []
+
+    def search(self, term: str) -> List[Dict[str, Any]]:
+        """Rows with term in a search field: field prefixes, then word prefixes, then other matches"""
+        ranked = []
+        word_start = " " + term
+        for position in self._candidates(term):
+            rank = None
+            for value in self.texts[position]:
+                if value.startswith(term):
+                    rank = 0
+                    break
+                if word_start in value:
+                    rank = 1
+                elif rank is None and term in value:
+                    rank = 2
+            if rank is not None:
+                ranked.append((rank, position))
+        ranked.sort()
+        return [self.rows[position] for _, position in ranked]
+
+
+class ReferenceIndex:
+    """
+    Search index over the active rows of the reference tables
+    """
+
+    def __init__(self, tables: Dict[str, Dict[str, Any]], enabled: bool = True):
+        self.tables = tables
+        self.enabled = enabled
+        self._indexes: Dict[str, _TableIndex] = {}
+        self._signatures: Dict[str, Tuple] = {}
+        self._stale = True
+        self._lock = threading.Lock()
+        self._search_function: Dict[str, bool] = {}
+        self._stats = {"searches": 0, "validations": 0, "fallbacks": 0, "reloads": 0}
+
+    @property
+    def is_loaded(self) -> bool:
+        return len(self._indexes) == len(self.tables)
+
+    def mark_stale(self) -> None:
+        """Check the tables for changes before the next search"""
+        self._stale = True
+
+    def _table_signatures(self, db: Session) -> Dict[str, Tuple]:
+        """Row counts and latest change time of every table, in one query"""
+        parts = []
+        for table_ref, mapping in self.tables.items():
+            model = mapping["model"]
+            parts.append(select(
+                literal(table_ref).label("table_ref"),
+                func.count().label("rows"),
+                func.sum(case((model.is_active == True, 1), else_=0)).label("active_rows"),
+                func.max(model.id).label("max_id"),
+                func.max(func.coalesce(model.updated_at, model.created_at)).label("changed_at")
+            ))
+        rows = db.execute(union_all(*parts)).all()
+        return {row.table_ref: tuple(row[1:]) for row in rows}
+
+    def _load_table(self, db: Session, table_ref: str) -> _TableIndex:
+        mapping = self.tables[table_ref]
+        model = mapping["model"]
+        columns = [column.key for column in model.__table__.columns]
+        records = db.query(model).filter(model.is_active == True).order_by(model.id).all()
+        rows = [{column: getattr(record, column) for column in columns} for record in records]
+        return _TableIndex(rows, mapping["search_fields"], mapping["code_field"])
+
+    def refresh(self, db: Optional[Session] = None) -> Dict[str, Any]:
+        """Reload the tables changed since they were loaded; returns the tables reloaded"""
+        if db is None:
+            from src.infrastructure.database.connection import db_manager
+            with db_manager.SessionLocal() as session:
+                return self.refresh(session)
+
+        with self._lock:
+            self._stale = False
+            try:
+                signatures = self._table_signatures(db)
+                reloaded = []
+                for table_ref in self.tables:
+                    if table_ref in self._indexes and self._signatures.get(table_ref) == signatures.get(table_ref):
+                        continue
+                    self._indexes[table_ref] = self._load_table(db, table_ref)
+                    self._signatures[table_ref] = signatures.get(table_ref)
+                    reloaded.append(table_ref)
+            except Exception:
+                self._stale = True
+                raise
+            if reloaded:
+                self._stats["reloads"] += 1
+                logger.info(f"Reference index loaded {', '.join(reloaded)}")
+            return {"reloaded": reloaded}
+
+    def _ensure_current(self, db: Session) -> bool:
+        """Reload the index if stale; whether it can be used"""
+        if not self.enabled:
+            return False
+        if self._stale or not self.is_loaded:
+            try:
+                self.refresh(db)
+            except Exception as e:
+                self._stats["fallbacks"] += 1
+                logger.warning(f"Reference index unavailable, searching the database: {e}")
+                return False
+        return True
+
+    def version(self, db: Session, table_ref: str) -> str:
+        """Tag of the current rows of table_ref, changing whenever they change"""
+        if self._ensure_current(db):
+            signature = self._signatures[table_ref]
+        else:
+            signature = self._table_signatures(db)[table_ref]
+        return hashlib.sha1(repr(signature).encode("utf-8")).hexdigest()[:16]
+
+    def search(self, db: Session, table_ref: str, term: Optional[str] = None,
+               filters: Optional[Dict[str, Any]] = None, skip: int = 0,
+               limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Active rows of table_ref (as column -> value dicts) containing term in
+        a search field, accents and case ignored, and equal to every non-None
+        filter; best matches first. Returns None when the index cannot be used,
+        so the caller queries the database.
+        """
+        if not self._ensure_current(db):
+            return None
+
+        index = self._indexes[table_ref]
+        normalized = normalize_search_text(term)
+        rows = index.search(normalized) if normalized else index.rows
+        if filters:
+            active_filters = [(field, value) for field, value in filters.items() if value is not None]
+            rows = [row for row in rows if all(row.get(field) == value for field, value in active_filters)]
+        self._stats["searches"] += 1
+        return rows[skip:skip + limit] if limit else rows[skip:]
+
+    def existing_codes(self, db: Session, codes_by_table: Dict[str, Set[str]]) -> Dict[str, Set[str]]:
+        """
+        The codes of codes_by_table that belong to an active row of their
+        table: from memory, or with one IN query per table.
+        """
+        if self._ensure_current(db):
+            self._stats["validations"] += 1
+            return {table_ref: codes & self._indexes[table_ref].codes
+                    for table_ref, codes in codes_by_table.items()}
+
+        existing = {}
+        for table_ref, codes in codes_by_table.items():
+            model = self.tables[table_ref]["model"]
+            code_column = getattr(model, self.tables[table_ref]["code_field"])
+            existing[table_ref] = set(db.execute(
+                select(code_column).where(code_column.in_(codes), model.is_active == True)
+            ).scalars()) if codes else set()
+        return existing
+
+    def _has_search_function(self, db: Session) -> bool:
+        bind = db.get_bind()
+        key = str(bind.url)
+        if key not in self._search_function:
+            available = False
+            if bind.dialect.name == "postgresql":
+                available = db.execute(
+                    text("SELECT to_regprocedure(:signature) IS NOT NULL"),
+                    {"signature": f"{SEARCH_TEXT_FUNCTION}(text)"}
+                ).scalar()
+            self._search_function[key] = bool(available)
+        return self._search_function[key]
+
+    def search_condition(self, db: Session, table_ref: str, term: str):
+        """SQL filter matching term in the search fields of table_ref (the database path)"""
+        model = self.tables[table_ref]["model"]
+        columns = [getattr(model, field) for field in self.tables[table_ref]["search_fields"]]
+        if self._has_search_function(db):
+            # Uses the trigram GIN indexes on reference_search_text(column)
+            normalized = normalize_search_text(term)
+            return or_(*[getattr(func, SEARCH_TEXT_FUNCTION)(column).contains(normalized, autoescape=True)
+                         for column in columns])
+        return or_(*[column.icontains(term, autoescape=True) for column in columns])
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Rows indexed per table and usage counters"""
+        return dict(
+            self._stats,
+            enabled=self.enabled,
+            loaded=self.is_loaded,
+            rows={table_ref: len(index.rows) for table_ref, index in self._indexes.items()}
+        )
+
+
+# Global reference index instance
+reference_index = ReferenceIndex(TABLE_REF_MAPPING, enabled=config.REFERENCE_INDEX_ENABLED)
+
+
+@event.listens_for(Session, "after_flush")
+def _note_reference_changes(session: Session, _flush_context) -> None:
+    if any(isinstance(instance, REFERENCE_MODELS)
+           for instance in (*session.new, *session.dirty, *session.deleted)):
+        session.info["reference_tables_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _reload_after_commit(session: Session) -> None:
+    if session.info.pop("reference_tables_changed", False):
+        reference_index.mark_stale()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_reference_changes(session: Session) -> None:
+    session.info.pop("reference_tables_changed", None)
+
+
+# Global reference index refresh job instance (picks up changes made by other processes)
+reference_index_job = PeriodicJob("reference-index", config.REFERENCE_INDEX_REFRESH_INTERVAL, reference_index.refresh)
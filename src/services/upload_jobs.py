@@ -0,0 +1,266 @@
+"""
+Service for asynchronous upload jobs
+Each job is a ParsingResult row recording the outcome and duration of every
+pipeline stage (parse, validate, create survey, create template), so clients
+can poll its progress instead of holding the upload request open.
+A job whose process stopped before finishing it stays queued or running;
+such jobs are marked failed once they have not been updated for
+UPLOAD_JOB_TIMEOUT_SECONDS, at startup and when polled. The worker's own
+updates only apply while the job is still queued or running
+"""
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+import config
+from src.infrastructure.database.models import ParsingResult
+
+UPLOAD_JOB_STAGES = ("parse", "validate", "create_survey", "create_template")
+
+# Statuses of jobs a background task still has to finish
+ACTIVE_STATUSES = ("queued", "running")
+
+STALE_JOB_ERROR = "Upload job interrupted: the job stopped making progress"
+
+
+class UploadJobAbortedError(Exception):
+    """The job is no longer queued or running, e.g. failed as stale"""
+
+
+class UploadJobService:
+    """
+    Service for creating upload jobs and recording their stage outcomes
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create_job(
+            self,
+            file_name: str,
+            file_hash: str,
+            schema_name: str,
+            created_by: str,
+            create_template: bool = True
+    ) -> ParsingResult:
+        """
+        Register a queued upload job with all its stages pending
+        """
+        stages = [
+            {
+                "name": stage,
+                "status": "pending",
+                "started_at": None,
+                "finished_at": None,
+                "duration_seconds": None,
+                "error": None,
+                "details": None
+            }
+            for stage in UPLOAD_JOB_STAGES
+        ]
+        if not create_template:
+            stages[-1]["status"] = "skipped"
+
+        job = ParsingResult(
+            JobID=str(uuid.uuid4()),
+            FileName=file_name,
+            FileHash=file_hash,
+            SchemaName=schema_name,
+            CreatedBy=created_by,
+            Status="queued",
+            Success=False,
+            Stages=stages
+        )
+        self.db.add(job)
+        self.db.commit()
+        self.db.refresh(job)
+        return job
+
+    def get_job(self, job_id: str) -> Optional[ParsingResult]:
+        """
+        Get an upload job by its job id
+        """
+        return self.db.query(ParsingResult).filter(ParsingResult.JobID == job_id).first()
+
+    def fail_stale_jobs(self, now: Optional[datetime] = None) -> int:
+        """
+        Mark as failed the queued or running jobs not updated for UPLOAD_JOB_TIMEOUT_SECONDS
+        """
+        now = now or datetime.utcnow()
+        stale = (
+            self.db.query(ParsingResult)
+            .filter(ParsingResult.Status.in_(ACTIVE_STATUSES), self._stale_before(now))
+            .all()
+        )
+        return sum(self._fail_stale(job, now) for job in stale)
+
+    def fail_if_stale(self, job: ParsingResult, now: Optional[datetime] = None) -> bool:
+        """
+        Mark a polled job as failed if it is queued or running but not updated for UPLOAD_JOB_TIMEOUT_SECONDS
+        """
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(seconds=config.UPLOAD_JOB_TIMEOUT_SECONDS)
+        if job.Status not in ACTIVE_STATUSES or (job.UpdatedAt is not None and job.UpdatedAt >= cutoff):
+            return False
+        return self._fail_stale(job, now)
+
+    @staticmethod
+    def _stale_before(now: datetime):
+        cutoff = now - timedelta(seconds=config.UPLOAD_JOB_TIMEOUT_SECONDS)
+        return or_(ParsingResult.UpdatedAt < cutoff, ParsingResult.UpdatedAt.is_(None))
+
+    def _fail_stale(self, job: ParsingResult, now: datetime) -> bool:
+        # Conditional on the row still being stale, so a worker update since it was read wins
+        updated = (
+            self.db.query(ParsingResult)
+            .filter(
+                ParsingResult.JobID == job.JobID,
+                ParsingResult.Status.in_(ACTIVE_STATUSES),
+                self._stale_before(now)
+            )
+            .update({
+                "Stages": [
+                    dict(entry, status="failed", error=STALE_JOB_ERROR) if entry["status"] == "running"
+                    else dict(entry, status="skipped") if entry["status"] == "pending"
+                    else entry
+                    for entry in job.Stages or []
+                ],
+                "Status": "failed",
+                "Success": False,
+                "CurrentStage": None,
+                "ErrorMessage": STALE_JOB_ERROR,
+                "UpdatedAt": now
+            }, synchronize_session=False)
+        )
+        self.db.commit()
+        return updated > 0
+
+    def _update_job(self, job: ParsingResult, values: Dict[str, Any]) -> bool:
+        """
+        Apply values to the job's row if it is still queued or running; returns whether it was
+        """
+        updated = (
+            self.db.query(ParsingResult)
+            .filter(ParsingResult.JobID == job.JobID, ParsingResult.Status.in_(ACTIVE_STATUSES))
+            .update(dict(values, UpdatedAt=datetime.utcnow()), synchronize_session=False)
+        )
+        self.db.commit()
+        return updated > 0
+
+    def _advance_job(self, job: ParsingResult, values: Dict[str, Any]) -> None:
+        """
+        Apply values to a queued or running job, raising UploadJobAbortedError when it is neither
+        """
+        if not self._update_job(job, values):
+            raise UploadJobAbortedError(f"Upload job {job.JobID} is no longer queued or running")
+
+    def start_stage(self, job: ParsingResult, stage: str) -> float:
+        """
+        Mark a stage as running and return its start time (perf counter)
+        """
+        self._advance_job(job, {
+            "Stages": self._updated_stages(job, stage, status="running", started_at=datetime.utcnow().isoformat()),
+            "Status": "running",
+            "CurrentStage": stage
+        })
+        return time.perf_counter()
+
+    def finish_stage(
+            self,
+            job: ParsingResult,
+            stage: str,
+            started: float,
+            status: str = "completed",
+            error: Optional[str] = None,
+            details: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Record the outcome and duration of a stage started with start_stage
+        """
+        self._advance_job(job, {"Stages": self._updated_stages(
+            job,
+            stage,
+            status=status,
+            finished_at=datetime.utcnow().isoformat(),
+            duration_seconds=round(time.perf_counter() - started, 3),
+            error=error,
+            details=details
+        )})
+
+    def complete_job(
+            self,
+            job: ParsingResult,
+            survey_id: Optional[int],
+            template_id: Optional[int],
+            parsed_data: Dict[str, Any]
+    ) -> None:
+        """
+        Mark a job as successfully completed
+        """
+        self._advance_job(job, {
+            "Status": "completed",
+            "Success": True,
+            "CurrentStage": None,
+            "SurveyID": survey_id,
+            "TemplateID": template_id,
+            "ParsedData": parsed_data
+        })
+
+    def fail_job(
+            self,
+            job: ParsingResult,
+            error_message: str,
+            validation_issues: Optional[List[str]] = None,
+            parsed_data: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Mark a job as failed, skipping the stages that did not run, unless it has already finished
+        """
+        self.db.rollback()
+        self._update_job(job, {
+            "Stages": [
+                dict(entry, status="skipped") if entry["status"] == "pending" else entry
+                for entry in job.Stages or []
+            ],
+            "Status": "failed",
+            "Success": False,
+            "ErrorMessage": error_message,
+            "ValidationIssues": validation_issues,
+            "ParsedData": parsed_data
+        })
+
+    @staticmethod
+    def job_progress(job: ParsingResult, include_structure: bool = False) -> Dict[str, Any]:
+        """
+        Progress report of a job, as returned by the status endpoint
+        """
+        stages = job.Stages or []
+        done = sum(1 for entry in stages if entry["status"] in ("completed", "failed", "skipped"))
+        return {
+            "job_id": job.JobID,
+            "status": job.Status,
+            "file_name": job.FileName,
+            "schema_name": job.SchemaName,
+            "current_stage": job.CurrentStage,
+            "progress": round(100.0 * done / len(stages), 1) if stages else 0.0,
+            "stages": stages,
+            "survey_id": job.SurveyID,
+            "template_id": job.TemplateID,
+            "issues": job.ValidationIssues,
+            "error_message": job.ErrorMessage,
+            "survey_structure": job.ParsedData if include_structure else None,
+            "created_by": job.CreatedBy,
+            "created_at": job.Timestamp,
+            "updated_at": job.UpdatedAt
+        }
+
+    @staticmethod
+    def _updated_stages(job: ParsingResult, stage: str, **changes) -> List[Dict[str, Any]]:
+        return [
+            dict(entry, **changes) if entry["name"] == stage else entry
+            for entry in job.Stages or []
+        ]
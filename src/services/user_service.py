@@ -9,7 +9,8 @@ import secrets
 import string
 
 from src.infrastructure.database import models
-from src.infrastructure.auth.oauth2 import get_password_hash, verify_password
+from src.infrastructure.auth.oauth2 import invalidate_cached_user
+from src.infrastructure.auth.password_hashing import password_hasher
 from schemas.user_schemas import UserCreate, UserUpdate, UserResponse, PasswordResetRequest, PasswordResetResponse
 
 
@@ -19,7 +20,7 @@ class UserService:
     def __init__(self, db: Session):
         self.db = db
     
-    def create_user(self, user_data: UserCreate) -> UserResponse:
+    async def create_user(self, user_data: UserCreate, client_ip: Optional[str] = None) -> UserResponse:
         """Create a new user"""
         # Check if user already exists (email serves as username)
         existing_user = self.db.query(models.User).filter(
@@ -34,7 +35,7 @@ class UserService:
             )
         
         # Hash the password
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await password_hasher.hash(user_data.password, client_ip)
         
         # Create new user (username is the email)
         db_user = models.User(
@@ -156,6 +157,7 @@ class UserService:
         user = self.db.query(models.User).filter(models.User.UserID == user_id).first()
         if not user:
             return None
+        previous_username = user.Username
         
         # Update fields if provided
         if user_update.email:
@@ -189,6 +191,8 @@ class UserService:
         
         try:
             self.db.commit()
+            invalidate_cached_user(previous_username)
+            invalidate_cached_user(user.Username)
             self.db.refresh(user)
             
             return UserResponse(
@@ -217,8 +221,10 @@ class UserService:
             return False
         
         try:
+            username = user.Username
             self.db.delete(user)
             self.db.commit()
+            invalidate_cached_user(username)
             return True
         except Exception as e:
             self.db.rollback()
@@ -227,27 +233,30 @@ class UserService:
                 detail=f"Failed to delete user: {str(e)}"
             )
     
-    async def change_password(self, user_id: int, current_password: str, new_password: str) -> None:
+    async def change_password(self, user_id: int, current_password: str, new_password: str,
+                              client_ip: Optional[str] = None) -> None:
         """Change user password"""
         user = self.db.query(models.User).filter(models.User.UserID == user_id).first()
         if not user:
             raise ValueError("User not found")
         
         # Verify current password
-        if not verify_password(current_password, user.HashedPassword):
+        if not await password_hasher.verify(current_password, user.HashedPassword, client_ip):
             raise ValueError("Current password is incorrect")
         
         # Hash new password
-        hashed_new_password = get_password_hash(new_password)
+        hashed_new_password = await password_hasher.hash(new_password, client_ip)
         
         try:
             user.HashedPassword = hashed_new_password
             self.db.commit()
+            invalidate_cached_user(user.Username)
         except Exception as e:
             self.db.rollback()
             raise ValueError(f"Failed to change password: {str(e)}")
     
-    def reset_user_password(self, user_id: int, reset_request: PasswordResetRequest) -> PasswordResetResponse:
+    async def reset_user_password(self, user_id: int, reset_request: PasswordResetRequest,
+                                  client_ip: Optional[str] = None) -> PasswordResetResponse:
         """Reset user password to a temporary password"""
         user = self.db.query(models.User).filter(models.User.UserID == user_id).first()
         if not user:
@@ -260,12 +269,13 @@ class UserService:
         temp_password = self._generate_temp_password(reset_request.temp_password_length or 12)
         
         # Hash the temporary password
-        hashed_temp_password = get_password_hash(temp_password)
+        hashed_temp_password = await password_hasher.hash(temp_password, client_ip)
         
         try:
             # Update user's password
             user.HashedPassword = hashed_temp_password
             self.db.commit()
+            invalidate_cached_user(user.Username)
             self.db.refresh(user)
             
             # Create response
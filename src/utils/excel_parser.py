@@ -9,14 +9,22 @@ from pathlib import Path
 import logging
 import re
 
+from .excel_streaming import StreamingWorkbookReader, DEFAULT_CHUNK_SIZE, should_stream
+
 logger = logging.getLogger(__name__)
 
 
 class ExcelParser:
     """Enhanced parser for Excel files with INSTAT structured survey data"""
 
-    def __init__(self):
+    # Number of rows sniffed by _is_structured_format
+    SNIFF_ROWS = 20
+
+    def __init__(self, streaming_threshold: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
         self.supported_formats = ['.xlsx', '.xls']
+        # Files at least this large (bytes) are parsed in streaming mode; None disables it
+        self.streaming_threshold = streaming_threshold
+        self.chunk_size = chunk_size
         self.entry_types = {
             'Survey': 'survey',
             'Context': 'context', 
@@ -26,15 +34,25 @@ class ExcelParser:
             'Response': 'response'
         }
 
-    def parse_file(self, file_path: Path) -> Dict[str, Any]:
-        """Parse Excel file and return survey structure"""
+    def parse_file(self, file_path: Path, streaming: Optional[bool] = None) -> Dict[str, Any]:
+        """Parse Excel file and return survey structure
+
+        With streaming=None the mode is picked from the file size and
+        streaming_threshold; streaming=True forces read-only row streaming.
+        """
         if not file_path.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
 
         if file_path.suffix.lower() not in self.supported_formats:
             raise ValueError(f"Unsupported file format: {file_path.suffix}")
 
+        if streaming is None:
+            streaming = should_stream(file_path, self.streaming_threshold)
+
         try:
+            if streaming:
+                return self._parse_file_streaming(file_path)
+
             # Read all sheets from Excel file
             excel_data = pd.read_excel(file_path, sheet_name=None, engine='openpyxl')
             
@@ -68,6 +86,40 @@ class ExcelParser:
             logger.error(f"Error parsing Excel file {file_path}: {str(e)}")
             raise
 
+    def _parse_file_streaming(self, file_path: Path) -> Dict[str, Any]:
+        """Parse the workbook with read-only row iterators, one chunk at a time"""
+        with StreamingWorkbookReader(file_path, chunk_size=self.chunk_size) as workbook:
+            # First try structured INSTAT parsing, stopping at the first structured sheet
+            for sheet in workbook.sheets():
+                parsed_survey = self._parse_structured_stream(sheet, file_path)
+                if parsed_survey:
+                    logger.info(f"Successfully parsed structured format from sheet: {sheet.name}")
+                    return parsed_survey
+
+        # Fallback to basic parsing if structured parsing fails
+        logger.info("Structured parsing failed, falling back to basic parsing")
+        survey_structure = {
+            "title": file_path.stem,
+            "description": f"Survey generated from {file_path.name}",
+            "sections": []
+        }
+
+        with StreamingWorkbookReader(file_path, chunk_size=self.chunk_size) as workbook:
+            for sheet in workbook.sheets():
+                section = None
+                for chunk in sheet.chunks():
+                    chunk_section = self._parse_sheet_basic(sheet.name, chunk)
+                    if not chunk_section:
+                        continue
+                    if section is None:
+                        section = chunk_section
+                    else:
+                        section["questions"].extend(chunk_section["questions"])
+                if section:
+                    survey_structure["sections"].append(section)
+
+        return survey_structure
+
     def _parse_sheet(self, sheet_name: str, df: pd.DataFrame) -> Optional[Dict[str, Any]]:
         """Parse individual sheet to extract section structure"""
         if df.empty:
@@ -222,36 +274,73 @@ class ExcelParser:
         logger.info(f"Parsing structured INSTAT format for sheet: {sheet_name}")
 
         # Map the DataFrame columns to expected structure
-        df_clean = df.copy()
-        
+        column_mapping, header_in_first_row = self._resolve_column_mapping(df)
+        df_clean = self._apply_column_mapping(df.copy(), column_mapping)
+        if header_in_first_row:
+            # Remove header row
+            df_clean = df_clean.iloc[1:].reset_index(drop=True)
+
+        # Parse the hierarchical structure
+        return self._build_survey_structure(df_clean, file_path)
+
+    def _parse_structured_stream(self, sheet, file_path: Path) -> Optional[Dict[str, Any]]:
+        """Streaming counterpart of _parse_structured_sheet"""
+        # Sniff the sheet on its first rows only
+        preview = sheet.preview(self.SNIFF_ROWS)
+        if preview.empty or len(preview.columns) < 5:
+            return None
+
+        if not self._is_structured_format(preview):
+            return None
+
+        logger.info(f"Parsing structured INSTAT format for sheet: {sheet.name} (streaming)")
+
+        column_mapping, header_in_first_row = self._resolve_column_mapping(preview)
+
+        def rows():
+            for chunk in sheet.chunks(skip_rows=1 if header_in_first_row else 0):
+                yield from self._apply_column_mapping(chunk, column_mapping).iterrows()
+
+        return self._assemble_survey_structure(rows(), file_path)
+
+    def _resolve_column_mapping(self, df: pd.DataFrame) -> tuple:
+        """Work out which columns hold entryLabel/entryName/entryParentIndex/entryIndex
+
+        Returns the column renames, applied one after the other, and whether
+        the first data row is a header row to drop.
+        """
+        column_mapping = []
+
         # Handle different column naming patterns
         if 'entryLabel' in df.iloc[0].values:
             # Header is in first row
-            header_row = 0
-            for i, val in enumerate(df.iloc[header_row]):
+            for i, val in enumerate(df.iloc[0]):
                 if pd.notna(val):
                     if 'entryLabel' in str(val):
-                        df_clean = df_clean.rename(columns={df.columns[i]: 'entryLabel'})
+                        column_mapping.append({df.columns[i]: 'entryLabel'})
                     elif 'entryName' in str(val):
-                        df_clean = df_clean.rename(columns={df.columns[i]: 'entryName'})
+                        column_mapping.append({df.columns[i]: 'entryName'})
                     elif 'entryParentIndex' in str(val):
-                        df_clean = df_clean.rename(columns={df.columns[i]: 'entryParentIndex'})
+                        column_mapping.append({df.columns[i]: 'entryParentIndex'})
                     elif 'entryIndex' in str(val):
-                        df_clean = df_clean.rename(columns={df.columns[i]: 'entryIndex'})
-            # Remove header row
-            df_clean = df_clean.iloc[1:].reset_index(drop=True)
-        else:
-            # Use positional mapping based on observed patterns
-            col_mapping = {}
-            if len(df.columns) >= 5:
-                col_mapping[df.columns[1]] = 'entryLabel'  # Column 1: Label
-                col_mapping[df.columns[2]] = 'entryName'   # Column 2: Type
-                col_mapping[df.columns[3]] = 'entryParentIndex'  # Column 3: Parent
-                col_mapping[df.columns[4]] = 'entryIndex'  # Column 4: Index
-            df_clean = df_clean.rename(columns=col_mapping)
-
-        # Parse the hierarchical structure
-        return self._build_survey_structure(df_clean, file_path)
+                        column_mapping.append({df.columns[i]: 'entryIndex'})
+            return column_mapping, True
+
+        # Use positional mapping based on observed patterns
+        col_mapping = {}
+        if len(df.columns) >= 5:
+            col_mapping[df.columns[1]] = 'entryLabel'  # Column 1: Label
+            col_mapping[df.columns[2]] = 'entryName'   # Column 2: Type
+            col_mapping[df.columns[3]] = 'entryParentIndex'  # Column 3: Parent
+            col_mapping[df.columns[4]] = 'entryIndex'  # Column 4: Index
+        return [col_mapping], False
+
+    @staticmethod
+    def _apply_column_mapping(df: pd.DataFrame, column_mapping: list) -> pd.DataFrame:
+        """Apply the renames returned by _resolve_column_mapping"""
+        for renames in column_mapping:
+            df = df.rename(columns=renames)
+        return df
 
     def _is_structured_format(self, df: pd.DataFrame) -> bool:
         """Check if DataFrame has INSTAT structured format"""
@@ -274,6 +363,10 @@ class ExcelParser:
 
     def _build_survey_structure(self, df: pd.DataFrame, file_path: Path) -> Dict[str, Any]:
         """Build survey structure from parsed DataFrame"""
+        return self._assemble_survey_structure(df.iterrows(), file_path)
+
+    def _assemble_survey_structure(self, rows, file_path: Path) -> Dict[str, Any]:
+        """Build survey structure from (index, row) pairs, which may be a generator"""
         
         # Initialize the survey structure
         survey_structure = {
@@ -282,7 +375,7 @@ class ExcelParser:
             "sections": [],
             "metadata": {
                 "source_file": file_path.name,
-                "total_rows": len(df)
+                "total_rows": 0
             }
         }
 
@@ -290,9 +383,11 @@ class ExcelParser:
         current_section = None
         current_subsection = None
         current_question = None
+        total_rows = 0
         
         # Process each row
-        for idx, row in df.iterrows():
+        for idx, row in rows:
+            total_rows += 1
             try:
                 entry_type = self._get_entry_type(row)
                 entry_label = self._get_entry_label(row)
@@ -396,6 +491,7 @@ class ExcelParser:
                 logger.warning(f"Error processing row {idx}: {e}")
                 continue
 
+        survey_structure["metadata"]["total_rows"] = total_rows
         return survey_structure
 
     def _get_entry_type(self, row) -> Optional[str]:
@@ -0,0 +1,166 @@
+"""
+Streaming read-only access to Excel workbooks
+Iterates worksheet rows through openpyxl read-only mode and hands them out as
+fixed-size pandas chunks, so huge workbooks can be parsed with flat memory
+"""
+from pathlib import Path
+from typing import Any, Iterator, List, Optional
+import logging
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+
+logger = logging.getLogger(__name__)
+
+# Cell strings pandas.read_excel treats as missing values by default
+NA_STRINGS = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND',
+    '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+}
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+class StreamingSheet:
+    """Row stream over one worksheet
+
+    The first row is the header, as with pd.read_excel(header=0). Data rows are
+    converted the way pandas' openpyxl reader converts them (integral floats to
+    int, error cells and NA strings to NaN, trailing empty rows dropped), but
+    cells keep their Python types (object dtype) since column dtypes cannot be
+    inferred without reading the whole sheet. Columns grow as wider rows show
+    up, with the same "Unnamed: i" labels pandas would give them.
+    """
+
+    def __init__(self, worksheet, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.name = worksheet.title
+        self.chunk_size = chunk_size
+        # Declared dimensions are often wrong (e.g. 16383 columns), rely on the cells
+        worksheet.reset_dimensions()
+        self._rows = self._data_rows(worksheet.iter_rows())
+        self._buffer: List[List[Any]] = []
+
+        self._header = next(self._rows, None) or []
+        self.columns: List[Any] = []
+        self._seen_columns = set()
+
+    @staticmethod
+    def _convert_cell(cell) -> Any:
+        """Convert a cell like pandas' openpyxl reader does"""
+        if cell.value is None:
+            return ""
+        elif cell.data_type == TYPE_ERROR:
+            return np.nan
+        elif cell.data_type == TYPE_NUMERIC:
+            val = int(cell.value)
+            if val == cell.value:
+                return val
+            return float(cell.value)
+        return cell.value
+
+    def _data_rows(self, rows) -> Iterator[List[Any]]:
+        """Converted rows, holding back blank rows until a non-blank row follows"""
+        pending_blank = 0
+        for row in rows:
+            converted = [self._convert_cell(cell) for cell in row]
+            while converted and converted[-1] == "":
+                converted.pop()
+            if not converted:
+                pending_blank += 1
+                continue
+            for _ in range(pending_blank):
+                yield []
+            pending_blank = 0
+            yield converted
+
+    def _grow_columns(self, width: int) -> None:
+        """Extend the column labels from the header row (Unnamed: i, name.1, ...)"""
+        for i in range(len(self.columns), max(width, len(self._header))):
+            value = self._header[i] if i < len(self._header) else ""
+            name = f"Unnamed: {i}" if value == "" else value
+            if name in self._seen_columns:
+                suffix = 1
+                while f"{name}.{suffix}" in self._seen_columns:
+                    suffix += 1
+                name = f"{name}.{suffix}"
+            self._seen_columns.add(name)
+            self.columns.append(name)
+
+    def _normalize_row(self, row: List[Any]) -> List[Any]:
+        """Pad a row to the sheet width and map NA strings to NaN"""
+        values = [np.nan if isinstance(value, str) and value in NA_STRINGS else value for value in row]
+        return values + [np.nan] * (len(self.columns) - len(values))
+
+    def _frame(self, rows: List[List[Any]], start: int) -> pd.DataFrame:
+        self._grow_columns(max([len(row) for row in rows], default=0))
+        return pd.DataFrame(
+            [self._normalize_row(row) for row in rows],
+            columns=self.columns,
+            index=pd.RangeIndex(start, start + len(rows)),
+            dtype=object
+        )
+
+    def preview(self, n_rows: int) -> pd.DataFrame:
+        """First data rows of the sheet, without consuming them from the stream"""
+        while len(self._buffer) < n_rows:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._buffer.append(row)
+        return self._frame(self._buffer[:n_rows], 0)
+
+    def chunks(self, skip_rows: int = 0) -> Iterator[pd.DataFrame]:
+        """Yield the sheet's data rows as DataFrames of at most chunk_size rows
+
+        The first skip_rows data rows are dropped and the index restarts at 0
+        after them, like df.iloc[skip_rows:].reset_index(drop=True).
+        """
+        rows = iter(self._buffer)
+        self._buffer = []
+        start = 0
+        batch: List[List[Any]] = []
+        for source in (rows, self._rows):
+            for row in source:
+                if skip_rows:
+                    skip_rows -= 1
+                    continue
+                batch.append(row)
+                if len(batch) >= self.chunk_size:
+                    yield self._frame(batch, start)
+                    start += len(batch)
+                    batch = []
+        if batch:
+            yield self._frame(batch, start)
+
+
+class StreamingWorkbookReader:
+    """Open a workbook in openpyxl read-only mode and iterate its sheets lazily"""
+
+    def __init__(self, file_path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.file_path = Path(file_path)
+        self.chunk_size = chunk_size
+        self._workbook = None
+
+    def __enter__(self) -> "StreamingWorkbookReader":
+        self._workbook = load_workbook(self.file_path, read_only=True, data_only=True, keep_links=False)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if self._workbook is not None:
+            self._workbook.close()
+            self._workbook = None
+
+    def sheets(self) -> Iterator[StreamingSheet]:
+        """Yield one StreamingSheet per worksheet, in workbook order"""
+        if self._workbook is None:
+            raise RuntimeError("StreamingWorkbookReader must be used as a context manager")
+        for worksheet in self._workbook.worksheets:
+            logger.debug(f"Streaming sheet: {worksheet.title}")
+            yield StreamingSheet(worksheet, self.chunk_size)
+
+
+def should_stream(file_path: Path, threshold: Optional[int]) -> bool:
+    """Whether a workbook is large enough to be parsed in streaming mode"""
+    return threshold is not None and Path(file_path).stat().st_size >= threshold
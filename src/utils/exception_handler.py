@@ -49,7 +49,8 @@ async def http_exception_handler(request: Request, exc: HTTPException):
             timestamp=datetime.utcnow().isoformat(),
             path=request.url.path,
             request_id=str(uuid.uuid4())
-        ).dict()
+        ).dict(),
+        headers=getattr(exc, "headers", None)
     )
 
 
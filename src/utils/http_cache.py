@@ -0,0 +1,53 @@
+"""
+HTTP caching for read-mostly JSON endpoints
+Responses carry an ETag derived from the data version and the request URL, so
+clients revalidate with If-None-Match and get an empty 304 when nothing
+changed; bodies are kept serialized in memory per version
+"""
+import hashlib
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import Request, Response
+
+from src.utils.ttl_cache import TTLCache
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value covers etag (weak comparison)"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+class ResponseCache:
+    """Serve versioned JSON bodies with ETag, Cache-Control and 304 responses
+
+    Clients may reuse a response for max_age seconds without asking. Bodies
+    of the last max_entries (URL, version) pairs are kept in memory.
+    """
+
+    def __init__(self, max_age: int = 60, max_entries: int = 256, ttl: float = 3600.0):
+        self.max_age = max_age
+        self._bodies = TTLCache(ttl=ttl, max_entries=max_entries)
+        self.not_modified = 0
+
+    def respond(self, request: Request, version: str, build: Callable[[], bytes]) -> Response:
+        """Response for request at data version; build serializes the body on a cache miss"""
+        key = (request.url.path, tuple(sorted(request.query_params.multi_items())), version)
+        etag = '"%s"' % hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:32]
+        headers = {"ETag": etag, "Cache-Control": f"private, max-age={self.max_age}"}
+
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        body = self._bodies.get(key)
+        if body is None:
+            body = build()
+            self._bodies.put(key, body)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Body cache counters and the number of 304 responses"""
+        return dict(self._bodies.get_statistics(), not_modified=self.not_modified)
@@ -2,20 +2,54 @@
 Enhanced Excel parser for INSTAT structured survey files
 Handles the specific format used in MODELISATION files with hierarchical survey structure
 """
+import numpy as np
 import pandas as pd
 from typing import Dict, List, Any, Optional
 from pathlib import Path
 import logging
 import re
 
+from .excel_streaming import StreamingWorkbookReader, DEFAULT_CHUNK_SIZE, should_stream
+
 logger = logging.getLogger(__name__)
 
 
 class INSTATExcelParser:
     """Parse INSTAT Excel files with structured survey data"""
 
-    def __init__(self):
+    # Bump whenever the produced survey structure changes, invalidates cached parse results
+    PARSER_VERSION = "1.0.0"
+
+    ENTRY_TYPE_VALUES = ['survey', 'section', 'subsection', 'question', 'response', 'context']
+
+    # Column name fragments identifying optional metadata columns
+    DESCRIPTION_COLUMNS = ['description', 'desc', 'annotation', 'note', 'comment', 'entryDescription']
+    ANNOTATION_COLUMNS = ['annotation', 'note', 'remark', 'entryAnnotation', 'comment']
+    CAUTION_COLUMNS = ['caution', 'warning', 'attention', 'avertissement']
+    CONDITION_COLUMNS = ['condition', 'prerequis', 'requirement', 'existingConditions']
+
+    TABLE_REF_PATTERNS = [
+        r'@?TableRef\s*:\s*(\d+)',
+        r'TableRef\s*(\d+)',
+        r'@TableRef:\s*(\d+)',
+        r'liste\s+déroulante.*(\d+)',
+        r'table\s+de\s+référence.*(\d+)'
+    ]
+
+    GEO_KEYWORDS = [
+        'adresse', 'address', 'ville', 'city', 'région', 'region', 
+        'commune', 'cercle', 'département', 'localisation', 'location',
+        'géographique', 'geographic', 'coordonnées', 'coordinates'
+    ]
+
+    # Number of rows sniffed by _is_structured_format
+    SNIFF_ROWS = 20
+
+    def __init__(self, streaming_threshold: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
         self.supported_formats = ['.xlsx', '.xls']
+        # Files at least this large (bytes) are parsed in streaming mode; None disables it
+        self.streaming_threshold = streaming_threshold
+        self.chunk_size = chunk_size
         self.entry_types = {
             'Survey': 'survey',
             'Context': 'context', 
@@ -25,15 +59,25 @@ class INSTATExcelParser:
             'Response': 'response'
         }
 
-    def parse_file(self, file_path: Path) -> Dict[str, Any]:
-        """Parse INSTAT Excel file and return survey structure"""
+    def parse_file(self, file_path: Path, streaming: Optional[bool] = None) -> Dict[str, Any]:
+        """Parse INSTAT Excel file and return survey structure
+
+        With streaming=None the mode is picked from the file size and
+        streaming_threshold; streaming=True forces read-only row streaming.
+        """
         if not file_path.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
 
         if file_path.suffix.lower() not in self.supported_formats:
             raise ValueError(f"Unsupported file format: {file_path.suffix}")
 
+        if streaming is None:
+            streaming = should_stream(file_path, self.streaming_threshold)
+
         try:
+            if streaming:
+                return self._parse_file_streaming(file_path)
+
             # Read all sheets from Excel file
             excel_data = pd.read_excel(file_path, sheet_name=None, engine='openpyxl')
             
@@ -65,6 +109,38 @@ class INSTATExcelParser:
             logger.error(f"Error parsing Excel file {file_path}: {str(e)}")
             raise
 
+    def _parse_file_streaming(self, file_path: Path) -> Dict[str, Any]:
+        """Parse the workbook with read-only row iterators, one chunk at a time"""
+        with StreamingWorkbookReader(file_path, chunk_size=self.chunk_size) as workbook:
+            # Stop at the first structured sheet, later sheets are never read
+            for sheet in workbook.sheets():
+                parsed_survey = self._parse_structured_stream(sheet, file_path)
+                if parsed_survey:
+                    return parsed_survey
+
+        # Fallback to basic parsing if structured parsing fails
+        survey_structure = {
+            "title": file_path.stem,
+            "description": f"Survey generated from {file_path.name}",
+            "sections": []
+        }
+
+        with StreamingWorkbookReader(file_path, chunk_size=self.chunk_size) as workbook:
+            for sheet in workbook.sheets():
+                section = None
+                for chunk in sheet.chunks():
+                    chunk_section = self._parse_sheet_basic(sheet.name, chunk)
+                    if not chunk_section:
+                        continue
+                    if section is None:
+                        section = chunk_section
+                    else:
+                        section["questions"].extend(chunk_section["questions"])
+                if section:
+                    survey_structure["sections"].append(section)
+
+        return survey_structure
+
     def _parse_structured_sheet(self, sheet_name: str, df: pd.DataFrame, file_path: Path) -> Optional[Dict[str, Any]]:
         """Parse sheet with INSTAT structured format"""
         if df.empty or len(df.columns) < 5:
@@ -77,37 +153,76 @@ class INSTATExcelParser:
         logger.info(f"Parsing structured INSTAT format for sheet: {sheet_name}")
 
         # Map the DataFrame columns to expected structure
-        df_clean = df.copy()
-        
+        column_mapping, header_in_first_row = self._resolve_column_mapping(df)
+        df_clean = self._apply_column_mapping(df.copy(), column_mapping)
+        if header_in_first_row:
+            # Remove header row
+            df_clean = df_clean.iloc[1:].reset_index(drop=True)
+
+        # Parse the hierarchical structure
+        survey_structure = self._build_survey_structure(df_clean, file_path)
+        return self._validate_and_fix_metadata(survey_structure)
+
+    def _parse_structured_stream(self, sheet, file_path: Path) -> Optional[Dict[str, Any]]:
+        """Streaming counterpart of _parse_structured_sheet"""
+        # Sniff the sheet on its first rows only
+        preview = sheet.preview(self.SNIFF_ROWS)
+        if preview.empty or len(preview.columns) < 5:
+            return None
+
+        if not self._is_structured_format(preview):
+            return None
+
+        logger.info(f"Parsing structured INSTAT format for sheet: {sheet.name} (streaming)")
+
+        column_mapping, header_in_first_row = self._resolve_column_mapping(preview)
+
+        def entries():
+            for chunk in sheet.chunks(skip_rows=1 if header_in_first_row else 0):
+                chunk = self._apply_column_mapping(chunk, column_mapping)
+                yield from self._classify_rows(chunk).itertuples()
+
+        survey_structure = self._assemble_survey_structure(entries(), file_path)
+        return self._validate_and_fix_metadata(survey_structure)
+
+    def _resolve_column_mapping(self, df: pd.DataFrame) -> tuple:
+        """Work out which columns hold entryLabel/entryName/entryParentIndex/entryIndex
+
+        Returns the column renames, applied one after the other, and whether
+        the first data row is a header row to drop.
+        """
+        column_mapping = []
+
         # Handle different column naming patterns
         if 'entryLabel' in df.iloc[0].values:
             # Header is in first row
-            header_row = 0
-            for i, val in enumerate(df.iloc[header_row]):
+            for i, val in enumerate(df.iloc[0]):
                 if pd.notna(val):
                     if 'entryLabel' in str(val):
-                        df_clean = df_clean.rename(columns={df.columns[i]: 'entryLabel'})
+                        column_mapping.append({df.columns[i]: 'entryLabel'})
                     elif 'entryName' in str(val):
-                        df_clean = df_clean.rename(columns={df.columns[i]: 'entryName'})
+                        column_mapping.append({df.columns[i]: 'entryName'})
                     elif 'entryParentIndex' in str(val):
-                        df_clean = df_clean.rename(columns={df.columns[i]: 'entryParentIndex'})
+                        column_mapping.append({df.columns[i]: 'entryParentIndex'})
                     elif 'entryIndex' in str(val):
-                        df_clean = df_clean.rename(columns={df.columns[i]: 'entryIndex'})
-            # Remove header row
-            df_clean = df_clean.iloc[1:].reset_index(drop=True)
-        else:
-            # Use positional mapping based on observed patterns
-            col_mapping = {}
-            if len(df.columns) >= 5:
-                col_mapping[df.columns[1]] = 'entryLabel'  # Column 1: Label
-                col_mapping[df.columns[2]] = 'entryName'   # Column 2: Type
-                col_mapping[df.columns[3]] = 'entryParentIndex'  # Column 3: Parent
-                col_mapping[df.columns[4]] = 'entryIndex'  # Column 4: Index
-            df_clean = df_clean.rename(columns=col_mapping)
-
-        # Parse the hierarchical structure
-        survey_structure = self._build_survey_structure(df_clean, file_path)
-        return self._validate_and_fix_metadata(survey_structure)
+                        column_mapping.append({df.columns[i]: 'entryIndex'})
+            return column_mapping, True
+
+        # Use positional mapping based on observed patterns
+        col_mapping = {}
+        if len(df.columns) >= 5:
+            col_mapping[df.columns[1]] = 'entryLabel'  # Column 1: Label
+            col_mapping[df.columns[2]] = 'entryName'   # Column 2: Type
+            col_mapping[df.columns[3]] = 'entryParentIndex'  # Column 3: Parent
+            col_mapping[df.columns[4]] = 'entryIndex'  # Column 4: Index
+        return [col_mapping], False
+
+    @staticmethod
+    def _apply_column_mapping(df: pd.DataFrame, column_mapping: list) -> pd.DataFrame:
+        """Apply the renames returned by _resolve_column_mapping"""
+        for renames in column_mapping:
+            df = df.rename(columns=renames)
+        return df
 
     def _is_structured_format(self, df: pd.DataFrame) -> bool:
         """Check if DataFrame has INSTAT structured format"""
@@ -130,6 +245,14 @@ class INSTATExcelParser:
 
     def _build_survey_structure(self, df: pd.DataFrame, file_path: Path) -> Dict[str, Any]:
         """Build survey structure from parsed DataFrame"""
+        # Classify every row up front, column by column
+        return self._assemble_survey_structure(self._classify_rows(df).itertuples(), file_path)
+
+    def _assemble_survey_structure(self, entries, file_path: Path) -> Dict[str, Any]:
+        """Build survey structure from classified rows (see _classify_rows)
+
+        entries may be a generator, rows are consumed once, in order.
+        """
         
         # Initialize the survey structure
         survey_structure = {
@@ -138,7 +261,7 @@ class INSTATExcelParser:
             "sections": [],
             "metadata": {
                 "source_file": file_path.name,
-                "total_rows": len(df)
+                "total_rows": 0
             }
         }
 
@@ -146,14 +269,17 @@ class INSTATExcelParser:
         current_section = None
         current_subsection = None
         current_question = None
+        total_rows = 0
         
-        # Process each row
-        for idx, row in df.iterrows():
+        # Single pass over the classified rows to build the hierarchy
+        for entry in entries:
+            idx = entry.Index
+            total_rows += 1
             try:
-                entry_type = self._get_entry_type(row)
-                entry_label = self._get_entry_label(row)
-                parent_index = self._get_parent_index(row)
-                entry_index = self._get_entry_index(row)
+                entry_type = entry.entry_type
+                entry_label = entry.entry_label
+                parent_index = entry.parent_index
+                entry_index = entry.entry_index
                 
                 if not entry_label or not entry_type:
                     continue
@@ -175,12 +301,12 @@ class INSTATExcelParser:
                             "entry_index": entry_index,
                             "parent_index": parent_index,
                             "entryFullPath": f"/{entry_label}",
-                            "entryDescription": self._extract_entry_description(row, entry_label),
-                            "entryAnnotation": self._extract_entry_annotation(row, entry_label),
-                            "caution": self._extract_caution_info(row, entry_label),
-                            "existingConditions": self._extract_existing_conditions(row, entry_label),
+                            "entryDescription": self._entry_description(entry),
+                            "entryAnnotation": self._entry_annotation(entry),
+                            "caution": self._entry_caution(entry),
+                            "existingConditions": self._entry_conditions(entry),
                             "JumpToEntry": "",
-                            "coordinates": self._extract_coordinates(entry_label)
+                            "coordinates": self._entry_coordinates(entry)
                         }
                     }
                     survey_structure["sections"].append(current_section)
@@ -197,12 +323,12 @@ class INSTATExcelParser:
                                 "entry_index": entry_index,
                                 "parent_index": parent_index,
                                 "entryFullPath": self._build_subsection_path(current_section, entry_label),
-                                "entryDescription": self._extract_entry_description(row, entry_label),
-                                "entryAnnotation": self._extract_entry_annotation(row, entry_label),
-                                "caution": self._extract_caution_info(row, entry_label),
-                                "existingConditions": self._extract_existing_conditions(row, entry_label),
+                                "entryDescription": self._entry_description(entry),
+                                "entryAnnotation": self._entry_annotation(entry),
+                                "caution": self._entry_caution(entry),
+                                "existingConditions": self._entry_conditions(entry),
                                 "JumpToEntry": "",
-                                "coordinates": self._extract_coordinates(entry_label)
+                                "coordinates": self._entry_coordinates(entry)
                             }
                         }
                         current_section["subsections"].append(current_subsection)
@@ -217,14 +343,14 @@ class INSTATExcelParser:
                         "metadata": {
                             "entry_index": entry_index,
                             "parent_index": parent_index,
-                            "table_reference": self._extract_table_reference(entry_label),
+                            "table_reference": entry.table_reference,
                             "entryFullPath": self._build_entry_path(current_section, current_subsection, entry_label),
-                            "entryDescription": self._extract_entry_description(row, entry_label),
-                            "entryAnnotation": self._extract_entry_annotation(row, entry_label),
-                            "caution": self._extract_caution_info(row, entry_label),
-                            "existingConditions": self._extract_existing_conditions(row, entry_label),
+                            "entryDescription": self._entry_description(entry),
+                            "entryAnnotation": self._entry_annotation(entry),
+                            "caution": self._entry_caution(entry),
+                            "existingConditions": self._entry_conditions(entry),
                             "JumpToEntry": "",
-                            "coordinates": self._extract_coordinates(entry_label)
+                            "coordinates": self._entry_coordinates(entry)
                         },
                         "is_required": self._is_required_question(entry_label)
                     }
@@ -247,12 +373,12 @@ class INSTATExcelParser:
                                 "entry_index": entry_index,
                                 "parent_index": parent_index,
                                 "entryFullPath": self._build_option_path(current_section, current_subsection, current_question, entry_label),
-                                "entryDescription": self._extract_entry_description(row, entry_label),
-                                "entryAnnotation": self._extract_entry_annotation(row, entry_label),
-                                "caution": self._extract_caution_info(row, entry_label),
-                                "existingConditions": self._extract_existing_conditions(row, entry_label),
+                                "entryDescription": self._entry_description(entry),
+                                "entryAnnotation": self._entry_annotation(entry),
+                                "caution": self._entry_caution(entry),
+                                "existingConditions": self._entry_conditions(entry),
                                 "JumpToEntry": "",
-                                "coordinates": self._extract_coordinates(entry_label)
+                                "coordinates": self._entry_coordinates(entry)
                             }
                         }
                         current_question["options"].append(response_option)
@@ -275,11 +401,11 @@ class INSTATExcelParser:
                                 "type": "context",
                                 "entryFullPath": f"/{section_title}",
                                 "entryDescription": "Section contextuelle contenant des informations de base",
-                                "entryAnnotation": self._extract_entry_annotation(row, entry_label),
-                                "caution": self._extract_caution_info(row, entry_label),
-                                "existingConditions": self._extract_existing_conditions(row, entry_label),
+                                "entryAnnotation": self._entry_annotation(entry),
+                                "caution": self._entry_caution(entry),
+                                "existingConditions": self._entry_conditions(entry),
                                 "JumpToEntry": "",
-                                "coordinates": self._extract_coordinates(entry_label)
+                                "coordinates": self._entry_coordinates(entry)
                             }
                         }
                         survey_structure["sections"].append(current_section)
@@ -288,8 +414,196 @@ class INSTATExcelParser:
                 logger.warning(f"Error processing row {idx}: {e}")
                 continue
 
+        survey_structure["metadata"]["total_rows"] = total_rows
         return survey_structure
 
+    def _classify_rows(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Classify every sheet row with whole-column operations.
+
+        Column roles are resolved once per sheet, then entry types, labels,
+        indices, metadata columns and label-derived flags are computed per
+        column. The result has one row per sheet row (same index) and is
+        what the hierarchy builder iterates over.
+        """
+        if not df.columns.is_unique:
+            # row[col] is ambiguous with duplicate column labels, keep row-wise semantics
+            return self._classify_rows_rowwise(df)
+
+        labels = self._column_entry_labels(df)
+        label_series = pd.Series(labels, index=df.index, dtype=object)
+
+        if 'entryParentIndex' in df.columns:
+            parent_indices = self._column_indices(df['entryParentIndex'], excluded=-1)
+        else:
+            parent_indices = [None] * len(df)
+
+        if 'entryIndex' in df.columns:
+            entry_indices = self._column_indices(df['entryIndex'])
+        else:
+            entry_indices = [None] * len(df)
+
+        return pd.DataFrame({
+            "entry_type": self._column_entry_types(df),
+            "entry_label": labels,
+            "parent_index": parent_indices,
+            "entry_index": entry_indices,
+            "description": self._column_metadata_values(
+                df, self._resolve_metadata_columns(df.columns, self.DESCRIPTION_COLUMNS), label_series),
+            "annotation": self._column_metadata_values(
+                df, self._resolve_metadata_columns(df.columns, self.ANNOTATION_COLUMNS), label_series),
+            "caution": self._column_metadata_values(
+                df, self._resolve_metadata_columns(df.columns, self.CAUTION_COLUMNS)),
+            "conditions": self._column_metadata_values(
+                df, self._resolve_metadata_columns(df.columns, self.CONDITION_COLUMNS)),
+            "table_reference": self._column_table_references(label_series),
+            "is_geographic": self._column_geographic_flags(label_series),
+        }, index=df.index, dtype=object)
+
+    def _classify_rows_rowwise(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Row-by-row classification producing the same frame as _classify_rows"""
+        columns = ["entry_type", "entry_label", "parent_index", "entry_index", "description",
+                   "annotation", "caution", "conditions", "table_reference", "is_geographic"]
+        records = []
+        for idx, row in df.iterrows():
+            try:
+                entry_label = self._get_entry_label(row)
+                records.append({
+                    "entry_type": self._get_entry_type(row),
+                    "entry_label": entry_label,
+                    "parent_index": self._get_parent_index(row),
+                    "entry_index": self._get_entry_index(row),
+                    "description": self._lookup_metadata_value(row, self.DESCRIPTION_COLUMNS, entry_label),
+                    "annotation": self._lookup_metadata_value(row, self.ANNOTATION_COLUMNS, entry_label),
+                    "caution": self._lookup_metadata_value(row, self.CAUTION_COLUMNS),
+                    "conditions": self._lookup_metadata_value(row, self.CONDITION_COLUMNS),
+                    "table_reference": self._extract_table_reference(entry_label) if entry_label else None,
+                    "is_geographic": self._is_geographic_label(entry_label) if entry_label else False,
+                })
+            except Exception as e:
+                logger.warning(f"Error processing row {idx}: {e}")
+                records.append(dict.fromkeys(columns))
+
+        return pd.DataFrame(records, index=df.index, columns=columns, dtype=object)
+
+    @staticmethod
+    def _column_text(series: pd.Series) -> pd.Series:
+        """Vectorized str(value).strip() over a whole column"""
+        return series.astype(str).str.strip()
+
+    @staticmethod
+    def _first_match(candidates: List[tuple], length: int) -> List[Optional[str]]:
+        """Pick per row the first (values, mask) candidate whose mask is set, in column order"""
+        result = np.full(length, None, dtype=object)
+        for values, mask in reversed(candidates):
+            result = np.where(mask.to_numpy(dtype=bool), values.to_numpy(dtype=object), result)
+        return result.tolist()
+
+    def _column_entry_types(self, df: pd.DataFrame) -> List[Optional[str]]:
+        """Normalize entry types for the whole sheet (see _get_entry_type)"""
+        if 'entryName' in df.columns:
+            text = self._column_text(df['entryName'])
+            valid = (text != '') & (text != 'nan')
+            return self._first_match([(text.str.lower(), valid)], len(df))
+
+        # Fallback: first column holding a known type indicator
+        candidates = []
+        for col in df.columns:
+            lowered = self._column_text(df[col]).str.lower()
+            candidates.append((lowered, lowered.isin(self.ENTRY_TYPE_VALUES)))
+        return self._first_match(candidates, len(df))
+
+    def _column_entry_labels(self, df: pd.DataFrame) -> List[Optional[str]]:
+        """Normalize entry labels for the whole sheet (see _get_entry_label)"""
+        if 'entryLabel' in df.columns:
+            text = self._column_text(df['entryLabel'])
+            return self._first_match([(text, (text != '') & (text != 'nan'))], len(df))
+
+        # Fallback: first non-empty column after ID
+        candidates = []
+        for col in df.columns[1:]:
+            text = self._column_text(df[col])
+            candidates.append((text, (text != '') & (text != 'nan') & (text.str.len() > 2)))
+        return self._first_match(candidates, len(df))
+
+    def _column_indices(self, series: pd.Series, excluded: Optional[int] = None) -> List[Optional[int]]:
+        """Convert an index column to Python ints, None for missing values (see _to_index)"""
+        numeric = series
+        if not pd.api.types.is_numeric_dtype(numeric):
+            if pd.api.types.infer_dtype(series, skipna=True) not in ('integer', 'floating', 'mixed-integer-float', 'empty'):
+                # Mixed cells (strings, dates, ...) keep the per-value int() semantics
+                return [self._to_index(value, excluded) for value in series]
+            numeric = pd.to_numeric(series)
+
+        values = numeric.to_numpy(dtype='float64')
+        valid = np.isfinite(values)
+        if excluded is not None:
+            valid &= values != excluded
+        if valid.any() and np.abs(values[valid]).max() >= 2 ** 63:
+            return [self._to_index(value, excluded) for value in series]
+
+        result = np.full(len(values), None, dtype=object)
+        result[valid] = np.trunc(values[valid]).astype(np.int64).tolist()
+        return result.tolist()
+
+    @staticmethod
+    def _resolve_metadata_columns(columns, fragments: List[str]) -> List[Any]:
+        """Columns whose lower-cased name contains one of the given fragments"""
+        return [col for col in columns if any(fragment in str(col).lower() for fragment in fragments)]
+
+    def _column_metadata_values(self, df: pd.DataFrame, columns: List[Any],
+                                labels: Optional[pd.Series] = None) -> List[Optional[str]]:
+        """First usable value per row among the resolved metadata columns"""
+        candidates = []
+        for col in columns:
+            text = self._column_text(df[col])
+            valid = (text != '') & (text != 'nan')
+            if labels is not None:
+                valid &= text != labels
+            candidates.append((text, valid))
+        return self._first_match(candidates, len(df))
+
+    def _column_table_references(self, labels: pd.Series) -> List[Optional[str]]:
+        """Vectorized _extract_table_reference over the label column"""
+        candidates = []
+        for pattern in self.TABLE_REF_PATTERNS:
+            found = labels.str.extract(pattern, flags=re.IGNORECASE, expand=False)
+            candidates.append(("TableRef:" + found.str.zfill(2), found.notna()))
+        return self._first_match(candidates, len(labels))
+
+    def _column_geographic_flags(self, labels: pd.Series) -> List[bool]:
+        """Vectorized _is_geographic_label over the label column"""
+        pattern = '|'.join(re.escape(keyword) for keyword in self.GEO_KEYWORDS)
+        flags = labels.str.lower().str.contains(pattern, regex=True)
+        return flags.eq(True).tolist()
+
+    def _entry_description(self, entry) -> str:
+        """Description of a classified entry"""
+        if entry.description is not None:
+            return entry.description
+        return self._default_entry_description(entry.entry_label)
+
+    def _entry_annotation(self, entry) -> str:
+        """Annotation of a classified entry"""
+        if entry.annotation is not None:
+            return entry.annotation
+        return self._default_entry_annotation(entry.entry_label, entry.table_reference)
+
+    def _entry_caution(self, entry) -> str:
+        """Caution information of a classified entry"""
+        if entry.caution is not None:
+            return entry.caution
+        return self._default_caution_info(entry.entry_label)
+
+    def _entry_conditions(self, entry) -> str:
+        """Existing conditions of a classified entry"""
+        if entry.conditions is not None:
+            return entry.conditions
+        return self._default_existing_conditions(entry.entry_label, entry.table_reference)
+
+    def _entry_coordinates(self, entry) -> dict:
+        """Coordinate metadata of a classified entry"""
+        return self._coordinate_metadata() if entry.is_geographic else {}
+
     def _get_entry_type(self, row) -> Optional[str]:
         """Extract entry type from row"""
         if 'entryName' in row:
@@ -299,7 +613,7 @@ class INSTATExcelParser:
         # Fallback: check all columns for type indicators
         for col in row.index:
             val = str(row[col]).strip()
-            if val.lower() in ['survey', 'section', 'subsection', 'question', 'response', 'context']:
+            if val.lower() in self.ENTRY_TYPE_VALUES:
                 return val.lower()
         return None
 
@@ -319,22 +633,25 @@ class INSTATExcelParser:
     def _get_parent_index(self, row) -> Optional[int]:
         """Extract parent index from row"""
         if 'entryParentIndex' in row:
-            try:
-                parent = row['entryParentIndex']
-                return int(parent) if pd.notna(parent) and parent != -1 else None
-            except:
-                return None
+            return self._to_index(row['entryParentIndex'], excluded=-1)
         return None
 
     def _get_entry_index(self, row) -> Optional[int]:
         """Extract entry index from row"""
         if 'entryIndex' in row:
-            try:
-                return int(row['entryIndex']) if pd.notna(row['entryIndex']) else None
-            except:
-                return None
+            return self._to_index(row['entryIndex'])
         return None
 
+    @staticmethod
+    def _to_index(value, excluded: Optional[int] = None) -> Optional[int]:
+        """Convert a single index cell to int, None if missing or not convertible"""
+        try:
+            if pd.isna(value) or (excluded is not None and value == excluded):
+                return None
+            return int(value)
+        except:
+            return None
+
     def _parse_sheet_basic(self, sheet_name: str, df: pd.DataFrame) -> Optional[Dict[str, Any]]:
         """Basic parsing fallback for non-structured sheets"""
         if df.empty:
@@ -413,15 +730,7 @@ class INSTATExcelParser:
     def _extract_table_reference(self, text: str) -> Optional[str]:
         """Extract table reference from question text"""
         # Look for TableRef patterns
-        table_ref_patterns = [
-            r'@?TableRef\s*:\s*(\d+)',
-            r'TableRef\s*(\d+)',
-            r'@TableRef:\s*(\d+)',
-            r'liste\s+déroulante.*(\d+)',
-            r'table\s+de\s+référence.*(\d+)'
-        ]
-        
-        for pattern in table_ref_patterns:
+        for pattern in self.TABLE_REF_PATTERNS:
             match = re.search(pattern, text, re.IGNORECASE)
             if match:
                 return f"TableRef:{match.group(1).zfill(2)}"
@@ -564,19 +873,25 @@ class INSTATExcelParser:
         
         return "/" + "/".join(path_parts)
 
+    def _lookup_metadata_value(self, row, fragments: List[str], entry_label: Optional[str] = None) -> Optional[str]:
+        """First usable value in the row's columns matching the given name fragments"""
+        if row is None:
+            return None
+
+        for col in self._resolve_metadata_columns(row.index, fragments):
+            val = str(row[col]).strip()
+            if val and val != 'nan' and (entry_label is None or val != entry_label):
+                return val
+        return None
+
     def _extract_entry_description(self, row, entry_label: str) -> str:
         """Extract description from additional columns in the row"""
         # Look for description in common description columns
-        description_columns = ['description', 'desc', 'annotation', 'note', 'comment', 'entryDescription']
-        
-        for col in row.index:
-            col_name = str(col).lower()
-            if any(desc_col in col_name for desc_col in description_columns):
-                val = str(row[col]).strip()
-                if val and val != 'nan' and val != entry_label:
-                    return val
-        
-        # Default description based on entry content
+        value = self._lookup_metadata_value(row, self.DESCRIPTION_COLUMNS, entry_label)
+        return value if value is not None else self._default_entry_description(entry_label)
+
+    def _default_entry_description(self, entry_label: str) -> str:
+        """Default description based on entry content"""
         if 'adresse' in entry_label.lower():
             return "Adresse géographique avec coordonnées requises"
         elif 'ville' in entry_label.lower() or 'city' in entry_label.lower():
@@ -591,17 +906,14 @@ class INSTATExcelParser:
     def _extract_entry_annotation(self, row, entry_label: str) -> str:
         """Extract annotation from additional columns in the row"""
         # Look for annotation in specific columns
-        annotation_columns = ['annotation', 'note', 'remark', 'entryAnnotation', 'comment']
-        
-        for col in row.index:
-            col_name = str(col).lower()
-            if any(ann_col in col_name for ann_col in annotation_columns):
-                val = str(row[col]).strip()
-                if val and val != 'nan' and val != entry_label:
-                    return val
-        
-        # Auto-generate annotation for specific types
-        if self._extract_table_reference(entry_label):
+        value = self._lookup_metadata_value(row, self.ANNOTATION_COLUMNS, entry_label)
+        if value is not None:
+            return value
+        return self._default_entry_annotation(entry_label, self._extract_table_reference(entry_label))
+
+    def _default_entry_annotation(self, entry_label: str, table_reference: Optional[str]) -> str:
+        """Auto-generate annotation for specific types"""
+        if table_reference:
             return "Référence à une table de données externe"
         elif 'obligatoire' in entry_label.lower() or '*' in entry_label:
             return "Champ obligatoire à remplir"
@@ -611,16 +923,11 @@ class INSTATExcelParser:
     def _extract_caution_info(self, row, entry_label: str) -> str:
         """Extract caution/warning information"""
         # Look for caution in specific columns
-        caution_columns = ['caution', 'warning', 'attention', 'avertissement']
-        
-        for col in row.index:
-            col_name = str(col).lower()
-            if any(caut_col in col_name for caut_col in caution_columns):
-                val = str(row[col]).strip()
-                if val and val != 'nan':
-                    return val
-        
-        # Auto-generate caution for sensitive data
+        value = self._lookup_metadata_value(row, self.CAUTION_COLUMNS)
+        return value if value is not None else self._default_caution_info(entry_label)
+
+    def _default_caution_info(self, entry_label: str) -> str:
+        """Auto-generate caution for sensitive data"""
         sensitive_keywords = ['confidentiel', 'personnel', 'privé', 'sensible']
         if any(keyword in entry_label.lower() for keyword in sensitive_keywords):
             return "Information sensible - manipuler avec précaution"
@@ -630,19 +937,16 @@ class INSTATExcelParser:
     def _extract_existing_conditions(self, row, entry_label: str) -> str:
         """Extract existing conditions for the entry"""
         # Look for conditions in specific columns
-        condition_columns = ['condition', 'prerequis', 'requirement', 'existingConditions']
-        
-        for col in row.index:
-            col_name = str(col).lower()
-            if any(cond_col in col_name for cond_col in condition_columns):
-                val = str(row[col]).strip()
-                if val and val != 'nan':
-                    return val
-        
-        # Auto-generate conditions based on question type
+        value = self._lookup_metadata_value(row, self.CONDITION_COLUMNS)
+        if value is not None:
+            return value
+        return self._default_existing_conditions(entry_label, self._extract_table_reference(entry_label))
+
+    def _default_existing_conditions(self, entry_label: str, table_reference: Optional[str]) -> str:
+        """Auto-generate conditions based on question type"""
         if 'dépend' in entry_label.lower() or 'si' in entry_label.lower():
             return "Réponse conditionnelle basée sur une question précédente"
-        elif self._extract_table_reference(entry_label):
+        elif table_reference:
             return "Nécessite l'accès à une table de référence externe"
             
         # Default to French conditional response text when no conditions found
@@ -651,25 +955,28 @@ class INSTATExcelParser:
     def _extract_coordinates(self, entry_label: str) -> dict:
         """Extract or generate ISO 6709:2022 coordinate metadata for geographic entries"""
         # Check if this is a geographic/address field
-        geo_keywords = [
-            'adresse', 'address', 'ville', 'city', 'région', 'region', 
-            'commune', 'cercle', 'département', 'localisation', 'location',
-            'géographique', 'geographic', 'coordonnées', 'coordinates'
-        ]
-        
-        if any(keyword in entry_label.lower() for keyword in geo_keywords):
-            return {
-                "required": True,
-                "format": "ISO 6709:2022",
-                "precision": "decimal_degrees",
-                "datum": "WGS84",
-                "example": "+12.6392-08.0029/",
-                "validation_pattern": r"^[+-][0-9]{2,3}\.[0-9]{4}[+-][0-9]{3}\.[0-9]{4}/$",
-                "description": "Coordonnées géographiques au format ISO 6709:2022 pour localisation précise"
-            }
+        if self._is_geographic_label(entry_label):
+            return self._coordinate_metadata()
         
         return {}
 
+    def _is_geographic_label(self, entry_label: str) -> bool:
+        """Check if the label designates a geographic/address field"""
+        return any(keyword in entry_label.lower() for keyword in self.GEO_KEYWORDS)
+
+    @staticmethod
+    def _coordinate_metadata() -> dict:
+        """ISO 6709:2022 coordinate metadata attached to geographic entries"""
+        return {
+            "required": True,
+            "format": "ISO 6709:2022",
+            "precision": "decimal_degrees",
+            "datum": "WGS84",
+            "example": "+12.6392-08.0029/",
+            "validation_pattern": r"^[+-][0-9]{2,3}\.[0-9]{4}[+-][0-9]{3}\.[0-9]{4}/$",
+            "description": "Coordonnées géographiques au format ISO 6709:2022 pour localisation précise"
+        }
+
     def determine_schema_name(self, filename: str) -> str:
         """Determine appropriate schema name based on filename"""
         filename_lower = filename.lower()
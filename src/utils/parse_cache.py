@@ -0,0 +1,164 @@
+"""
+Content-addressed cache of parsed Excel workbooks
+Entries are keyed by the SHA-256 of the uploaded bytes and the parser version,
+so re-uploading an unchanged workbook skips parsing entirely
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ParseCache:
+    """Disk-backed LRU cache of parsed survey structures and validation issues"""
+
+    def __init__(self, cache_dir: str = "generated/parse_cache", parser_version: str = "1",
+                 max_entries: int = 256, max_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.parser_version = parser_version
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        # content hash -> entry size in bytes, least recently used first
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._load_index()
+
+    def get(self, content_hash: str, file_path: Path) -> Optional[Tuple[Dict[str, Any], List[str]]]:
+        """Return (survey_structure, validation_issues) for the content, or None on a miss
+
+        Fields derived from the file name (title, description, source_file)
+        are rewritten for file_path, the name the content was uploaded under.
+        """
+        with self._lock:
+            if content_hash not in self._index:
+                self.misses += 1
+                return None
+
+            entry_path = self._entry_path(content_hash)
+            try:
+                with open(entry_path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+                os.utime(entry_path)
+            except (OSError, ValueError) as e:
+                # Evicted by another worker or unreadable, treat as a miss
+                logger.warning(f"Dropping parse cache entry {content_hash}: {e}")
+                self._forget(content_hash)
+                self.misses += 1
+                return None
+
+            self._index.move_to_end(content_hash)
+            self.hits += 1
+
+        survey_structure = self._rebase_structure(entry["survey_structure"], entry["source_file"], file_path)
+        return survey_structure, entry["validation_issues"]
+
+    def put(self, content_hash: str, file_path: Path, survey_structure: Dict[str, Any],
+            validation_issues: List[str]) -> None:
+        """Store a parse result, evicting least recently used entries beyond the caps"""
+        entry = {
+            "parser_version": self.parser_version,
+            "content_hash": content_hash,
+            "source_file": file_path.name,
+            "survey_structure": survey_structure,
+            "validation_issues": validation_issues
+        }
+        data = json.dumps(entry, ensure_ascii=False, default=str).encode('utf-8')
+        if len(data) > self.max_bytes:
+            logger.info(f"Parse result for {file_path.name} exceeds the cache size cap, not cached")
+            return
+
+        with self._lock:
+            entry_path = self._entry_path(content_hash)
+            tmp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+            try:
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, entry_path)
+            except OSError as e:
+                logger.error(f"Failed to write parse cache entry {content_hash}: {e}")
+                return
+
+            self._forget(content_hash, delete=False)
+            self._index[content_hash] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+
+    def clear(self) -> None:
+        """Remove every cache entry"""
+        with self._lock:
+            for content_hash in list(self._index):
+                self._forget(content_hash)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Cache size and hit/miss counters"""
+        with self._lock:
+            return {
+                "parser_version": self.parser_version,
+                "entries": len(self._index),
+                "total_bytes": self._total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+    def _entry_path(self, content_hash: str) -> Path:
+        return self.cache_dir / f"{self.parser_version}-{content_hash}.json"
+
+    def _load_index(self) -> None:
+        """Rebuild the LRU index from disk, dropping entries of other parser versions"""
+        prefix = f"{self.parser_version}-"
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                if not path.name.startswith(prefix):
+                    path.unlink()
+                    continue
+                stat = path.stat()
+                entries.append((stat.st_mtime, path.stem[len(prefix):], stat.st_size))
+            except OSError as e:
+                logger.warning(f"Skipping parse cache file {path}: {e}")
+
+        for _, content_hash, size in sorted(entries):
+            self._index[content_hash] = size
+            self._total_bytes += size
+        self._evict()
+
+    def _evict(self) -> None:
+        while self._index and (len(self._index) > self.max_entries or self._total_bytes > self.max_bytes):
+            content_hash = next(iter(self._index))
+            self._forget(content_hash)
+
+    def _forget(self, content_hash: str, delete: bool = True) -> None:
+        size = self._index.pop(content_hash, None)
+        if size is not None:
+            self._total_bytes -= size
+        if delete:
+            try:
+                self._entry_path(content_hash).unlink()
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _rebase_structure(survey_structure: Dict[str, Any], cached_name: str, file_path: Path) -> Dict[str, Any]:
+        """Point the file-name derived fields of a cached structure at file_path"""
+        cached_path = Path(cached_name)
+        if survey_structure.get("title") == cached_path.stem:
+            survey_structure["title"] = file_path.stem
+        if survey_structure.get("description") == f"Survey generated from {cached_path.name}":
+            survey_structure["description"] = f"Survey generated from {file_path.name}"
+        metadata = survey_structure.get("metadata")
+        if isinstance(metadata, dict) and metadata.get("source_file") == cached_path.name:
+            metadata["source_file"] = file_path.name
+        return survey_structure
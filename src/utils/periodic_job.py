@@ -0,0 +1,53 @@
+"""
+Background thread running a maintenance task at a fixed interval
+Used for database housekeeping such as audit rollups and retention
+"""
+import threading
+from typing import Any, Callable, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicJob:
+    """Run task now and then every interval seconds until stopped
+
+    Failures are logged and the job keeps its schedule. An interval of 0
+    disables the job.
+    """
+
+    def __init__(self, name: str, interval: float, task: Callable[[], Any]):
+        self.name = name
+        self.interval = interval
+        self.task = task
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> Any:
+        """Run the task now, logging instead of raising on failure"""
+        try:
+            return self.task()
+        except Exception as e:
+            logger.error(f"Periodic job {self.name} failed: {e}")
+            return None
+
+    def _run(self) -> None:
+        while True:
+            self.run_once()
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self) -> None:
+        """Start the job thread (no-op when disabled or already running)"""
+        if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the job thread after its current run"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
@@ -1,203 +1,319 @@
 """
 Upload tracking utility for logging and managing file uploads
+Uploads are appended to a JSON-lines log, one entry per line, under an
+exclusive file lock so concurrent workers never overwrite each other. Each
+process keeps in-memory indexes by user and by date plus running statistics,
+and catches up on lines appended by other processes before answering a query.
+Compactions bump a generation number kept in the lock file, telling the other
+processes to index the rewritten log again
 """
+import bisect
+import copy
 import json
 import os
-from datetime import datetime
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterator, List, Any, Optional
 import logging
 
+import config
+
+try:
+    import fcntl
+except ImportError:  # Windows: the in-process lock only
+    fcntl = None
+
 logger = logging.getLogger(__name__)
 
 
+def _parse_timestamp(entry: Dict[str, Any]) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(entry.get("timestamp", ""))
+    except (TypeError, ValueError):
+        return None
+
+
 class UploadTracker:
-    """Track file uploads with timestamps and metadata"""
-    
-    def __init__(self, log_file_path: str = "logs/uploads.json"):
+    """Track file uploads with timestamps and metadata
+
+    The log keeps at least the newest max_entries uploads: once it holds
+    twice as many, it is compacted down to the newest max_entries. Queries
+    return copies of the indexed entries.
+    """
+
+    def __init__(self, log_file_path: str = "logs/uploads.jsonl", max_entries: int = 10000):
         self.log_file = Path(log_file_path)
         self.log_file.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Initialize log file if it doesn't exist
-        if not self.log_file.exists():
-            self._write_log([])
-    
+        self.lock_file = self.log_file.with_name(self.log_file.name + ".lock")
+        self.max_entries = max_entries
+        self._lock = threading.RLock()
+        # Handle and generation number of the lock file while it is held
+        self._lock_handle = None
+        self._lock_generation = 0
+        self._reset()
+
+        # Carry over the entries of the former single-document JSON log
+        legacy_file = self.log_file.with_suffix(".json")
+        if legacy_file != self.log_file and legacy_file.exists():
+            with self._file_lock(exclusive=True):
+                if legacy_file.exists() and not self.log_file.exists():
+                    self._import_legacy(legacy_file)
+
+    def _reset(self) -> None:
+        """Empty the in-memory indexes and statistics"""
+        self._generation = None
+        self._offset = 0
+        self._line_count = 0
+        self._last_id = 0
+        self._entries: List[Dict[str, Any]] = []
+        # Entries with a valid timestamp, sorted by timestamp, and their timestamps
+        self._dated: List[Dict[str, Any]] = []
+        self._timestamps: List[datetime] = []
+        self._by_user: Dict[str, List[Dict[str, Any]]] = {}
+        self._total_file_size = 0
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool) -> Iterator[None]:
+        """Hold the in-process lock and a shared or exclusive lock on the lock file"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_file, "a+") as lock:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    lock.seek(0)
+                    content = lock.read().strip()
+                    self._lock_generation = int(content) if content.isdigit() else 0
+                    self._lock_handle = lock
+                    yield
+                finally:
+                    self._lock_handle = None
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def _bump_generation(self) -> None:
+        """Record a rewrite of the log in the lock file (exclusive lock held)"""
+        if self._lock_handle is None:
+            return
+        self._lock_generation += 1
+        self._lock_handle.seek(0)
+        self._lock_handle.truncate(0)
+        self._lock_handle.write(str(self._lock_generation))
+        self._lock_handle.flush()
+        os.fsync(self._lock_handle.fileno())
+
+    def _index(self, entry: Dict[str, Any]) -> None:
+        """Add one entry to the indexes and running statistics"""
+        self._entries.append(entry)
+        self._last_id = max(self._last_id, entry.get("id") or 0)
+        self._total_file_size += entry.get("file_size") or 0
+
+        user = entry.get("uploaded_by")
+        if user:
+            self._by_user.setdefault(user, []).append(entry)
+
+        timestamp = _parse_timestamp(entry)
+        if timestamp is not None:
+            # Appended in time order, except after a clock adjustment
+            position = bisect.bisect_right(self._timestamps, timestamp)
+            self._timestamps.insert(position, timestamp)
+            self._dated.insert(position, entry)
+
+    def _refresh(self) -> None:
+        """Index the lines appended since the last read (all of them if the log was rewritten)
+
+        A rewrite is recognised by the generation number of the lock file;
+        the file identity cannot be relied on, as the file system may give
+        the replacement file the inode of the old one.
+        """
+        try:
+            stat = os.stat(self.log_file)
+        except FileNotFoundError:
+            if self._generation is not None:
+                self._reset()
+            return
+
+        if self._lock_generation != self._generation or stat.st_size < self._offset:
+            self._reset()
+            self._generation = self._lock_generation
+        if stat.st_size == self._offset:
+            return
+
+        with open(self.log_file, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        # A line without its newline is still being written (or was cut short by a crash)
+        complete = data.rfind(b"\n") + 1
+        for line in data[:complete].splitlines():
+            if not line.strip():
+                continue
+            self._line_count += 1
+            try:
+                self._index(json.loads(line))
+            except ValueError:
+                logger.warning(f"Skipping unreadable line in upload log {self.log_file}")
+        self._offset += complete
+
+    def _rewrite(self, uploads: List[Dict[str, Any]]) -> None:
+        """Replace the log with uploads and reindex (exclusive lock held)"""
+        temp_file = self.log_file.with_name(self.log_file.name + ".tmp")
+        with open(temp_file, "w", encoding="utf-8") as f:
+            for upload in uploads:
+                f.write(json.dumps(upload, ensure_ascii=False, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        # Bumped first: a crash before the replace only costs the others a rescan
+        self._bump_generation()
+        os.replace(temp_file, self.log_file)
+        self._reset()
+        self._refresh()
+
+    def _import_legacy(self, legacy_file: Path) -> None:
+        try:
+            with open(legacy_file, "r", encoding="utf-8") as f:
+                uploads = json.load(f)
+            self._rewrite(uploads)
+            legacy_file.rename(legacy_file.with_name(legacy_file.name + ".migrated"))
+            logger.info(f"Moved {len(uploads)} uploads from {legacy_file} to {self.log_file}")
+        except Exception as e:
+            logger.error(f"Failed to import legacy upload log {legacy_file}: {e}")
+
     def log_upload(self, upload_info: Dict[str, Any]) -> None:
         """Log a file upload with timestamp and metadata"""
         try:
-            # Read existing logs
-            uploads = self._read_log()
-            
-            # Add new upload entry
-            upload_entry = {
-                "id": len(uploads) + 1,
-                "timestamp": datetime.utcnow().isoformat(),
-                **upload_info
-            }
-            uploads.append(upload_entry)
-            
-            # Keep only the last 1000 uploads to prevent log file from growing too large
-            if len(uploads) > 1000:
-                uploads = uploads[-1000:]
-            
-            # Write back to file
-            self._write_log(uploads)
-            
+            with self._file_lock(exclusive=True):
+                self._refresh()
+                upload_entry = {
+                    "id": self._last_id + 1,
+                    "timestamp": datetime.utcnow().isoformat(),
+                    **upload_info
+                }
+                line = json.dumps(upload_entry, ensure_ascii=False, default=str) + "\n"
+                with open(self.log_file, "a", encoding="utf-8") as f:
+                    # Start a new line after a partial one left by a crash
+                    if f.tell() > self._offset:
+                        line = "\n" + line
+                    f.write(line)
+                self._refresh()
+
+                if self._line_count >= 2 * self.max_entries:
+                    self._rewrite(self._entries[-self.max_entries:])
+
             logger.info(f"Logged upload: {upload_info.get('timestamped_filename', 'unknown')}")
-            
+
         except Exception as e:
             logger.error(f"Failed to log upload: {e}")
-    
+
+    def _current(self) -> None:
+        with self._file_lock(exclusive=False):
+            self._refresh()
+
     def get_recent_uploads(self, limit: int = 50) -> List[Dict[str, Any]]:
         """Get recent uploads, most recent first"""
         try:
-            uploads = self._read_log()
-            return uploads[-limit:] if uploads else []
+            with self._lock:
+                self._current()
+                return copy.deepcopy(self._entries[-limit:])
         except Exception as e:
             logger.error(f"Failed to read upload log: {e}")
             return []
-    
+
     def get_uploads_by_user(self, username: str, limit: int = 50) -> List[Dict[str, Any]]:
         """Get uploads by specific user"""
         try:
-            uploads = self._read_log()
-            user_uploads = [u for u in uploads if u.get('uploaded_by') == username]
-            return user_uploads[-limit:] if user_uploads else []
+            with self._lock:
+                self._current()
+                return copy.deepcopy(self._by_user.get(username, [])[-limit:])
         except Exception as e:
             logger.error(f"Failed to read upload log for user {username}: {e}")
             return []
-    
+
     def get_uploads_by_date_range(self, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
         """Get uploads within a date range"""
         try:
-            uploads = self._read_log()
-            filtered_uploads = []
-            
-            for upload in uploads:
-                upload_time = datetime.fromisoformat(upload.get('timestamp', ''))
-                if start_date <= upload_time <= end_date:
-                    filtered_uploads.append(upload)
-            
-            return filtered_uploads
+            with self._lock:
+                self._current()
+                first = bisect.bisect_left(self._timestamps, start_date)
+                last = bisect.bisect_right(self._timestamps, end_date)
+                return copy.deepcopy(self._dated[first:last])
         except Exception as e:
             logger.error(f"Failed to filter uploads by date range: {e}")
             return []
-    
+
+    def _count_since(self, moment: datetime) -> int:
+        return len(self._timestamps) - bisect.bisect_left(self._timestamps, moment)
+
     def get_upload_statistics(self) -> Dict[str, Any]:
         """Get upload statistics"""
         try:
-            uploads = self._read_log()
-            
-            if not uploads:
+            with self._lock:
+                self._current()
+                total_uploads = len(self._entries)
+                if not total_uploads:
+                    return {
+                        "total_uploads": 0,
+                        "unique_users": 0,
+                        "total_file_size": 0,
+                        "uploads_today": 0,
+                        "uploads_this_week": 0,
+                        "uploads_this_month": 0
+                    }
+
+                now = datetime.utcnow()
+                today = now.replace(hour=0, minute=0, second=0, microsecond=0)
                 return {
-                    "total_uploads": 0,
-                    "unique_users": 0,
-                    "total_file_size": 0,
-                    "uploads_today": 0,
-                    "uploads_this_week": 0,
-                    "uploads_this_month": 0
+                    "total_uploads": total_uploads,
+                    "unique_users": len(self._by_user),
+                    "total_file_size": self._total_file_size,
+                    "average_file_size": self._total_file_size / total_uploads,
+                    "uploads_today": self._count_since(today),
+                    "uploads_this_week": self._count_since(now - timedelta(days=7)),
+                    "uploads_this_month": self._count_since(now - timedelta(days=30)),
+                    "most_active_user": self._get_most_active_user()
                 }
-            
-            # Calculate statistics
-            total_uploads = len(uploads)
-            unique_users = len(set(u.get('uploaded_by') for u in uploads if u.get('uploaded_by')))
-            total_file_size = sum(u.get('file_size', 0) for u in uploads)
-            
-            # Date-based statistics
-            now = datetime.utcnow()
-            today = now.date()
-            week_ago = now.replace(day=now.day-7) if now.day > 7 else now.replace(month=now.month-1, day=30-7+now.day)
-            month_ago = now.replace(month=now.month-1) if now.month > 1 else now.replace(year=now.year-1, month=12)
-            
-            uploads_today = len([u for u in uploads 
-                               if datetime.fromisoformat(u.get('timestamp', '')).date() == today])
-            uploads_this_week = len([u for u in uploads 
-                                   if datetime.fromisoformat(u.get('timestamp', '')) >= week_ago])
-            uploads_this_month = len([u for u in uploads 
-                                    if datetime.fromisoformat(u.get('timestamp', '')) >= month_ago])
-            
-            return {
-                "total_uploads": total_uploads,
-                "unique_users": unique_users,
-                "total_file_size": total_file_size,
-                "average_file_size": total_file_size / total_uploads if total_uploads > 0 else 0,
-                "uploads_today": uploads_today,
-                "uploads_this_week": uploads_this_week,
-                "uploads_this_month": uploads_this_month,
-                "most_active_user": self._get_most_active_user(uploads)
-            }
-            
+
         except Exception as e:
             logger.error(f"Failed to calculate upload statistics: {e}")
             return {"error": str(e)}
-    
+
     def cleanup_old_files(self, days_old: int = 30) -> int:
         """Clean up uploaded files older than specified days"""
         try:
-            uploads = self._read_log()
-            cutoff_date = datetime.utcnow().replace(day=datetime.utcnow().day - days_old)
-            
-            files_deleted = 0
-            remaining_uploads = []
-            
-            for upload in uploads:
-                upload_time = datetime.fromisoformat(upload.get('timestamp', ''))
-                
-                if upload_time < cutoff_date:
+            cutoff_date = datetime.utcnow() - timedelta(days=days_old)
+            with self._file_lock(exclusive=True):
+                self._refresh()
+                expired = set(map(id, self._dated[:bisect.bisect_left(self._timestamps, cutoff_date)]))
+                if not expired:
+                    return 0
+
+                files_deleted = 0
+                for upload in self._entries:
+                    if id(upload) not in expired:
+                        continue
                     # Delete the file if it exists
                     file_path = Path(upload.get('file_path', ''))
-                    if file_path.exists():
+                    if file_path.is_file():
                         file_path.unlink()
                         files_deleted += 1
                         logger.info(f"Deleted old file: {file_path}")
-                else:
-                    remaining_uploads.append(upload)
-            
-            # Update log with remaining uploads
-            self._write_log(remaining_uploads)
-            
+
+                # Update log with remaining uploads
+                self._rewrite([upload for upload in self._entries if id(upload) not in expired])
+
             return files_deleted
-            
+
         except Exception as e:
             logger.error(f"Failed to cleanup old files: {e}")
             return 0
-    
-    def _read_log(self) -> List[Dict[str, Any]]:
-        """Read upload log from file"""
-        try:
-            if self.log_file.exists():
-                with open(self.log_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return []
-        except Exception as e:
-            logger.error(f"Failed to read upload log: {e}")
-            return []
-    
-    def _write_log(self, uploads: List[Dict[str, Any]]) -> None:
-        """Write upload log to file"""
-        try:
-            with open(self.log_file, 'w', encoding='utf-8') as f:
-                json.dump(uploads, f, indent=2, ensure_ascii=False, default=str)
-        except Exception as e:
-            logger.error(f"Failed to write upload log: {e}")
-    
-    def _get_most_active_user(self, uploads: List[Dict[str, Any]]) -> Optional[str]:
+
+    def _get_most_active_user(self) -> Optional[str]:
         """Get the most active user from uploads"""
-        try:
-            user_counts = {}
-            for upload in uploads:
-                user = upload.get('uploaded_by')
-                if user:
-                    user_counts[user] = user_counts.get(user, 0) + 1
-            
-            if user_counts:
-                return max(user_counts.items(), key=lambda x: x[1])[0]
-            return None
-            
-        except Exception as e:
-            logger.error(f"Failed to get most active user: {e}")
+        if not self._by_user:
             return None
+        return max(self._by_user.items(), key=lambda item: len(item[1]))[0]
 
 
 # Global tracker instance
-upload_tracker = UploadTracker()
\ No newline at end of file
+upload_tracker = UploadTracker(config.UPLOAD_LOG_PATH, config.UPLOAD_LOG_MAX_ENTRIES)
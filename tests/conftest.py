@@ -0,0 +1,172 @@
+"""
+Shared fixtures for the platform tests
+Database tests run on in-memory SQLite; the PostgreSQL-only features (COPY,
+partitions, row locks) use TEST_DATABASE_URL and are skipped without it
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Add the project root to the Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.domain.survey import progress_service  # noqa: E402
+from src.infrastructure.auth import oauth2  # noqa: E402
+from src.infrastructure.database import models  # noqa: E402
+from src.infrastructure.database.connection import db_manager, get_db  # noqa: E402
+from src.services.audit_writer import audit_writer  # noqa: E402
+
+# Tables of a survey and of the responses, progress, statistics and exports stored for it
+SURVEY_MODELS = (
+    models.Survey, models.Section, models.Subsection, models.Question, models.AnswerOption,
+    models.Response, models.ResponseDetail, models.RespondentProgress,
+    models.SurveyResponseStatistics, models.QuestionStatistics, models.DataExport
+)
+
+# Signed-in user of the API tests
+ADMIN_USERNAME = "admin@instat.ml"
+
+
+@pytest.fixture
+def sqlite_engine():
+    """Empty in-memory SQLite database shared by all sessions of a test"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+    @event.listens_for(engine, "connect")
+    def attach_public_schema(dbapi_connection, _):
+        # Models of the public schema (users, audit log) are qualified with it
+        dbapi_connection.execute("ATTACH DATABASE ':memory:' AS public")
+
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def make_sqlite_session(sqlite_engine):
+    """Create the given model tables and return a session factory"""
+    def factory(*model_classes):
+        models.Base.metadata.create_all(sqlite_engine, tables=[m.__table__ for m in model_classes])
+        return sessionmaker(bind=sqlite_engine)
+    return factory
+
+
+@pytest.fixture(scope="session")
+def pg_database_url():
+    """Scratch database created next to the one of TEST_DATABASE_URL for the test run"""
+    url = os.environ.get("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    name = f"instat_test_{os.getpid()}"
+    admin = create_engine(url, isolation_level="AUTOCOMMIT")
+    with admin.connect() as connection:
+        connection.execute(text(f'CREATE DATABASE "{name}"'))
+    yield make_url(url).set(database=name)
+    with admin.connect() as connection:
+        connection.execute(text(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)'))
+    admin.dispose()
+
+
+@pytest.fixture
+def pg_engine(pg_database_url):
+    """Engine on the scratch PostgreSQL database, tables dropped afterwards"""
+    engine = create_engine(pg_database_url)
+    yield engine
+    models.Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def make_pg_session(pg_engine):
+    """Create the given model tables on PostgreSQL and return a session factory"""
+    def factory(*model_classes):
+        models.Base.metadata.create_all(pg_engine, tables=[m.__table__ for m in model_classes])
+        return sessionmaker(bind=pg_engine)
+    return factory
+
+
+@pytest.fixture
+def make_api_client(make_sqlite_session, monkeypatch, tmp_path):
+    """Create the Users table and the given model tables, and return a test client of
+    the API signed in as an admin with a real access token
+
+    Background work (export jobs, audit entries) uses the same database;
+    audit spools go to the test's temporary directory.
+    """
+    from fastapi.testclient import TestClient
+    from main import get_application
+
+    monkeypatch.setattr(audit_writer, "spool_path", tmp_path / "audit_spool.jsonl")
+    monkeypatch.setattr(audit_writer, "lock_path", tmp_path / "audit_spool.jsonl.lock")
+    oauth2.user_cache.invalidate()
+
+    def factory(*model_classes):
+        session_factory = make_sqlite_session(models.User, *model_classes)
+        monkeypatch.setattr(db_manager, "SessionLocal", session_factory)
+        db = session_factory()
+        admin = models.User(Username=ADMIN_USERNAME, Email=ADMIN_USERNAME, HashedPassword="-", Role="admin")
+        db.add(admin)
+        db.commit()
+        token = oauth2.create_access_token({"sub": admin.Username, "role": admin.Role, "user_id": admin.UserID})
+        db.close()
+
+        def get_test_db():
+            db = session_factory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app = get_application()
+        app.dependency_overrides[get_db] = get_test_db
+        return TestClient(app, headers={"Authorization": f"Bearer {token}"})
+
+    yield factory
+    audit_writer.flush()
+
+
+@pytest.fixture
+def survey_models():
+    """Model classes of the survey tables (SURVEY_MODELS)"""
+    return SURVEY_MODELS
+
+
+@pytest.fixture
+def make_survey():
+    """Create a survey with one section and one question per given type
+
+    Returns (survey_id, question id by type, option ids of the single_choice question).
+    """
+    def factory(db, question_types=("region", "number", "date", "single_choice", "boolean", "text")):
+        survey = models.Survey(Title="Enquete test", Version=1)
+        db.add(survey)
+        db.flush()
+        section = models.Section(SurveyID=survey.SurveyID, Title="Section 1")
+        db.add(section)
+        db.flush()
+        questions = [
+            models.Question(SectionID=section.SectionID, QuestionText=question_type, QuestionType=question_type)
+            for question_type in question_types
+        ]
+        db.add_all(questions)
+        db.flush()
+        options = []
+        if "single_choice" in question_types:
+            choice = questions[list(question_types).index("single_choice")]
+            options = [models.AnswerOption(QuestionID=choice.QuestionID, OptionText=text) for text in ("Oui", "Non")]
+            db.add_all(options)
+            db.flush()
+        db.commit()
+        # Survey ids repeat across test databases
+        progress_service.invalidate_survey_structure(survey.SurveyID)
+        return (
+            survey.SurveyID,
+            {question.QuestionType: question.QuestionID for question in questions},
+            [option.OptionID for option in options]
+        )
+    return factory
@@ -0,0 +1,41 @@
+"""
+Tests for the user administration routes
+"""
+import pytest
+
+from src.infrastructure.auth.password_hashing import password_hasher
+from src.infrastructure.database import models
+
+
+@pytest.fixture
+def client(make_api_client):
+    return make_api_client(models.AuditLog)
+
+
+def _create_user(client, email):
+    return client.post("/v1/api/admin/users", json={
+        "email": email, "first_name": "Awa", "last_name": "Traore", "role": "viewer", "password": "s3cret-pass"
+    })
+
+
+def test_create_user(client):
+    """An admin creates a user whose password is stored hashed"""
+    response = _create_user(client, "awa@instat.ml")
+    assert response.status_code == 201
+    assert response.json()["username"] == "awa@instat.ml"
+
+
+def test_create_user_over_hash_limit_is_429(client, monkeypatch):
+    """A client over its password hashing limit gets 429, not 400"""
+    monkeypatch.setattr(password_hasher, "per_ip_limit", 0)
+    response = _create_user(client, "awa@instat.ml")
+    assert response.status_code == 429
+
+
+def test_reset_password_over_hash_limit_is_429(client, monkeypatch):
+    """A client over its password hashing limit gets 429, not 500"""
+    user_id = _create_user(client, "awa@instat.ml").json()["user_id"]
+    monkeypatch.setattr(password_hasher, "per_ip_limit", 0)
+
+    response = client.post(f"/v1/api/admin/users/{user_id}/reset-password", json={})
+    assert response.status_code == 429
@@ -0,0 +1,113 @@
+"""
+Tests for survey response analytics
+"""
+from datetime import timedelta
+
+import pytest
+
+from src.domain.survey import analytics_service, progress_service, response_service
+from src.infrastructure.database import models
+from src.infrastructure.database.connection import db_manager
+from src.infrastructure.database.mali_ref_models import MaliRegionModel
+from schemas.survey_extensions import SurveyResponseCreate
+
+
+def _make_two_section_survey(db):
+    """Survey with a region and a text question in section 1 and a number question in section 2"""
+    survey = models.Survey(Title="Analytics", Version=1)
+    db.add(survey)
+    db.flush()
+    sections = [models.Section(SurveyID=survey.SurveyID, Title=title) for title in ("S1", "S2")]
+    db.add_all(sections)
+    db.flush()
+    questions = [
+        models.Question(SectionID=sections[0].SectionID, QuestionText="Region", QuestionType="region"),
+        models.Question(SectionID=sections[0].SectionID, QuestionText="Nom", QuestionType="text"),
+        models.Question(SectionID=sections[1].SectionID, QuestionText="Age", QuestionType="number")
+    ]
+    db.add_all(questions)
+    db.add_all([MaliRegionModel(region_code=code, region_name=name)
+                for code, name in (("01", "Kayes"), ("02", "Koulikoro"), ("03", "Sikasso"))])
+    db.commit()
+    progress_service.invalidate_survey_structure(survey.SurveyID)
+    return survey.SurveyID, [section.SectionID for section in sections], [q.QuestionID for q in questions]
+
+
+def _submit(db, survey_id, respondent_id, answers):
+    structure = response_service.get_question_options(db, survey_id)
+    response_service.ingest_responses(db, [response_service.prepare_response(survey_id, SurveyResponseCreate(
+        survey_id=survey_id, respondent_id=respondent_id,
+        responses=[{"question_id": question_id, "value": value} for question_id, value in answers]
+    ), structure)])
+
+
+@pytest.fixture
+def db(make_sqlite_session, survey_models):
+    analytics_service.analytics_cache.invalidate()
+    session = make_sqlite_session(*survey_models, MaliRegionModel)()
+    yield session
+    session.close()
+
+
+def test_parse_time_period():
+    assert analytics_service.parse_time_period("7d") == timedelta(days=7)
+    assert analytics_service.parse_time_period("2w") == timedelta(days=14)
+    assert analytics_service.parse_time_period("1y") == timedelta(days=365)
+    for invalid in ("", "0d", "30", "7h", "d7"):
+        with pytest.raises(analytics_service.InvalidTimePeriodError):
+            analytics_service.parse_time_period(invalid)
+
+
+def test_analytics_of_complete_and_abandoned_responses(db):
+    """Completion, abandonment, duplicates and regions come out of the answers"""
+    survey_id, sections, (region, name, age) = _make_two_section_survey(db)
+    _submit(db, survey_id, "R-1", [(region, "01"), (name, "Awa"), (age, 30)])
+    _submit(db, survey_id, "R-2", [(region, "01"), (name, "Moussa")])
+    _submit(db, survey_id, "R-2", [(region, "02")])
+    _submit(db, survey_id, "R-3", [])
+
+    analytics = analytics_service.get_survey_analytics(db, survey_id, "7d")
+    assert (analytics["total_responses"], analytics["unique_respondents"]) == (4, 3)
+    assert analytics["quality_metrics"] == {
+        "average_completion": round((1 + 2 / 3 + 1 / 3 + 0) / 4, 4),
+        "incomplete_responses": 3,
+        "duplicate_responses": 1
+    }
+    trends = analytics["response_trends"]
+    assert len(trends["dates"]) == 8 and sum(trends["daily_responses"]) == 4
+    # Two responses stopped after section 1, one before it
+    assert trends["abandonment_points"] == {f"section_{sections[0]}": 0.25, f"section_{sections[1]}": 0.5}
+    assert analytics["geographic_insights"] == {
+        "top_regions": [
+            {"region": "Kayes", "region_code": "01", "responses": 2, "completion_rate": round(5 / 6, 4)},
+            {"region": "Koulikoro", "region_code": "02", "responses": 1, "completion_rate": round(1 / 3, 4)}
+        ],
+        "coverage_gaps": ["Sikasso"]
+    }
+
+
+def test_analytics_are_cached_until_a_response_is_saved(db):
+    """Saving a response drops the cached analytics of its survey"""
+    survey_id, _, (region, _, _) = _make_two_section_survey(db)
+    assert analytics_service.get_survey_analytics(db, survey_id)["total_responses"] == 0
+    assert analytics_service.get_survey_analytics(db, 999) is None
+
+    _submit(db, survey_id, "R-1", [(region, "03")])
+    analytics = analytics_service.get_survey_analytics(db, survey_id)
+    assert analytics["total_responses"] == 1
+    assert analytics["geographic_insights"]["top_regions"][0]["region"] == "Sikasso"
+
+
+def test_analytics_route(make_api_client, survey_models):
+    """The analytics endpoint rejects an unreadable time period with 400"""
+    analytics_service.analytics_cache.invalidate()
+    client = make_api_client(*survey_models, MaliRegionModel)
+    db = db_manager.SessionLocal()
+    survey_id, _, _ = _make_two_section_survey(db)
+    db.close()
+
+    response = client.get(f"/v1/api/surveys/{survey_id}/analytics", params={"time_period": "90d"})
+    assert response.status_code == 200
+    assert response.json()["data"]["time_period"] == "90d"
+    assert client.get(f"/v1/api/surveys/{survey_id}/analytics", params={"time_period": "soon"}).status_code == 400
+    assert client.get("/v1/api/surveys/999/analytics").status_code == 404
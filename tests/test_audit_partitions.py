@@ -0,0 +1,156 @@
+"""
+Tests for audit log partitioning (PostgreSQL) and retention
+"""
+import importlib.util
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import insert, text
+
+import config
+from src.infrastructure.database.connection import db_manager
+from src.infrastructure.database.models import AuditLog
+from src.services import audit_partitions
+from src.services.audit_partitions import DEFAULT_PARTITION, AuditPartitionService, partition_name
+
+
+def _migration(name):
+    path = Path(__file__).resolve().parent.parent / "migrations" / "versions" / f"{name}.py"
+    spec = importlib.util.spec_from_file_location(f"migration_{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+MIGRATION_008 = _migration("008_partition_audit_log")
+
+
+def _add_entries(db, timestamps):
+    db.execute(insert(AuditLog.__table__), [{"Action": "login", "Timestamp": moment} for moment in timestamps])
+    db.commit()
+
+
+def _catalog(db):
+    """(primary key name, index names) of public.AuditLog"""
+    primary_key = db.execute(text(
+        "SELECT conname FROM pg_constraint WHERE conrelid = 'public.\"AuditLog\"'::regclass AND contype = 'p'"
+    )).scalar()
+    indexes = db.execute(text(
+        "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE i.indrelid = 'public.\"AuditLog\"'::regclass AND NOT i.indisprimary"
+    )).scalars().all()
+    return primary_key, sorted(indexes)
+
+
+def test_partitioning_round_trip_keeps_rows_and_frozen_indexes(make_pg_session):
+    """Both conversions keep every row, the primary key name and the migration's index list"""
+    db = make_pg_session(AuditLog)()
+    now = datetime(2026, 3, 15)
+    _add_entries(db, [now - timedelta(days=40 * i) for i in range(6)])
+    frozen_names = sorted(name for name, _, _ in MIGRATION_008.INDEXES)
+
+    service = AuditPartitionService(db)
+    created = service.convert_to_partitioned(MIGRATION_008.INDEXES, now=now)
+    db.commit()
+    assert service.is_partitioned()
+    assert "AuditLog_2025_10" in created and "AuditLog_2026_06" in created
+    assert db.query(AuditLog).count() == 6
+    assert _catalog(db) == ("AuditLog_pkey", frozen_names)
+
+    service.convert_to_unpartitioned(MIGRATION_008.INDEXES)
+    db.commit()
+    assert not service.is_partitioned()
+    assert db.query(AuditLog).count() == 6
+    assert _catalog(db) == ("AuditLog_pkey", frozen_names)
+    db.close()
+
+
+def test_migration_partitions_when_enabled(make_pg_session, monkeypatch):
+    """Migration 008 builds the same table as the service, and only when AUDIT_LOG_PARTITIONING is set"""
+    db = make_pg_session(AuditLog)()
+    timestamps = [datetime.utcnow() - timedelta(days=40 * i) for i in range(3)]
+    _add_entries(db, timestamps)
+    frozen_names = sorted(name for name, _, _ in MIGRATION_008.INDEXES)
+
+    def migrate(step):
+        with Operations.context(MigrationContext.configure(db.connection())):
+            step()
+        db.commit()
+
+    monkeypatch.setattr(config, "AUDIT_LOG_PARTITIONING", False)
+    migrate(MIGRATION_008.upgrade)
+    assert not AuditPartitionService(db).is_partitioned()
+
+    monkeypatch.setattr(config, "AUDIT_LOG_PARTITIONING", True)
+    migrate(MIGRATION_008.upgrade)
+    service = AuditPartitionService(db)
+    assert service.is_partitioned() and service.partitions()[0][1] == partition_name(timestamps[-1])
+    assert (db.query(AuditLog).count(), _catalog(db)) == (3, ("AuditLog_pkey", frozen_names))
+
+    migrate(MIGRATION_008.downgrade)
+    assert not service.is_partitioned()
+    assert (db.query(AuditLog).count(), _catalog(db)) == (3, ("AuditLog_pkey", frozen_names))
+    db.close()
+
+
+def test_partitioning_refuses_entries_without_timestamp(make_pg_session):
+    """Entries without a Timestamp stop the conversion instead of being dated now"""
+    db = make_pg_session(AuditLog)()
+    _add_entries(db, [datetime(2026, 1, 5), None])
+
+    with pytest.raises(RuntimeError, match="1 AuditLog entries have no Timestamp"):
+        AuditPartitionService(db).convert_to_partitioned(MIGRATION_008.INDEXES)
+    db.rollback()
+    assert db.query(AuditLog).filter(AuditLog.Timestamp.is_(None)).count() == 1
+    db.close()
+
+
+def test_months_in_the_default_partition_get_their_own(make_pg_session, monkeypatch):
+    """Entries past the created months are moved out of the default partition once their month is created"""
+    monkeypatch.setattr(config, "AUDIT_PARTITION_MONTHS_AHEAD", 1)
+    session_factory = make_pg_session(AuditLog)
+    db = session_factory()
+    service = AuditPartitionService(db)
+    service.convert_to_partitioned(MIGRATION_008.INDEXES, now=datetime(2026, 3, 15))
+    db.commit()
+    _add_entries(db, [datetime(2026, 3, 20), datetime(2026, 6, 2), datetime(2026, 6, 28), datetime(2027, 1, 1)])
+
+    def rows(table):
+        return db.execute(text(f'SELECT count(*) FROM public."{table}"')).scalar()
+    assert rows(DEFAULT_PARTITION) == 3
+
+    assert service.ensure_partitions(now=datetime(2026, 5, 10)) == ["AuditLog_2026_05", "AuditLog_2026_06"]
+    db.commit()
+    assert (rows("AuditLog_2026_06"), rows(DEFAULT_PARTITION), db.query(AuditLog).count()) == (2, 1, 4)
+    _add_entries(db, [datetime(2027, 2, 1)])
+    assert rows(DEFAULT_PARTITION) == 2
+
+    # A failure to create partitions does not stop retention
+    def fail(*args, **kwargs):
+        raise RuntimeError("no partitions")
+    monkeypatch.setattr(db_manager, "SessionLocal", session_factory)
+    monkeypatch.setattr(AuditPartitionService, "ensure_partitions", fail)
+    monkeypatch.setattr(config, "AUDIT_LOG_RETENTION_DAYS", (datetime.utcnow() - datetime(2026, 7, 1)).days)
+    db.commit()
+    result = audit_partitions.maintain_audit_log()
+    assert result["created_partitions"] == [] and "AuditLog_2026_06" in result["dropped_partitions"]
+    assert db.query(AuditLog).count() == 2
+    db.close()
+
+
+def test_retention_deletes_expired_entries_in_batches(make_sqlite_session, monkeypatch):
+    """Entries older than the retention period are deleted, newer ones kept"""
+    monkeypatch.setattr(config, "AUDIT_LOG_RETENTION_DAYS", 30)
+    monkeypatch.setattr(config, "AUDIT_RETENTION_BATCH_SIZE", 2)
+    db = make_sqlite_session(AuditLog)()
+    now = datetime(2026, 3, 15)
+    _add_entries(db, [now - timedelta(days=days) for days in (1, 10, 31, 45, 60, 90, 120)])
+
+    result = AuditPartitionService(db).apply_retention(now=now)
+    assert result["deleted_rows"] == 5
+    assert result["dropped_partitions"] == []
+    assert db.query(AuditLog).count() == 2
+    db.close()
@@ -0,0 +1,92 @@
+"""
+Tests for the hourly and daily audit log rollups
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from src.infrastructure.database.models import AuditLog, AuditLogRollup
+from src.services.audit_rollup import AuditRollupService
+
+NOW = datetime(2026, 3, 15, 10, 30)
+
+
+def _entry(moment, i):
+    return {
+        "Action": ("login", "create", "delete")[i % 3],
+        "Resource": ("user", "survey", None)[i % 4 % 3],
+        "Success": i % 5 != 0,
+        "Timestamp": moment
+    }
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def audit_db(request):
+    """Audit entries every 50 minutes over the four days before NOW, and a few after it"""
+    make_session = request.getfixturevalue(f"make_{'pg' if request.param == 'postgresql' else 'sqlite'}_session")
+    db = make_session(AuditLog, AuditLogRollup)()
+    moments = [NOW - timedelta(days=4) + timedelta(minutes=50 * i) for i in range(125)]
+    db.execute(insert(AuditLog.__table__), [_entry(moment, i) for i, moment in enumerate(moments)])
+    db.commit()
+    yield db
+    db.close()
+
+
+def _expected(db, start_date=None, end_date=None):
+    """Statistics counted from AuditLog directly (whole hours, end hour included)"""
+    low = start_date.replace(minute=0, second=0, microsecond=0) if start_date else None
+    high = end_date.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1) if end_date else None
+    entries = [entry for entry in db.query(AuditLog)
+               if (low is None or entry.Timestamp >= low) and (high is None or entry.Timestamp < high)]
+    successful = sum(1 for entry in entries if entry.Success)
+    return {
+        "total_actions": len(entries),
+        "successful_actions": successful,
+        "failed_actions": len(entries) - successful,
+        "success_rate": (successful / len(entries) * 100) if entries else 0,
+        "action_types": dict(Counter(entry.Action for entry in entries)),
+        "resource_types": dict(Counter(entry.Resource for entry in entries))
+    }
+
+
+RANGES = [
+    (None, None),
+    (NOW - timedelta(days=3, hours=5, minutes=10), None),
+    (None, NOW - timedelta(days=1, hours=2)),
+    (NOW - timedelta(days=3, hours=1), NOW - timedelta(hours=20)),
+    (NOW - timedelta(hours=3), NOW + timedelta(hours=2)),
+    (NOW - timedelta(days=2, hours=6), NOW - timedelta(days=2, hours=6)),
+]
+
+
+def test_statistics_match_the_audit_log(audit_db):
+    """Rolled-up days and hours plus the raw tail count like a scan of AuditLog"""
+    service = AuditRollupService(audit_db)
+    before = [service.get_statistics(start, end) for start, end in RANGES]
+    assert before == [_expected(audit_db, start, end) for start, end in RANGES]
+
+    result = service.refresh(now=NOW)
+    assert result["hours_through"] == datetime(2026, 3, 15, 10)
+    assert result["day_rows"] > 0
+    for start, end in RANGES:
+        assert service.get_statistics(start, end) == _expected(audit_db, start, end)
+
+
+def test_refresh_counts_entries_written_late(audit_db):
+    """Entries logged late inside the lookback window are counted by the next refresh"""
+    service = AuditRollupService(audit_db)
+    service.refresh(now=NOW)
+    late = NOW - timedelta(hours=2)
+    audit_db.execute(insert(AuditLog.__table__), [_entry(late, 1), _entry(late, 2)])
+    audit_db.commit()
+
+    service.refresh(now=NOW)
+    assert service.get_statistics() == _expected(audit_db)
+    rows = [(row.Granularity, row.BucketStart, row.Action, row.Resource, row.Success, row.Count)
+            for row in audit_db.query(AuditLogRollup).order_by(AuditLogRollup.RollupID)]
+    service.refresh(now=NOW, full=True)
+    rebuilt = [(row.Granularity, row.BucketStart, row.Action, row.Resource, row.Success, row.Count)
+               for row in audit_db.query(AuditLogRollup).order_by(AuditLogRollup.RollupID)]
+    assert sorted(rows, key=repr) == sorted(rebuilt, key=repr)
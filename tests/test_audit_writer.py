@@ -0,0 +1,146 @@
+"""
+Tests for the background audit writer and its spool files
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from src.infrastructure.database.models import AuditLog
+from src.services.audit_writer import AuditWriter
+
+
+class _Database:
+    """Session factory that can be switched off to simulate an outage"""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self.available = True
+
+    def __call__(self):
+        if not self.available:
+            raise ConnectionError("database unavailable")
+        return self.session_factory()
+
+
+@pytest.fixture
+def database(make_sqlite_session):
+    return _Database(make_sqlite_session(AuditLog))
+
+
+def _writer(database, tmp_path, **options):
+    return AuditWriter(spool_path=str(tmp_path / "audit_spool.jsonl"), session_factory=database, **options)
+
+
+def _actions(database):
+    db = database.session_factory()
+    try:
+        return sorted(action for (action,) in db.query(AuditLog.Action))
+    finally:
+        db.close()
+
+
+def _dead_pid():
+    """Id of a process that has exited"""
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_entries_are_written_in_batches(database, tmp_path):
+    """Submitted entries reach AuditLog once flushed"""
+    writer = _writer(database, tmp_path, batch_size=3, flush_interval_ms=20)
+    for i in range(7):
+        writer.submit({"Action": f"action-{i}", "Success": True})
+    assert writer.flush()
+    writer.shutdown()
+    assert _actions(database) == [f"action-{i}" for i in range(7)]
+
+
+def test_outage_spools_to_the_process_file_and_replays_once(database, tmp_path):
+    """Unwritten entries go to the per-process spool and are written once the database is back"""
+    writer = _writer(database, tmp_path, flush_interval_ms=20)
+    database.available = False
+    writer.submit({"Action": "during-outage"})
+    assert writer.flush()
+    assert writer.process_spool_path == tmp_path / f"audit_spool.{os.getpid()}.jsonl"
+    assert writer.process_spool_path.exists()
+    assert not (tmp_path / "audit_spool.jsonl").exists()
+
+    database.available = True
+    writer._retry_at = 0
+    writer._replay_spool()
+    writer._replay_spool()
+    writer.shutdown()
+    assert _actions(database) == ["during-outage"]
+    assert not list(tmp_path.glob("audit_spool*.jsonl")) + list(tmp_path.glob("*.replay"))
+
+
+def test_spools_of_dead_processes_are_adopted(database, tmp_path):
+    """Spools of exited processes and the former shared spool are replayed; live ones are left alone"""
+    line = json.dumps({"Action": "orphan", "Timestamp": "2025-01-01T00:00:00"}) + "\n"
+    (tmp_path / f"audit_spool.{_dead_pid()}.jsonl").write_text(line)
+    (tmp_path / f"audit_spool.{_dead_pid()}.jsonl.replay").write_text(line)
+    (tmp_path / "audit_spool.jsonl").write_text(line)
+    live_spool = tmp_path / f"audit_spool.{os.getppid()}.jsonl"
+    live_spool.write_text(line)
+
+    writer = _writer(database, tmp_path)
+    writer._replay_spool()
+    assert _actions(database) == ["orphan"] * 3
+    assert live_spool.exists()
+
+
+def test_replay_is_skipped_while_another_process_holds_the_lock(database, tmp_path):
+    """Only one process replays the shared spool files at a time"""
+    orphan = tmp_path / f"audit_spool.{_dead_pid()}.jsonl.replay"
+    orphan.write_text(json.dumps({"Action": "orphan"}) + "\n")
+    first, second = _writer(database, tmp_path), _writer(database, tmp_path)
+
+    with first._replay_lock() as locked:
+        assert locked
+        second._replay_spool()
+        assert orphan.exists()
+    second._replay_spool()
+    assert _actions(database) == ["orphan"]
+
+
+def test_replay_file_removed_meanwhile_is_not_an_error(database, tmp_path):
+    """A replay file that disappears before it is read does not stop the writer"""
+    writer = _writer(database, tmp_path)
+    assert writer._replay_file_entries(tmp_path / "audit_spool.1.jsonl.replay")
+
+
+def test_flush_does_not_block_on_a_full_queue(tmp_path):
+    """flush gives up after its timeout even when the queue has no room for the wake-up"""
+    release = threading.Event()
+
+    def stuck_session():
+        release.wait(10)
+        raise ConnectionError("database unavailable")
+
+    writer = AuditWriter(queue_size=1, batch_size=1, flush_interval_ms=10,
+                         spool_path=str(tmp_path / "audit_spool.jsonl"), session_factory=stuck_session)
+    writer.submit({"Action": "first"})
+    time.sleep(0.1)
+    writer.submit({"Action": "second"})
+
+    started = time.monotonic()
+    assert writer.flush(timeout=0.3) is False
+    assert time.monotonic() - started < 2
+    release.set()
+    writer.shutdown()
+
+
+def test_idle_writer_does_not_take_the_replay_lock(database, tmp_path):
+    """Without spooled entries the lock is only taken at the periodic orphan check"""
+    writer = _writer(database, tmp_path)
+    writer._replay_spool()
+    writer.lock_path.unlink()
+
+    writer._replay_spool()
+    assert not writer.lock_path.exists()
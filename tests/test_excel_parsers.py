@@ -0,0 +1,117 @@
+"""
+Tests for the INSTAT Excel parsers: column-wise classification, streaming mode
+"""
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from src.utils.excel_parser import ExcelParser
+from src.utils.instat_excel_parser import INSTATExcelParser
+
+HEADER = ["ID", "entryLabel", "entryName", "entryParentIndex", "entryIndex", "entryDescription", "caution"]
+
+ENTRIES = [
+    (1, "Enquete sur les menages", "Survey", -1, 1, None, None),
+    (2, "Identification", "Section", 1, 2, "Bloc d'identification", None),
+    (3, "Localisation", "SubSection", 2, 3, None, None),
+    (4, "Région de résidence @TableRef:08", "Question", 3, 4, None, "Obligatoire"),
+    (5, "Age du chef de ménage", "Question", 3, "5", None, None),
+    (6, "Le ménage a-t-il l'électricité ?", "Question", 2, 6.0, None, None),
+    (7, "Oui", "Response", 6, 7, None, None),
+    (8, "Non", "Response", 6, 8, None, None),
+    (9, "", None, None, None, None, None),
+    (10, "Dépenses", "Section", 1, 10, None, None),
+    (11, "Montant total des dépenses", "Question", 10, "onze", "Montant en FCFA", None),
+]
+
+
+def _workbook(path, rows, header=True, extra_sheet=False):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "MODELISATION"
+    if header:
+        sheet.append(HEADER)
+    for row in rows:
+        sheet.append(list(row))
+    if extra_sheet:
+        workbook.create_sheet("Notes").append(["Feuille sans structure"])
+    workbook.save(path)
+    return path
+
+
+@pytest.fixture
+def workbook_path(tmp_path):
+    return _workbook(tmp_path / "menages.xlsx", ENTRIES, extra_sheet=True)
+
+
+def _mapped_frame(parser, path, header=True):
+    """Sheet frame with the parser's column mapping applied, as the structured parser sees it"""
+    df = pd.read_excel(path, sheet_name=0, engine="openpyxl", header=None if not header else 0)
+    mapping, header_in_first_row = parser._resolve_column_mapping(df)
+    df = parser._apply_column_mapping(df.copy(), mapping)
+    return df.iloc[1:].reset_index(drop=True) if header_in_first_row else df
+
+
+@pytest.mark.parametrize("header", [True, False])
+def test_column_wise_classification_matches_row_wise(tmp_path, header):
+    """_classify_rows gives the frame the row-by-row classification gives"""
+    parser = INSTATExcelParser()
+    path = _workbook(tmp_path / "menages.xlsx", ENTRIES, header=header)
+    df = _mapped_frame(parser, path, header=header)
+    column_wise = parser._classify_rows(df)
+    row_wise = parser._classify_rows_rowwise(df)
+    pd.testing.assert_frame_equal(column_wise, row_wise)
+    assert column_wise["entry_type"].tolist()[:3] == ["survey", "section", "subsection"]
+
+
+def test_structure_of_an_instat_workbook(workbook_path):
+    parser = INSTATExcelParser()
+    survey = parser.parse_file(workbook_path, streaming=False)
+    assert survey["title"] == "Enquete sur les menages"
+    assert [section["title"] for section in survey["sections"]] == ["Identification", "Dépenses"]
+
+    region, age, electricity = survey["sections"][0]["subsections"][0]["questions"]
+    assert (region["type"], region["metadata"]["table_reference"]) == ("table_reference", "TableRef:08")
+    assert region["metadata"]["caution"] == "Obligatoire"
+    assert region["metadata"]["coordinates"]
+    assert age["metadata"]["entry_index"] == 5
+    assert electricity["type"] == "single_choice"
+    assert [option["text"] for option in electricity["options"]] == ["Oui", "Non"]
+    # An unreadable entryIndex is dropped, not an error
+    assert survey["sections"][1]["questions"][0]["metadata"]["entry_index"] is None
+
+
+@pytest.mark.parametrize("parser_class", [INSTATExcelParser, ExcelParser])
+@pytest.mark.parametrize("chunk_size", [2, 1000])
+def test_streaming_matches_in_memory_parsing(workbook_path, parser_class, chunk_size):
+    """Read-only streaming, whatever the chunk size, produces the in-memory structure"""
+    parser = parser_class(chunk_size=chunk_size)
+    assert parser.parse_file(workbook_path, streaming=True) == parser.parse_file(workbook_path, streaming=False)
+
+
+@pytest.mark.parametrize("parser_class", [INSTATExcelParser, ExcelParser])
+def test_streaming_threshold_picks_the_mode(workbook_path, parser_class, monkeypatch):
+    """Files at least streaming_threshold bytes long are streamed"""
+    modes = []
+    parser = parser_class(streaming_threshold=workbook_path.stat().st_size)
+    monkeypatch.setattr(parser, "_parse_file_streaming", lambda path: modes.append("streaming") or {})
+    parser.parse_file(workbook_path)
+    parser.streaming_threshold = None
+    parser.parse_file(workbook_path)
+    assert modes == ["streaming"]
+
+
+def test_unstructured_workbook_falls_back_to_basic_parsing(tmp_path):
+    """Sheets without the INSTAT layout become one section each, streamed or not"""
+    path = tmp_path / "questions.xlsx"
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Questions"
+    for text in ("Quel est votre nom ?", "Quel est votre age ?", "Combien de personnes vivent ici ?"):
+        sheet.append([text])
+    workbook.save(path)
+
+    parser = INSTATExcelParser(chunk_size=2)
+    in_memory = parser.parse_file(path, streaming=False)
+    assert in_memory == parser.parse_file(path, streaming=True)
+    assert [section["title"] for section in in_memory["sections"]] == ["Questions"]
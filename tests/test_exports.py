@@ -0,0 +1,228 @@
+"""
+Tests for background survey data exports
+"""
+import csv
+import io
+import json
+import zipfile
+from datetime import datetime, timedelta
+
+import pytest
+
+import config
+from src.domain.survey import export_service, response_service
+from src.infrastructure.database import models
+from src.infrastructure.database.connection import db_manager
+from src.services.export_jobs import STALE_JOB_ERROR, ExportJobAbortedError, ExportJobService, export_job_sweep
+from schemas.survey_extensions import SurveyResponseCreate
+
+
+@pytest.fixture
+def survey(make_api_client, make_survey, survey_models, monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "EXPORT_DIR", str(tmp_path / "exports"))
+    client = make_api_client(*survey_models)
+    db = db_manager.SessionLocal()
+    survey_id, questions, options = make_survey(db, ("text", "number"))
+    structure = response_service.get_question_options(db, survey_id)
+    response_service.ingest_responses(db, [
+        response_service.prepare_response(survey_id, SurveyResponseCreate(
+            survey_id=survey_id, respondent_id=f"R-{i}",
+            responses=[{"question_id": questions["text"], "value": f"texte, {i}"},
+                       {"question_id": questions["number"], "value": i}]
+        ), structure)
+        for i in range(3)
+    ])
+    db.close()
+    return client, survey_id
+
+
+def _export(client, survey_id, **request):
+    """Run an export job (the test client runs background tasks before returning) and report its status"""
+    response = client.post(f"/v1/api/surveys/{survey_id}/export", json=dict(survey_id=survey_id, **request))
+    assert response.status_code == 202
+    export_id = response.json()["data"]["export_id"]
+    return client.get(f"/v1/api/surveys/exports/{export_id}").json()["data"]
+
+
+def test_csv_export_and_download(survey):
+    """A completed CSV export holds one row per response and counts its downloads"""
+    client, survey_id = survey
+    result = _export(client, survey_id, format="csv")
+    assert (result["status"], result["rows_exported"]) == ("completed", 3)
+
+    download = client.get(result["file_url"])
+    assert download.status_code == 200
+    rows = list(csv.reader(io.StringIO(download.text)))
+    assert len(rows) == 4
+    assert "texte, 0" in rows[1]
+    assert client.get(f"/v1/api/surveys/exports/{result['export_id']}").json()["data"]["download_count"] == 1
+
+
+def test_ndjson_export(survey):
+    """NDJSON exports hold one JSON object per response"""
+    client, survey_id = survey
+    result = _export(client, survey_id, format="ndjson")
+    lines = client.get(result["file_url"]).text.splitlines()
+    assert len(lines) == 3
+    assert all(isinstance(json.loads(line), dict) for line in lines)
+
+
+def test_unknown_export(survey):
+    client, _ = survey
+    assert client.get("/v1/api/surveys/exports/missing").status_code == 404
+    assert client.get("/v1/api/surveys/exports/missing/download").status_code == 404
+
+
+def test_stale_jobs_are_failed(survey):
+    """Jobs left queued or processing by a stopped process are failed once past the timeout"""
+    client, survey_id = survey
+    db = db_manager.SessionLocal()
+    jobs = ExportJobService(db)
+    stale = jobs.create_job(survey_id, "csv", "stale.csv", {}, "admin")
+    running = jobs.create_job(survey_id, "csv", "running.csv", {}, "admin")
+    jobs.start_job(running)
+    stale.UpdatedAt = datetime.utcnow() - timedelta(seconds=config.EXPORT_JOB_TIMEOUT_SECONDS + 1)
+    db.commit()
+    stale_id, running_id = stale.JobID, running.JobID
+    db.close()
+
+    # Polling reads the job without sweeping
+    assert client.get(f"/v1/api/surveys/exports/{stale_id}").json()["data"]["status"] == "queued"
+    assert export_job_sweep.run_once() == 1
+    result = client.get(f"/v1/api/surveys/exports/{stale_id}").json()["data"]
+    assert (result["status"], result["error_message"]) == ("failed", STALE_JOB_ERROR)
+    assert client.get(f"/v1/api/surveys/exports/{running_id}").json()["data"]["status"] == "processing"
+    assert client.get(f"/v1/api/surveys/exports/{stale_id}/download").status_code == 409
+
+    db = db_manager.SessionLocal()
+    later = datetime.utcnow() + timedelta(seconds=config.EXPORT_JOB_TIMEOUT_SECONDS + 1)
+    assert ExportJobService(db).fail_stale_jobs(now=later) == 1
+    assert db.query(models.DataExport).filter(models.DataExport.Status == "failed").count() == 2
+    db.close()
+
+
+def test_worker_stops_on_a_job_failed_as_stale(survey, monkeypatch):
+    """A job failed as stale while its worker runs is neither advanced nor completed by the worker"""
+    client, survey_id = survey
+    db = db_manager.SessionLocal()
+    jobs = ExportJobService(db)
+    job = jobs.create_job(survey_id, "csv", "slow.csv", {}, "admin")
+    jobs.start_job(job)
+    later = datetime.utcnow() + timedelta(seconds=config.EXPORT_JOB_TIMEOUT_SECONDS + 1)
+    assert ExportJobService(db_manager.SessionLocal()).fail_stale_jobs(now=later) == 1
+    with pytest.raises(ExportJobAbortedError):
+        jobs.record_progress(job, 10)
+    with pytest.raises(ExportJobAbortedError):
+        jobs.start_job(job)
+    jobs.fail_job(job, "Export failed: boom")
+    db.expire_all()
+    assert (job.Status, job.RowCount, job.ErrorMessage) == ("failed", 0, STALE_JOB_ERROR)
+    db.close()
+
+    # Failed between two chunks: the export stops and leaves no file behind
+    def fail_as_stale(db, plan, path, progress=None):
+        ExportJobService(db_manager.SessionLocal()).fail_stale_jobs(now=later)
+        progress(1)
+
+    monkeypatch.setattr(export_service, "write_export", fail_as_stale)
+    response = client.post(f"/v1/api/surveys/{survey_id}/export", json={"survey_id": survey_id, "format": "csv"})
+    result = client.get(f"/v1/api/surveys/exports/{response.json()['data']['export_id']}").json()["data"]
+    assert (result["status"], result["error_message"], result["rows_exported"]) == ("failed", STALE_JOB_ERROR, 0)
+
+
+def _parquet_dataset(client, result, tmp_path):
+    """Partition directories and table of a downloaded Parquet export"""
+    import pyarrow.dataset as ds
+    archive = tmp_path / "dataset.zip"
+    archive.write_bytes(client.get(result["file_url"]).content)
+    directory = tmp_path / "dataset"
+    with zipfile.ZipFile(archive) as dataset_zip:
+        dataset_zip.extractall(directory)
+    partitions = sorted(str(path.parent.relative_to(directory)) for path in directory.rglob("*.parquet"))
+    return partitions, ds.dataset(str(directory), format="parquet", partitioning="hive").to_table()
+
+
+@pytest.fixture
+def region_survey(make_api_client, make_survey, survey_models, monkeypatch, tmp_path):
+    pytest.importorskip("pyarrow")
+    monkeypatch.setattr(config, "EXPORT_DIR", str(tmp_path / "exports"))
+    monkeypatch.setattr(config, "EXPORT_SNAPSHOT_LAG_SECONDS", 0)
+    client = make_api_client(*survey_models)
+    db = db_manager.SessionLocal()
+    survey_id, questions, _ = make_survey(db, ("region", "number"))
+    db.close()
+
+    def submit(*regions):
+        db = db_manager.SessionLocal()
+        structure = response_service.get_question_options(db, survey_id)
+        response_service.ingest_responses(db, [
+            response_service.prepare_response(survey_id, SurveyResponseCreate(
+                survey_id=survey_id,
+                responses=[{"question_id": questions["region"], "value": region},
+                           {"question_id": questions["number"], "value": 1}]
+            ), structure)
+            for region in regions
+        ])
+        db.close()
+    return client, survey_id, submit
+
+
+def test_parquet_partitions_stay_in_the_dataset(region_survey, tmp_path):
+    """Region answers are escaped in partition names, never used as paths"""
+    client, survey_id, submit = region_survey
+    submit("01", "../../../../tmp/evil", "a\\b", "unknown")
+    result = _export(client, survey_id, format="parquet")
+    assert (result["status"], result["rows_exported"]) == ("completed", 4)
+
+    year = datetime.utcnow().year
+    partitions, table = _parquet_dataset(client, result, tmp_path)
+    assert partitions == sorted(f"region_code={name}/fiscal_year={year}"
+                                for name in ("01", "..%2F..%2F..%2F..%2Ftmp%2Fevil", "a%5Cb", "unknown"))
+    assert table.num_rows == 4
+    assert sorted(table.column("region_code").to_pylist()) == sorted(["01", "../../../../tmp/evil", "a\\b", "unknown"])
+    assert not list((tmp_path / "exports").rglob("evil*"))
+
+
+def test_partition_value():
+    assert export_service.partition_value("01") == "01"
+    assert export_service.partition_value(None) == export_service.UNKNOWN_REGION_PARTITION
+    assert export_service.partition_value("..") == ".."
+    assert export_service.partition_value("a/b=c%\n") == "a%2Fb%3Dc%25%0A"
+
+
+def test_incremental_snapshots(region_survey, tmp_path):
+    """An incremental snapshot holds the responses submitted since the completed snapshot reaching furthest"""
+    client, survey_id, submit = region_survey
+    submit("01", "02")
+    first = _export(client, survey_id, format="parquet")
+    assert first["rows_exported"] == 2
+
+    # A later snapshot limited to an earlier date range does not move the snapshot end back
+    dated = _export(client, survey_id, format="parquet", date_range={"start": "2000-01-01", "end": "2000-12-31"})
+    assert (dated["status"], dated["rows_exported"]) == ("completed", 0)
+
+    submit("03")
+    second = _export(client, survey_id, format="parquet", incremental=True)
+    assert second["rows_exported"] == 1
+    partitions, table = _parquet_dataset(client, second, tmp_path)
+    assert partitions == [f"region_code=03/fiscal_year={datetime.utcnow().year}"]
+    assert table.num_rows == 1
+
+    # Nothing new since the second snapshot
+    assert _export(client, survey_id, format="parquet", incremental=True)["rows_exported"] == 0
+
+
+def test_incremental_snapshot_waits_for_the_running_one(region_survey):
+    """Incremental requests get a 409 while a snapshot of the survey is queued or processing"""
+    client, survey_id, submit = region_survey
+    db = db_manager.SessionLocal()
+    jobs = ExportJobService(db)
+    running = jobs.create_job(survey_id, "parquet", "running.parquet.zip",
+                              {"snapshot": {"since": None, "until": datetime.utcnow().isoformat()}}, "admin")
+    assert jobs.last_snapshot_end(survey_id) is None
+
+    request = {"survey_id": survey_id, "format": "parquet", "incremental": True}
+    assert client.post(f"/v1/api/surveys/{survey_id}/export", json=request).status_code == 409
+    jobs.fail_job(running, "stopped")
+    db.close()
+    assert client.post(f"/v1/api/surveys/{survey_id}/export", json=request).status_code == 202
@@ -0,0 +1,66 @@
+"""
+Tests for the INSTAT dashboard summary
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from src.domain.instat.instat_services import INSTATSurveyService, dashboard_cache
+from src.infrastructure.database.models import INSTATSurvey
+from schemas.instat_domains import INSTATSurveyCreate
+
+START = datetime(2026, 1, 1)
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def db(request):
+    dashboard_cache.invalidate()
+    make_session = request.getfixturevalue(f"make_{'pg' if request.param == 'postgresql' else 'sqlite'}_session")
+    session = make_session(INSTATSurvey)()
+    # Created in order, updated in reverse order; the last one has no update date
+    for i, (domain, survey_status) in enumerate([
+        ("sds", "draft"), ("sds", "published"), ("program_review", "draft"), ("diagnostic", "published"),
+        ("ssn", "draft"), ("sds", "archived"), ("program_review", "published"), ("des", "draft"),
+        ("ssn", "review"), ("sds", "draft")
+    ]):
+        session.add(INSTATSurvey(
+            Title=f"Enquete {i}", Domain=domain, Category="diagnostic", Status=survey_status,
+            CreatedDate=START + timedelta(days=i), UpdatedDate=START + timedelta(days=30 - i)
+        ))
+    session.commit()
+    session.execute(update(INSTATSurvey).where(INSTATSurvey.Title == "Enquete 9").values(UpdatedDate=None))
+    session.commit()
+    yield session
+    session.close()
+    dashboard_cache.invalidate()
+
+
+def _titles(surveys):
+    return [survey["Title"] for survey in surveys]
+
+
+def test_dashboard_summary_counts_and_recent_activity(db):
+    """Counts by status and domain come from one grouped query; both recent lists have their own order"""
+    summary = INSTATSurveyService(db).get_dashboard_summary()
+    assert (summary["total_surveys"], summary["draft_surveys"], summary["published_surveys"]) == (10, 5, 3)
+    assert summary["surveys_by_status"] == {"draft": 5, "published": 3, "archived": 1, "review": 1}
+    assert summary["surveys_by_domain"] == {"program": 2, "sds": 4, "diagnostic": 1}
+    assert _titles(summary["recent_activity"]["last_created"]) == [f"Enquete {i}" for i in (9, 8, 7, 6, 5)]
+    assert _titles(summary["recent_activity"]["last_updated"]) == [f"Enquete {i}" for i in (0, 1, 2, 3, 4)]
+
+
+def test_dashboard_summary_is_cached_until_the_service_writes(db):
+    """Rows written behind the service's back stay unseen until it changes a survey"""
+    service = INSTATSurveyService(db)
+    assert service.get_dashboard_summary()["total_surveys"] == 10
+
+    db.add(INSTATSurvey(Title="Hors service", Domain="sds", Category="diagnostic", Status="draft"))
+    db.commit()
+    assert service.get_dashboard_summary()["total_surveys"] == 10
+
+    service.create_survey(INSTATSurveyCreate(Title="Nouvelle", Domain="des", Category="diagnostic"))
+    summary = service.get_dashboard_summary()
+    assert (summary["total_surveys"], summary["draft_surveys"]) == (12, 7)
+    assert service.delete_survey(summary["recent_activity"]["last_created"][0]["SurveyID"])
+    assert service.get_dashboard_summary()["total_surveys"] == 11
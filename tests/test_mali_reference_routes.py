@@ -0,0 +1,48 @@
+"""
+Tests for the cached Mali reference table routes
+"""
+import pytest
+
+from src.infrastructure.database.connection import db_manager
+from src.infrastructure.database.mali_ref_models import MaliRegionModel
+from src.services.reference_index import REFERENCE_MODELS, reference_index
+
+
+@pytest.fixture
+def client(make_api_client):
+    client = make_api_client(*REFERENCE_MODELS)
+    reference_index.mark_stale()
+    db = db_manager.SessionLocal()
+    db.add(MaliRegionModel(region_code="01", region_name="Kayes", region_capital="Kayes"))
+    db.commit()
+    db.close()
+    return client
+
+
+def test_regions_are_revalidated_with_etags(client):
+    """An unchanged table answers 304 to its ETag; a change gives a new ETag"""
+    first = client.get("/v1/api/mali-references/regions")
+    assert first.status_code == 200
+    assert [region["region_code"] for region in first.json()] == ["01"]
+    etag = first.headers["ETag"]
+
+    assert client.get("/v1/api/mali-references/regions", headers={"If-None-Match": etag}).status_code == 304
+
+    db = db_manager.SessionLocal()
+    db.add(MaliRegionModel(region_code="02", region_name="Koulikoro", region_capital="Koulikoro"))
+    db.commit()
+    db.close()
+    changed = client.get("/v1/api/mali-references/regions", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert [region["region_code"] for region in changed.json()] == ["01", "02"]
+
+
+def test_search_and_paging_have_their_own_etags(client):
+    """Each search and page is cached and tagged on its own"""
+    searched = client.get("/v1/api/mali-references/regions", params={"search": "kay"})
+    assert [region["region_name"] for region in searched.json()] == ["Kayes"]
+    assert client.get("/v1/api/mali-references/regions", params={"search": "zzz"}).json() == []
+    paged = client.get("/v1/api/mali-references/regions", params={"skip": 1})
+    assert paged.json() == []
+    assert len({searched.headers["ETag"], paged.headers["ETag"]}) == 2
@@ -0,0 +1,77 @@
+"""
+Tests for keyset pagination and cached totals
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.infrastructure.database import models
+from src.infrastructure.database.pagination import InvalidCursorError, count_cache, paginate
+
+SORT_KEYS = ((models.Survey.CreatedDate, True), (models.Survey.SurveyID, True))
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def survey_db(request):
+    """Surveys where every third one has no CreatedDate"""
+    count_cache.invalidate()
+    make_session = request.getfixturevalue(f"make_{'pg' if request.param == 'postgresql' else 'sqlite'}_session")
+    db = make_session(models.Survey)()
+    base = datetime(2025, 1, 1)
+    db.add_all([models.Survey(Title=f"survey {i}", CreatedDate=base + timedelta(days=i % 4)) for i in range(10)])
+    db.commit()
+    # Inserts fill CreatedDate by default, clear it afterwards
+    undated = [f"survey {i}" for i in range(0, 10, 3)]
+    db.query(models.Survey).filter(models.Survey.Title.in_(undated)).update(
+        {models.Survey.CreatedDate: None}, synchronize_session=False
+    )
+    db.commit()
+    yield db
+    db.close()
+
+
+def _all_pages(db, limit):
+    seen, cursor = [], None
+    while True:
+        rows, pagination = paginate(db.query(models.Survey), SORT_KEYS, limit, cursor=cursor)
+        seen.extend(row.SurveyID for row in rows)
+        cursor = pagination["next_cursor"]
+        if cursor is None:
+            return seen
+
+
+def test_cursor_pages_include_null_sort_keys(survey_db):
+    """Paging with cursors returns every row once, NULL dates last"""
+    expected = [
+        s.SurveyID for s in sorted(
+            survey_db.query(models.Survey).all(),
+            key=lambda s: (s.CreatedDate is not None, s.CreatedDate or datetime.min, s.SurveyID),
+            reverse=True
+        )
+    ]
+    for limit in (1, 2, 3):
+        assert _all_pages(survey_db, limit) == expected
+
+
+def test_cached_total_is_not_exact(survey_db):
+    """A count served from the TTL cache is reported as possibly stale"""
+    _, first = paginate(survey_db.query(models.Survey), SORT_KEYS, 5)
+    assert (first["total"], first["total_is_exact"]) == (10, True)
+
+    survey_db.add(models.Survey(Title="late"))
+    survey_db.commit()
+    _, cached = paginate(survey_db.query(models.Survey), SORT_KEYS, 5)
+    assert (cached["total"], cached["total_is_exact"]) == (10, False)
+
+    _, exact = paginate(survey_db.query(models.Survey), SORT_KEYS, 5, exact_total=True)
+    assert (exact["total"], exact["total_is_exact"]) == (11, True)
+
+
+def test_foreign_cursor_is_rejected(survey_db):
+    """A cursor made for another ordering cannot be reused"""
+    _, pagination = paginate(survey_db.query(models.Survey), SORT_KEYS, 2)
+    other_keys = ((models.Survey.SurveyID, False),)
+    with pytest.raises(InvalidCursorError):
+        paginate(survey_db.query(models.Survey), other_keys, 2, cursor=pagination["next_cursor"])
+    with pytest.raises(InvalidCursorError):
+        paginate(survey_db.query(models.Survey), SORT_KEYS, 2, cursor="not-a-cursor")
@@ -0,0 +1,68 @@
+"""
+Tests for the content-addressed parse cache
+"""
+import os
+from pathlib import Path
+
+from src.utils.parse_cache import ParseCache
+
+
+def _structure(name):
+    return {
+        "title": Path(name).stem,
+        "description": f"Survey generated from {name}",
+        "sections": [{"title": "Section 1", "questions": [{"text": "Âge ?", "type": "number"}]}],
+        "metadata": {"source_file": name, "sheets": 1}
+    }
+
+
+def test_round_trip_rebases_file_name_fields(tmp_path):
+    """A hit returns the cached parse with the name fields of the new upload"""
+    cache = ParseCache(str(tmp_path), parser_version="3")
+    cache.put("abc", Path("/uploads/menages_2024.xlsx"), _structure("menages_2024.xlsx"), ["Avertissement"])
+
+    structure, issues = cache.get("abc", Path("/uploads/copie.xlsx"))
+    assert structure == _structure("copie.xlsx")
+    assert issues == ["Avertissement"]
+    assert cache.get("def", Path("/uploads/copie.xlsx")) is None
+    statistics = cache.get_statistics()
+    assert (statistics["entries"], statistics["hits"], statistics["misses"]) == (1, 1, 1)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    """Past max_entries the entry read least recently goes first"""
+    cache = ParseCache(str(tmp_path), max_entries=2)
+    for content_hash in ("a", "b"):
+        cache.put(content_hash, Path(f"{content_hash}.xlsx"), _structure(f"{content_hash}.xlsx"), [])
+    assert cache.get("a", Path("a.xlsx")) is not None
+    cache.put("c", Path("c.xlsx"), _structure("c.xlsx"), [])
+
+    assert cache.get("b", Path("b.xlsx")) is None
+    assert cache.get("a", Path("a.xlsx")) is not None
+    assert sorted(os.listdir(tmp_path)) == ["1-a.json", "1-c.json"]
+
+
+def test_byte_cap_and_oversized_entries(tmp_path):
+    """Entries larger than max_bytes are not stored; the total stays under the cap"""
+    probe = ParseCache(str(tmp_path / "probe"))
+    probe.put("x", Path("a.xlsx"), _structure("a.xlsx"), [])
+    size = probe.get_statistics()["total_bytes"]
+
+    cache = ParseCache(str(tmp_path / "capped"), max_bytes=size * 2 + 1)
+    cache.put("huge", Path("a.xlsx"), dict(_structure("a.xlsx"), notes="x" * size * 3), [])
+    assert cache.get_statistics()["entries"] == 0
+    for content_hash in ("a", "b", "c"):
+        cache.put(content_hash, Path("a.xlsx"), _structure("a.xlsx"), [])
+    statistics = cache.get_statistics()
+    assert statistics["entries"] == 2 and statistics["total_bytes"] <= statistics["max_bytes"]
+
+
+def test_reload_keeps_only_the_current_parser_version(tmp_path):
+    """Restarting with a new parser version drops entries parsed by the old one"""
+    old = ParseCache(str(tmp_path), parser_version="1")
+    old.put("abc", Path("a.xlsx"), _structure("a.xlsx"), [])
+    assert ParseCache(str(tmp_path), parser_version="1").get("abc", Path("a.xlsx")) is not None
+
+    new = ParseCache(str(tmp_path), parser_version="2")
+    assert new.get("abc", Path("a.xlsx")) is None
+    assert os.listdir(tmp_path) == []
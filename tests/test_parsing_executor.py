@@ -0,0 +1,78 @@
+"""
+Tests for the parsing process pool
+"""
+import asyncio
+import os
+import time
+
+import pytest
+
+from src.services.parsing_executor import ParsingExecutor, ParsingQueueFullError, ParsingTimeoutError
+
+
+# The tests fork their workers: spawned workers import the application on
+# start, which alone can exceed the short timeouts used here
+
+
+def _sleep_and_report(seconds):
+    """Pool job: sleep, then return the worker pid"""
+    time.sleep(seconds)
+    return os.getpid()
+
+
+def test_timed_out_job_frees_its_worker():
+    """A job over the timeout is killed, so the single worker can serve the next job"""
+    executor = ParsingExecutor(max_workers=1, queue_size=0, job_timeout=1.0, start_method="fork")
+
+    async def scenario():
+        first_pid = await executor.run(_sleep_and_report, 0)
+        started = time.monotonic()
+        with pytest.raises(ParsingTimeoutError):
+            await executor.run(_sleep_and_report, 60)
+        assert time.monotonic() - started < 5
+        next_pid = await executor.run(_sleep_and_report, 0)
+        assert next_pid != first_pid
+        assert executor.pending_jobs == 0
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+
+
+def test_jobs_sharing_the_killed_pool_are_resubmitted():
+    """Other jobs of a pool killed for a timeout run again instead of failing"""
+    executor = ParsingExecutor(max_workers=2, queue_size=0, job_timeout=2.0, start_method="fork")
+
+    async def innocent():
+        await asyncio.sleep(1.0)
+        return await executor.run(_sleep_and_report, 0.5)
+
+    async def scenario():
+        hostile = asyncio.ensure_future(executor.run(_sleep_and_report, 60))
+        result = await innocent()
+        assert isinstance(result, int)
+        with pytest.raises(ParsingTimeoutError):
+            await hostile
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+
+
+def test_full_queue_is_rejected():
+    """Jobs beyond the running and queued slots are refused"""
+    executor = ParsingExecutor(max_workers=1, queue_size=0, job_timeout=5.0, start_method="fork")
+
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(_sleep_and_report, 0.5))
+        await asyncio.sleep(0)
+        with pytest.raises(ParsingQueueFullError):
+            await executor.run(_sleep_and_report, 0)
+        await running
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        executor.shutdown()
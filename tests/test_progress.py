@@ -0,0 +1,87 @@
+"""
+Tests for respondent completion progress
+"""
+import pytest
+
+from src.domain.survey import progress_service, response_service, survey_service
+from src.infrastructure.database import models
+from schemas import survey as survey_schema
+from schemas.survey_extensions import SurveyResponseCreate, SurveyResponseValue
+
+
+@pytest.fixture
+def db(make_sqlite_session, survey_models):
+    session = make_sqlite_session(*survey_models)()
+    yield session
+    session.close()
+
+
+def _submit(db, survey_id, answers, respondent_id="R-1"):
+    structure = response_service.get_question_options(db, survey_id)
+    prepared = response_service.prepare_response(survey_id, SurveyResponseCreate(
+        survey_id=survey_id, respondent_id=respondent_id,
+        responses=[{"question_id": question_id, "value": value} for question_id, value in answers]
+    ), structure)
+    response_id, = response_service.ingest_responses(db, [prepared])
+    return response_id
+
+
+def test_progress_counts_answered_questions(db, make_survey):
+    """Answers add up per respondent, answering a question again counts it once"""
+    survey_id, questions, _ = make_survey(db, ("text", "number", "date", "boolean"))
+    _submit(db, survey_id, [(questions["text"], "a"), (questions["number"], 3)])
+    _submit(db, survey_id, [(questions["number"], 4), (questions["date"], "2024-01-01")])
+    _submit(db, survey_id, [(questions["boolean"], True)], respondent_id="R-2")
+
+    progress = progress_service.get_progress(db, survey_id, "R-1")
+    assert (progress["answered_questions"], progress["total_questions"]) == (3, 4)
+    assert progress["completion_percentage"] == 75.0
+    assert progress["sections_progress"][0]["questions_answered"] == 3
+    assert progress_service.get_progress(db, survey_id, "R-2")["answered_questions"] == 1
+    assert progress_service.get_progress(db, survey_id, "R-3")["answered_questions"] == 0
+
+
+def test_empty_answers_do_not_count(db, make_survey):
+    """As in completion_percentage, an empty answer is not answered"""
+    survey_id, questions, _ = make_survey(db, ("text", "number"))
+    response_id = _submit(db, survey_id, [(questions["text"], ""), (questions["number"], 1)])
+    assert progress_service.get_progress(db, survey_id, "R-1")["answered_questions"] == 1
+
+    response = db.get(models.Response, response_id)
+    response_service.update_response(db, response, [
+        SurveyResponseValue(question_id=questions["text"], value="filled"),
+        SurveyResponseValue(question_id=questions["number"], value="")
+    ], response_service.get_question_options(db, survey_id))
+    progress = progress_service.get_progress(db, survey_id, "R-1")
+    assert progress["answered_questions"] == 1
+    assert progress["sections_progress"][0]["questions_answered"] == 1
+
+    stored = db.query(models.RespondentProgress).filter_by(SurveyID=survey_id, RespondentKey="R-1").one()
+    assert stored.AnsweredQuestionIDs == [questions["text"]]
+
+
+def test_progress_recounts_after_a_structure_change(db, make_survey):
+    """Progress counted for an older version of the survey is recounted against the current one"""
+    survey_id, questions, _ = make_survey(db, ("text", "number"))
+    _submit(db, survey_id, [(questions["text"], "a"), (questions["number"], 1)])
+
+    db.query(models.Question).filter(models.Question.QuestionID == questions["number"]).delete()
+    db.get(models.Survey, survey_id).Version = 2
+    db.commit()
+    progress = progress_service.get_progress(db, survey_id, "R-1")
+    assert (progress["answered_questions"], progress["total_questions"]) == (1, 1)
+    assert progress["completion_percentage"] == 100.0
+
+
+def test_survey_mutations_drop_the_cached_structure(db):
+    """Creating or deleting a survey forgets the structures cached for its id"""
+    created = survey_service.create_survey(db, survey_schema.SurveyCreate(
+        Title="Enquete", Sections=[{"Title": "S1", "Questions": [{"QuestionText": "Q1", "QuestionType": "text"}]}]
+    ), "public")
+    survey_id = created.SurveyID
+    assert progress_service.get_survey_structure(db, survey_id).total_questions == 1
+
+    survey_service.delete_survey(db, survey_id, "public")
+    # Nothing left to forget
+    assert progress_service.structure_cache.invalidate_where(lambda key: key[0] == survey_id) == 0
+    assert progress_service.get_survey_structure(db, survey_id) is None
@@ -0,0 +1,90 @@
+"""
+Tests for the in-memory Mali reference index and batch code validation
+"""
+import pytest
+
+from src.infrastructure.database.connection import db_manager
+from src.infrastructure.database.mali_ref_models import MaliRegionModel
+from src.services.reference_index import (
+    REFERENCE_MODELS, TABLE_REF_MAPPING, ReferenceIndex, normalize_search_text, reference_index
+)
+
+REGIONS = [("01", "Kayes"), ("04", "Ségou"), ("05", "Mopti"), ("06", "Tombouctou"), ("10", "Ménaka")]
+
+
+@pytest.fixture
+def db(make_sqlite_session):
+    session = make_sqlite_session(MaliRegionModel)()
+    session.add_all([MaliRegionModel(region_code=code, region_name=name, region_capital=name)
+                     for code, name in REGIONS])
+    session.add(MaliRegionModel(region_code="99", region_name="Ancienne région", is_active=False))
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def index():
+    return ReferenceIndex({"TableRef:08": TABLE_REF_MAPPING["TableRef:08"]})
+
+
+def _names(rows):
+    return [row["region_name"] for row in rows]
+
+
+def test_normalize_search_text():
+    assert normalize_search_text("  Ségou   Ville ") == "segou ville"
+    assert normalize_search_text(None) == ""
+
+
+def test_search_ignores_accents_and_ranks_prefixes_first(db, index):
+    """Field prefixes come before other matches; inactive rows are left out"""
+    assert _names(index.search(db, "TableRef:08", "SEGOU")) == ["Ségou"]
+    assert _names(index.search(db, "TableRef:08", "m")) == ["Mopti", "Ménaka", "Tombouctou"]
+    assert _names(index.search(db, "TableRef:08", "ancienne")) == []
+    assert _names(index.search(db, "TableRef:08", None, skip=1, limit=2)) == ["Ségou", "Mopti"]
+    assert _names(index.search(db, "TableRef:08", filters={"region_code": "05", "population": None})) == ["Mopti"]
+
+
+def test_stale_index_reloads_changed_tables(db, index):
+    """Once marked stale (after a commit touching a reference table), the index reloads changed tables"""
+    index.search(db, "TableRef:08", "kay")
+    version = index.version(db, "TableRef:08")
+
+    db.add(MaliRegionModel(region_code="11", region_name="Kayes Nord", region_capital="Kayes"))
+    db.commit()
+    index.mark_stale()
+    assert _names(index.search(db, "TableRef:08", "kay")) == ["Kayes", "Kayes Nord"]
+    assert index.version(db, "TableRef:08") != version
+
+
+def test_existing_codes_from_memory_and_database(db, index):
+    """Validation answers the same with the index and with the database fallback"""
+    codes = {"TableRef:08": {"01", "10", "99", "42"}}
+    assert index.existing_codes(db, codes) == {"TableRef:08": {"01", "10"}}
+    disabled = ReferenceIndex({"TableRef:08": TABLE_REF_MAPPING["TableRef:08"]}, enabled=False)
+    assert disabled.search(db, "TableRef:08", "kay") is None
+    assert disabled.existing_codes(db, codes) == {"TableRef:08": {"01", "10"}}
+
+
+def test_validate_references_route(make_api_client):
+    """Results come back in request order, an unknown table is a 400"""
+    client = make_api_client(*REFERENCE_MODELS)
+    reference_index.mark_stale()
+    db = db_manager.SessionLocal()
+    db.add_all([MaliRegionModel(region_code=code, region_name=name, region_capital=name) for code, name in REGIONS])
+    db.commit()
+    db.close()
+
+    response = client.post("/v1/api/mali-references/validate-references", json={"items": [
+        {"table_ref": "TableRef:08", "reference_code": "04"},
+        {"table_ref": "TableRef:08", "reference_code": "42"},
+        {"table_ref": "TableRef:09", "reference_code": "04"}
+    ]})
+    assert response.status_code == 200
+    assert [result["exists"] for result in response.json()["results"]] == [True, False, False]
+    assert response.json()["all_valid"] is False
+
+    unknown = client.post("/v1/api/mali-references/validate-references",
+                          json={"items": [{"table_ref": "TableRef:77", "reference_code": "1"}]})
+    assert unknown.status_code == 400
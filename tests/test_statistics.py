@@ -0,0 +1,95 @@
+"""
+Tests for the materialized survey statistics
+"""
+import pytest
+
+from src.domain.survey import response_service, statistics_service
+from src.infrastructure.database import models
+from src.infrastructure.database.connection import db_manager
+from src.infrastructure.database.mali_ref_models import MaliRegionModel
+from schemas.survey_extensions import SurveyResponseCreate, SurveyResponseValue
+
+
+@pytest.fixture
+def db(make_sqlite_session, survey_models):
+    session = make_sqlite_session(*survey_models, MaliRegionModel)()
+    session.add_all([
+        MaliRegionModel(region_code="01", region_name="Kayes"),
+        MaliRegionModel(region_code="02", region_name="Koulikoro")
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+def _submit(db, survey_id, questions, options, region, number, choice=0):
+    structure = response_service.get_question_options(db, survey_id)
+    prepared = response_service.prepare_response(survey_id, SurveyResponseCreate(
+        survey_id=survey_id,
+        responses=[
+            {"question_id": questions["region"], "value": region},
+            {"question_id": questions["number"], "value": number},
+            {"question_id": questions["single_choice"], "value": "x", "metadata": {"option_id": options[choice]}}
+        ]
+    ), structure)
+    response_id, = response_service.ingest_responses(db, [prepared])
+    return response_id
+
+
+def _rebuilt(db, survey_id):
+    """Statistics counted again from the stored responses"""
+    db.get(models.SurveyResponseStatistics, survey_id).StructureVersion = "stale"
+    db.commit()
+    return statistics_service.get_survey_statistics(db, survey_id)
+
+
+def test_counters_match_a_rebuild(db, make_survey):
+    """Counters kept up to date on insert and update equal those counted from scratch"""
+    survey_id, questions, options = make_survey(db, ("region", "number", "single_choice", "text"))
+    _submit(db, survey_id, questions, options, "01", 10)
+    _submit(db, survey_id, questions, options, "01", 20, choice=1)
+    response_id = _submit(db, survey_id, questions, options, "02", 30)
+    response_service.update_response(db, db.get(models.Response, response_id), [
+        SurveyResponseValue(question_id=questions["number"], value=40),
+        SurveyResponseValue(question_id=questions["text"], value="libre")
+    ], response_service.get_question_options(db, survey_id))
+
+    incremental = statistics_service.get_survey_statistics(db, survey_id)
+    rebuilt = _rebuilt(db, survey_id)
+    assert dict(incremental, last_updated=None) == dict(rebuilt, last_updated=None)
+
+    assert incremental["total_responses"] == 3
+    assert incremental["geographic_distribution"] == {"Kayes": 2, "Koulikoro": 1}
+    by_id = {question["question_id"]: question for question in incremental["sections"][0]["questions"]}
+    assert by_id[questions["single_choice"]]["answer_distribution"] == {"Oui": 2, "Non": 1}
+    assert by_id[questions["number"]]["numeric_summary"]["max"] == 40
+    assert by_id[questions["number"]]["numeric_summary"]["mean"] == round(70 / 3, 4)
+    assert by_id[questions["text"]]["total_responses"] == 1
+
+
+def test_statistics_are_counted_on_first_read(db, make_survey):
+    """Responses stored before the counters existed are counted when statistics are first read"""
+    survey_id, questions, options = make_survey(db, ("region", "number", "single_choice"))
+    _submit(db, survey_id, questions, options, "02", 5)
+    db.query(models.QuestionStatistics).delete()
+    db.query(models.SurveyResponseStatistics).delete()
+    db.commit()
+
+    statistics = statistics_service.get_survey_statistics(db, survey_id)
+    assert statistics["total_responses"] == 1
+    assert statistics["geographic_distribution"] == {"Koulikoro": 1}
+    assert statistics_service.get_survey_statistics(db, 999) is None
+
+
+def test_statistics_route(make_api_client, make_survey, survey_models):
+    """The statistics endpoint serves the counters, 404 for an unknown survey"""
+    client = make_api_client(*survey_models, MaliRegionModel)
+    db = db_manager.SessionLocal()
+    survey_id, questions, options = make_survey(db, ("region", "number", "single_choice"))
+    _submit(db, survey_id, questions, options, "01", 7)
+    db.close()
+
+    response = client.get(f"/v1/api/surveys/{survey_id}/statistics")
+    assert response.status_code == 200
+    assert response.json()["data"]["total_responses"] == 1
+    assert client.get("/v1/api/surveys/999/statistics").status_code == 404
@@ -0,0 +1,152 @@
+"""
+Tests for storing survey responses, one at a time and in NDJSON bulk
+"""
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func
+
+import config
+from src.api.v1.survey_responses import _ndjson_lines
+from src.domain.survey import response_service
+from src.infrastructure.database import models
+from src.infrastructure.database.connection import db_manager
+from schemas.survey_extensions import SurveyResponseCreate
+
+
+@pytest.fixture
+def survey(make_api_client, make_survey, survey_models):
+    client = make_api_client(*survey_models)
+    db = db_manager.SessionLocal()
+    survey_id, questions, options = make_survey(db, ("region", "text", "single_choice"))
+    db.close()
+    return client, survey_id, questions, options
+
+
+def _count(model):
+    db = db_manager.SessionLocal()
+    try:
+        return db.query(func.count()).select_from(model).scalar()
+    finally:
+        db.close()
+
+
+def test_submit_response(survey):
+    """A response and its answers are stored together"""
+    client, survey_id, questions, options = survey
+    response = client.post(f"/v1/api/surveys/{survey_id}/responses", json={
+        "survey_id": survey_id,
+        "respondent_id": "R-1",
+        "responses": [
+            {"question_id": questions["region"], "value": "01"},
+            {"question_id": questions["single_choice"], "value": "Oui", "metadata": {"option_id": options[0]}}
+        ]
+    })
+    assert response.status_code == 201
+    assert response.json()["data"]["response_id"] == 1
+    assert (_count(models.Response), _count(models.ResponseDetail)) == (1, 2)
+
+
+def test_submit_response_rejects_foreign_questions_and_options(survey):
+    """Answers to questions or options of another survey are refused"""
+    client, survey_id, questions, options = survey
+    unknown_question = client.post(f"/v1/api/surveys/{survey_id}/responses", json={
+        "survey_id": survey_id, "responses": [{"question_id": 999, "value": "x"}]
+    })
+    foreign_option = client.post(f"/v1/api/surveys/{survey_id}/responses", json={
+        "survey_id": survey_id,
+        "responses": [{"question_id": questions["text"], "value": "x", "metadata": {"option_id": options[0]}}]
+    })
+    assert unknown_question.status_code == 422
+    assert foreign_option.status_code == 422
+    assert _count(models.Response) == 0
+
+
+def test_bulk_ingest_reports_invalid_lines(survey):
+    """Valid NDJSON lines are stored, invalid ones reported with their line number"""
+    client, survey_id, questions, _ = survey
+    lines = [
+        json.dumps({"survey_id": survey_id, "respondent_id": f"R-{i}",
+                    "responses": [{"question_id": questions["text"], "value": f"answer {i}"}]})
+        for i in range(3)
+    ]
+    lines.insert(1, "not json")
+    lines.insert(3, "")
+    lines.append(json.dumps({"survey_id": survey_id, "responses": [{"question_id": 999, "value": 1}]}))
+    body = "\n".join(lines).encode()
+
+    def chunks():
+        for start in range(0, len(body), 7):
+            yield body[start:start + 7]
+
+    response = client.post(f"/v1/api/surveys/{survey_id}/responses/bulk", content=chunks(),
+                           headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 201
+    result = response.json()["data"]
+    assert len(result["response_ids"]) == 3
+    assert [error["line"] for error in result["errors"]] == [2, 6]
+    assert _count(models.ResponseDetail) == 3
+
+
+def test_bulk_ingest_rejects_an_overlong_line(survey, monkeypatch):
+    """A line over RESPONSE_BULK_MAX_LINE_BYTES is refused with 413 instead of being buffered"""
+    client, survey_id, questions, _ = survey
+    monkeypatch.setattr(config, "RESPONSE_BULK_MAX_LINE_BYTES", 1024)
+    valid = json.dumps({"survey_id": survey_id, "responses": [{"question_id": questions["text"], "value": "ok"}]})
+
+    def chunks():
+        yield (valid + "\n").encode()
+        for _ in range(8):
+            yield b"x" * 512
+
+    response = client.post(f"/v1/api/surveys/{survey_id}/responses/bulk", content=chunks(),
+                           headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 413
+    assert "Line 2" in json.dumps(response.json())
+    assert _count(models.Response) == 0
+
+
+def test_ndjson_lines_stop_at_the_line_limit(monkeypatch):
+    """An endless line ends the read with 413 once it passes the limit"""
+    monkeypatch.setattr(config, "RESPONSE_BULK_MAX_LINE_BYTES", 1024)
+
+    class EndlessRequest:
+        async def stream(self):
+            yield b'{"survey_id": 1}\n'
+            while True:
+                yield b"x" * 512
+
+    async def read_all():
+        return [line async for line in _ndjson_lines(EndlessRequest())]
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(read_all())
+    assert raised.value.status_code == 413
+
+
+def test_copy_ingest_on_postgresql(make_pg_session, make_survey, survey_models):
+    """Answers loaded with COPY are stored like inserted ones, special characters included"""
+    db = make_pg_session(*survey_models)()
+    survey_id, questions, _ = make_survey(db, ("text", "number"))
+    structure = response_service.get_question_options(db, survey_id)
+    texts = ["tab\there", "line\nbreak", "back\\slash", "quote \" ' ;", "\\N", ""]
+    prepared = [
+        response_service.prepare_response(survey_id, SurveyResponseCreate(
+            survey_id=survey_id, respondent_id=f"R-{i}",
+            responses=[{"question_id": questions["text"], "value": text},
+                       {"question_id": questions["number"], "value": i}]
+        ), structure)
+        for i, text in enumerate(texts)
+    ]
+    response_ids = response_service.ingest_responses(db, prepared, copy_threshold=1)
+
+    stored = dict(
+        db.query(models.ResponseDetail.ResponseID, models.ResponseDetail.AnswerText)
+        .filter(models.ResponseDetail.QuestionID == questions["text"])
+        .all()
+    )
+    assert [stored[response_id] for response_id in response_ids] == texts
+    assert db.query(models.ResponseDetail).filter(models.ResponseDetail.QuestionID == questions["number"]).count() == 6
+    db.close()
@@ -0,0 +1,110 @@
+"""
+Tests for creating survey trees in batched inserts and loading them back
+"""
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from src.domain.survey import survey_service
+from src.infrastructure.database import models
+from src.infrastructure.database.connection import db_manager
+from schemas import survey as survey_schema
+
+SCHEMA = "survey_program"
+
+
+def _survey_create(title="Enquete agricole"):
+    question = survey_schema.QuestionCreate
+    return survey_schema.SurveyCreate(Title=title, Description="Campagne 2024", Sections=[
+        survey_schema.SectionCreate(Title="Menage", Subsections=[
+            survey_schema.SubsectionCreate(Title="Chef de menage", Questions=[
+                question(QuestionText="Nom", QuestionType="text"),
+                question(QuestionText="Sexe", QuestionType="single_choice", AnswerOptions=[
+                    survey_schema.AnswerOptionCreate(OptionText="Homme"),
+                    survey_schema.AnswerOptionCreate(OptionText="Femme")
+                ])
+            ]),
+            survey_schema.SubsectionCreate(Title="Vide")
+        ], Questions=[question(QuestionText="Taille du menage", QuestionType="number")]),
+        survey_schema.SectionCreate(Title="Cultures", Questions=[
+            question(QuestionText="Culture principale", QuestionType="single_choice", AnswerOptions=[
+                survey_schema.AnswerOptionCreate(OptionText=text) for text in ("Mil", "Sorgho", "Riz")
+            ])
+        ])
+    ])
+
+
+def _shape(tree):
+    """Titles, question texts and option texts of a survey tree, without ids"""
+    def questions(items):
+        return [(q["QuestionText"], q["QuestionType"], [o["OptionText"] for o in q["AnswerOptions"]]) for q in items]
+    return [
+        (section["Title"],
+         [(subsection["Title"], questions(subsection["Questions"])) for subsection in section["Subsections"]],
+         questions(section["Questions"]))
+        for section in tree["Sections"]
+    ]
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def db(request, survey_models):
+    make_session = request.getfixturevalue(f"make_{'pg' if request.param == 'postgresql' else 'sqlite'}_session")
+    session = make_session(*survey_models)()
+    yield session
+    session.close()
+
+
+def test_created_tree_loads_back_unchanged(db):
+    """Every level is wired to the ids returned by its parent's batched insert"""
+    survey_service.create_survey(db, _survey_create("Premiere"), SCHEMA)
+    survey_id = survey_service.create_survey(db, _survey_create(), SCHEMA).SurveyID
+
+    tree = survey_service.get_survey_tree(db, survey_id, SCHEMA)
+    assert tree["Title"] == "Enquete agricole"
+    assert _shape(tree) == [
+        ("Menage",
+         [("Chef de menage", [("Nom", "text", []), ("Sexe", "single_choice", ["Homme", "Femme"])]), ("Vide", [])],
+         [("Taille du menage", "number", [])]),
+        ("Cultures", [], [("Culture principale", "single_choice", ["Mil", "Sorgho", "Riz"])])
+    ]
+    section = tree["Sections"][0]
+    assert {q["SubsectionID"] for q in section["Subsections"][0]["Questions"]} == {
+        section["Subsections"][0]["SubsectionID"]
+    }
+    assert survey_service.get_survey_tree(db, survey_id + 1, SCHEMA) is None
+
+
+def test_failed_insert_leaves_nothing_behind(db):
+    """A failing level rolls back the whole survey"""
+    survey = _survey_create()
+    survey.Sections[1].Questions[0].AnswerOptions.append(survey_schema.AnswerOptionCreate.model_construct(
+        OptionText=None
+    ))
+    with pytest.raises(IntegrityError):
+        survey_service.create_survey(db, survey, SCHEMA)
+    assert [db.query(model).count() for model in (models.Survey, models.Section, models.Question)] == [0, 0, 0]
+
+
+def test_tree_projection(db):
+    """Projected questions only carry the requested fields; options are skipped unless asked for"""
+    survey_id = survey_service.create_survey(db, _survey_create(), SCHEMA).SurveyID
+    tree = survey_service.get_survey_tree(db, survey_id, SCHEMA, question_fields=["QuestionText"])
+    assert tree["Sections"][1]["Questions"] == [{"QuestionText": "Culture principale"}]
+    assert tree["Sections"][0]["Subsections"][0]["Questions"] == [{"QuestionText": "Nom"}, {"QuestionText": "Sexe"}]
+
+
+def test_tree_route(make_api_client, survey_models):
+    """Unknown fields are a 400, a missing survey a 404"""
+    client = make_api_client(*survey_models)
+    db = db_manager.SessionLocal()
+    survey_id = survey_service.create_survey(db, _survey_create(), SCHEMA).SurveyID
+    db.close()
+
+    response = client.get(f"/v1/api/surveys/{SCHEMA}/{survey_id}/tree", params={"fields": "QuestionType, AnswerOptions"})
+    assert response.status_code == 200
+    (question,) = response.json()["data"]["Sections"][1]["Questions"]
+    assert sorted(question) == ["AnswerOptions", "QuestionType"]
+    assert [option["OptionText"] for option in question["AnswerOptions"]] == ["Mil", "Sorgho", "Riz"]
+    full = client.get(f"/v1/api/surveys/{SCHEMA}/{survey_id}")
+    assert _shape(full.json()["data"])[1] == ("Cultures", [], [("Culture principale", "single_choice", ["Mil", "Sorgho", "Riz"])])
+    assert client.get(f"/v1/api/surveys/{SCHEMA}/{survey_id}/tree", params={"fields": "Secret"}).status_code == 400
+    assert client.get(f"/v1/api/surveys/{SCHEMA}/{survey_id + 1}/tree").status_code == 404
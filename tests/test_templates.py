@@ -0,0 +1,75 @@
+"""
+Tests for the stored survey template statistics
+"""
+import pytest
+from fastapi import HTTPException
+
+from src.domain.instat.instat_services import TemplateService, compute_template_statistics, template_summary_cache
+from src.infrastructure.database.models import SurveyTemplate
+from schemas.instat_domains import SurveyTemplateCreate
+
+
+def _sections(question_count):
+    """Two sections: half the questions in a subsection of the first, the rest in the second"""
+    half = question_count // 2
+    return [
+        {"title": "A", "questions": [], "subsections": [{"title": "A.1", "questions": [{"text": "q"}] * half}]},
+        {"title": "B", "questions": [{"text": "q"}] * (question_count - half)}
+    ]
+
+
+@pytest.fixture
+def service(make_sqlite_session):
+    template_summary_cache.invalidate()
+    db = make_sqlite_session(SurveyTemplate)()
+    yield TemplateService(db)
+    db.close()
+    template_summary_cache.invalidate()
+
+
+def test_compute_template_statistics():
+    assert compute_template_statistics(None) == {
+        "SectionCount": 0, "SubsectionCount": 0, "QuestionCount": 0, "ComplexityLevel": "Low"
+    }
+    assert compute_template_statistics(_sections(21)) == {
+        "SectionCount": 2, "SubsectionCount": 1, "QuestionCount": 21, "ComplexityLevel": "Medium"
+    }
+    assert compute_template_statistics(_sections(51))["ComplexityLevel"] == "High"
+
+
+def test_statistics_are_stored_and_recomputed(service):
+    """Creating a template stores its counts; updating Sections recomputes them"""
+    template = service.create_template(SurveyTemplateCreate(
+        TemplateName="Diagnostic", Domain="sds", Category="diagnostic", Sections=_sections(4)
+    ))
+    assert (template.QuestionCount, template.ComplexityLevel) == (4, "Low")
+
+    updated = service.update_template(template.TemplateID, {"Sections": _sections(30), "Version": "2.0.0"})
+    assert (updated.SectionCount, updated.QuestionCount, updated.ComplexityLevel) == (2, 30, "Medium")
+    details = service.get_template_with_sections(template.TemplateID)
+    assert details["metadata"] == {
+        "total_sections": 2, "total_subsections": 1, "total_questions": 30, "template_complexity": "Medium"
+    }
+    assert service.update_template(template.TemplateID + 1, {"Version": "3"}) is None
+    for field in ("QuestionCount", "Colour"):
+        with pytest.raises(HTTPException) as error:
+            service.update_template(template.TemplateID, {field: 1})
+        assert error.value.status_code == 400
+
+
+def test_templates_with_stats_use_stored_columns(service):
+    """Listings read the stored counts and a cached summary refreshed on writes"""
+    for name, domain, count in (("Zeta", "sds", 60), ("Alpha", "ssn", 3), ("Mu", "sds", 25)):
+        service.create_template(SurveyTemplateCreate(
+            TemplateName=name, Domain=domain, Category="diagnostic", Sections=_sections(count)
+        ))
+    listing = service.list_templates_with_stats(limit=2)
+    assert [(t["TemplateName"], t["question_count"], t["complexity_level"]) for t in listing["templates"]] == [
+        ("Alpha", 3, "Low"), ("Mu", 25, "Medium")
+    ]
+    assert "Sections" not in listing["templates"][0]
+    assert listing["pagination"] == {"total": 3, "page": 1, "size": 2, "pages": 2}
+    assert listing["summary"]["templates_by_domain"] == {"sds": 2, "ssn": 1}
+
+    service.create_template(SurveyTemplateCreate(TemplateName="Nu", Domain="des", Category="diagnostic"))
+    assert service.list_templates_with_stats()["summary"]["total_templates"] == 4
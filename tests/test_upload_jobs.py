@@ -0,0 +1,129 @@
+"""
+Tests for asynchronous upload jobs and their stage records
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import config
+from src.api.v1 import file_upload
+from src.infrastructure.database import models
+from src.infrastructure.database.connection import db_manager
+from src.services.upload_jobs import UPLOAD_JOB_STAGES, STALE_JOB_ERROR, UploadJobAbortedError, UploadJobService
+
+STRUCTURE = {
+    "title": "Enquete menages",
+    "description": "Survey generated from menages.xlsx",
+    "sections": [
+        {"title": "Identification", "subsections": [], "questions": [
+            {"text": "Nom", "type": "text", "options": []},
+            {"text": "Electricite", "type": "single_choice", "options": [
+                {"text": "Oui", "value": "Oui"}, {"text": "Non", "value": "Non"}
+            ]}
+        ]},
+        {"title": "Vide", "subsections": [], "questions": []}
+    ]
+}
+
+
+def _statuses(job):
+    return {entry["name"]: entry["status"] for entry in job.Stages}
+
+
+@pytest.fixture
+def jobs(make_sqlite_session, survey_models, monkeypatch, tmp_path):
+    """Job service on a database holding the job, survey and template tables"""
+    session_factory = make_sqlite_session(models.ParsingResult, models.SurveyTemplate, *survey_models)
+    monkeypatch.setattr(db_manager, "SessionLocal", session_factory)
+    monkeypatch.setattr(config, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    db = session_factory()
+    yield UploadJobService(db)
+    db.close()
+
+
+def test_stage_records_and_progress(jobs):
+    """Finished, failed and skipped stages count towards progress; a failure skips what did not run"""
+    job = jobs.create_job("menages.xlsx", "ab" * 32, "survey_program", "admin", create_template=False)
+    assert job.Status == "queued" and [entry["name"] for entry in job.Stages] == list(UPLOAD_JOB_STAGES)
+    assert UploadJobService.job_progress(job)["progress"] == 25.0
+
+    started = jobs.start_stage(job, "parse")
+    assert (job.Status, job.CurrentStage, _statuses(job)["parse"]) == ("running", "parse", "running")
+    jobs.finish_stage(job, "parse", started, details={"from_cache": True})
+    parse = job.Stages[0]
+    assert parse["status"] == "completed" and parse["duration_seconds"] >= 0 and parse["details"] == {"from_cache": True}
+    assert UploadJobService.job_progress(job)["progress"] == 50.0
+
+    jobs.fail_job(job, "Survey structure has validation issues", ["Question sans texte"])
+    job = jobs.get_job(job.JobID)
+    progress = UploadJobService.job_progress(job)
+    assert (progress["status"], progress["progress"], progress["issues"]) == ("failed", 100.0, ["Question sans texte"])
+    assert _statuses(job) == {
+        "parse": "completed", "validate": "skipped", "create_survey": "skipped", "create_template": "skipped"
+    }
+
+
+def _run(jobs, monkeypatch, tmp_path, validation_issues):
+    """Run the background pipeline of a new job on a fixed parse result"""
+    async def parse(db, file_path, content_hash):
+        return dict(STRUCTURE), validation_issues, False
+
+    monkeypatch.setattr(file_upload, "_parse_cached", parse)
+    file_path = tmp_path / "menages.xlsx"
+    job = jobs.create_job(file_path.name, "ab" * 32, "survey_program", "admin")
+    upload_info = {"original_filename": "menages.xlsx", "content_sha256": "ab" * 32}
+    asyncio.run(file_upload._run_upload_job(job.JobID, file_path, upload_info, "survey_program", True, None))
+    jobs.db.expire_all()
+    return jobs.get_job(job.JobID)
+
+
+def test_pipeline_creates_the_survey_and_template(jobs, monkeypatch, tmp_path):
+    job = _run(jobs, monkeypatch, tmp_path, [])
+    progress = UploadJobService.job_progress(job, include_structure=True)
+    assert (progress["status"], progress["progress"], progress["current_stage"]) == ("completed", 100.0, None)
+    assert set(_statuses(job).values()) == {"completed"}
+    assert progress["survey_structure"]["upload_metadata"]["original_filename"] == "menages.xlsx"
+    assert jobs.db.get(models.Survey, job.SurveyID).Title == "Enquete menages"
+    template = jobs.db.get(models.SurveyTemplate, job.TemplateID)
+    assert (template.TemplateName, template.QuestionCount) == ("Template_menages", 2)
+    assert (tmp_path / "generated" / "menages_structure.json").exists()
+
+
+def test_pipeline_stops_at_validation_issues(jobs, monkeypatch, tmp_path):
+    job = _run(jobs, monkeypatch, tmp_path, ["Section 'Vide' sans question"])
+    assert (job.Status, job.ErrorMessage) == ("failed", "Survey structure has validation issues")
+    assert _statuses(job) == {
+        "parse": "completed", "validate": "failed", "create_survey": "skipped", "create_template": "skipped"
+    }
+    assert job.ValidationIssues == ["Section 'Vide' sans question"]
+    assert jobs.db.query(models.Survey).count() == 0
+
+
+def test_stale_jobs_are_failed_and_their_worker_stops(jobs):
+    """Jobs not updated within the timeout are failed, at startup or when polled; their worker then stops"""
+    running = jobs.create_job("menages.xlsx", "ab" * 32, "survey_program", "admin")
+    started = jobs.start_stage(running, "parse")
+    queued = jobs.create_job("bilan.xlsx", "cd" * 32, "survey_program", "admin")
+    later = datetime.utcnow() + timedelta(seconds=config.UPLOAD_JOB_TIMEOUT_SECONDS + 1)
+
+    assert jobs.fail_stale_jobs() == 0
+    assert not jobs.fail_if_stale(queued, now=later - timedelta(seconds=2))
+    assert jobs.fail_if_stale(queued, now=later)
+    assert jobs.fail_stale_jobs(now=later) == 1
+    assert jobs.fail_stale_jobs(now=later) == 0
+
+    running, queued = jobs.get_job(running.JobID), jobs.get_job(queued.JobID)
+    assert (running.Status, running.ErrorMessage, running.CurrentStage) == ("failed", STALE_JOB_ERROR, None)
+    assert _statuses(running) == {
+        "parse": "failed", "validate": "skipped", "create_survey": "skipped", "create_template": "skipped"
+    }
+    assert (queued.Status, set(_statuses(queued).values())) == ("failed", {"skipped"})
+    assert not jobs.fail_if_stale(running, now=later)
+
+    with pytest.raises(UploadJobAbortedError):
+        jobs.finish_stage(running, "parse", started)
+    with pytest.raises(UploadJobAbortedError):
+        jobs.complete_job(running, 1, None, {})
+    jobs.fail_job(running, "Failed to parse Excel file: boom")
+    assert jobs.get_job(running.JobID).ErrorMessage == STALE_JOB_ERROR
@@ -0,0 +1,99 @@
+"""
+Tests for the JSON-lines upload log shared by worker processes
+"""
+import json
+import multiprocessing
+import os
+import shutil
+from datetime import datetime, timedelta
+
+from src.utils.upload_tracker import UploadTracker
+
+
+def _upload(name, user="alice"):
+    return {"original_filename": name, "uploaded_by": user, "file_size": 10}
+
+
+def _ids(log_file):
+    with open(log_file, encoding="utf-8") as f:
+        return [json.loads(line)["id"] for line in f if line.strip()]
+
+
+def test_compaction_with_a_reused_inode_is_noticed(tmp_path, monkeypatch):
+    """Another tracker rescans a compacted log even when the file keeps its inode"""
+    def replace_in_place(source, target):
+        # Same effect as a file system reusing the inode of the replaced file
+        shutil.copyfile(source, target)
+        os.unlink(source)
+
+    monkeypatch.setattr(os, "replace", replace_in_place)
+    log_file = tmp_path / "uploads.jsonl"
+    writer = UploadTracker(str(log_file), max_entries=4)
+    reader = UploadTracker(str(log_file), max_entries=4)
+
+    for i in range(7):
+        writer.log_upload(_upload(f"file-{i}.xlsx"))
+    assert len(reader.get_recent_uploads(limit=50)) == 7
+
+    # The eighth upload compacts the log to the newest four, three more follow
+    for i in range(7, 11):
+        writer.log_upload(_upload(f"file-{i}.xlsx"))
+    reader.log_upload(_upload("from-reader.xlsx"))
+
+    # Its upload took the next id and, as the eighth line, compacted the log again
+    ids = _ids(log_file)
+    assert ids == [9, 10, 11, 12]
+    assert [u["id"] for u in reader.get_recent_uploads(limit=50)] == ids
+
+
+def _log_uploads(log_file, count):
+    tracker = UploadTracker(log_file, max_entries=20)
+    for i in range(count):
+        tracker.log_upload(_upload(f"{os.getpid()}-{i}.xlsx", user=str(os.getpid())))
+
+
+def test_concurrent_processes_get_distinct_ids(tmp_path):
+    """Processes logging through compactions never hand out the same id twice"""
+    log_file = str(tmp_path / "uploads.jsonl")
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_log_uploads, args=(log_file, 45)) for _ in range(8)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+    ids = _ids(log_file)
+    assert ids == sorted(set(ids))
+    assert ids[-1] == 8 * 45
+
+
+def test_queries_return_copies(tmp_path):
+    """Changing a returned entry does not change the tracker's indexes"""
+    tracker = UploadTracker(str(tmp_path / "uploads.jsonl"))
+    tracker.log_upload(_upload("survey.xlsx"))
+
+    tracker.get_recent_uploads()[0]["uploaded_by"] = "mallory"
+    tracker.get_uploads_by_user("alice")[0]["file_size"] = 0
+    now = datetime.utcnow()
+    tracker.get_uploads_by_date_range(now - timedelta(days=1), now + timedelta(days=1))[0].clear()
+
+    entry = tracker.get_uploads_by_user("alice")[0]
+    assert (entry["uploaded_by"], entry["file_size"], entry["original_filename"]) == ("alice", 10, "survey.xlsx")
+    assert tracker.get_upload_statistics()["total_file_size"] == 10
+
+
+def test_old_entries_are_cleaned_up(tmp_path):
+    """cleanup_old_files deletes expired uploads and drops them from the log"""
+    log_file = tmp_path / "uploads.jsonl"
+    old_file = tmp_path / "old.xlsx"
+    old_file.write_bytes(b"x")
+    old = dict(_upload("old.xlsx"), id=1, file_path=str(old_file),
+               timestamp=(datetime.utcnow() - timedelta(days=60)).isoformat())
+    log_file.write_text(json.dumps(old) + "\n")
+
+    tracker = UploadTracker(str(log_file))
+    tracker.log_upload(_upload("new.xlsx"))
+    assert tracker.cleanup_old_files(days_old=30) == 1
+    assert not old_file.exists()
+    assert [u["original_filename"] for u in tracker.get_recent_uploads()] == ["new.xlsx"]
@@ -0,0 +1,76 @@
+"""
+Tests for the per-token cache of authenticated users
+"""
+import asyncio
+
+import pytest
+
+from src.infrastructure.auth import oauth2
+from src.infrastructure.database import models
+from src.infrastructure.database.connection import db_manager
+
+STATISTICS = "/v1/api/admin/user-cache/statistics"
+
+
+@pytest.fixture
+def client(make_api_client):
+    return make_api_client(models.AuditLog)
+
+
+def _user_token(client):
+    """Create a viewer through the API and return its id and an access token"""
+    user = client.post("/v1/api/admin/users", json={
+        "email": "awa@instat.ml", "first_name": "Awa", "last_name": "Traore", "role": "viewer",
+        "password": "s3cret-pass"
+    }).json()
+    token = oauth2.create_access_token({"sub": user["username"]})
+    return user["user_id"], {"Authorization": f"Bearer {token}"}
+
+
+def test_cached_user_is_reused_per_token(client):
+    """Repeated requests with one token read the user once; each token has its own entry"""
+    before = client.get(STATISTICS).json()
+    statistics = client.get(STATISTICS).json()
+    assert (statistics["entries"], statistics["hits"] - before["hits"], statistics["misses"]) == (1, 1, before["misses"])
+
+    _, headers = _user_token(client)
+    assert client.get(STATISTICS, headers=headers).status_code == 403
+    assert client.get(STATISTICS).json()["entries"] == 2
+
+
+def test_user_changes_drop_the_cached_user(client):
+    """Changes made through UserService apply to the next request, others after the TTL"""
+    user_id, headers = _user_token(client)
+    assert client.get(STATISTICS, headers=headers).status_code == 403
+
+    assert client.put(f"/v1/api/admin/users/{user_id}", json={"role": "admin"}).status_code == 200
+    assert client.get(STATISTICS, headers=headers).status_code == 200
+
+    # Written behind UserService's back: served from the cache until it expires
+    db = db_manager.SessionLocal()
+    db.query(models.User).filter(models.User.UserID == user_id).update({"Role": "viewer"})
+    db.commit()
+    db.close()
+    assert client.get(STATISTICS, headers=headers).status_code == 200
+    oauth2.user_cache.invalidate()
+    assert client.get(STATISTICS, headers=headers).status_code == 403
+
+    assert client.delete(f"/v1/api/admin/users/{user_id}").status_code == 200
+    assert client.get(STATISTICS, headers=headers).status_code == 401
+
+
+def test_cached_user_cannot_be_altered_by_callers():
+    """get_current_user hands out copies of the cached user"""
+    cached = oauth2.UserInToken(
+        username="awa", email="awa@instat.ml", first_name="Awa", last_name="Traore", role="viewer",
+        status="active", department=None, user_id=1, scopes=["context:read"]
+    )
+    oauth2.user_cache.invalidate()
+    oauth2.user_cache.put(("awa", "t1"), cached)
+    try:
+        token = oauth2.create_access_token({"sub": "awa", "jti": "t1"})
+        user = asyncio.run(oauth2.get_current_user(oauth2.SecurityScopes([]), token, db=None))
+        user.scopes.append("admin")
+        assert oauth2.user_cache.get(("awa", "t1")).scopes == ["context:read"]
+    finally:
+        oauth2.user_cache.invalidate()